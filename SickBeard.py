@@ -55,7 +55,7 @@ import sickbeard
 
 from sickbeard import db
 from sickbeard.tv import TVShow
-from sickbeard import logger
+from sickbeard import logger, show_list
 from sickbeard.version import SICKBEARD_VERSION
 from sickbeard.databases.mainDB import MAX_DB_VERSION
 
@@ -78,7 +78,7 @@ def loadShowsFromDB():
 
     for sqlShow in sqlResults:
         try:
-            curShow = TVShow(int(sqlShow["tvdb_id"]))
+            curShow = TVShow(int(sqlShow["tvdb_id"]), sqlShow=sqlShow)
             sickbeard.showList.append(curShow)
         except Exception, e:
             logger.log(u"There was an error creating the show in " + sqlShow["location"] + ": " + str(e).decode('utf-8'), logger.ERROR)
@@ -279,7 +279,7 @@ def main():
     # Initialize the config and our threads
     sickbeard.initialize(consoleLogging=consoleLogging)
 
-    sickbeard.showList = []
+    sickbeard.showList = show_list.ShowList()
 
     if sickbeard.DAEMON:
         daemonize()
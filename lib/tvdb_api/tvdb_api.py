@@ -14,6 +14,8 @@ Example usage:
 >>> t['Lost'][4][11]['episodename']
 u'Cabin Fever'
 """
+from __future__ import with_statement
+
 __author__ = "dbr/Ben"
 __version__ = "1.8.2"
 
@@ -28,6 +30,8 @@ import warnings
 import logging
 import datetime
 import zipfile
+import threading
+from itertools import izip
 
 try:
     import xml.etree.cElementTree as ElementTree
@@ -40,7 +44,7 @@ except ImportError:
     gzip = None
 
 
-from tvdb_cache import CacheHandler
+from tvdb_cache import CacheHandler, UncachedRequest
 
 from tvdb_ui import BaseUI, ConsoleUI
 from tvdb_exceptions import (tvdb_error, tvdb_userabort, tvdb_shownotfound,
@@ -52,6 +56,226 @@ def log():
     return logging.getLogger("tvdb_api")
 
 
+# marks an attribute an episode doesn't have in CachedShow.episodes
+_MISSING = object()
+
+
+def _roughSize(value):
+    """A rough guess of how much memory the strings, dicts and lists making
+    up a value take
+    """
+    if isinstance(value, basestring):
+        return len(value)
+    if isinstance(value, dict):
+        return 100 + sum(_roughSize(x) + _roughSize(y) for x, y in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return 50 + sum(_roughSize(x) for x in value)
+    return 8
+
+
+class CachedShow(object):
+    """The parsed data of one show as kept in the ShowDataCache.
+
+    Instead of an Episode dict per episode the attribute names are kept once
+    in fields and every episode is a (season, episode, values) tuple with the
+    values in the same order. Repeated values share one string.
+    """
+    __slots__ = ('data', 'fields', 'episodes', 'size', 'checked')
+
+    def __init__(self, data, episodes):
+        self.data = data
+        self.checked = time.time()
+
+        fields = []
+        for seas_no, ep_no, row in episodes:
+            for tag in row:
+                if tag not in fields:
+                    fields.append(tag)
+        self.fields = tuple(fields)
+
+        pool = {}
+        self.episodes = []
+        for seas_no, ep_no, row in episodes:
+            values = tuple(pool.setdefault(row[x], row[x]) if x in row else _MISSING for x in self.fields)
+            self.episodes.append((seas_no, ep_no, values))
+
+        # a rough guess of how much memory this takes
+        self.size = 200 * len(data) + 100 * len(self.episodes) + 8 * len(self.fields) * len(self.episodes)
+        self.size += sum(len(x) for x in pool if isinstance(x, basestring))
+        self.size += sum(len(x) for x in data.values() if isinstance(x, basestring))
+
+    def fillShow(self, show):
+        """Adds this data to the given Show
+        """
+        show.data.update(self.data)
+
+        for seas_no, ep_no, values in self.episodes:
+            if seas_no not in show:
+                show[seas_no] = Season(show = show)
+            season = dict.__getitem__(show, seas_no)
+            if ep_no not in season:
+                season[ep_no] = Episode(season = season)
+            dict.__getitem__(season, ep_no).update((x, y) for x, y in izip(self.fields, values) if y is not _MISSING)
+
+
+class ShowDataCache(object):
+    """The data of recently loaded shows, shared by all Tvdb instances.
+
+    Shows are kept by (sid, language) until they're evicted to keep the size
+    below max_size (least recently used first). Once a show is older than
+    ttl seconds TheTVDB's updates are checked before it's used again. Only
+    the shows which changed since are dropped (and reloaded without the disk
+    cache), the rest are good for another ttl.
+    """
+
+    def __init__(self, max_size = 32 * 1024 * 1024, ttl = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._shows = {}
+        self._order = []
+        self._size = 0
+        self._changed = set()
+
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.update_checks = 0
+        self.changed = 0
+
+    def get(self, key, getUpdates):
+        """Returns the CachedShow for key or None. getUpdates(since) is
+        called to get the sids which changed since the given time if the show
+        is older than the ttl, it returns None if it can't tell.
+        """
+        with self._lock:
+            cached = self._shows.get(key)
+            expired = cached is not None and time.time() - cached.checked > self.ttl
+
+        if expired:
+            self._checkUpdates(getUpdates)
+
+        with self._lock:
+            cached = self._shows.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._order.remove(key)
+            self._order.append(key)
+            return cached
+
+    def isChanged(self, sid):
+        """True if the show was dropped because it changed on TheTVDB and
+        hasn't been loaded since (so the disk cache is stale too)
+        """
+        with self._lock:
+            return sid in self._changed
+
+    def add(self, key, cached):
+        with self._lock:
+            self._remove(key)
+            self._changed.discard(key[0])
+
+            self._shows[key] = cached
+            self._order.append(key)
+            self._size += cached.size
+
+            while self._size > self.max_size and len(self._order) > 1:
+                self._remove(self._order[0])
+
+    def addData(self, key, cached, name, value):
+        """Adds a piece of series data (the banners or actors an instance
+        loaded later) to a cached show. The data dict is replaced rather than
+        changed since other instances may be reading it, and nothing's done
+        if the show was dropped or reloaded since.
+        """
+        with self._lock:
+            if self._shows.get(key) is not cached:
+                return
+
+            data = dict(cached.data)
+            data[name] = value
+            cached.data = data
+
+            addedSize = _roughSize(value)
+            cached.size += addedSize
+            self._size += addedSize
+
+            while self._size > self.max_size and len(self._order) > 1:
+                self._remove(self._order[0])
+
+    def _remove(self, key):
+        if key in self._shows:
+            self._size -= self._shows.pop(key).size
+            self._order.remove(key)
+
+    def _checkUpdates(self, getUpdates):
+        # only one thread needs to ask, the rest wait for its answer
+        with self._update_lock:
+            with self._lock:
+                now = time.time()
+                expired = [x for x in self._shows if now - self._shows[x].checked > self.ttl]
+                if not expired:
+                    return
+                since = min(self._shows[x].checked for x in self._shows)
+
+                # the updates only go back 30 days
+                if now - since > 29 * 24 * 60 * 60:
+                    for key in expired:
+                        self._remove(key)
+                    return
+
+            self.update_checks += 1
+            try:
+                changed = getUpdates(int(since))
+            except tvdb_error, e:
+                log().debug("Unable to get the updates from thetvdb.com: %s" % e)
+                changed = None
+
+            with self._lock:
+                if changed is None:
+                    for key in expired:
+                        self._remove(key)
+                    return
+
+                for key in self._shows.keys():
+                    if key[0] in changed:
+                        log().debug("Show %s changed on thetvdb.com, dropping it from the cache" % key[0])
+                        self._remove(key)
+                        self._changed.add(key[0])
+                        self.changed += 1
+                    else:
+                        self._shows[key].checked = now
+
+    def clear(self):
+        with self._lock:
+            self._shows = {}
+            self._order = []
+            self._size = 0
+            self._changed = set()
+
+            self.hits = 0
+            self.misses = 0
+            self.update_checks = 0
+            self.changed = 0
+
+    def getStats(self):
+        with self._lock:
+            return {'shows': len(self._shows),
+                    'episodes': sum(len(x.episodes) for x in self._shows.values()),
+                    'size': self._size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'update_checks': self.update_checks,
+                    'changed': self.changed}
+
+show_data_cache = ShowDataCache()
+
+
 class ShowContainer(dict):
     """Simple dict that holds a series of Show instances
     """
@@ -290,6 +514,24 @@ class Actor(dict):
         return "<Actor \"%s\">" % (self.get("name"))
 
 
+class RateLimitHandler(urllib2.BaseHandler):
+    """Calls limiter.wait() before every request that goes to the server.
+
+    It runs just before the HTTP handler, so responses from the
+    CacheHandler never get this far.
+    """
+    handler_order = 400
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def http_open(self, request):
+        self.limiter.wait()
+        return None # let the HTTP handler make the request
+
+    https_open = http_open
+
+
 class Tvdb:
     """Create easy-to-use interface to name of season/episode name
     >>> t = Tvdb()
@@ -308,7 +550,8 @@ class Tvdb:
                 search_all_languages = False,
                 apikey = None,
                 forceConnect=False,
-                useZip=False):
+                useZip=False,
+                rate_limiter=None):
 
         """interactive (True/False):
             When True, uses built-in console UI is used to select the correct show.
@@ -380,6 +623,11 @@ class Tvdb:
             Download the zip archive where possibale, instead of the xml.
             This is only used when all episodes are pulled.
             And only the main language xml is used, the actor and banner xml are lost.
+
+        rate_limiter (object with a wait() method):
+            If given, rate_limiter.wait() is called before every request that
+            goes to thetvdb.com (cached responses don't count), it should
+            sleep for as long as it takes to stay within the rate limit.
         """
         
         global lastTimeout
@@ -411,22 +659,26 @@ class Tvdb:
         self.config['useZip'] = useZip
 
 
+        handlers = []
+        if rate_limiter is not None:
+            handlers.append(RateLimitHandler(rate_limiter))
+
         if cache is True:
             self.config['cache_enabled'] = True
             self.config['cache_location'] = self._getTempDir()
             self.urlopener = urllib2.build_opener(
-                CacheHandler(self.config['cache_location'])
+                CacheHandler(self.config['cache_location']), *handlers
             )
 
         elif cache is False:
             self.config['cache_enabled'] = False
-            self.urlopener = urllib2.build_opener() # default opener with no caching
+            self.urlopener = urllib2.build_opener(*handlers) # default opener with no caching
 
         elif isinstance(cache, basestring):
             self.config['cache_enabled'] = True
             self.config['cache_location'] = cache
             self.urlopener = urllib2.build_opener(
-                CacheHandler(self.config['cache_location'])
+                CacheHandler(self.config['cache_location']), *handlers
             )
 
         elif isinstance(cache, urllib2.OpenerDirector):
@@ -493,6 +745,8 @@ class Tvdb:
         self.config['url_seriesBanner'] = u"%(base_url)s/api/%(apikey)s/series/%%s/banners.xml" % self.config
         self.config['url_artworkPrefix'] = u"%(base_url)s/banners/%%s" % self.config
 
+        self.config['url_updates'] = u"%(base_url)s/api/Updates.php?type=series&time=%%s" % self.config
+
     #end __init__
 
     def _getTempDir(self):
@@ -521,8 +775,9 @@ class Tvdb:
                     resp.headers['x-local-cache'])
                 )
                 if recache:
+                    # through the opener, so it's rate limited like any other request
                     log().debug("Attempting to recache %s" % url)
-                    resp.recache()
+                    resp = self.urlopener.open(UncachedRequest(url))
         except (IOError, urllib2.URLError), errormsg:
             if not str(errormsg).startswith('HTTP Error'):
                 lastTimeout = datetime.datetime.now()
@@ -554,18 +809,24 @@ class Tvdb:
 
         return resp.read()
 
-    def _getetsrc(self, url, language=None):
+    def _getetsrc(self, url, language=None, recache=False):
         """Loads a URL using caching, returns an ElementTree of the source
         """
-        src = self._loadUrl(url, language=language)
+        return self._parseUrl(url, ElementTree.fromstring, language, recache)
+
+    def _parseUrl(self, url, parser, language=None, recache=False):
+        """Loads a URL using caching and returns parser(source), it's
+        loaded again without the cache if it can't be parsed
+        """
+        src = self._loadUrl(url, recache=recache, language=language)
         try:
             # TVDB doesn't sanitize \r (CR) from user input in some fields,
             # remove it to avoid errors. Change from SickBeard, from will14m
-            return ElementTree.fromstring(src.rstrip("\r"))
+            return parser(src.rstrip("\r"))
         except SyntaxError:
             src = self._loadUrl(url, recache=True, language=language)
             try:
-                return ElementTree.fromstring(src.rstrip("\r"))
+                return parser(src.rstrip("\r"))
             except SyntaxError, exceptionmsg:
                 errormsg = "There was an error with the XML retrieved from thetvdb.com:\n%s" % (
                     exceptionmsg
@@ -579,7 +840,22 @@ class Tvdb:
                 errormsg += "\nIf this does not resolve the issue, please try again later. If the error persists, report a bug on"
                 errormsg += "\nhttp://dbr.lighthouseapp.com/projects/13342-tvdb_api/overview\n"
                 raise tvdb_error(errormsg)
-    #end _getetsrc
+    #end _parseUrl
+
+    def _getUpdates(self, since):
+        """Returns the set of series IDs which changed on thetvdb.com since
+        the given time, this always goes to the server
+        """
+        url = self.config['url_updates'] % (since)
+        log().debug("Retrieving URL %s" % url)
+        try:
+            # through the opener so it's rate limited, but never from (or into) the cache
+            resp = self.urlopener.open(UncachedRequest(url, store = False))
+            updatesEt = ElementTree.fromstring(resp.read())
+        except (IOError, urllib2.URLError, SyntaxError), errormsg:
+            raise tvdb_error("Could not get the updates: %s" % (errormsg))
+
+        return set(int(x.text) for x in updatesEt.findall('Series'))
 
     def _setItem(self, sid, seas, ep, attrib, value):
         """Creates a new episode, creating Show(), Season() and
@@ -777,10 +1053,36 @@ class Tvdb:
             )
             getShowInLanguage = self.config['language']
 
+        # the series data is in getShowInLanguage and the episodes in language,
+        # only shows where they're the same go in the shared cache
+        cacheKey = None
+        recache = False
+        if language == getShowInLanguage:
+            cacheKey = (sid, language)
+            recache = show_data_cache.isChanged(sid)
+
+        if cacheKey and self.config['cache_enabled']:
+            cached = show_data_cache.get(cacheKey, self._getUpdates)
+            if cached:
+                log().debug('Using the cached series data for %s' % (sid))
+                show = Show()
+                cached.fillShow(show)
+                self.shows[sid] = show
+
+                # the instance which loaded it might not have wanted these
+                if self.config['banners_enabled'] and '_banners' not in cached.data:
+                    self._parseBanners(sid)
+                    show_data_cache.addData(cacheKey, cached, '_banners', show.data['_banners'])
+                if self.config['actors_enabled'] and '_actors' not in cached.data:
+                    self._parseActors(sid)
+                    show_data_cache.addData(cacheKey, cached, '_actors', show.data['_actors'])
+                return
+
         # Parse show information
         log().debug('Getting all series data for %s' % (sid))
         seriesInfoEt = self._getetsrc(
-            self.config['url_seriesInfo'] % (sid, getShowInLanguage)
+            self.config['url_seriesInfo'] % (sid, getShowInLanguage),
+            recache = recache
         )
         for curInfo in seriesInfoEt.findall("Series")[0]:
             tag = curInfo.tag.lower()
@@ -811,12 +1113,25 @@ class Tvdb:
         else:
             url = self.config['url_epInfo'] % (sid, language)
 
-        epsEt = self._getetsrc( url, language=language)
+        episodes = self._parseUrl(url, self._parseEpisodes, language, recache)
+
+        cached = CachedShow(dict(self.shows[sid].data), episodes)
+        cached.fillShow(self.shows[sid])
+        if cacheKey:
+            show_data_cache.add(cacheKey, cached)
+    #end _geEps
 
-        for cur_ep in epsEt.findall("Episode"):
-            seas_no = int(cur_ep.find('SeasonNumber').text)
-            ep_no = int(cur_ep.find('EpisodeNumber').text)
-            for cur_item in cur_ep.getchildren():
+    def _parseEpisodes(self, src):
+        """Parses the episodes XML one episode at a time, returns a list of
+        (season number, episode number, episode data dict)
+        """
+        episodes = []
+        for event, cur_ep in ElementTree.iterparse(StringIO.StringIO(src)):
+            if cur_ep.tag != "Episode":
+                continue
+
+            ep_data = {}
+            for cur_item in cur_ep:
                 tag = cur_item.tag.lower()
                 value = cur_item.text
                 if value is not None:
@@ -824,9 +1139,13 @@ class Tvdb:
                         value = self.config['url_artworkPrefix'] % (value)
                     else:
                         value = self._cleanData(value)
-                self._setItem(sid, seas_no, ep_no, tag, value)
+                ep_data[tag] = value
+
+            episodes.append((int(ep_data['seasonnumber']), int(ep_data['episodenumber']), ep_data))
+            cur_ep.clear()
         #end for cur_ep
-    #end _geEps
+
+        return episodes
 
     def _nameToSid(self, name):
         """Takes show name, returns the correct series ID (if the show has
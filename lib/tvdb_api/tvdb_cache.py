@@ -8,6 +8,16 @@
 """
 urllib2 caching handler
 Modified from http://code.activestate.com/recipes/491261/
+
+The responses are kept in a single SQLite database in the cache directory
+(tvdb_cache.db) with zlib compressed bodies, and the least recently used
+ones are evicted once the bodies take up more than max_size bytes.
+
+Run this module to look after a cache:
+
+    python tvdb_cache.py [--prune=DAYS] [--clear] [--vacuum] cache_location
+
+prints the number of responses, their size and the hit rate.
 """
 from __future__ import with_statement
 
@@ -16,106 +26,75 @@ __version__ = "1.8.2"
 
 import os
 import time
+import zlib
 import errno
 import httplib
+import logging
+import sqlite3
 import urllib2
 import StringIO
-from hashlib import md5
-from threading import RLock
+import threading
 
-cache_lock = RLock()
+CACHE_FILENAME = "tvdb_cache.db"
 
-def locked_function(origfunc):
-    """Decorator to execute function under lock"""
-    def wrapped(*args, **kwargs):
-        cache_lock.acquire()
-        try:
-            return origfunc(*args, **kwargs)
-        finally:
-            cache_lock.release()
-    return wrapped
+# total size of the compressed bodies before the least recently used are evicted
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+# evictions go this far under max_size so they don't happen on every store
+EVICT_TO = 0.9
 
-def calculate_cache_path(cache_location, url):
-    """Checks if [cache_location]/[hash_of_url].headers and .body exist
+# reads remember the access times and hit counts in memory, they're
+# written out with the next store or once this many have built up
+FLUSH_EVERY = 100
+
+def log():
+    return logging.getLogger("tvdb_cache")
+
+def remove_legacy_files(cache_location):
+    """Deletes the [hash_of_url].headers and .body files the old cache
+    wrote, returns how many were removed
     """
-    thumb = md5(url).hexdigest()
-    header = os.path.join(cache_location, thumb + ".headers")
-    body = os.path.join(cache_location, thumb + ".body")
-    return header, body
-
-def check_cache_time(path, max_age):
-    """Checks if a file has been created/modified in the [last max_age] seconds.
-    False means the file is too old (or doesn't exist), True means it is
-    up-to-date and valid"""
-    if not os.path.isfile(path):
-        return False
-    cache_modified_time = os.stat(path).st_mtime
-    time_now = time.time()
-    if cache_modified_time < time_now - max_age:
-        # Cache is old
-        return False
-    else:
-        return True
-
-@locked_function
-def exists_in_cache(cache_location, url, max_age):
-    """Returns if header AND body cache file exist (and are up-to-date)"""
-    hpath, bpath = calculate_cache_path(cache_location, url)
-    if os.path.exists(hpath) and os.path.exists(bpath):
-        return(
-            check_cache_time(hpath, max_age)
-            and check_cache_time(bpath, max_age)
-        )
-    else:
-        # File does not exist
-        return False
-
-@locked_function
-def store_in_cache(cache_location, url, response):
-    """Tries to store response in cache."""
-    hpath, bpath = calculate_cache_path(cache_location, url)
-    try:
-        outf = open(hpath, "wb")
-        headers = str(response.info())
-        outf.write(headers)
-        outf.close()
-
-        outf = open(bpath, "wb")
-        outf.write(response.read())
-        outf.close()
-    except IOError:
-        return True
-    else:
-        return False
-        
-@locked_function
-def delete_from_cache(cache_location, url):
-    """Deletes a response in cache."""
-    hpath, bpath = calculate_cache_path(cache_location, url)
-    try:
-        if os.path.exists(hpath):
-            os.remove(hpath)
-        if os.path.exists(bpath):
-            os.remove(bpath)
-    except IOError:
-        return True
-    else:
-        return False
+    removed = 0
+    for name in os.listdir(cache_location):
+        if not name.endswith((".headers", ".body")):
+            continue
+        try:
+            os.remove(os.path.join(cache_location, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
 
-class CacheHandler(urllib2.BaseHandler):
-    """Stores responses in a persistant on-disk cache.
+class CacheStore(object):
+    """The responses cached in one cache_location.
 
-    If a subsequent GET request is made for the same URL, the stored
-    response is returned, saving time, resources and bandwidth
+    Every thread gets its own connection to the database. Lookups never
+    take a lock (the database is in WAL mode so they don't wait on
+    writers either), writes are serialised by a lock so threads don't
+    fight over SQLite's.
+
+    The counters are only approximate, they aren't locked.
     """
-    @locked_function
-    def __init__(self, cache_location, max_age = 21600):
-        """The location of the cache directory"""
-        self.max_age = max_age
+
+    def __init__(self, cache_location, max_size = DEFAULT_MAX_SIZE):
         self.cache_location = cache_location
+        self.path = os.path.join(cache_location, CACHE_FILENAME)
+        self.max_size = max_size
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._touched = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._flushed_hits = 0
+        self._flushed_misses = 0
+
         if not os.path.exists(self.cache_location):
             try:
-                os.mkdir(self.cache_location)
+                os.makedirs(self.cache_location)
             except OSError, e:
                 if e.errno == errno.EEXIST and os.path.isdir(self.cache_location):
                     # File exists, and it's a directory,
@@ -126,46 +105,269 @@ class CacheHandler(urllib2.BaseHandler):
                     # relay the error!
                     raise
 
+        new_store = not os.path.exists(self.path)
+
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, headers TEXT, body BLOB, compressed INTEGER, raw_size INTEGER, size INTEGER, stored REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+        if new_store:
+            removed = remove_legacy_files(self.cache_location)
+            if removed:
+                log().debug("Removed %d files of the old cache from %s" % (removed, self.cache_location))
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout = 20, isolation_level = None)
+            conn.text_factory = str
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                # SQLite before 3.7, the lookups just wait on the writes
+                pass
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, url, max_age):
+        """Returns (headers, body) of the response for url if it was
+        stored in the last max_age seconds, None if it wasn't
+        """
+        row = self._connection().execute(
+            "SELECT headers, body, compressed, stored FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+
+        now = time.time()
+        if row is None or row[3] < now - max_age:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._touched[url] = now
+        if len(self._touched) >= FLUSH_EVERY and self._write_lock.acquire(False):
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._flush(conn)
+                    conn.execute("COMMIT")
+                except:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                self._write_lock.release()
+
+        headers, body, compressed = row[0], str(row[1]), row[2]
+        if compressed:
+            body = zlib.decompress(body)
+        return headers, body
+
+    def store(self, url, headers, body):
+        """Stores a response, evicting the least recently used ones if the
+        cache has got too big
+        """
+        data = zlib.compress(body)
+        compressed = len(data) < len(body)
+        if not compressed:
+            # already compressed (gzip/zip from the server)
+            data = body
+
+        now = time.time()
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (url, headers, body, compressed, raw_size, size, stored, accessed) VALUES (?,?,?,?,?,?,?,?)",
+                    (url, headers, sqlite3.Binary(data), int(compressed), len(body), len(data), now, now))
+                self.stores += 1
+                self._touched.pop(url, None)
+                self._flush(conn)
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, url):
+        """Deletes the response for url
+        """
+        with self._write_lock:
+            self._connection().execute("DELETE FROM responses WHERE url = ?", (url,))
+
+    def _flush(self, conn):
+        """Writes out the access times and counters built up by lookups,
+        callers hold the write lock
+        """
+        touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany("UPDATE responses SET accessed = ? WHERE url = ?",
+                             [(accessed, url) for (url, accessed) in touched.iteritems()])
+
+        hits, misses = self.hits, self.misses
+        for name, count in (("hits", hits - self._flushed_hits), ("misses", misses - self._flushed_misses)):
+            if count:
+                conn.execute("INSERT OR IGNORE INTO stats (name, value) VALUES (?, 0)", (name,))
+                conn.execute("UPDATE stats SET value = value + ? WHERE name = ?", (count, name))
+        self._flushed_hits, self._flushed_misses = hits, misses
+
+    def _evict(self, conn):
+        """Deletes the least recently used responses until the bodies take up
+        less than max_size, callers hold the write lock
+        """
+        size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        target = self.max_size * EVICT_TO
+        evicted = []
+        for url, url_size in conn.execute("SELECT url, size FROM responses ORDER BY accessed"):
+            if size <= target:
+                break
+            evicted.append((url,))
+            size -= url_size
+
+        conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+        self.evictions += len(evicted)
+        log().debug("Evicted %d responses from %s" % (len(evicted), self.path))
+
+    def prune(self, max_age):
+        """Deletes the responses stored more than max_age seconds ago,
+        returns how many there were
+        """
+        with self._write_lock:
+            cursor = self._connection().execute("DELETE FROM responses WHERE stored < ?", (time.time() - max_age,))
+            return cursor.rowcount
+
+    def clear(self):
+        """Deletes every response and resets the counters
+        """
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM stats")
+            self._touched = {}
+            self.hits = self.misses = self.stores = self.evictions = 0
+            self._flushed_hits = self._flushed_misses = 0
+
+    def vacuum(self):
+        """Gives the space left by deleted responses back to the filesystem
+        """
+        with self._write_lock:
+            self._connection().execute("VACUUM")
+
+    def get_stats(self):
+        """Returns a dict of the number and size of the cached responses and
+        the hits and misses since the cache was created (or cleared)
+        """
+        conn = self._connection()
+        entries, size, raw_size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM responses").fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+
+        hits = counters.get("hits", 0) + self.hits - self._flushed_hits
+        misses = counters.get("misses", 0) + self.misses - self._flushed_misses
+        if hits + misses:
+            hit_rate = round(float(hits) / (hits + misses), 3)
+        else:
+            hit_rate = None
+
+        file_size = 0
+        for suffix in ("", "-wal"):
+            if os.path.exists(self.path + suffix):
+                file_size += os.path.getsize(self.path + suffix)
+
+        return {"location": self.cache_location,
+                "entries": entries,
+                "size": size,
+                "raw_size": raw_size,
+                "file_size": file_size,
+                "max_size": self.max_size,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hit_rate,
+                "stores": self.stores,
+                "evictions": self.evictions}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(cache_location, max_size = DEFAULT_MAX_SIZE):
+    """Returns the CacheStore for cache_location, there's only one per
+    location so every handler using it shares the connections and counters
+    """
+    key = os.path.abspath(cache_location)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CacheStore(cache_location, max_size)
+        return _stores[key]
+
+def get_stats():
+    """Returns the stats of every cache opened by this process
+    """
+    with _stores_lock:
+        stores = _stores.values()
+    return [store.get_stats() for store in stores]
+
+class UncachedRequest(urllib2.Request):
+    """A GET request the CacheHandler always sends to the server, even if
+    the response is cached. The new response replaces the cached one
+    unless store is False
+    """
+    def __init__(self, url, store = True):
+        urllib2.Request.__init__(self, url)
+        self.store = store
+
+class CacheHandler(urllib2.BaseHandler):
+    """Stores responses in a persistant on-disk cache.
+
+    If a subsequent GET request is made for the same URL, the stored
+    response is returned, saving time, resources and bandwidth
+    """
+    def __init__(self, cache_location, max_age = 21600, max_size = DEFAULT_MAX_SIZE):
+        """The location of the cache directory"""
+        self.max_age = max_age
+        self.cache_location = cache_location
+        self.store = get_store(cache_location, max_size)
+
     def default_open(self, request):
         """Handles GET requests, if the response is cached it returns it
         """
-        if request.get_method() is not "GET":
+        if request.get_method() != "GET" or isinstance(request, UncachedRequest):
             return None # let the next handler try to handle the request
 
-        if exists_in_cache(
-            self.cache_location, request.get_full_url(), self.max_age
-        ):
-            return CachedResponse(
-                self.cache_location,
-                request.get_full_url(),
-                set_cache_header = True
-            )
-        else:
+        try:
+            cached = self.store.lookup(request.get_full_url(), self.max_age)
+        except sqlite3.Error, e:
+            log().warning("Unable to read the cache in %s: %s" % (self.store.path, e))
             return None
 
+        if cached is None:
+            return None
+
+        headers, body = cached
+        return CachedResponse(self.store, request.get_full_url(), headers, body, set_cache_header = True)
+
     def http_response(self, request, response):
         """Gets a HTTP response, if it was a GET request and the status code
         starts with 2 (200 OK etc) it caches it and returns a CachedResponse
         """
         if (request.get_method() == "GET"
+            and getattr(request, 'store', True)
             and str(response.code).startswith("2")
+            and 'x-local-cache' not in response.info()
         ):
-            if 'x-local-cache' not in response.info():
-                # Response is not cached
-                set_cache_header = store_in_cache(
-                    self.cache_location,
-                    request.get_full_url(),
-                    response
-                )
-            else:
-                set_cache_header = True
-            #end if x-cache in response
-
-            return CachedResponse(
-                self.cache_location,
-                request.get_full_url(),
-                set_cache_header = set_cache_header
-            )
+            headers = str(response.info())
+            body = response.read()
+            try:
+                self.store.store(request.get_full_url(), headers, body)
+            except sqlite3.Error, e:
+                log().warning("Unable to write to the cache in %s: %s" % (self.store.path, e))
+
+            return CachedResponse(self.store, request.get_full_url(), headers, body, set_cache_header = False)
         else:
             return response
 
@@ -176,20 +378,17 @@ class CachedResponse(StringIO.StringIO):
     the network, check the x-local-cache header rather than the object type.
     """
 
-    @locked_function
-    def __init__(self, cache_location, url, set_cache_header=True):
-        self.cache_location = cache_location
-        hpath, bpath = calculate_cache_path(cache_location, url)
+    def __init__(self, store, url, headers, body, set_cache_header=True):
+        self.store = store
 
-        StringIO.StringIO.__init__(self, file(bpath, "rb").read())
+        StringIO.StringIO.__init__(self, body)
 
         self.url     = url
         self.code    = 200
         self.msg     = "OK"
-        headerbuf = file(hpath, "rb").read()
         if set_cache_header:
-            headerbuf += "x-local-cache: %s\r\n" % (bpath)
-        self.headers = httplib.HTTPMessage(StringIO.StringIO(headerbuf))
+            headers += "x-local-cache: %s\r\n" % (store.path)
+        self.headers = httplib.HTTPMessage(StringIO.StringIO(headers))
 
     def info(self):
         """Returns headers
@@ -201,52 +400,52 @@ class CachedResponse(StringIO.StringIO):
         """
         return self.url
 
-    @locked_function
     def recache(self):
         new_request = urllib2.urlopen(self.url)
-        set_cache_header = store_in_cache(
-            self.cache_location,
-            new_request.url,
-            new_request
-        )
-        CachedResponse.__init__(self, self.cache_location, self.url, True)
-
-    @locked_function
+        headers = str(new_request.info())
+        body = new_request.read()
+        self.store.store(self.url, headers, body)
+        CachedResponse.__init__(self, self.store, self.url, headers, body, True)
+
     def delete_cache(self):
-        delete_from_cache(
-            self.cache_location,
-            self.url
-        )
-    
+        self.store.delete(self.url)
+
 
 if __name__ == "__main__":
     def main():
-        """Quick test/example of CacheHandler"""
-        opener = urllib2.build_opener(CacheHandler("/tmp/"))
-        response = opener.open("http://google.com")
-        print response.headers
-        print "Response:", response.read()
-
-        response.recache()
-        print response.headers
-        print "After recache:", response.read()
-
-        # Test usage in threads
-        from threading import Thread
-        class CacheThreadTest(Thread):
-            lastdata = None
-            def run(self):
-                req = opener.open("http://google.com")
-                newdata = req.read()
-                if self.lastdata is None:
-                    self.lastdata = newdata
-                assert self.lastdata == newdata, "Data was not consistent, uhoh"
-                req.recache()
-        threads = [CacheThreadTest() for x in range(50)]
-        print "Starting threads"
-        [t.start() for t in threads]
-        print "..done"
-        print "Joining threads"
-        [t.join() for t in threads]
-        print "..done"
+        """Reports on (and tidies up) a cache directory"""
+        from optparse import OptionParser
+
+        parser = OptionParser(usage = "usage: %prog [options] cache_location")
+        parser.add_option("--prune", type = "float", metavar = "DAYS",
+            help = "delete the responses stored more than DAYS days ago")
+        parser.add_option("--clear", action = "store_true", default = False,
+            help = "delete every response and reset the hit rate")
+        parser.add_option("--vacuum", action = "store_true", default = False,
+            help = "shrink the database file after deleting responses")
+        options, args = parser.parse_args()
+
+        if len(args) != 1 or not os.path.isdir(args[0]):
+            parser.error("cache_location must be an existing directory")
+
+        store = get_store(args[0])
+
+        if options.clear:
+            store.clear()
+            print "Cleared the cache"
+        if options.prune is not None:
+            print "Pruned %d responses" % store.prune(options.prune * 24 * 60 * 60)
+        if options.vacuum:
+            store.vacuum()
+
+        stats = store.get_stats()
+        print "Cache:     %s" % store.path
+        print "Responses: %d" % stats["entries"]
+        print "Size:      %.1f KB compressed, %.1f KB uncompressed (limit %.1f KB)" % (
+            stats["size"] / 1024.0, stats["raw_size"] / 1024.0, stats["max_size"] / 1024.0)
+        print "File size: %.1f KB" % (stats["file_size"] / 1024.0)
+        if stats["hit_rate"] is None:
+            print "Hit rate:  no lookups yet"
+        else:
+            print "Hit rate:  %.1f%% (%d hits, %d misses)" % (stats["hit_rate"] * 100, stats["hits"], stats["misses"])
     main()
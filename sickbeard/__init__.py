@@ -35,9 +35,10 @@ from providers import showrss, kat, dailytvtorrents, iplayer, publichd, anyrss
 from sickbeard.config import CheckSection, check_setting_int, check_setting_str, ConfigMigrator
 
 from sickbeard import searchCurrent, searchBacklog, showUpdater, versionChecker, properFinder, autoPostProcesser
-from sickbeard import helpers, db, exceptions, show_queue, search_queue, scheduler
+from sickbeard import helpers, db, exceptions, show_queue, search_queue, scheduler, show_list, rate_limiter
 from sickbeard import logger
 from sickbeard import naming
+from sickbeard.episode_cache import episode_cache
 
 from common import SD, SKIPPED, NAMING_REPEAT
 
@@ -69,6 +70,7 @@ PIDFILE = ''
 DAEMON = None
 NO_RESIZE = False
 
+schedulerService = None
 backlogSearchScheduler = None
 currentSearchScheduler = None
 showUpdateScheduler = None
@@ -90,11 +92,16 @@ NEWEST_VERSION = None
 NEWEST_VERSION_STRING = None
 VERSION_NOTIFY = None
 
+SHOW_QUEUE_THREADS = 3
+EPISODE_CACHE_SIZE = 5000
+
 INIT_LOCK = Lock()
 __INITIALIZED__ = False
 started = False
 
 LOG_DIR = None
+LOG_DEBUG = True
+LOG_BACKGROUND = False
 
 WEB_PORT = None
 WEB_LOG = None
@@ -148,6 +155,9 @@ NZB_METHOD = None
 NZB_DIR = None
 USENET_RETENTION = None
 DOWNLOAD_PROPERS = None
+CACHE_RETENTION = 7
+PROVIDER_THREADS = 4
+PROVIDER_TIMEOUT = 120
 
 SEARCH_FREQUENCY = None
 BACKLOG_SEARCH_FREQUENCY = 21
@@ -178,6 +188,7 @@ CREATE_MISSING_SHOW_DIRS = None
 RENAME_EPISODES = False
 PROCESS_AUTOMATICALLY = False
 KEEP_PROCESSED_DIR = False
+POST_PROCESS_THREADS = 2
 MOVE_ASSOCIATED_FILES = False
 TV_DOWNLOAD_DIR = None
 
@@ -333,11 +344,11 @@ def initialize(consoleLogging=True):
 
     with INIT_LOCK:
 
-        global LOG_DIR, WEB_PORT, WEB_LOG, WEB_ROOT, WEB_USERNAME, WEB_PASSWORD, WEB_HOST, WEB_IPV6, USE_API, API_KEY, ENABLE_HTTPS, HTTPS_CERT, HTTPS_KEY, \
+        global LOG_DIR, LOG_DEBUG, LOG_BACKGROUND, WEB_PORT, WEB_LOG, WEB_ROOT, WEB_USERNAME, WEB_PASSWORD, WEB_HOST, WEB_IPV6, USE_API, API_KEY, ENABLE_HTTPS, HTTPS_CERT, HTTPS_KEY, \
                 USE_NZBS, USE_TORRENTS, NZB_METHOD, NZB_DIR, DOWNLOAD_PROPERS, \
                 USE_VODS, IPLAYER, IPLAYER_GETIPLAYER_PATH, \
                 SAB_USERNAME, SAB_PASSWORD, SAB_APIKEY, SAB_CATEGORY, SAB_HOST, \
-                NZBGET_PASSWORD, NZBGET_CATEGORY, NZBGET_HOST, currentSearchScheduler, backlogSearchScheduler, \
+                NZBGET_PASSWORD, NZBGET_CATEGORY, NZBGET_HOST, schedulerService, currentSearchScheduler, backlogSearchScheduler, \
                 USE_XBMC, XBMC_NOTIFY_ONSNATCH, XBMC_NOTIFY_ONDOWNLOAD, XBMC_UPDATE_FULL, XBMC_UPDATE_ONLYFIRST, \
                 XBMC_UPDATE_LIBRARY, XBMC_HOST, XBMC_USERNAME, XBMC_PASSWORD, \
                 USE_TRAKT, TRAKT_USERNAME, TRAKT_PASSWORD, TRAKT_API, \
@@ -346,15 +357,15 @@ def initialize(consoleLogging=True):
                 showUpdateScheduler, __INITIALIZED__, LAUNCH_BROWSER, showList, loadingShowList, \
                 SHOWRSS, KAT, DAILYTVTORRENTS, PUBLICHD, \
                 NZBS, NZBS_UID, NZBS_HASH, EZRSS, TVTORRENTS, TVTORRENTS_DIGEST, TVTORRENTS_HASH, BTN, BTN_API_KEY, TORRENTLEECH, TORRENTLEECH_KEY, \
-                TORRENT_DIR, USENET_RETENTION, SOCKET_TIMEOUT, \
+                TORRENT_DIR, USENET_RETENTION, CACHE_RETENTION, PROVIDER_THREADS, PROVIDER_TIMEOUT, SOCKET_TIMEOUT, \
                 SEARCH_FREQUENCY, DEFAULT_SEARCH_FREQUENCY, BACKLOG_SEARCH_FREQUENCY, \
                 QUALITY_DEFAULT, FLATTEN_FOLDERS_DEFAULT, STATUS_DEFAULT, \
                 GROWL_NOTIFY_ONSNATCH, GROWL_NOTIFY_ONDOWNLOAD, TWITTER_NOTIFY_ONSNATCH, TWITTER_NOTIFY_ONDOWNLOAD, \
                 USE_GROWL, GROWL_HOST, GROWL_PASSWORD, USE_PROWL, PROWL_NOTIFY_ONSNATCH, PROWL_NOTIFY_ONDOWNLOAD, PROWL_API, PROWL_PRIORITY, PROG_DIR, NZBMATRIX, NZBMATRIX_USERNAME, \
                 USE_PYTIVO, PYTIVO_NOTIFY_ONSNATCH, PYTIVO_NOTIFY_ONDOWNLOAD, PYTIVO_UPDATE_LIBRARY, PYTIVO_HOST, PYTIVO_SHARE_NAME, PYTIVO_TIVO_NAME, \
                 USE_NMA, NMA_NOTIFY_ONSNATCH, NMA_NOTIFY_ONDOWNLOAD, NMA_API, NMA_PRIORITY, \
-                NZBMATRIX_APIKEY, versionCheckScheduler, VERSION_NOTIFY, PROCESS_AUTOMATICALLY, \
-                KEEP_PROCESSED_DIR, TV_DOWNLOAD_DIR, TVDB_BASE_URL, MIN_SEARCH_FREQUENCY, \
+                NZBMATRIX_APIKEY, versionCheckScheduler, VERSION_NOTIFY, SHOW_QUEUE_THREADS, EPISODE_CACHE_SIZE, PROCESS_AUTOMATICALLY, \
+                KEEP_PROCESSED_DIR, POST_PROCESS_THREADS, TV_DOWNLOAD_DIR, TVDB_BASE_URL, MIN_SEARCH_FREQUENCY, \
                 showQueueScheduler, searchQueueScheduler, ROOT_DIRS, CACHE_DIR, ACTUAL_CACHE_DIR, TVDB_API_PARMS, \
                 NAMING_PATTERN, NAMING_MULTI_EP, NAMING_FORCE_FOLDERS, NAMING_ABD_PATTERN, NAMING_CUSTOM_ABD, \
                 RENAME_EPISODES, properFinderScheduler, PROVIDER_ORDER, autoPostProcesserScheduler, \
@@ -377,6 +388,8 @@ def initialize(consoleLogging=True):
 
         CheckSection(CFG, 'General')
         LOG_DIR = check_setting_str(CFG, 'General', 'log_dir', 'Logs')
+        LOG_DEBUG = bool(check_setting_int(CFG, 'General', 'log_debug', 1))
+        LOG_BACKGROUND = bool(check_setting_int(CFG, 'General', 'log_background', 0))
         if not helpers.makeDir(LOG_DIR):
             logger.log(u"!!! No log folder, logging to screen only!", logger.ERROR)
 
@@ -432,7 +445,8 @@ def initialize(consoleLogging=True):
         # Set our common tvdb_api options here
         TVDB_API_PARMS = {'apikey': TVDB_API_KEY,
                           'language': 'en',
-                          'useZip': True}
+                          'useZip': True,
+                          'rate_limiter': rate_limiter.tvdb_limiter}
 
         if CACHE_DIR:
             TVDB_API_PARMS['cache'] = os.path.join(CACHE_DIR, 'tvdb')
@@ -442,6 +456,9 @@ def initialize(consoleLogging=True):
         QUALITY_DEFAULT = check_setting_int(CFG, 'General', 'quality_default', SD)
         STATUS_DEFAULT = check_setting_int(CFG, 'General', 'status_default', SKIPPED)
         VERSION_NOTIFY = check_setting_int(CFG, 'General', 'version_notify', 1)
+        SHOW_QUEUE_THREADS = max(1, check_setting_int(CFG, 'General', 'show_queue_threads', 3))
+        EPISODE_CACHE_SIZE = max(100, check_setting_int(CFG, 'General', 'episode_cache_size', 5000))
+        episode_cache.setSize(EPISODE_CACHE_SIZE)
         FLATTEN_FOLDERS_DEFAULT = bool(check_setting_int(CFG, 'General', 'flatten_folders_default', 0))
 
         PROVIDER_ORDER = check_setting_str(CFG, 'General', 'provider_order', '').split()
@@ -462,6 +479,9 @@ def initialize(consoleLogging=True):
 
         DOWNLOAD_PROPERS = bool(check_setting_int(CFG, 'General', 'download_propers', 1))
         USENET_RETENTION = check_setting_int(CFG, 'General', 'usenet_retention', 500)
+        CACHE_RETENTION = check_setting_int(CFG, 'General', 'cache_retention', 7)
+        PROVIDER_THREADS = max(1, check_setting_int(CFG, 'General', 'provider_threads', 4))
+        PROVIDER_TIMEOUT = max(10, check_setting_int(CFG, 'General', 'provider_timeout', 120))
         SEARCH_FREQUENCY = check_setting_int(CFG, 'General', 'search_frequency', DEFAULT_SEARCH_FREQUENCY)
         if SEARCH_FREQUENCY < MIN_SEARCH_FREQUENCY:
             SEARCH_FREQUENCY = MIN_SEARCH_FREQUENCY
@@ -470,6 +490,7 @@ def initialize(consoleLogging=True):
         PROCESS_AUTOMATICALLY = check_setting_int(CFG, 'General', 'process_automatically', 0)
         RENAME_EPISODES = check_setting_int(CFG, 'General', 'rename_episodes', 1)
         KEEP_PROCESSED_DIR = check_setting_int(CFG, 'General', 'keep_processed_dir', 1)
+        POST_PROCESS_THREADS = max(1, check_setting_int(CFG, 'General', 'post_process_threads', 2))
         MOVE_ASSOCIATED_FILES = check_setting_int(CFG, 'General', 'move_associated_files', 0)
         CREATE_MISSING_SHOW_DIRS = check_setting_int(CFG, 'General', 'create_missing_show_dirs', 0)
         ADD_SHOWS_WO_DIR = check_setting_int(CFG, 'General', 'add_shows_wo_dir', 0)
@@ -739,7 +760,12 @@ def initialize(consoleLogging=True):
         NMA_PRIORITY = check_setting_str(CFG, 'NMA', 'nma_priority', "0")
 
         # start up all the threads
+        logger.sb_log_instance.setLevel(logger.DEBUG if LOG_DEBUG else logger.MESSAGE)
         logger.sb_log_instance.initLogging(consoleLogging=consoleLogging)
+        if LOG_BACKGROUND:
+            logger.sb_log_instance.startWriter()
+        else:
+            logger.sb_log_instance.stopWriter()
 
         # initialize the main SB database
         db.upgradeDatabase(db.DBConnection(), mainDB.InitialSchema)
@@ -771,13 +797,14 @@ def initialize(consoleLogging=True):
                                                      threadName="CHECKVERSION",
                                                      runImmediately=True)
 
+        # the queues wake their schedulers up when they change, this is just in case
         showQueueScheduler = scheduler.Scheduler(show_queue.ShowQueue(),
-                                               cycleTime=datetime.timedelta(seconds=3),
+                                               cycleTime=datetime.timedelta(minutes=1),
                                                threadName="SHOWQUEUE",
                                                silent=True)
 
         searchQueueScheduler = scheduler.Scheduler(search_queue.SearchQueue(),
-                                               cycleTime=datetime.timedelta(seconds=3),
+                                               cycleTime=datetime.timedelta(minutes=1),
                                                threadName="SEARCHQUEUE",
                                                silent=True)
 
@@ -798,7 +825,16 @@ def initialize(consoleLogging=True):
                                                                       runImmediately=True)
         backlogSearchScheduler.action.cycleTime = BACKLOG_SEARCH_FREQUENCY
 
-        showList = []
+        # one thread runs all of them when they're due, start() starts it
+        schedulerService = scheduler.SchedulerService()
+        for curScheduler in (currentSearchScheduler, backlogSearchScheduler, showUpdateScheduler, versionCheckScheduler,
+                             showQueueScheduler, searchQueueScheduler, properFinderScheduler, autoPostProcesserScheduler):
+            schedulerService.add(curScheduler)
+
+        showQueueScheduler.action.set_scheduler(showQueueScheduler)
+        searchQueueScheduler.action.set_scheduler(searchQueueScheduler)
+
+        showList = show_list.ShowList()
         loadingShowList = {}
 
         __INITIALIZED__ = True
@@ -807,47 +843,22 @@ def initialize(consoleLogging=True):
 
 def start():
 
-    global __INITIALIZED__, currentSearchScheduler, backlogSearchScheduler, \
-            showUpdateScheduler, versionCheckScheduler, showQueueScheduler, \
-            properFinderScheduler, autoPostProcesserScheduler, searchQueueScheduler, \
-            started
+    global __INITIALIZED__, schedulerService, started
 
     with INIT_LOCK:
 
         if __INITIALIZED__:
 
-            # start the search scheduler
-            currentSearchScheduler.thread.start()
-
-            # start the backlog scheduler
-            backlogSearchScheduler.thread.start()
-
-            # start the show updater
-            showUpdateScheduler.thread.start()
-
-            # start the version checker
-            versionCheckScheduler.thread.start()
-
-            # start the queue checker
-            showQueueScheduler.thread.start()
-
-            # start the search queue checker
-            searchQueueScheduler.thread.start()
-
-            # start the queue checker
-            properFinderScheduler.thread.start()
-
-            # start the proper finder
-            autoPostProcesserScheduler.thread.start()
+            # start the scheduler, it runs the searches, show updater, version checker, queues,
+            # proper finder and post processer
+            schedulerService.start()
 
             started = True
 
 
 def halt():
 
-    global __INITIALIZED__, currentSearchScheduler, backlogSearchScheduler, showUpdateScheduler, \
-            showQueueScheduler, properFinderScheduler, autoPostProcesserScheduler, searchQueueScheduler, \
-            started
+    global __INITIALIZED__, schedulerService, started
 
     with INIT_LOCK:
 
@@ -855,63 +866,17 @@ def halt():
 
             logger.log(u"Aborting all threads")
 
-            # abort all the threads
-
-            currentSearchScheduler.abort = True
-            logger.log(u"Waiting for the SEARCH thread to exit")
-            try:
-                currentSearchScheduler.thread.join(10)
-            except:
-                pass
-
-            backlogSearchScheduler.abort = True
-            logger.log(u"Waiting for the BACKLOG thread to exit")
-            try:
-                backlogSearchScheduler.thread.join(10)
-            except:
-                pass
-
-            showUpdateScheduler.abort = True
-            logger.log(u"Waiting for the SHOWUPDATER thread to exit")
-            try:
-                showUpdateScheduler.thread.join(10)
-            except:
-                pass
-
-            versionCheckScheduler.abort = True
-            logger.log(u"Waiting for the VERSIONCHECKER thread to exit")
-            try:
-                versionCheckScheduler.thread.join(10)
-            except:
-                pass
-
-            showQueueScheduler.abort = True
-            logger.log(u"Waiting for the SHOWQUEUE thread to exit")
-            try:
-                showQueueScheduler.thread.join(10)
-            except:
-                pass
-
-            searchQueueScheduler.abort = True
-            logger.log(u"Waiting for the SEARCHQUEUE thread to exit")
-            try:
-                searchQueueScheduler.thread.join(10)
-            except:
-                pass
-
-            autoPostProcesserScheduler.abort = True
-            logger.log(u"Waiting for the POSTPROCESSER thread to exit")
-            try:
-                autoPostProcesserScheduler.thread.join(10)
-            except:
-                pass
-
-            properFinderScheduler.abort = True
-            logger.log(u"Waiting for the PROPERFINDER thread to exit")
-            try:
-                properFinderScheduler.thread.join(10)
-            except:
-                pass
+            # abort all the schedulers, the ones that are running stop once they're done
+            for curScheduler in list(schedulerService.schedulers):
+                curScheduler.abort = True
+
+            logger.log(u"Waiting for the scheduled threads to exit")
+            if not schedulerService.stop(10):
+                logger.log(u"Some scheduled threads are still running, not waiting for them any more", logger.WARNING)
+
+            logger.log(u"Sending the notifications that are still queued")
+            from sickbeard import notifiers
+            notifiers.dispatcher.stop(10)
 
             __INITIALIZED__ = False
 
@@ -971,6 +936,9 @@ def saveAndShutdown(restart=False):
             logger.log(u"Restarting Sick Beard with " + str(popen_list))
             subprocess.Popen(popen_list, cwd=os.getcwd())
 
+    # write out what the background log writer still has
+    logger.sb_log_instance.stopWriter()
+
     os._exit(0)
 
 
@@ -1011,6 +979,8 @@ def save_config():
 
     new_config['General'] = {}
     new_config['General']['log_dir'] = LOG_DIR
+    new_config['General']['log_debug'] = int(LOG_DEBUG)
+    new_config['General']['log_background'] = int(LOG_BACKGROUND)
     new_config['General']['web_port'] = WEB_PORT
     new_config['General']['web_host'] = WEB_HOST
     new_config['General']['web_ipv6'] = int(WEB_IPV6)
@@ -1028,6 +998,9 @@ def save_config():
     new_config['General']['use_vods'] = int(USE_VODS)
     new_config['General']['nzb_method'] = NZB_METHOD
     new_config['General']['usenet_retention'] = int(USENET_RETENTION)
+    new_config['General']['cache_retention'] = int(CACHE_RETENTION)
+    new_config['General']['provider_threads'] = int(PROVIDER_THREADS)
+    new_config['General']['provider_timeout'] = int(PROVIDER_TIMEOUT)
     new_config['General']['search_frequency'] = int(SEARCH_FREQUENCY)
     new_config['General']['download_propers'] = int(DOWNLOAD_PROPERS)
     new_config['General']['quality_default'] = int(QUALITY_DEFAULT)
@@ -1035,6 +1008,8 @@ def save_config():
     new_config['General']['flatten_folders_default'] = int(FLATTEN_FOLDERS_DEFAULT)
     new_config['General']['provider_order'] = ' '.join([x.getID() for x in providers.sortedProviderList()])
     new_config['General']['version_notify'] = int(VERSION_NOTIFY)
+    new_config['General']['show_queue_threads'] = int(SHOW_QUEUE_THREADS)
+    new_config['General']['episode_cache_size'] = int(EPISODE_CACHE_SIZE)
     new_config['General']['naming_pattern'] = NAMING_PATTERN
     new_config['General']['naming_custom_abd'] = int(NAMING_CUSTOM_ABD)
     new_config['General']['naming_abd_pattern'] = NAMING_ABD_PATTERN
@@ -1054,6 +1029,7 @@ def save_config():
     new_config['General']['root_dirs'] = ROOT_DIRS if ROOT_DIRS else ''
     new_config['General']['tv_download_dir'] = TV_DOWNLOAD_DIR
     new_config['General']['keep_processed_dir'] = int(KEEP_PROCESSED_DIR)
+    new_config['General']['post_process_threads'] = int(POST_PROCESS_THREADS)
     new_config['General']['move_associated_files'] = int(MOVE_ASSOCIATED_FILES)
     new_config['General']['process_automatically'] = int(PROCESS_AUTOMATICALLY)
     new_config['General']['rename_episodes'] = int(RENAME_EPISODES)
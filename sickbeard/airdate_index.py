@@ -0,0 +1,171 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import threading
+
+import sickbeard
+
+from sickbeard import db
+
+from lib.tvdb_api import tvdb_api
+
+
+class AirDateIndex(object):
+    """
+    Maps (tvdbid, airdate) to the (season, episode) numbers of the episodes that aired on that
+    date, so air-by-date releases can be numbered without asking TVDB.
+
+    A show's dates are loaded from tv_episodes the first time they're needed, after that
+    TVEpisode.saveToDB and deleteEpisode keep them current with update() and remove().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # tvdbid: {airdate ordinal: set of (season, episode)}
+        self._byDate = {}
+        # tvdbid: {(season, episode): airdate ordinal}
+        self._byEpisode = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _loadShow(self, tvdbid):
+        # callers hold the lock
+        if tvdbid in self._byDate:
+            return
+
+        self._byDate[tvdbid] = {}
+        self._byEpisode[tvdbid] = {}
+        self.loads += 1
+
+        sqlResults = db.DBConnection().select("SELECT season, episode, airdate FROM tv_episodes WHERE showid = ? AND airdate > 1", [tvdbid])
+        for curResult in sqlResults:
+            self._add(tvdbid, int(curResult["season"]), int(curResult["episode"]), int(curResult["airdate"]))
+
+    def _add(self, tvdbid, season, episode, airdate):
+        self._discard(tvdbid, season, episode)
+
+        # an ordinal of 1 means the air date isn't known
+        if airdate <= 1:
+            return
+
+        self._byDate[tvdbid].setdefault(airdate, set()).add((season, episode))
+        self._byEpisode[tvdbid][(season, episode)] = airdate
+
+    def _discard(self, tvdbid, season, episode):
+        oldAirdate = self._byEpisode[tvdbid].pop((season, episode), None)
+        if oldAirdate is None:
+            return
+
+        episodes = self._byDate[tvdbid][oldAirdate]
+        episodes.discard((season, episode))
+        if not episodes:
+            del self._byDate[tvdbid][oldAirdate]
+
+    def lookup(self, tvdbid, airdate):
+        """
+        Returns a sorted list of the (season, episode) numbers of the episodes of the show which
+        aired on the given date (a datetime.date), an empty list if there aren't any. Specials
+        are only returned if no other episode aired that day.
+        """
+        with self._lock:
+            self._loadShow(tvdbid)
+            episodes = self._byDate[tvdbid].get(airdate.toordinal(), ())
+            episodes = sorted([x for x in episodes if x[0] > 0] or episodes)
+
+        if episodes:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return episodes
+
+    def update(self, tvdbid, season, episode, airdate):
+        """
+        Records the air date (a datetime.date) of an episode. Shows which haven't been loaded yet
+        are left alone, they'll get the date from the database.
+        """
+        with self._lock:
+            if tvdbid in self._byDate:
+                self._add(tvdbid, season, episode, airdate.toordinal())
+
+    def remove(self, tvdbid, season, episode):
+        """
+        Forgets a deleted episode.
+        """
+        with self._lock:
+            if tvdbid in self._byEpisode:
+                self._discard(tvdbid, season, episode)
+
+    def clearShow(self, tvdbid):
+        """
+        Forgets every episode of a show, it's loaded again the next time it's needed.
+        """
+        with self._lock:
+            self._byDate.pop(tvdbid, None)
+            self._byEpisode.pop(tvdbid, None)
+
+    def clear(self):
+        with self._lock:
+            self._byDate = {}
+            self._byEpisode = {}
+            self.hits = self.misses = self.loads = 0
+
+    def getEpisode(self, tvdbid, airdate, lang=None):
+        """
+        Returns the (season, episode) numbers of the first episode of the show which aired on the
+        given date. If the index doesn't know of one TVDB is asked instead (and the answer is kept),
+        in which case the tvdb_episodenotfound and tvdb_error exceptions of tvdb_api are raised.
+        """
+        episodes = self.lookup(tvdbid, airdate)
+        if episodes:
+            return episodes[0]
+
+        # There's gotta be a better way of doing this but we don't wanna
+        # change the language value elsewhere
+        ltvdb_api_parms = sickbeard.TVDB_API_PARMS.copy()
+
+        if lang and not lang == 'en':
+            ltvdb_api_parms['language'] = lang
+
+        t = tvdb_api.Tvdb(**ltvdb_api_parms)
+        epObj = t[tvdbid].airedOn(airdate)[0]
+        season = int(epObj["seasonnumber"])
+        episode = int(epObj["episodenumber"])
+
+        # remember it until the episode is saved with the date
+        self.update(tvdbid, season, episode, airdate)
+
+        return (season, episode)
+
+    def getStats(self):
+        with self._lock:
+            shows = len(self._byDate)
+            episodes = sum([len(x) for x in self._byEpisode.values()])
+
+        return {"shows": shows,
+                "episodes": episodes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads}
+
+
+airdate_index = AirDateIndex()
@@ -131,40 +131,50 @@ class Quality:
 
     @staticmethod
     def nameQuality(name):
+        """
+        Guesses the quality of a release from its name. The name is scanned once for the
+        resolution, source and codec tokens and the quality is looked up in nameQualityTable.
+        """
         name = os.path.basename(name)
 
         # if we have our exact text then assume we put it there
-        for x in sorted(Quality.qualityStrings, reverse=True):
-            if x == Quality.UNKNOWN:
+        qualities = [int(x.lastgroup[1:]) for x in _qualityStringRegex.finditer(name)]
+        if qualities:
+            return max(qualities)
+
+        tokens = set()
+        token_starts = {}
+        for match in _qualityTokenRegex.finditer(name):
+            if match.lastgroup == 'token':
+                token = match.group('token').lower()
+            else:
+                token = match.lastgroup
+            tokens.add(token)
+            token_starts[match.start()] = token
+
+        # the SD qualities only count if the source and the codec are next to each other
+        for start, token in token_starts.items():
+            end = start + len(token)
+            if token in ('pdtv', 'hdtv', 'dsr', 'tvrip', 'webrip') and token_starts.get(end + 1) in ('xvid', 'x264'):
+                tokens.add('sd_tv')
+                if token == 'pdtv' and token_starts.get(end + 1) == 'x264' and start >= 6 \
+                        and name[start - 6:start - 4].lower() == 'hr' and name[start - 3:start - 1].lower() == 'ws':
+                    tokens.add('hr_pdtv')
+            elif token in ('dvdrip', 'bdrip'):
+                if token_starts.get(end + 1) in ('xvid', 'divx', 'x264') \
+                        or name[end + 1:end + 3].lower() == 'ws' and token_starts.get(end + 4) in ('xvid', 'divx', 'x264'):
+                    tokens.add('sd_dvd')
+
+        for quality, required, excluded in nameQualityTable:
+            if tokens.intersection(excluded):
                 continue
+            for cur_options in required:
+                if not tokens.intersection(cur_options):
+                    break
+            else:
+                return quality
 
-            regex = '\W' + Quality.qualityStrings[x].replace(' ', '\W') + '\W'
-            regex_match = re.search(regex, name, re.I)
-            if regex_match:
-                return x
-
-        checkName = lambda list, func: func([re.search(x, name, re.I) for x in list])
-
-        if checkName(["(pdtv|hdtv|dsr|tvrip|webrip).(xvid|x264)"], all) and not checkName(["(720|1080)[pi]"], all):
-            return Quality.SDTV
-        elif checkName(["(dvdrip|bdrip)(.ws)?.(xvid|divx|x264)"], any) and not checkName(["(720|1080)[pi]"], all):
-            return Quality.SDDVD
-        elif checkName(["720p", "hdtv", "x264"], all) or checkName(["hr.ws.pdtv.x264"], any) and not checkName(["(1080)[pi]"], all):
-            return Quality.HDTV
-        elif checkName(["720p|1080i", "hdtv", "mpeg2"], all):
-            return Quality.RAWHDTV
-        elif checkName(["1080p", "hdtv", "x264"], all):
-            return Quality.FULLHDTV
-        elif checkName(["720p", "web.dl|webrip"], all) or checkName(["720p", "itunes", "h.?264"], all):
-            return Quality.HDWEBDL
-        elif checkName(["1080p", "web.dl|webrip"], all) or checkName(["1080p", "itunes", "h.?264"], all):
-            return Quality.FULLHDWEBDL
-        elif checkName(["720p", "bluray|hddvd", "x264"], all):
-            return Quality.HDBLURAY
-        elif checkName(["1080p", "bluray|hddvd", "x264"], all):
-            return Quality.FULLHDBLURAY
-        else:
-            return Quality.UNKNOWN
+        return Quality.UNKNOWN
 
     @staticmethod
     def assumeQuality(name):
@@ -212,6 +222,35 @@ Quality.DOWNLOADED = [Quality.compositeStatus(DOWNLOADED, x) for x in Quality.qu
 Quality.SNATCHED = [Quality.compositeStatus(SNATCHED, x) for x in Quality.qualityStrings.keys()]
 Quality.SNATCHED_PROPER = [Quality.compositeStatus(SNATCHED_PROPER, x) for x in Quality.qualityStrings.keys()]
 
+# the quality strings we use in names ourselves, each in a group named after its quality
+_qualityStringRegex = re.compile('(?<=\W)(?:' + '|'.join(['(?P<q%d>%s)' % (x, Quality.qualityStrings[x].replace(' ', '\W'))
+                                                         for x in sorted(Quality.qualityStrings, reverse=True)
+                                                         if x != Quality.UNKNOWN]) + ')(?=\W)', re.I)
+
+# every token that starts at each position of the name, it's a lookahead so tokens can overlap (eg. hdtvrip)
+_qualityTokenRegex = re.compile(r"""
+    (?=(?P<token>(?:720|1080)[pi]|pdtv|hdtv|dsr|tvrip|webrip|itunes|dvdrip|bdrip|bluray|hddvd|xvid|divx|x264|mpeg2) |
+       (?P<webdl>web.dl) |
+       (?P<h264>h.?264))
+    """, re.I | re.VERBOSE)
+
+_NO_RESOLUTION = ('720p', '720i', '1080p', '1080i')
+
+# (quality, [tokens it needs one of, ...], tokens it can't have), the first match wins
+nameQualityTable = [(Quality.SDTV, [('sd_tv',)], _NO_RESOLUTION),
+                    (Quality.SDDVD, [('sd_dvd',)], _NO_RESOLUTION),
+                    (Quality.HDTV, [('720p',), ('hdtv',), ('x264',)], ()),
+                    (Quality.HDTV, [('hr_pdtv',)], ('1080p', '1080i')),
+                    (Quality.RAWHDTV, [('720p', '1080i'), ('hdtv',), ('mpeg2',)], ()),
+                    (Quality.FULLHDTV, [('1080p',), ('hdtv',), ('x264',)], ()),
+                    (Quality.HDWEBDL, [('720p',), ('webdl', 'webrip')], ()),
+                    (Quality.HDWEBDL, [('720p',), ('itunes',), ('h264',)], ()),
+                    (Quality.FULLHDWEBDL, [('1080p',), ('webdl', 'webrip')], ()),
+                    (Quality.FULLHDWEBDL, [('1080p',), ('itunes',), ('h264',)], ()),
+                    (Quality.HDBLURAY, [('720p',), ('bluray', 'hddvd'), ('x264',)], ()),
+                    (Quality.FULLHDBLURAY, [('1080p',), ('bluray', 'hddvd'), ('x264',)], ()),
+                    ]
+
 SD = Quality.combineQualities([Quality.SDTV, Quality.SDDVD], [])
 HD = Quality.combineQualities([Quality.HDTV, Quality.FULLHDTV, Quality.HDWEBDL, Quality.FULLHDWEBDL, Quality.HDBLURAY, Quality.FULLHDBLURAY], []) # HD720p + HD1080p
 HD720p = Quality.combineQualities([Quality.HDTV, Quality.HDWEBDL, Quality.HDBLURAY], [])
@@ -72,6 +72,24 @@ def change_HTTPS_KEY(https_key):
 
     return True
 
+def change_LOG_DEBUG(log_debug):
+
+    sickbeard.LOG_DEBUG = bool(log_debug)
+
+    if sickbeard.LOG_DEBUG:
+        logger.sb_log_instance.setLevel(logger.DEBUG)
+    else:
+        logger.sb_log_instance.setLevel(logger.MESSAGE)
+
+def change_LOG_BACKGROUND(log_background):
+
+    sickbeard.LOG_BACKGROUND = bool(log_background)
+
+    if sickbeard.LOG_BACKGROUND:
+        logger.sb_log_instance.startWriter()
+    else:
+        logger.sb_log_instance.stopWriter()
+
 def change_LOG_DIR(log_dir):
 
     if os.path.normpath(sickbeard.LOG_DIR) != os.path.normpath(log_dir):
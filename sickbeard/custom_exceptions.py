@@ -14,15 +14,30 @@ def _check_for_schema():
         myDB.action('CREATE TABLE if not exists custom_exceptions (exception_id INTEGER PRIMARY KEY, tvdb_id INTEGER KEY, show_name TEXT)')
         schema_created = True
 
+# tvdb_id -> list of custom exception names, filled as shows are looked up
+custom_exception_cache = {}
+
+def clear_custom_exception_cache():
+    """
+    Forgets the custom exceptions read from the DB, they're read again on the next lookup.
+    """
+    custom_exception_cache.clear()
+
+    from sickbeard.name_parser.parser import name_parser_cache
+    name_parser_cache.clearSceneNumbering()
+
 def get_custom_exceptions(tvdb_id):
     """
     Given a tvdb_id, return a list of all the custom scene exceptions.
     """
-    _check_for_schema()
-    myDB = db.DBConnection()
-        
-    exceptions = myDB.select("SELECT show_name FROM custom_exceptions WHERE tvdb_id = ?", [tvdb_id])
-    return [cur_exception["show_name"] for cur_exception in exceptions]
+    if tvdb_id not in custom_exception_cache:
+        _check_for_schema()
+        myDB = db.DBConnection()
+
+        exceptions = myDB.select("SELECT show_name FROM custom_exceptions WHERE tvdb_id = ?", [tvdb_id])
+        custom_exception_cache[tvdb_id] = [cur_exception["show_name"] for cur_exception in exceptions]
+
+    return list(custom_exception_cache[tvdb_id])
 
 def get_custom_exception_by_name(show_name):
     """
@@ -78,4 +93,5 @@ def set_custom_exceptions(tvdb_id, show_names):
 
     # since this could invalidate the results of the cache we clear it out after updating
     if changed_exceptions:
-        name_cache.clearCache()
\ No newline at end of file
+        name_cache.clearCache()
+        clear_custom_exception_cache()
\ No newline at end of file
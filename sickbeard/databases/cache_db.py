@@ -48,4 +48,52 @@ class AddSceneNameCache(AddSceneExceptions):
         return self.hasTable("scene_names")
 
     def execute(self):
-        self.connection.action("CREATE TABLE scene_names (tvdb_id INTEGER, name TEXT)")
\ No newline at end of file
+        self.connection.action("CREATE TABLE scene_names (tvdb_id INTEGER, name TEXT)")
+
+class AddProviderCache(AddSceneNameCache):
+    """
+    Moves the cached RSS results of every provider out of their own unindexed table and into
+    provider_cache. Releases which contain more than one episode list all of them in
+    provider_cache_episodes.
+    """
+
+    def test(self):
+        return self.hasTable("provider_cache")
+
+    def execute(self):
+        self.connection.action("CREATE TABLE provider_cache (cache_id INTEGER PRIMARY KEY, provider TEXT, name TEXT, season NUMERIC, episode NUMERIC, tvrid NUMERIC, tvdbid NUMERIC, url TEXT, time NUMERIC, quality NUMERIC)")
+        self.connection.action("CREATE TABLE provider_cache_episodes (cache_id INTEGER, episode NUMERIC)")
+
+        self.connection.action("CREATE INDEX idx_provider_cache_episode ON provider_cache (provider, tvdbid, season, episode)")
+        self.connection.action("CREATE UNIQUE INDEX idx_provider_cache_url ON provider_cache (provider, url)")
+        self.connection.action("CREATE INDEX idx_provider_cache_time ON provider_cache (provider, time)")
+        self.connection.action("CREATE INDEX idx_provider_cache_episodes_episode ON provider_cache_episodes (episode, cache_id)")
+        self.connection.action("CREATE INDEX idx_provider_cache_episodes_cache_id ON provider_cache_episodes (cache_id)")
+
+        # the old tables only hold the last RSS feed of each provider so there's nothing worth
+        # converting, drop them and let the next update fill provider_cache back up
+        old_tables = self.connection.select("SELECT name FROM sqlite_master WHERE type = 'table'")
+        for cur_table in [x["name"] for x in old_tables]:
+            if cur_table in ("provider_cache", "provider_cache_episodes"):
+                continue
+            if self.hasColumn(cur_table, "episodes") and self.hasColumn(cur_table, "url"):
+                self.connection.action("DROP TABLE [" + cur_table + "]")
+
+        self.connection.action("DELETE FROM lastUpdate")
+
+class AddProviderCacheSeen(AddProviderCache):
+    """
+    Remembers which feed items (by GUID or URL) each provider has already handled, including the
+    ones which couldn't be parsed or didn't match a show, so refreshes only have to look at new
+    items. The tvdbid of the show an item matched is kept so the ones which didn't (tvdbid 0) can
+    be forgotten when a show is added or the scene exceptions change.
+    """
+
+    def test(self):
+        return self.hasTable("provider_cache_seen")
+
+    def execute(self):
+        self.connection.action("CREATE TABLE provider_cache_seen (provider TEXT, item_id TEXT, time NUMERIC, tvdbid NUMERIC)")
+        self.connection.action("CREATE UNIQUE INDEX idx_provider_cache_seen_item ON provider_cache_seen (provider, item_id)")
+        self.connection.action("CREATE INDEX idx_provider_cache_seen_time ON provider_cache_seen (provider, time)")
+        self.connection.action("CREATE INDEX idx_provider_cache_seen_tvdbid ON provider_cache_seen (tvdbid)")
@@ -83,6 +83,8 @@ class MainSanityCheck(db.DBSanityCheck):
 
 
 def backupDatabase(version):
+    # make sure the copy isn't missing anything still sitting in the WAL
+    db.DBConnection().checkpoint()
     helpers.backupVersionedFile(db.dbFilename(), version)
 
 # ======================
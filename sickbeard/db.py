@@ -30,7 +30,13 @@ from sickbeard import encodingKludge as ek
 from sickbeard import logger
 from sickbeard.exceptions import ex
 
-db_lock = threading.Lock()
+# pragmas applied to every pooled connection when it is opened. WAL lets readers keep going
+# while the writer commits, NORMAL sync is safe in WAL mode and saves an fsync per commit.
+DB_PRAGMAS = (("journal_mode", "WAL"),
+              ("synchronous", "NORMAL"),
+              ("cache_size", -8000),
+              ("mmap_size", 64 * 1024 * 1024),
+              )
 
 def dbFilename(filename="sickbeard.db", suffix=None):
     """
@@ -44,15 +50,265 @@ def dbFilename(filename="sickbeard.db", suffix=None):
         filename = "%s.%s" % (filename, suffix)
     return ek.ek(os.path.join, sickbeard.DATA_DIR, filename)
 
-class DBConnection:
+class DBConnectionPool(object):
+    """
+    Keeps one open sqlite3 connection per thread and database file so that a DBConnection
+    can be created for every query without opening the file again. Writers to the same file
+    are serialized by a per-file lock, readers take no lock at all.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_locks = {}
+        self._generation = 0
+        # (path, row key): how many open batches have the row waiting to be written
+        self._pending = {}
+
+        self.stats = {'hits': 0,
+                      'opened': 0,
+                      'reads': 0,
+                      'writes': 0,
+                      'write_waits': 0,
+                      'write_wait_time': 0.0,
+                      'locked_retries': 0,
+                      'batch_flushes': 0,
+                      'batched_rows': 0}
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def getStats(self):
+        with self._lock:
+            stats = self.stats.copy()
+            stats['files'] = len(self._write_locks)
+        return stats
+
+    def getConnection(self, path):
+        """
+        Returns this thread's connection to the given file, opening it if needed.
+        """
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        cur_entry = connections.get(path)
+        if cur_entry and cur_entry[1] == self._generation:
+            self.count('hits')
+            return cur_entry[0]
+
+        # the pool was reset since we opened this one
+        if cur_entry:
+            cur_entry[0].close()
+
+        connection = self._connect(path)
+        connections[path] = (connection, self._generation)
+        self.count('opened')
+
+        return connection
+
+    def _connect(self, path):
+        connection = sqlite3.connect(path, 20)
+        connection.row_factory = sqlite3.Row
+
+        for name, value in DB_PRAGMAS:
+            try:
+                connection.execute("PRAGMA %s = %s" % (name, value))
+            except sqlite3.DatabaseError, e:
+                logger.log(u"Unable to set " + name + u" on " + path + u": " + ex(e), logger.WARNING)
+
+        return connection
+
+    def getBatch(self, path):
+        """
+        Returns the write-behind batch this thread has open on the given file, if any.
+        """
+        return getattr(self._local, 'batches', {}).get(path)
+
+    def setBatch(self, path, batch):
+        batches = getattr(self._local, 'batches', None)
+        if batches is None:
+            batches = self._local.batches = {}
+
+        if batch:
+            batches[path] = batch
+        elif path in batches:
+            del batches[path]
+
+    def addPending(self, path, rowKey):
+        with self._lock:
+            self._pending[(path, rowKey)] = self._pending.get((path, rowKey), 0) + 1
+
+    def removePending(self, path, rowKeys):
+        with self._lock:
+            for curRowKey in rowKeys:
+                count = self._pending.pop((path, curRowKey), 0) - 1
+                if count > 0:
+                    self._pending[(path, curRowKey)] = count
+
+    def isPending(self, path, rowKey):
+        """
+        Returns True if a batch on any thread has the row waiting to be written to the file.
+        """
+        with self._lock:
+            return (path, rowKey) in self._pending
+
+    def acquireWrite(self, path):
+        with self._lock:
+            if path not in self._write_locks:
+                self._write_locks[path] = threading.Lock()
+            write_lock = self._write_locks[path]
+
+        # only time the acquire if somebody else is writing to the file right now
+        if not write_lock.acquire(False):
+            start_time = time.time()
+            write_lock.acquire()
+            with self._lock:
+                self.stats['write_waits'] += 1
+                self.stats['write_wait_time'] += time.time() - start_time
+
+        self.count('writes')
+
+        return write_lock
+
+    def reset(self):
+        """
+        Closes this thread's connections and makes every other thread reopen theirs the next
+        time they are used, eg. after the database files were replaced or deleted.
+        """
+        with self._lock:
+            self._generation += 1
+
+        connections = getattr(self._local, 'connections', {})
+        for connection, generation in connections.values(): #@UnusedVariable
+            connection.close()
+        self._local.connections = {}
+
+_pool = DBConnectionPool()
+
+def _rowKey(tableName, keyDict):
+    return (tableName, tuple(sorted(keyDict.items())))
+
+def getPoolStats():
+    return _pool.getStats()
+
+def closeAll():
+    _pool.reset()
+
+class DBBatch(object):
+    """
+    Write-behind unit of work. While it is open every upsert made on this thread to the same
+    database file is only remembered, and when the outermost block exits all of them are
+    written with executemany in a single transaction.
+
+    Selects made inside the block only see what was already committed, other writes on the
+    file flush the pending rows first so the order of writes is kept.
+
+    Use it through DBConnection.batch():
+
+        with myDB.batch():
+            for curEp in episodes:
+                curEp.saveToDB()
+    """
+
+    def __init__(self, connection):
+        self.db = connection
+        self.depth = 0
+        self._rows = {}
+        self._order = []
+
+    def __enter__(self):
+        if self.depth == 0:
+            _pool.setBatch(self.db.path, self)
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth == 0:
+            _pool.setBatch(self.db.path, None)
+            if exc_type is None:
+                self.flush()
+            else:
+                # the rows saved before the error are written like they would have been without
+                # the batch, but failing to doesn't hide the error that ended the block
+                try:
+                    self.flush()
+                except Exception, e:
+                    logger.log(u"Unable to write the rows batched before an error: " + ex(e), logger.ERROR)
+        # don't swallow exceptions
+        return False
+
+    def upsert(self, tableName, valueDict, keyDict):
+        # the last write to a row wins, just like it would have without the batch
+        rowKey = _rowKey(tableName, keyDict)
+        if rowKey in self._rows:
+            self._rows[rowKey][0].update(valueDict)
+        else:
+            self._rows[rowKey] = (dict(valueDict), dict(keyDict))
+            self._order.append(rowKey)
+            _pool.addPending(self.db.path, rowKey)
+
+    def flush(self):
+
+        if not self._order:
+            return
+
+        # rows for the same table with the same columns can share one executemany
+        groups = {}
+        groupOrder = []
+        for rowKey in self._order:
+            valueDict, keyDict = self._rows[rowKey]
+            valueCols = sorted(valueDict.keys())
+            keyCols = sorted(keyDict.keys())
+            groupKey = (rowKey[0], tuple(valueCols), tuple(keyCols))
+            if groupKey not in groups:
+                groups[groupKey] = []
+                groupOrder.append(groupKey)
+            values = [valueDict[x] for x in valueCols]
+            keys = [keyDict[x] for x in keyCols]
+            groups[groupKey].append((values, keys))
+
+        querylist = []
+        for groupKey in groupOrder:
+            tableName, valueCols, keyCols = groupKey
+            rows = groups[groupKey]
+            keyWhere = " AND ".join([x + " = ?" for x in keyCols])
+
+            updateQuery = "UPDATE " + tableName + " SET " + ", ".join([x + " = ?" for x in valueCols]) + " WHERE " + keyWhere
+            querylist.append([updateQuery, [values + keys for (values, keys) in rows]])
+
+            # only insert the rows the update didn't find
+            insertQuery = "INSERT INTO " + tableName + " (" + ", ".join(valueCols + keyCols) + ")" + \
+                          " SELECT " + ", ".join(["?"] * len(valueCols + keyCols)) + \
+                          " WHERE NOT EXISTS (SELECT 1 FROM " + tableName + " WHERE " + keyWhere + ")"
+            querylist.append([insertQuery, [values + keys + keys for (values, keys) in rows]])
+
+        rowKeys = self._order
+        rowCount = len(self._order)
+        self._rows = {}
+        self._order = []
+
+        try:
+            self.db._transaction(querylist, many=True)
+        finally:
+            _pool.removePending(self.db.path, rowKeys)
+        _pool.count('batch_flushes')
+        _pool.count('batched_rows', rowCount)
+        logger.log(u"%s: Flushed %d batched rows", logger.DEBUG, self.db.filename, rowCount)
+
+class DBConnection(object):
     def __init__(self, filename="sickbeard.db", suffix=None, row_type=None):
 
         self.filename = filename
-        self.connection = sqlite3.connect(dbFilename(filename), 20)
+        self.path = dbFilename(filename)
         if row_type == "dict":
-            self.connection.row_factory = self._dict_factory
+            self.row_factory = self._dict_factory
         else:
-            self.connection.row_factory = sqlite3.Row
+            self.row_factory = sqlite3.Row
+
+    connection = property(lambda self: _pool.getConnection(self.path))
 
     def checkDBVersion(self):
         try:
@@ -68,10 +324,24 @@ class DBConnection:
 
     def mass_action(self, querylist, logTransaction=False):
 
-        with db_lock:
+        if querylist == None:
+            return
+
+        # keep the order of writes if this thread has batched rows waiting for this file
+        self.flushBatch()
 
-            if querylist == None:
-                return
+        return self._transaction(querylist, logTransaction=logTransaction)
+
+    def _transaction(self, querylist, many=False, logTransaction=False):
+        """
+        Runs all the queries in one transaction. With many=True every entry is a query and a list
+        of argument lists, which are run with executemany.
+        """
+
+        connection = self.connection
+
+        write_lock = _pool.acquireWrite(self.path)
+        try:
 
             sqlResult = []
             attempt = 0
@@ -82,20 +352,24 @@ class DBConnection:
                         if len(qu) == 1:
                             if logTransaction:
                                 logger.log(qu[0], logger.DEBUG)
-                            sqlResult.append(self.connection.execute(qu[0]))
+                            sqlResult.append(connection.execute(qu[0]))
+                        elif many:
+                            if logTransaction:
+                                logger.log(u"%s with %d sets of args", logger.DEBUG, qu[0], len(qu[1]))
+                            sqlResult.append(connection.executemany(qu[0], qu[1]))
                         elif len(qu) > 1:
                             if logTransaction:
-                                logger.log(qu[0] + " with args " + str(qu[1]), logger.DEBUG)
-                            sqlResult.append(self.connection.execute(qu[0], qu[1]))
-                    self.connection.commit()
-                    logger.log(u"Transaction with " + str(len(querylist)) + u" query's executed", logger.DEBUG)
+                                logger.log(u"%s with args %s", logger.DEBUG, qu[0], qu[1])
+                            sqlResult.append(connection.execute(qu[0], qu[1]))
+                    connection.commit()
+                    logger.log(u"Transaction with %d query's executed", logger.DEBUG, len(querylist))
                     return sqlResult
                 except sqlite3.OperationalError, e:
                     sqlResult = []
-                    if self.connection:
-                        self.connection.rollback()
+                    connection.rollback()
                     if "unable to open database file" in e.message or "database is locked" in e.message:
                         logger.log(u"DB error: " + ex(e), logger.WARNING)
+                        _pool.count('locked_retries')
                         attempt += 1
                         time.sleep(1)
                     else:
@@ -103,60 +377,109 @@ class DBConnection:
                         raise
                 except sqlite3.DatabaseError, e:
                     sqlResult = []
-                    if self.connection:
-                        self.connection.rollback()
+                    connection.rollback()
                     logger.log(u"Fatal error executing query: " + ex(e), logger.ERROR)
                     raise
 
             return sqlResult
 
+        finally:
+            write_lock.release()
+
     def action(self, query, args=None):
 
-        with db_lock:
+        if query == None:
+            return
 
-            if query == None:
-                return
-    
-            sqlResult = None
-            attempt = 0
-    
-            while attempt < 5:
-                try:
-                    if args == None:
-                        logger.log(self.filename+": "+query, logger.DEBUG)
-                        sqlResult = self.connection.execute(query)
-                    else:
-                        logger.log(self.filename+": "+query+" with args "+str(args), logger.DEBUG)
-                        sqlResult = self.connection.execute(query, args)
-                    self.connection.commit()
-                    # get out of the connection attempt loop since we were successful
-                    break
-                except sqlite3.OperationalError, e:
-                    if "unable to open database file" in e.message or "database is locked" in e.message:
-                        logger.log(u"DB error: "+ex(e), logger.WARNING)
-                        attempt += 1
-                        time.sleep(1)
-                    else:
-                        logger.log(u"DB error: "+ex(e), logger.ERROR)
-                        raise
-                except sqlite3.DatabaseError, e:
-                    logger.log(u"Fatal error executing query: " + ex(e), logger.ERROR)
+        # keep the order of writes if this thread has batched rows waiting for this file
+        self.flushBatch()
+
+        write_lock = _pool.acquireWrite(self.path)
+        try:
+            return self._execute(query, args, commit=True)
+        finally:
+            write_lock.release()
+
+    def _execute(self, query, args=None, commit=False):
+
+        connection = self.connection
+
+        sqlResult = None
+        attempt = 0
+
+        while attempt < 5:
+            try:
+                cursor = connection.cursor()
+                cursor.row_factory = self.row_factory
+                if args == None:
+                    logger.log(u"%s: %s", logger.DEBUG, self.filename, query)
+                    sqlResult = cursor.execute(query)
+                else:
+                    logger.log(u"%s: %s with args %s", logger.DEBUG, self.filename, query, args)
+                    sqlResult = cursor.execute(query, args)
+                if commit:
+                    connection.commit()
+                # get out of the connection attempt loop since we were successful
+                break
+            except sqlite3.OperationalError, e:
+                if "unable to open database file" in e.message or "database is locked" in e.message:
+                    logger.log(u"DB error: "+ex(e), logger.WARNING)
+                    _pool.count('locked_retries')
+                    attempt += 1
+                    time.sleep(1)
+                else:
+                    logger.log(u"DB error: "+ex(e), logger.ERROR)
                     raise
-    
-            return sqlResult
+            except sqlite3.DatabaseError, e:
+                logger.log(u"Fatal error executing query: " + ex(e), logger.ERROR)
+                raise
+
+        return sqlResult
 
 
     def select(self, query, args=None):
 
-        sqlResults = self.action(query, args).fetchall()
+        # reads don't need the write lock, WAL lets them run next to the writer
+        _pool.count('reads')
+        sqlResults = self._execute(query, args).fetchall()
 
         if sqlResults == None:
             return []
 
         return sqlResults
 
+    def batch(self):
+        """
+        Returns the write-behind batch for this thread and database file, creating it if needed.
+        See DBBatch.
+        """
+        cur_batch = _pool.getBatch(self.path)
+        if not cur_batch:
+            cur_batch = DBBatch(self)
+        return cur_batch
+
+    def flushBatch(self):
+        """
+        Writes the rows this thread has batched for this database file now, if there are any.
+        """
+        cur_batch = _pool.getBatch(self.path)
+        if cur_batch:
+            cur_batch.flush()
+
+    def isBatched(self, tableName, keyDict):
+        """
+        Returns True if an upsert of the row is waiting in a batch on any thread, so what's in the
+        file for it may be out of date.
+        """
+        return _pool.isPending(self.path, _rowKey(tableName, keyDict))
+
     def upsert(self, tableName, valueDict, keyDict):
 
+        cur_batch = _pool.getBatch(self.path)
+        if cur_batch:
+            cur_batch.upsert(tableName, valueDict, keyDict)
+            return
+
         changesBefore = self.connection.total_changes
 
         genParams = lambda myDict : [x + " = ?" for x in myDict.keys()]
@@ -170,6 +493,12 @@ class DBConnection:
                      " VALUES (" + ", ".join(["?"] * len(valueDict.keys() + keyDict.keys())) + ")"
             self.action(query, valueDict.values() + keyDict.values())
 
+    def checkpoint(self):
+        """
+        Writes everything in the WAL back into the main database file, eg. before it is copied.
+        """
+        self.action("PRAGMA wal_checkpoint(TRUNCATE)")
+
     def tableInfo(self, tableName):
         # FIXME ? binding is not supported here, but I cannot find a way to escape a string manually
         cursor = self.connection.execute("PRAGMA table_info(%s)" % tableName)
@@ -0,0 +1,137 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import threading
+
+from sickbeard import db
+from sickbeard.lru import LRUDict
+
+# how many episode objects are kept alive across all the shows
+EPISODE_CACHE_SIZE = 5000
+
+# when the cache is full it's trimmed down to this fraction of its size, so the batch flush
+# that goes with it doesn't happen for every episode added
+EVICT_TO = 0.9
+
+# the most episodes one eviction looks at, the ones it has to keep are moved to the back so the
+# next one looks at others
+EVICT_MAX_CHECKED = 500
+
+
+class EpisodeCache(object):
+    """
+    LRU cache of the TVEpisode objects of all the shows.
+
+    A show only keeps weak references to its episodes (TVShow.episodes), this is what keeps the
+    ones used most recently alive. Once there are more than maxSize the least recently used
+    ones are let go of, unless they have changes that haven't been saved yet or their row is
+    still waiting to be written in another thread's batch (those count as used again). An episode that
+    is let go of but still used somewhere else is found again by its show, so there's never
+    more than one object for an episode.
+    """
+
+    def __init__(self, maxSize=EPISODE_CACHE_SIZE, maxChecked=EVICT_MAX_CHECKED):
+        self.maxSize = maxSize
+        self.maxChecked = maxChecked
+
+        self._lock = threading.Lock()
+        # id(episode): episode, least recently used first
+        self._episodes = LRUDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, ep):
+        """
+        Keeps a newly made episode alive.
+        """
+        with self._lock:
+            self.misses += 1
+            self._episodes[id(ep)] = ep
+            full = len(self._episodes) > self.maxSize
+
+        if full:
+            self._evict()
+
+    def touch(self, ep):
+        """
+        Marks an episode that was found by its show as the most recently used one.
+        """
+        with self._lock:
+            self.hits += 1
+            self._episodes[id(ep)] = ep
+
+    def _evict(self):
+        # called without the lock, getEpisode in every thread would be waiting on the flush
+
+        # rows this thread saved in a batch have to be in the database before the episode
+        # they came from can be read from it again
+        myDB = db.DBConnection()
+        myDB.flushBatch()
+
+        with self._lock:
+            targetSize = int(self.maxSize * EVICT_TO)
+            for curKey in self._episodes.oldestKeys(self.maxChecked):
+                if len(self._episodes) <= targetSize:
+                    break
+
+                # don't lose changes nobody has saved, or ones another thread's batch hasn't
+                # written yet
+                curEp = self._episodes[curKey]
+                if curEp.dirty or myDB.isBatched("tv_episodes", {"showid": curEp.show.tvdbid, "season": curEp.season, "episode": curEp.episode}):
+                    self._episodes.touch(curKey)
+                    continue
+
+                del self._episodes[curKey]
+                self.evictions += 1
+
+    def discard(self, ep):
+        """
+        Stops keeping an episode alive, for ones that were deleted or flushed by their show.
+        """
+        with self._lock:
+            self._episodes.pop(id(ep), None)
+
+    def setSize(self, maxSize):
+        with self._lock:
+            self.maxSize = maxSize
+            full = len(self._episodes) > self.maxSize
+
+        if full:
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._episodes.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._episodes)
+
+    def getStats(self):
+        with self._lock:
+            return {"size": len(self._episodes),
+                    "max_size": self.maxSize,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+episode_cache = EpisodeCache()
@@ -16,7 +16,11 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import with_statement
+
 import datetime
+import heapq
+import itertools
 import threading
 
 from sickbeard import logger
@@ -27,19 +31,59 @@ class QueuePriorities:
     HIGH = 30
 
 class GenericQueue(object):
+    """
+    Runs queue items in threads, highest priority first and in the order they were added within
+    a priority.
 
-    def __init__(self):
+    The waiting items are kept in a heap, and indexed by id, by the key their get_key() returns
+    and by action_id so the subclasses can check for duplicates without walking the queue. Up to
+    max_running items are run at the same time, the last reserved_slots of them only for items
+    of reserved_priority or higher. Items that can_run() turns down wait for the next run.
 
-        self.currentItem = None
-        self.queue = []
+    Once it has been given its scheduler with set_scheduler() the items run on the worker pool of
+    the scheduler service, and the queue is run again as soon as an item is added or finishes
+    instead of waiting for the next cycle.
+    """
 
-        self.thread = None
+    def __init__(self, max_running=1):
 
         self.queue_name = "QUEUE"
 
         self.min_priority = 0
-        
-        self.currentItem = None
+
+        self.max_running = max_running
+
+        self.reserved_slots = 0
+        self.reserved_priority = QueuePriorities.NORMAL
+
+        self.lock = threading.RLock()
+
+        # (-priority, added, count, item), count keeps items added at the same time in order
+        self._heap = []
+        self._counter = itertools.count()
+
+        # id(item): (item, key), key: [items], action_id: number of items
+        self._queued = {}
+        self._byKey = {}
+        self._actionCounts = {}
+
+        # [(thread or job, item)] in the order they were started
+        self._running = []
+
+        self.scheduler = None
+        self.pool = None
+
+    def set_scheduler(self, scheduler):
+        """
+        Runs the items on the pool of the service the scheduler has been added to, and wakes the
+        scheduler up whenever the queue changes.
+        """
+        self.scheduler = scheduler
+        self.pool = scheduler.service.pool
+
+    def _wake(self):
+        if self.scheduler:
+            self.scheduler.wake()
 
     def pause(self):
         logger.log(u"Pausing queue")
@@ -48,58 +92,147 @@ class GenericQueue(object):
     def unpause(self):
         logger.log(u"Unpausing queue")
         self.min_priority = 0
+        self._wake()
 
     def add_item(self, item):
-        item.added = datetime.datetime.now()
-        self.queue.append(item)
-        
+        with self.lock:
+            item.added = datetime.datetime.now()
+            heapq.heappush(self._heap, (-item.priority, item.added, self._counter.next(), item))
+
+            key = item.get_key()
+            self._queued[id(item)] = (item, key)
+            if key != None:
+                self._byKey.setdefault(key, []).append(item)
+            self._actionCounts[item.action_id] = self._actionCounts.get(item.action_id, 0) + 1
+
+        self._wake()
+
         return item
 
+    def _unindex(self, item):
+        # callers hold the lock
+        key = self._queued.pop(id(item))[1]
+        if key != None:
+            self._byKey[key].remove(item)
+            if not self._byKey[key]:
+                del self._byKey[key]
+        self._actionCounts[item.action_id] -= 1
+
+    def set_priority(self, item, priority):
+        """
+        Moves a waiting item to a new priority, returns False if it isn't waiting any more.
+        """
+        with self.lock:
+            if id(item) not in self._queued:
+                return False
+
+            for i, entry in enumerate(self._heap):
+                if entry[3] is item:
+                    item.priority = priority
+                    self._heap[i] = (-priority,) + entry[1:]
+                    heapq.heapify(self._heap)
+                    break
+
+        self._wake()
+
+        return True
+
+    def can_run(self, item):
+        """
+        Subclasses can return False to keep an item waiting while whatever it conflicts with is
+        running, it's checked again the next time the queue runs.
+        """
+        return True
+
+    def find_queued(self, key):
+        """
+        Returns the waiting items whose get_key() is key
+        """
+        with self.lock:
+            return list(self._byKey.get(key, []))
+
+    def is_key_queued(self, key):
+        return key in self._byKey
+
+    def count_queued(self, action_id):
+        """
+        Returns the number of waiting items with the given action_id
+        """
+        return self._actionCounts.get(action_id, 0)
+
+    def contains(self, item):
+        """
+        Returns True if the item is waiting or running
+        """
+        with self.lock:
+            return id(item) in self._queued or item in self.currentItems
+
+    def _getQueue(self):
+        with self.lock:
+            return [x[3] for x in sorted(self._heap)]
+
+    # the waiting items in the order they'll be run
+    queue = property(_getQueue)
+
+    def _getCurrentItems(self):
+        with self.lock:
+            return [x[1] for x in self._running]
+
+    currentItems = property(_getCurrentItems)
+
+    def _getCurrentItem(self):
+        with self.lock:
+            if self._running:
+                return self._running[0][1]
+            return None
+
+    currentItem = property(_getCurrentItem)
+
+    def __len__(self):
+        return len(self._heap)
+
     def run(self):
 
-        # only start a new task if one isn't already going
-        if self.thread == None or self.thread.isAlive() == False:
-
-            # if the thread is dead then the current item should be finished
-            if self.currentItem != None:
-                self.currentItem.finish()
-                self.currentItem = None
-
-            # if there's something in the queue then run it in a thread and take it out of the queue
-            if len(self.queue) > 0:
-
-                # sort by priority
-                def sorter(x,y):
-                    """
-                    Sorts by priority descending then time ascending
-                    """
-                    if x.priority == y.priority:
-                        if y.added == x.added:
-                            return 0
-                        elif y.added < x.added:
-                            return 1
-                        elif y.added > x.added:
-                            return -1
-                    else:
-                        return y.priority-x.priority
-
-                self.queue.sort(cmp=sorter)
-                
-                queueItem = self.queue[0]
+        with self.lock:
+
+            # the items whose threads are done should be finished
+            for curThread, curItem in list(self._running):
+                if not curThread.isAlive():
+                    curItem.finish()
+                    self._running.remove((curThread, curItem))
+
+            # start the items at the front of the queue until there are max_running going
+            skipped = []
+            while self._heap and len(self._running) < self.max_running:
+
+                queueItem = self._heap[0][3]
 
                 if queueItem.priority < self.min_priority:
-                    return
+                    break
+
+                # everything after this has the same priority or less so it would have to wait as well
+                if queueItem.priority < self.reserved_priority and len(self._running) >= self.max_running - self.reserved_slots:
+                    break
+
+                entry = heapq.heappop(self._heap)
+                if not self.can_run(queueItem):
+                    skipped.append(entry)
+                    continue
+
+                self._unindex(queueItem)
 
                 # launch the queue item in a thread
-                # TODO: improve thread name
                 threadName = self.queue_name + '-' + queueItem.get_thread_name()
-                self.thread = threading.Thread(None, queueItem.execute, threadName)
-                self.thread.start()
+                if self.pool:
+                    thread = self.pool.submit(threadName, queueItem.execute, self._wake)
+                else:
+                    thread = threading.Thread(None, queueItem.execute, threadName)
+                    thread.start()
 
-                self.currentItem = queueItem
+                self._running.append((thread, queueItem))
 
-                # take it out of the queue
-                del self.queue[0]
+            for entry in skipped:
+                heapq.heappush(self._heap, entry)
 
 class QueueItem:
     def __init__(self, name, action_id = 0):
@@ -121,6 +254,13 @@ class QueueItem:
         else:
             return self.name.replace(" ","-").upper()
 
+    def get_key(self):
+        """
+        Items with the same key are duplicates of each other, the queues look them up with
+        find_queued(). None means the item can't have duplicates.
+        """
+        return None
+
     def execute(self):
         """Implementing classes should call this"""
 
@@ -131,4 +271,3 @@ class QueueItem:
 
         self.inProgress = False
 
-
@@ -16,15 +16,20 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import with_statement
+
 import StringIO, zlib, gzip
 import os
 import stat
-import urllib, urllib2
+import urllib, urllib2, urlparse
 import re, socket
 import shutil
+import threading
 import traceback
 import time, sys
+import httplib
 
+from collections import deque
 from httplib import BadStatusLine
 
 from xml.dom.minidom import Node
@@ -38,6 +43,7 @@ from sickbeard.common import USER_AGENT, mediaExtensions, XML_NSMAP
 from sickbeard import db
 from sickbeard import encodingKludge as ek
 from sickbeard import notifiers
+from sickbeard.show_list import ShowList
 
 from lib.tvdb_api import tvdb_api, tvdb_exceptions
 
@@ -126,34 +132,309 @@ def sanitizeFileName (name):
     return name
 
 
-def getURL (url, headers=[]):
+# how many requests can run against one host at the same time (and how many idle connections it keeps)
+HTTP_HOST_LIMIT = 4
+HTTP_MAX_REDIRECTS = 5
+HTTP_CHUNK_SIZE = 64 * 1024
+# how many URLs we remember the ETag/Last-Modified (and body) of for conditional requests
+HTTP_VALIDATOR_CACHE_SIZE = 100
+
+# requests for schemes with a proxy set in the environment go through urllib2 which knows how to use it
+http_proxies = urllib.getproxies()
+
+class HTTPHostPool(object):
     """
-    Returns a byte-string retrieved from the url provider.
+    The kept-alive connections to one host and the request counters for it.
     """
 
-    opener = urllib2.build_opener()
-    opener.addheaders = [('User-Agent', USER_AGENT), ('Accept-Encoding', 'gzip,deflate')]
-    for cur_header in headers:
-        opener.addheaders.append(cur_header)
+    def __init__(self, scheme, host, port):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+
+        self.semaphore = threading.BoundedSemaphore(HTTP_HOST_LIMIT)
+        self._idle = []
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.reused = 0
+        self.bytes = 0
+        self.total_time = 0.0
+
+    def getConnection(self):
+        """
+        Returns (connection, reused) with an idle connection if there is one or a new one.
+        """
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return (self._idle.pop(), True)
+
+        if self.scheme == 'https':
+            return (httplib.HTTPSConnection(self.host, self.port), False)
+        return (httplib.HTTPConnection(self.host, self.port), False)
+
+    def releaseConnection(self, conn):
+        with self._lock:
+            if len(self._idle) < HTTP_HOST_LIMIT:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def record(self, requestTime, numBytes=0, error=False, notModified=False):
+        with self._lock:
+            self.requests += 1
+            self.total_time += requestTime
+            self.bytes += numBytes
+            if error:
+                self.errors += 1
+            if notModified:
+                self.not_modified += 1
+
+http_pools = {}
+http_pools_lock = threading.Lock()
+
+def _getHostPool(scheme, host, port):
+    with http_pools_lock:
+        if (scheme, host, port) not in http_pools:
+            http_pools[(scheme, host, port)] = HTTPHostPool(scheme, host, port)
+        return http_pools[(scheme, host, port)]
+
+def getHTTPStats():
+    """
+    Returns a dict of host: number of requests, errors, 304 responses, reused connections, bytes
+    received (before decompression) and average request time in seconds.
+    """
+    results = {}
+    with http_pools_lock:
+        pools = http_pools.values()
+
+    for pool in pools:
+        name = pool.host
+        if pool.port:
+            name += ':' + str(pool.port)
+        results[name] = {'requests': pool.requests,
+                         'errors': pool.errors,
+                         'not_modified': pool.not_modified,
+                         'reused': pool.reused,
+                         'bytes': pool.bytes,
+                         'average_time': round(pool.total_time / pool.requests, 3) if pool.requests else 0.0}
+    return results
+
+_conditional = threading.local()
+http_validators = {}
+# the URLs in http_validators, oldest first
+http_validator_order = deque()
+http_validators_lock = threading.Lock()
+
+class ConditionalRequests(object):
+    """
+    GETs made inside a "with ConditionalRequests() as requests:" block send the ETag and
+    Last-Modified of the last response for the same URL. If the server answers 304 the body of
+    that last response is returned again and counted in notModified, so the caller can tell
+    nothing changed with unchanged() and skip processing it.
+    """
 
-    try:
-        usock = opener.open(url)
-        url = usock.geturl()
-        encoding = usock.info().get("Content-Encoding")
-
-        if encoding in ('gzip', 'x-gzip', 'deflate'):
-            content = usock.read()
-            if encoding == 'deflate':
-                data = StringIO.StringIO(zlib.decompress(content))
-            else:
-                data = gzip.GzipFile('', 'rb', 9, StringIO.StringIO(content))
-            result = data.read()
+    def __init__(self):
+        self.modified = 0
+        self.notModified = 0
+
+    def __enter__(self):
+        self._previous = getattr(_conditional, 'requests', None)
+        _conditional.requests = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _conditional.requests = self._previous
+        return False
+
+    def unchanged(self):
+        return self.notModified > 0 and self.modified == 0
+
+def _storeValidators(url, responseHeaders, body):
+    etag = responseHeaders.get('etag')
+    lastModified = responseHeaders.get('last-modified')
+
+    with http_validators_lock:
+        if http_validators.pop(url, None) != None:
+            http_validator_order.remove(url)
+        if etag or lastModified:
+            http_validators[url] = (etag, lastModified, body)
+            http_validator_order.append(url)
+            while len(http_validator_order) > HTTP_VALIDATOR_CACHE_SIZE:
+                del http_validators[http_validator_order.popleft()]
 
+def _readBody(response, encoding):
+    """
+    Reads the whole body of a response, decompressing it as it comes in.
+    Returns (body, bytes received).
+    """
+    decompressor = None
+    if encoding in ('gzip', 'x-gzip'):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == 'deflate':
+        decompressor = zlib.decompressobj()
+
+    chunks = []
+    numBytes = 0
+    while True:
+        chunk = response.read(HTTP_CHUNK_SIZE)
+        if not chunk:
+            break
+        numBytes += len(chunk)
+
+        if decompressor:
+            try:
+                chunk = decompressor.decompress(chunk)
+            except zlib.error:
+                # some servers send raw deflate data without the zlib header
+                if encoding != 'deflate' or numBytes != len(chunk):
+                    raise
+                decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                chunk = decompressor.decompress(chunk)
+
+        chunks.append(chunk)
+
+    if decompressor:
+        chunks.append(decompressor.flush())
+
+    return (''.join(chunks), numBytes)
+
+def _httpRequest(pool, method, selector, headers, data):
+    """
+    Makes one request on a connection from the pool and returns
+    (status, reason, response headers, body, bytes received).
+    """
+    for attempt in (1, 2):
+        conn, reused = pool.getConnection()
+        try:
+            conn.request(method, selector, data, headers)
+            response = conn.getresponse()
+        except (socket.error, httplib.HTTPException), e:
+            conn.close()
+            # the server may have closed a kept-alive connection since we last used it
+            if reused and attempt == 1:
+                continue
+            if isinstance(e, socket.error):
+                raise urllib2.URLError(e)
+            raise
+
+        try:
+            body, numBytes = _readBody(response, response.getheader('content-encoding', '').lower())
+        except:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
         else:
-            result = usock.read()
+            pool.releaseConnection(conn)
 
+        return (response.status, response.reason, response.msg, body, numBytes)
+
+def _urllib2Request(url, headers, data):
+    opener = urllib2.build_opener()
+    opener.addheaders = headers.items()
+
+    usock = opener.open(url, data)
+    try:
+        body, numBytes = _readBody(usock, usock.info().get('content-encoding', '').lower())
+        return (usock.geturl(), usock.info(), body)
+    finally:
         usock.close()
 
+def httpGet(url, headers=[], data=None):
+    """
+    Fetches a URL (POSTing data if it's given) over the shared keep-alive connections and returns
+    (final url, response headers, body) with any gzip/deflate encoding already undone.
+
+    Error statuses raise urllib2.HTTPError and connection problems urllib2.URLError, just like
+    urllib2 does. See ConditionalRequests for conditional GETs.
+    """
+
+    requestHeaders = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip,deflate'}
+    for (name, value) in headers:
+        requestHeaders[name] = value
+
+    method = 'GET'
+    if data is not None:
+        method = 'POST'
+        requestHeaders.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+    for redirect in range(HTTP_MAX_REDIRECTS + 1):
+
+        split_url = urlparse.urlsplit(url)
+        if split_url.scheme not in ('http', 'https'):
+            raise urllib2.URLError('unknown url type: ' + split_url.scheme)
+
+        if split_url.scheme in http_proxies:
+            return _urllib2Request(url, requestHeaders, data)
+
+        pool = _getHostPool(split_url.scheme, split_url.hostname, split_url.port)
+        selector = urlparse.urlunsplit(('', '', split_url.path or '/', split_url.query, ''))
+
+        curHeaders = dict(requestHeaders)
+
+        conditional = None
+        validators = None
+        if method == 'GET':
+            conditional = getattr(_conditional, 'requests', None)
+        if conditional:
+            with http_validators_lock:
+                validators = http_validators.get(url)
+            if validators:
+                if validators[0]:
+                    curHeaders['If-None-Match'] = validators[0]
+                if validators[1]:
+                    curHeaders['If-Modified-Since'] = validators[1]
+
+        startTime = time.time()
+        pool.semaphore.acquire()
+        try:
+            try:
+                status, reason, responseHeaders, body, numBytes = _httpRequest(pool, method, selector, curHeaders, data)
+            except:
+                pool.record(time.time() - startTime, error=True)
+                raise
+        finally:
+            pool.semaphore.release()
+
+        pool.record(time.time() - startTime, numBytes, error=status >= 400, notModified=status == 304)
+
+        if status in (301, 302, 303, 307) and responseHeaders.get('location'):
+            url = urlparse.urljoin(url, responseHeaders.get('location'))
+            # like urllib2 anything but a 307 turns a POST into a GET
+            if status != 307:
+                method = 'GET'
+                data = None
+                requestHeaders.pop('Content-Type', None)
+            continue
+
+        if status == 304 and validators:
+            conditional.notModified += 1
+            return (url, responseHeaders, validators[2])
+
+        if status >= 400:
+            raise urllib2.HTTPError(url, status, reason, responseHeaders, StringIO.StringIO(body))
+
+        if conditional:
+            conditional.modified += 1
+            _storeValidators(url, responseHeaders, body)
+
+        return (url, responseHeaders, body)
+
+    raise urllib2.HTTPError(url, status, "Too many redirects", responseHeaders, None)
+
+def getURL (url, headers=[]):
+    """
+    Returns a byte-string retrieved from the url provider.
+    """
+
+    try:
+        url, responseHeaders, result = httpGet(url, headers)
+
     except urllib2.HTTPError, e:
         logger.log(u"HTTP error " + str(e.code) + " while loading URL " + url, logger.WARNING)
         return None
@@ -176,6 +457,11 @@ def getURL (url, headers=[]):
     return result
 
 def findCertainShow (showList, tvdbid):
+
+    # sickbeard.showList has an index, anything else has to be searched
+    if isinstance(showList, ShowList):
+        return showList.getByTvdbid(tvdbid)
+
     results = filter(lambda x: x.tvdbid == tvdbid, showList)
     if len(results) == 0:
         return None
@@ -189,6 +475,9 @@ def findCertainTVRageShow (showList, tvrid):
     if tvrid == 0:
         return None
 
+    if isinstance(showList, ShowList):
+        return showList.getByTvrid(tvrid)
+
     results = filter(lambda x: x.tvrid == tvrid, showList)
 
     if len(results) == 0:
@@ -350,6 +639,12 @@ def buildNFOXML(myShow):
 
 def searchDBForShow(regShowName):
 
+    # try the name index of the show list before going to the DB
+    if isinstance(sickbeard.showList, ShowList):
+        showResults = sickbeard.showList.getByName(regShowName)
+        if len(showResults) == 1:
+            return (int(showResults[0].tvdbid), showResults[0].name)
+
     showNames = [re.sub('[. -]', ' ', regShowName)]
 
     myDB = db.DBConnection()
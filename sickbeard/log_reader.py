@@ -0,0 +1,203 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+
+from sickbeard import logger
+from sickbeard import encodingKludge as ek
+
+# how much of the log or its index is read at a time
+BLOCK_SIZE = 64 * 1024
+
+# the first line of a message, the lines after it up to the next one are part of it (tracebacks)
+LOG_LINE_REGEX = re.compile(r"^(\w{3})\-(\d\d)\s*(\d\d)\:(\d\d):(\d\d)\s*([A-Z]+)\s*(.+?)\s*\:\:\s*(.*)$")
+
+
+class LogEntry(object):
+    """
+    A message from the log: its level, the name of the thread that logged it and its text,
+    which is all the lines of it as they are in the file.
+    """
+
+    __slots__ = ('level', 'thread', 'text')
+
+    def __init__(self, level, thread, text):
+        self.level = level
+        self.thread = thread
+        self.text = text
+
+    def __repr__(self):
+        return '<LogEntry %r>' % self.text
+
+
+def _makeEntry(lines):
+    """
+    Makes a LogEntry out of the lines of a message (the first one in file order), returns None
+    if the first line isn't the start of a message or its level is unknown.
+    """
+    text = ''.join(lines).decode('utf-8', 'replace')
+
+    match = LOG_LINE_REGEX.match(text.split('\n', 1)[0].rstrip('\r'))
+    if not match or match.group(6) not in logger.reverseNames:
+        return None
+
+    return LogEntry(logger.reverseNames[match.group(6)], match.group(7), text)
+
+
+def _readLinesBackwards(f, start, end):
+    """
+    Yields the lines of f between the offsets start and end, last one first, reading it a block
+    at a time from the end.
+    """
+    buf = ''
+    pos = end
+
+    while pos > start:
+        size = min(BLOCK_SIZE, pos - start)
+        pos -= size
+        f.seek(pos)
+        buf = f.read(size) + buf
+
+        # everything after the first newline is whole lines, the first one may go on in the block before
+        firstEnd = buf.find('\n')
+        if firstEnd == -1:
+            continue
+
+        parts = buf[firstEnd + 1:].split('\n')
+        if parts[-1]:
+            yield parts[-1]
+        for curPart in reversed(parts[:-1]):
+            yield curPart + '\n'
+
+        buf = buf[:firstEnd + 1]
+
+    if buf:
+        yield buf
+
+
+def _entriesBackwards(f, start, end):
+    """
+    Yields the messages of f between the offsets start and end, newest first. Lines before the
+    first message in the range are skipped.
+    """
+    lines = []
+    for curLine in _readLinesBackwards(f, start, end):
+        lines.insert(0, curLine)
+        if LOG_LINE_REGEX.match(curLine.rstrip('\r\n')):
+            entry = _makeEntry(lines)
+            if entry:
+                yield entry
+            lines = []
+
+
+def _readIndex(indexFileName, logSize):
+    """
+    Returns the (offset, level) entries of the index of a log file of the given size, or None
+    if there isn't one or it doesn't go with the log.
+    """
+    if not ek.ek(os.path.isfile, indexFileName):
+        return None
+
+    f = ek.ek(open, indexFileName, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+
+    data = data[:len(data) - len(data) % logger.INDEX_ENTRY.size]
+
+    entries = [logger.INDEX_ENTRY.unpack_from(data, x) for x in xrange(0, len(data), logger.INDEX_ENTRY.size)]
+
+    # messages logged since the size of the log was taken
+    while entries and entries[-1][0] >= logSize:
+        entries.pop()
+
+    # the offsets have to go up
+    lastOffset = -1
+    for curOffset, curLevel in entries:
+        if curOffset <= lastOffset:
+            return None
+        lastOffset = curOffset
+
+    return entries
+
+
+def _indexedEntriesBackwards(f, index, logSize, minLevel):
+    """
+    Yields the messages at or above minLevel newest first, reading only those from the log.
+    Anything before the first indexed message is read without the index.
+    """
+    end = logSize
+    for curOffset, curLevel in reversed(index):
+        if curLevel >= minLevel:
+            # usually just the one message, but parse it the same way as without the index
+            for curEntry in _entriesBackwards(f, curOffset, end):
+                yield curEntry
+        end = curOffset
+
+    if index:
+        end = index[0][0]
+    for curEntry in _entriesBackwards(f, 0, end):
+        yield curEntry
+
+
+def readLog(logFile, minLevel=logger.MESSAGE, maxLines=500, thread=None, page=0):
+    """
+    Returns a list of up to maxLines messages (LogEntry objects) from the log file, newest first.
+
+    minLevel: only messages at or above this level
+    thread: only messages logged by the thread with this name (optional)
+    page: skip the newest page * maxLines messages that match
+
+    The log is read backwards from the end, and only as far as is needed. When the logger's
+    index of the log is there the messages below minLevel aren't read at all.
+    """
+
+    if not ek.ek(os.path.isfile, logFile):
+        return []
+
+    logSize = ek.ek(os.path.getsize, logFile)
+    index = _readIndex(logFile + logger.INDEX_SUFFIX, logSize)
+
+    toSkip = max(0, int(page)) * maxLines
+    results = []
+
+    f = ek.ek(open, logFile, 'rb')
+    try:
+        if index != None:
+            entries = _indexedEntriesBackwards(f, index, logSize, minLevel)
+        else:
+            entries = _entriesBackwards(f, 0, logSize)
+
+        for curEntry in entries:
+            if curEntry.level < minLevel:
+                continue
+            if thread and curEntry.thread != thread:
+                continue
+
+            if toSkip:
+                toSkip -= 1
+                continue
+
+            results.append(curEntry)
+            if len(results) >= maxLines:
+                break
+    finally:
+        f.close()
+
+    return results
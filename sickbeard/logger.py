@@ -19,7 +19,9 @@
 from __future__ import with_statement 
 
 import os
+import struct
 import threading
+import Queue
 
 import logging
 
@@ -34,6 +36,14 @@ NUM_LOGS = 3
 # log size in bytes
 LOG_SIZE = 10000000 # 10 megs
 
+# messages the background writer can fall behind by before new ones are dropped
+LOG_QUEUE_SIZE = 10000
+
+# the sidecar index of the log file has an entry of the offset and level of every message
+# written to it, so log_reader can skip the ones below the level it's looking for
+INDEX_SUFFIX = '.idx'
+INDEX_ENTRY = struct.Struct('<IB')
+
 ERROR = logging.ERROR
 WARNING = logging.WARNING
 MESSAGE = logging.INFO
@@ -52,11 +62,20 @@ class SBRotatingLogHandler(object):
         
         self.log_file = log_file
         self.cur_handler = None
+        self.index_file = None
 
         self.writes_since_check = 0
 
         self.log_lock = threading.Lock()
 
+        # anything below this isn't logged at all
+        self.level = DEBUG
+
+        # the background writer, see startWriter()
+        self.writer = None
+        self.queue = None
+        self.dropped = 0
+
     def initLogging(self, consoleLogging=True):
     
         self.log_file = os.path.join(sickbeard.LOG_DIR, self.log_file)
@@ -85,10 +104,54 @@ class SBRotatingLogHandler(object):
         """
     
         file_handler = logging.FileHandler(self.log_file)
-        file_handler.setLevel(logging.DEBUG)
+        file_handler.setLevel(self.level)
         file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(message)s', '%b-%d %H:%M:%S'))
+
+        self._open_index()
+
         return file_handler
 
+    def _open_index(self):
+        """
+        Opens the index of the log file for appending. If it doesn't go with the log file it's
+        started over, log_reader reads the part of the log before its first entry without it.
+        """
+
+        self._close_index()
+
+        index_file_name = self.log_file + INDEX_SUFFIX
+
+        log_size = 0
+        if os.path.isfile(self.log_file):
+            log_size = os.path.getsize(self.log_file)
+
+        mode = 'wb'
+        if log_size and os.path.isfile(index_file_name):
+            index_size = os.path.getsize(index_file_name)
+            index_size -= index_size % INDEX_ENTRY.size
+            if index_size:
+                f = open(index_file_name, 'rb')
+                try:
+                    f.seek(index_size - INDEX_ENTRY.size)
+                    last_offset = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+                finally:
+                    f.close()
+                if last_offset < log_size:
+                    mode = 'ab'
+
+        try:
+            self.index_file = open(index_file_name, mode)
+            if mode == 'ab':
+                # drop a partly written entry
+                self.index_file.truncate(index_size)
+        except IOError:
+            self.index_file = None
+
+    def _close_index(self):
+        if self.index_file:
+            self.index_file.close()
+            self.index_file = None
+
     def _log_file_name(self, i):
         """
         Returns a numbered log file name depending on i. If i==0 it just uses logName, if not it appends
@@ -118,6 +181,13 @@ class SBRotatingLogHandler(object):
             self.cur_handler.flush()
             self.cur_handler.close()
             sb_logger.removeHandler(self.cur_handler)
+
+        # the new log file gets a new index
+        self._close_index()
+        try:
+            os.remove(self.log_file + INDEX_SUFFIX)
+        except OSError:
+            pass
     
         # rename or delete all the old log files
         for i in range(self._num_logs(), -1, -1):
@@ -137,43 +207,166 @@ class SBRotatingLogHandler(object):
         
         sb_logger.addHandler(new_file_handler)
 
-    def log(self, toLog, logLevel=MESSAGE):
-    
+    def setLevel(self, logLevel):
+        """
+        Sets the lowest level that's logged, messages below it are thrown away before they're
+        even formatted.
+        """
+        self.level = logLevel
+        if self.cur_handler:
+            self.cur_handler.setLevel(logLevel)
+
+    def startWriter(self, maxQueued=LOG_QUEUE_SIZE):
+        """
+        Hands the writing of the log file (and its rotation) to a background thread so threads
+        logging something never wait for the disk. If the writer falls more than maxQueued
+        messages behind new ones are dropped until it catches up, it says how many it dropped.
+        """
+        with self.log_lock:
+            if self.writer:
+                return
+
+            self.queue = Queue.Queue(maxQueued)
+            self.writer = threading.Thread(target=self._writer, args=(self.queue,), name="LOGWRITER")
+            self.writer.setDaemon(True)
+            self.writer.start()
+
+    def stopWriter(self, timeout=10):
+        """
+        Writes whatever the background writer still has queued and stops it, messages are
+        written by the thread logging them again afterwards.
+        """
+        with self.log_lock:
+            writer = self.writer
+            if not writer:
+                return
+
+            self.writer = None
+            queue = self.queue
+            self.queue = None
+
+        # the writer exits once it gets to this
+        queue.put(None)
+        writer.join(timeout)
+
+        # and anything that was queued behind it is written here
+        with self.log_lock:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except Queue.Empty:
+                    break
+                if item != None:
+                    self._write(*item)
+
+    def _writer(self, queue):
+        while True:
+            item = queue.get()
+            if item == None:
+                return
+
+            with self.log_lock:
+                if self.dropped:
+                    self._write(u"LOGWRITER :: The log writer fell behind, dropped " + str(self.dropped) + u" messages", WARNING)
+                    self.dropped = 0
+                self._write(*item)
+
+    def log(self, toLog, logLevel=MESSAGE, *args):
+        """
+        Logs a message, see log() below.
+        """
+
+        if logLevel < self.level:
+            return
+
+        if callable(toLog):
+            toLog = toLog(*args)
+        elif args:
+            toLog = toLog % args
+
+        meThread = threading.currentThread().getName()
+        message = meThread + u" :: " + toLog
+
+        if logLevel == ERROR:
+            # add errors to the UI logger
+            classes.ErrorViewer.add(classes.UIError(message))
+
+        queue = self.queue
+        if queue:
+            try:
+                queue.put_nowait((message, logLevel))
+            except Queue.Full:
+                self.dropped += 1
+            return
+
         with self.log_lock:
+            self._write(message, logLevel)
+
+    def _write(self, message, logLevel):
+        """
+        Writes a formatted message to the log, callers hold log_lock.
+        """
+
+        # check the size and see if we need to rotate
+        if self.writes_since_check >= 10:
+            if os.path.isfile(self.log_file) and os.path.getsize(self.log_file) >= LOG_SIZE:
+                self._rotate_logs()
+            self.writes_since_check = 0
+        else:
+            self.writes_since_check += 1
+
+        out_line = message.encode('utf-8')
     
-            # check the size and see if we need to rotate
-            if self.writes_since_check >= 10:
-                if os.path.isfile(self.log_file) and os.path.getsize(self.log_file) >= LOG_SIZE:
-                    self._rotate_logs()
-                self.writes_since_check = 0
+        sb_logger = logging.getLogger('sickbeard')
+
+        # where the message is going to start in the log file, everything before it has been flushed
+        offset = None
+        if self.index_file and self.cur_handler and self.cur_handler.stream:
+            offset = os.fstat(self.cur_handler.stream.fileno()).st_size
+
+        try:
+            if logLevel == DEBUG:
+                sb_logger.debug(out_line)
+            elif logLevel == MESSAGE:
+                sb_logger.info(out_line)
+            elif logLevel == WARNING:
+                sb_logger.warning(out_line)
+            elif logLevel == ERROR:
+                sb_logger.error(out_line)
             else:
-                self.writes_since_check += 1
-    
-            meThread = threading.currentThread().getName()
-            message = meThread + u" :: " + toLog
-        
-            out_line = message.encode('utf-8')
-        
-            sb_logger = logging.getLogger('sickbeard')
-    
+                sb_logger.log(logLevel, out_line)
+        except ValueError:
+            return
+
+        if offset != None:
             try:
-                if logLevel == DEBUG:
-                    sb_logger.debug(out_line)
-                elif logLevel == MESSAGE:
-                    sb_logger.info(out_line)
-                elif logLevel == WARNING:
-                    sb_logger.warning(out_line)
-                elif logLevel == ERROR:
-                    sb_logger.error(out_line)
-            
-                    # add errors to the UI logger
-                    classes.ErrorViewer.add(classes.UIError(message))
-                else:
-                    sb_logger.log(logLevel, out_line)
-            except ValueError:
-                pass
+                self.index_file.write(INDEX_ENTRY.pack(offset, logLevel))
+                self.index_file.flush()
+            except (IOError, struct.error):
+                # an index with gaps is worse than none, the reader does without it
+                self._close_index()
+                try:
+                    os.remove(self.log_file + INDEX_SUFFIX)
+                except OSError:
+                    pass
 
 sb_log_instance = SBRotatingLogHandler('sickbeard.log', NUM_LOGS, LOG_SIZE)
 
-def log(toLog, logLevel=MESSAGE):
-    sb_log_instance.log(toLog, logLevel)
\ No newline at end of file
+def isEnabledFor(logLevel):
+    """
+    Returns True if messages of the given level are logged, for callers who'd have to do some
+    work just to put a message together.
+    """
+    return logLevel >= sb_log_instance.level
+
+def log(toLog, logLevel=MESSAGE, *args):
+    """
+    Logs toLog at the given level. Messages below the level set with setLevel() cost no more
+    than the call, so anything expensive about a message should be left for here to do:
+
+    args: if given toLog is %-formatted with them, logger.log(u"Got %s", logger.DEBUG, data)
+    toLog can also be a callable returning the message, it's called with the args
+    """
+    if logLevel < sb_log_instance.level:
+        return
+    sb_log_instance.log(toLog, logLevel, *args)
\ No newline at end of file
@@ -0,0 +1,122 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import deque
+
+
+class LRUDict(object):
+    """
+    A dict which keeps track of the order its keys were last set or touched in, for the LRU
+    caches (collections.OrderedDict needs Python 2.7).
+
+    Every time a key is used it's added to the end of a deque with a new generation number, the
+    entries it had further up are left there and skipped once they reach the front. The deque
+    is rebuilt when there are a lot more of those than keys.
+
+    It isn't thread safe, the caches using it have their own locks.
+    """
+
+    def __init__(self):
+        # key: [value, generation]
+        self._items = {}
+        # (key, generation), least recently used first
+        self._order = deque()
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        return self._items[key][0]
+
+    def __setitem__(self, key, value):
+        self._generation += 1
+        self._items[key] = [value, self._generation]
+        self._order.append((key, self._generation))
+        self._compact()
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def get(self, key, default=None):
+        """
+        Returns the value of a key without touching it.
+        """
+        item = self._items.get(key)
+        if item is None:
+            return default
+        return item[0]
+
+    def touch(self, key):
+        """
+        Makes a key the most recently used one.
+        """
+        self._generation += 1
+        self._items[key][1] = self._generation
+        self._order.append((key, self._generation))
+        self._compact()
+
+    def pop(self, key, default=None):
+        item = self._items.pop(key, None)
+        if item is None:
+            return default
+        return item[0]
+
+    def _isCurrent(self, entry):
+        item = self._items.get(entry[0])
+        return item is not None and item[1] == entry[1]
+
+    def popOldest(self):
+        """
+        Removes the least recently used key and returns (key, value), raises KeyError if there
+        aren't any.
+        """
+        while self._order:
+            entry = self._order.popleft()
+            if self._isCurrent(entry):
+                return (entry[0], self._items.pop(entry[0])[0])
+        raise KeyError('popOldest(): LRUDict is empty')
+
+    def keys(self):
+        """
+        Returns a list of the keys, least recently used first.
+        """
+        return [x[0] for x in self._order if self._isCurrent(x)]
+
+    def oldestKeys(self, limit):
+        """
+        Returns a list of at most limit keys, least recently used first, without going through
+        all of them.
+        """
+        keys = []
+        for curEntry in self._order:
+            if len(keys) >= limit:
+                break
+            if self._isCurrent(curEntry):
+                keys.append(curEntry[0])
+        return keys
+
+    def clear(self):
+        self._items.clear()
+        self._order.clear()
+
+    def _compact(self):
+        if len(self._order) > 2 * len(self._items) + 16:
+            self._order = deque([x for x in self._order if self._isCurrent(x)])
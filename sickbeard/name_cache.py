@@ -58,8 +58,10 @@ def retrieveNameFromCache(name):
 
 def clearCache():
     """
-    Deletes all "unknown" entries from the cache (names with tvdb_id of 0).
+    Deletes all "unknown" entries from the cache (names with tvdb_id of 0), along with the feed
+    items which didn't match a show so the providers look at them again.
     """
     cacheDB = db.DBConnection('cache.db')
     cacheDB.action("DELETE FROM scene_names WHERE tvdb_id = ?", [0])
+    cacheDB.action("DELETE FROM provider_cache_seen WHERE tvdbid = ?", [0])
 
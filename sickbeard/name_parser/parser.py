@@ -16,24 +16,41 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import with_statement
+
 import datetime
 import os.path
 import re
+import threading
 
 import regexes
 
 import sickbeard
 
 from sickbeard import logger
+from sickbeard.lru import LRUDict
 
 from lib.tvdb_api import tvdb_api, tvdb_exceptions
 
+def _compile_regexes():
+    compiled_regexes = []
+    for (cur_pattern_name, cur_pattern) in regexes.ep_regexes:
+        try:
+            cur_regex = re.compile(cur_pattern, re.VERBOSE | re.IGNORECASE)
+        except re.error, errormsg:
+            logger.log(u"WARNING: Invalid episode_pattern, %s. %s" % (errormsg, cur_pattern))
+        else:
+            compiled_regexes.append((cur_pattern_name, cur_regex))
+    return compiled_regexes
+
+# the patterns are the same for every parser so they're only compiled once
+compiled_regexes = _compile_regexes()
+
 class NameParser(object):
     def __init__(self, file_name=True):
 
         self.file_name = file_name
-        self.compiled_regexes = []
-        self._compile_regexes()
+        self.compiled_regexes = compiled_regexes
 
     def clean_series_name(self, series_name):
         """Cleans up series name by removing any . and _
@@ -58,15 +75,6 @@ class NameParser(object):
         series_name = re.sub("-$", "", series_name)
         return series_name.strip()
 
-    def _compile_regexes(self):
-        for (cur_pattern_name, cur_pattern) in regexes.ep_regexes:
-            try:
-                cur_regex = re.compile(cur_pattern, re.VERBOSE | re.IGNORECASE)
-            except re.error, errormsg:
-                logger.log(u"WARNING: Invalid episode_pattern, %s. %s" % (errormsg, cur_pattern))
-            else:
-                self.compiled_regexes.append((cur_pattern_name, cur_regex))
-
     def _parse_string(self, name):
         
         if not name:
@@ -78,15 +86,14 @@ class NameParser(object):
             if not match:
                 continue
             
-            result = ParseResult(name)
-            result.which_regex = [cur_regex_name]
+            result = {'which_regex': [cur_regex_name]}
             
             named_groups = match.groupdict().keys()
 
             if 'series_name' in named_groups:
-                result.series_name = match.group('series_name')
-                if result.series_name:
-                    result.series_name = self.clean_series_name(result.series_name)
+                result['series_name'] = match.group('series_name')
+                if result['series_name']:
+                    result['series_name'] = self.clean_series_name(result['series_name'])
             
             if 'season_num' in named_groups:
                 tmp_season = match.group('season_num')
@@ -94,14 +101,14 @@ class NameParser(object):
                     continue
                 if cur_regex_name == 'mvgroup' and tmp_season is None:
                     tmp_season = '1'
-                result.season_number = int(tmp_season)
+                result['season_number'] = int(tmp_season)
             
             if 'ep_num' in named_groups:
                 ep_num = self._convert_number(match.group('ep_num'))
                 if 'extra_ep_num' in named_groups and match.group('extra_ep_num'):
-                    result.episode_numbers = range(ep_num, self._convert_number(match.group('extra_ep_num'))+1)
+                    result['episode_numbers'] = range(ep_num, self._convert_number(match.group('extra_ep_num'))+1)
                 else:
-                    result.episode_numbers = [ep_num]
+                    result['episode_numbers'] = [ep_num]
 
             if 'air_year' in named_groups and 'air_month' in named_groups and 'air_day' in named_groups:
                 year = int(match.group('air_year'))
@@ -115,7 +122,7 @@ class NameParser(object):
                     day = tmp_month
 
                 try:
-                    result.air_date = datetime.date(year, month, day)
+                    result['air_date'] = datetime.date(year, month, day)
                 except ValueError, e:
                     raise InvalidNameException(e.message)
 
@@ -125,12 +132,12 @@ class NameParser(object):
                 # Show.S04.Special is almost certainly not every episode in the season
                 if tmp_extra_info and cur_regex_name == 'season_only' and re.match(r'([. _-]|^)(special|extra)\w*([. _-]|$)', tmp_extra_info, re.I):
                     continue
-                result.extra_info = tmp_extra_info
+                result['extra_info'] = tmp_extra_info
             
             if 'release_group' in named_groups:
-                result.release_group = match.group('release_group')
+                result['release_group'] = match.group('release_group')
 
-            return result
+            return ParseResult(name, **result)
         
         return None
 
@@ -202,11 +209,27 @@ class NameParser(object):
     def parse(self, name, fix_scene_numbering=False):
         
         name = self._unicodify(name)
-        
-        cached = name_parser_cache.get(name)
-        if cached:
-            if fix_scene_numbering: cached.fix_scene_numbering()
-            return cached
+
+        cache_key = (name, self.file_name)
+
+        if fix_scene_numbering:
+            cached = name_parser_cache.get(cache_key, scene_numbered=True)
+            if cached:
+                return cached
+
+        result = name_parser_cache.get(cache_key)
+        if not result:
+            result = self._parse(name)
+            name_parser_cache.add(cache_key, result)
+
+        # scene numbering is its own step on top of the plain result since it depends on the DB
+        if fix_scene_numbering:
+            result = result.fix_scene_numbering()
+            name_parser_cache.add(cache_key, result, scene_numbered=True)
+
+        return result
+
+    def _parse(self, name):
 
         # break it into parts if there are any (dirname, file name, extension)
         dir_name, file_name = os.path.split(name)
@@ -219,9 +242,6 @@ class NameParser(object):
         # use only the direct parent dir
         dir_name = os.path.basename(dir_name)
         
-        # set up a result to use
-        final_result = ParseResult(name)
-        
         # try parsing the file name
         file_name_result = self._parse_string(base_file_name)
         
@@ -229,37 +249,40 @@ class NameParser(object):
         dir_name_result = self._parse_string(dir_name)
 
         # build the ParseResult object
-        final_result.air_date = self._combine_results(file_name_result, dir_name_result, 'air_date')
+        air_date = self._combine_results(file_name_result, dir_name_result, 'air_date')
 
-        if not final_result.air_date:
-            final_result.season_number = self._combine_results(file_name_result, dir_name_result, 'season_number')
-            final_result.episode_numbers = self._combine_results(file_name_result, dir_name_result, 'episode_numbers')
+        season_number = None
+        episode_numbers = None
+        if not air_date:
+            season_number = self._combine_results(file_name_result, dir_name_result, 'season_number')
+            episode_numbers = self._combine_results(file_name_result, dir_name_result, 'episode_numbers')
         
-        # if the dirname has a release group/show name I believe it over the filename
-        final_result.series_name = self._combine_results(dir_name_result, file_name_result, 'series_name')
-        final_result.extra_info = self._combine_results(dir_name_result, file_name_result, 'extra_info')
-        final_result.release_group = self._combine_results(dir_name_result, file_name_result, 'release_group')
-
-        final_result.which_regex = []
+        final_result = ParseResult(name,
+                                   # if the dirname has a release group/show name I believe it over the filename
+                                   series_name=self._combine_results(dir_name_result, file_name_result, 'series_name'),
+                                   season_number=season_number,
+                                   episode_numbers=episode_numbers,
+                                   extra_info=self._combine_results(dir_name_result, file_name_result, 'extra_info'),
+                                   release_group=self._combine_results(dir_name_result, file_name_result, 'release_group'),
+                                   air_date=air_date)
+
+        which_regex = []
         if final_result == file_name_result:
-            final_result.which_regex = file_name_result.which_regex
+            which_regex = file_name_result.which_regex
         elif final_result == dir_name_result:
-            final_result.which_regex = dir_name_result.which_regex
+            which_regex = dir_name_result.which_regex
         else:
             if file_name_result:
-                final_result.which_regex += file_name_result.which_regex
+                which_regex += file_name_result.which_regex
             if dir_name_result:
-                final_result.which_regex += dir_name_result.which_regex
+                which_regex += dir_name_result.which_regex
 
         # if there's no useful info in it then raise an exception
         if final_result.season_number == None and not final_result.episode_numbers and final_result.air_date == None and not final_result.series_name:
             raise InvalidNameException("Unable to parse "+name.encode(sickbeard.SYS_ENCODING))
 
-        name_parser_cache.add(name, final_result)
-        
-        if fix_scene_numbering: final_result.fix_scene_numbering()
         # return it
-        return final_result
+        return final_result.copy(which_regex=which_regex)
     
     @classmethod
     def series_name_to_tvdb_id(cls, series_name, check_scene_exceptions=True, check_database=True, check_tvdb=False):
@@ -319,6 +342,11 @@ class NameParser(object):
         return None
 
 class ParseResult(object):
+    """
+    The result of parsing a name. These are shared through the parse cache so they can't be
+    changed once they're made, use copy() to get a changed version.
+    """
+
     def __init__(self,
                  original_name,
                  series_name=None,
@@ -326,7 +354,8 @@ class ParseResult(object):
                  episode_numbers=None,
                  extra_info=None,
                  release_group=None,
-                 air_date=None
+                 air_date=None,
+                 which_regex=None
                  ):
 
         self.original_name = original_name
@@ -343,8 +372,29 @@ class ParseResult(object):
         
         self.air_date = air_date
         
-        self.which_regex = None
-        
+        self.which_regex = which_regex
+
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("ParseResult objects can't be changed, use copy()")
+        object.__setattr__(self, name, value)
+
+    def copy(self, **changes):
+        """
+        Returns a new ParseResult with the same values as this one apart from the given changes.
+        """
+        values = {'series_name': self.series_name,
+                  'season_number': self.season_number,
+                  'episode_numbers': list(self.episode_numbers),
+                  'extra_info': self.extra_info,
+                  'release_group': self.release_group,
+                  'air_date': self.air_date,
+                  'which_regex': self.which_regex}
+        values.update(changes)
+        return ParseResult(self.original_name, **values)
+
     def __eq__(self, other):
         if not other:
             return False
@@ -395,12 +445,12 @@ class ParseResult(object):
     
     def fix_scene_numbering(self):
         """
-        The changes the parsed result (which is assumed to be scene numbering) to
+        Returns a copy of the parsed result (which is assumed to be scene numbering) with
         tvdb numbering, if necessary.
         """
-        if self.air_by_date: return # scene numbering does not apply to air-by-date
-        if self.season_number == None: return # can't work without a season
-        if len(self.episode_numbers) == 0: return # need at least one episode
+        if self.air_by_date: return self # scene numbering does not apply to air-by-date
+        if self.season_number == None: return self # can't work without a season
+        if len(self.episode_numbers) == 0: return self # need at least one episode
         
         tvdb_id = NameParser.series_name_to_tvdb_id(self.series_name, True, True, False)
         
@@ -426,30 +476,63 @@ class ParseResult(object):
         new_episode_numbers = list(set(new_episode_numbers))
         new_episode_numbers.sort()
         
-        self.episode_numbers = new_episode_numbers
-        self.season_number = new_season_numbers[0]
+        return self.copy(season_number=new_season_numbers[0], episode_numbers=new_episode_numbers)
         
         
 
 class NameParserCache(object):
-    #TODO: check if the fifo list can beskiped and only use one dict
-    _previous_parsed_list = [] # keep a fifo list of the cached items
-    _previous_parsed = {}
-    _cache_size = 100
+    """
+    LRU cache of parse results keyed on (name, file_name). Results with scene numbering applied
+    are kept apart from the plain ones since they depend on the scene numbering and exceptions,
+    clearSceneNumbering() drops them when those change.
+    """
+
+    def __init__(self, cache_size=1000):
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._previous_parsed = LRUDict()
+        self._scene_numbered = LRUDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _getCache(self, scene_numbered):
+        if scene_numbered:
+            return self._scene_numbered
+        return self._previous_parsed
+
+    def add(self, key, parse_result, scene_numbered=False):
+        with self._lock:
+            cache = self._getCache(scene_numbered)
+            cache[key] = parse_result
+            while len(cache) > self._cache_size:
+                cache.popOldest()
     
-    def add(self, name, parse_result):
-        self._previous_parsed[name] = parse_result
-        self._previous_parsed_list.append(name)
-        while len(self._previous_parsed_list) > self._cache_size:
-            del_me = self._previous_parsed_list.pop(0)
-            self._previous_parsed.pop(del_me)
-    
-    def get(self, name):
-        if name in self._previous_parsed:
-            logger.log("Using cached parse result for: " + name, logger.DEBUG)
-            return self._previous_parsed[name]
-        else:
-            return None
+    def get(self, key, scene_numbered=False):
+        with self._lock:
+            cache = self._getCache(scene_numbered)
+            if key in cache:
+                self.hits += 1
+                # move it to the end so it's the last to go
+                parse_result = cache[key]
+                cache.touch(key)
+            else:
+                self.misses += 1
+                return None
+
+        logger.log(u"Using cached parse result for: " + key[0], logger.DEBUG)
+        return parse_result
+
+    def clearSceneNumbering(self):
+        with self._lock:
+            self._scene_numbered.clear()
+
+    def getStats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._previous_parsed),
+                    'scene_numbered_size': len(self._scene_numbered)}
 
 name_parser_cache = NameParserCache()
 
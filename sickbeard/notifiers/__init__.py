@@ -37,6 +37,7 @@ import tweet
 import trakt
 
 from sickbeard.common import *
+from sickbeard.notifiers.dispatcher import NotificationDispatcher
 
 # home theater
 xbmc_notifier = xbmc.XBMCNotifier()
@@ -75,12 +76,32 @@ notifiers = [
     trakt_notifier,
 ]
 
+# sends everything in the background, see NotificationDispatcher
+dispatcher = NotificationDispatcher()
+
 
 def notify_download(ep_name):
     for n in notifiers:
-        n.notify_download(ep_name)
+        dispatcher.submit(n, 'notify_download', (ep_name,))
 
 
 def notify_snatch(ep_name):
     for n in notifiers:
-        n.notify_snatch(ep_name)
+        dispatcher.submit(n, 'notify_snatch', (ep_name,))
+
+
+def update_library(show_name):
+    """
+    Updates the show in XBMC and the library in Plex. Both wait a little so that all the updates
+    asked for in the meantime are only done once.
+    """
+    dispatcher.submit(xbmc_notifier, 'update_library', (show_name,), key=show_name, failOnFalse=True)
+    dispatcher.submit(plex_notifier, 'update_library', key='update_library', failOnFalse=True)
+
+
+def update_episode(ep_obj):
+    """
+    Tells pyTivo and trakt about a downloaded episode.
+    """
+    dispatcher.submit(pytivo_notifier, 'update_library', (ep_obj,))
+    dispatcher.submit(trakt_notifier, 'update_library', (ep_obj,))
@@ -0,0 +1,256 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import threading
+import time
+import traceback
+
+from sickbeard import logger
+from sickbeard.exceptions import ex
+
+# notifications waiting for a notifier beyond this are dropped
+MAX_QUEUED = 100
+
+# failed notifications are tried this many times in total, waiting RETRY_DELAY, then twice as long, ...
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30
+
+# how long library updates wait for more of the same to turn up
+COALESCE_WINDOW = 30
+
+# workers with nothing to do exit after this long, they're started again when they're needed
+IDLE_TIMEOUT = 60
+
+
+class Notification(object):
+
+    def __init__(self, method, args, key, due, failOnFalse):
+        self.method = method
+        self.args = args
+        self.key = key
+        self.due = due
+        self.failOnFalse = failOnFalse
+        self.attempts = 0
+
+
+class NotifierQueue(object):
+    """
+    The notifications waiting for one notifier and the counters shown on the manage searches page.
+    """
+
+    def __init__(self, notifier):
+        self.notifier = notifier
+        self.name = notifier.__class__.__module__.split('.')[-1]
+
+        self.pending = []
+        self.thread = None
+        self.running = None
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.lastError = None
+        self.lastErrorTime = None
+
+    def nextDue(self):
+        if not self.pending:
+            return None
+        return min([x.due for x in self.pending])
+
+    def getStats(self):
+        return {"queued": len(self.pending) + (1 if self.running else 0),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "last_error": self.lastError,
+                "last_error_time": self.lastErrorTime}
+
+
+class NotificationDispatcher(object):
+    """
+    Sends notifications in the background so a notifier that's slow or down doesn't hold up
+    searching and post processing.
+
+    Every notifier has its own queue and worker thread, a notification that raises an exception
+    (or returns False, if it was submitted with failOnFalse) is tried again later. Notifications
+    submitted with a key wait for the coalescing window, and any more with the same key that turn
+    up while the first one is waiting are dropped in favour of it.
+    """
+
+    def __init__(self, maxQueued=MAX_QUEUED, maxAttempts=MAX_ATTEMPTS, retryDelay=RETRY_DELAY, coalesceWindow=COALESCE_WINDOW):
+        self.maxQueued = maxQueued
+        self.maxAttempts = maxAttempts
+        self.retryDelay = retryDelay
+        self.coalesceWindow = coalesceWindow
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._queues = {}
+        self._stopping = False
+
+    def _getQueue(self, notifier):
+        # callers hold the lock
+        if id(notifier) not in self._queues:
+            self._queues[id(notifier)] = NotifierQueue(notifier)
+        return self._queues[id(notifier)]
+
+    def submit(self, notifier, method, args=(), key=None, failOnFalse=False):
+        """
+        Queues notifier.method(*args) to be run by the notifier's worker.
+
+        key: notifications with the same key for the same notifier are coalesced (optional)
+        failOnFalse: if True a False result counts as a failure and is retried
+        """
+
+        with self._lock:
+            queue = self._getQueue(notifier)
+
+            if key != None:
+                if [x for x in queue.pending if x.key == key and x.attempts == 0]:
+                    queue.coalesced += 1
+                    return
+                due = time.time() + self.coalesceWindow
+            else:
+                due = time.time()
+
+            if len(queue.pending) >= self.maxQueued:
+                queue.dropped += 1
+                logger.log(u"Too many notifications waiting for " + queue.name + ", dropping " + method, logger.WARNING)
+                return
+
+            queue.pending.append(Notification(method, args, key, due, failOnFalse))
+
+            if not queue.thread:
+                queue.thread = threading.Thread(target=self._worker, args=(queue,), name="NOTIFIER-" + queue.name.upper())
+                queue.thread.setDaemon(True)
+                queue.thread.start()
+
+            self._changed.notifyAll()
+
+    def _next(self, queue):
+        """
+        Waits for the next notification of the queue to be due and returns it, None if the worker
+        should exit
+        """
+
+        with self._lock:
+            idleSince = time.time()
+            while True:
+                now = time.time()
+                due = queue.nextDue()
+
+                if due != None and (due <= now or self._stopping):
+                    notification = min(queue.pending, key=lambda x: x.due)
+                    queue.pending.remove(notification)
+                    queue.running = notification
+                    return notification
+
+                if due == None and (self._stopping or now - idleSince >= IDLE_TIMEOUT):
+                    queue.thread = None
+                    self._changed.notifyAll()
+                    return None
+
+                if due == None:
+                    self._changed.wait(IDLE_TIMEOUT - (now - idleSince))
+                else:
+                    self._changed.wait(due - now)
+
+    def _worker(self, queue):
+
+        while True:
+            notification = self._next(queue)
+            if not notification:
+                return
+
+            notification.attempts += 1
+            error = None
+            try:
+                result = getattr(queue.notifier, notification.method)(*notification.args)
+                if result == False and notification.failOnFalse:
+                    error = "it returned False"
+            except Exception, e:
+                error = ex(e)
+                logger.log(traceback.format_exc(), logger.DEBUG)
+
+            with self._lock:
+                queue.running = None
+
+                if not error:
+                    queue.sent += 1
+
+                else:
+                    queue.lastError = notification.method + ": " + error
+                    queue.lastErrorTime = time.time()
+
+                    if notification.attempts < self.maxAttempts and not self._stopping:
+                        delay = self.retryDelay * 2 ** (notification.attempts - 1)
+                        logger.log(u"Sending " + notification.method + " to " + queue.name + " failed (" + error + "), trying again in " + str(delay) + " seconds", logger.WARNING)
+                        notification.due = time.time() + delay
+                        queue.pending.append(notification)
+                        queue.retried += 1
+                    else:
+                        logger.log(u"Sending " + notification.method + " to " + queue.name + " failed (" + error + "), giving up", logger.ERROR)
+                        queue.failed += 1
+
+                self._changed.notifyAll()
+
+    def waitUntilEmpty(self, timeout=None):
+        """
+        Waits for every queued notification (including ones waiting to be coalesced or retried)
+        to be sent, returns False if they weren't by the end of the timeout.
+        """
+
+        endTime = time.time() + timeout if timeout != None else None
+        with self._lock:
+            while [x for x in self._queues.values() if x.pending or x.running]:
+                if endTime == None:
+                    self._changed.wait(1)
+                elif time.time() >= endTime:
+                    return False
+                else:
+                    self._changed.wait(min(1, endTime - time.time()))
+            return True
+
+    def stop(self, timeout=10):
+        """
+        Sends whatever is still waiting (without any more retries) and waits for the workers to
+        exit. Notifications submitted afterwards start them again.
+        """
+
+        endTime = time.time() + timeout
+        with self._lock:
+            self._stopping = True
+            self._changed.notifyAll()
+
+            while [x for x in self._queues.values() if x.thread] and time.time() < endTime:
+                self._changed.wait(min(1, endTime - time.time()))
+
+            self._stopping = False
+
+    def getStats(self):
+        """
+        Returns the counters of every notifier that's been sent something, by name.
+        """
+
+        with self._lock:
+            return dict([(x.name, x.getStats()) for x in self._queues.values()])
@@ -36,6 +36,7 @@ from sickbeard import logger
 from sickbeard import notifiers
 from sickbeard import show_name_helpers
 from sickbeard import scene_exceptions
+from sickbeard.airdate_index import airdate_index
 
 from sickbeard import encodingKludge as ek
 from sickbeard.exceptions import ex
@@ -60,12 +61,13 @@ class PostProcessor(object):
     FOLDER_NAME = 2
     FILE_NAME = 3
 
-    def __init__(self, file_path, nzb_name = None):
+    def __init__(self, file_path, nzb_name = None, library_updates = None):
         """
         Creates a new post processor with the given file path and optionally an NZB name.
         
         file_path: The path to the file to be processed
         nzb_name: The name of the NZB which resulted in this file being downloaded (optional)
+        library_updates: A processTV.LibraryUpdates to leave the XBMC/Plex updates to (optional)
         """
         # absolute path to the folder that is being processed
         self.folder_path = ek.ek(os.path.dirname, ek.ek(os.path.abspath, file_path))
@@ -91,6 +93,8 @@ class PostProcessor(object):
                              self.FILE_NAME: False}
     
         self.log = ''
+
+        self.library_updates = library_updates
     
     def _log(self, message, level=logger.MESSAGE):
         """
@@ -514,17 +518,8 @@ class PostProcessor(object):
                     raise #TODO: later I'll just log this, for now I want to know about it ASAP
 
                 try:
-                    # There's gotta be a better way of doing this but we don't wanna
-                    # change the language value elsewhere
-                    ltvdb_api_parms = sickbeard.TVDB_API_PARMS.copy()
-
-                    if tvdb_lang and not tvdb_lang == 'en':
-                        ltvdb_api_parms['language'] = tvdb_lang
-
-                    t = tvdb_api.Tvdb(**ltvdb_api_parms)
-                    epObj = t[tvdb_id].airedOn(episodes[0])[0]
-                    season = int(epObj["seasonnumber"])
-                    episodes = [int(epObj["episodenumber"])]
+                    season, episode = airdate_index.getEpisode(tvdb_id, episodes[0], tvdb_lang)
+                    episodes = [episode]
                     self._log(u"Got season " + str(season) + " episodes " + str(episodes), logger.DEBUG)
                 except tvdb_exceptions.tvdb_episodenotfound, e:
                     self._log(u"Unable to find episode with date " + str(episodes[0]) + u" for show " + str(tvdb_id) + u", skipping", logger.DEBUG)
@@ -720,6 +715,21 @@ class PostProcessor(object):
         # retrieve/create the corresponding TVEpisode objects
         ep_obj = self._get_ep_obj(tvdb_id, season, episodes)
 
+        # anything else post processing the same episodes waits until we're done with them
+        ep_locks = ep_obj.show.getEpisodeLocks([ep_obj] + ep_obj.relatedEps)
+        for cur_lock in ep_locks:
+            cur_lock.acquire()
+        try:
+            return self._process_episode(ep_obj)
+        finally:
+            for cur_lock in reversed(ep_locks):
+                cur_lock.release()
+
+    def _process_episode(self, ep_obj):
+        """
+        The part of process() done with the locks of ep_obj and its related episodes held
+        """
+
         # get the quality of the episode we're processing
         new_ep_quality = self._get_quality(ep_obj)
         logger.log(u"Quality of the episode we're processing: " + str(new_ep_quality), logger.DEBUG)
@@ -762,47 +772,47 @@ class PostProcessor(object):
             except (OSError, IOError):
                 raise exceptions.PostProcessingFailed("Unable to delete the existing files")
 
-        # if the show directory doesn't exist then make it if allowed
-        if not ek.ek(os.path.isdir, ep_obj.show._location) and sickbeard.CREATE_MISSING_SHOW_DIRS:
-            self._log(u"Show directory doesn't exist, creating it", logger.DEBUG)
-            try:
-                ek.ek(os.mkdir, ep_obj.show._location)
-                # do the library update for synoindex
-                notifiers.synoindex_notifier.addFolder(ep_obj.show._location)
+        # if the show directory doesn't exist then make it if allowed (only once if other episodes of the show are being processed)
+        with ep_obj.show.lock:
+            if not ek.ek(os.path.isdir, ep_obj.show._location) and sickbeard.CREATE_MISSING_SHOW_DIRS:
+                self._log(u"Show directory doesn't exist, creating it", logger.DEBUG)
+                try:
+                    ek.ek(os.mkdir, ep_obj.show._location)
+                    # do the library update for synoindex
+                    notifiers.synoindex_notifier.addFolder(ep_obj.show._location)
 
-            except (OSError, IOError):
-                raise exceptions.PostProcessingFailed("Unable to create the show directory: " + ep_obj.show._location)
+                except (OSError, IOError):
+                    raise exceptions.PostProcessingFailed("Unable to create the show directory: " + ep_obj.show._location)
 
-            # get metadata for the show (but not episode because it hasn't been fully processed)
-            ep_obj.show.writeMetadata(True)
+                # get metadata for the show (but not episode because it hasn't been fully processed)
+                ep_obj.show.writeMetadata(True)
 
         # update the ep info before we rename so the quality & release name go into the name properly
         for cur_ep in [ep_obj] + ep_obj.relatedEps:
-            with cur_ep.lock:
-                cur_release_name = None
-
-                # use the best possible representation of the release name
-                if self.good_results[self.NZB_NAME]:
-                    cur_release_name = self.nzb_name
-                    if cur_release_name.lower().endswith('.nzb'):
-                        cur_release_name = cur_release_name.rpartition('.')[0]
-                elif self.good_results[self.FOLDER_NAME]:
-                    cur_release_name = self.folder_name
-                elif self.good_results[self.FILE_NAME]:
-                    cur_release_name = self.file_name
-                    # take the extension off the filename, it's not needed
-                    if '.' in self.file_name:
-                        cur_release_name = self.file_name.rpartition('.')[0]
-
-                if cur_release_name:
-                    self._log("Found release name " + cur_release_name, logger.DEBUG)
-                    cur_ep.release_name = cur_release_name
-                else:
-                    logger.log("good results: " + repr(self.good_results), logger.DEBUG)
+            cur_release_name = None
+
+            # use the best possible representation of the release name
+            if self.good_results[self.NZB_NAME]:
+                cur_release_name = self.nzb_name
+                if cur_release_name.lower().endswith('.nzb'):
+                    cur_release_name = cur_release_name.rpartition('.')[0]
+            elif self.good_results[self.FOLDER_NAME]:
+                cur_release_name = self.folder_name
+            elif self.good_results[self.FILE_NAME]:
+                cur_release_name = self.file_name
+                # take the extension off the filename, it's not needed
+                if '.' in self.file_name:
+                    cur_release_name = self.file_name.rpartition('.')[0]
+
+            if cur_release_name:
+                self._log("Found release name " + cur_release_name, logger.DEBUG)
+                cur_ep.release_name = cur_release_name
+            else:
+                logger.log("good results: " + repr(self.good_results), logger.DEBUG)
 
-                cur_ep.status = common.Quality.compositeStatus(common.DOWNLOADED, new_ep_quality)
+            cur_ep.status = common.Quality.compositeStatus(common.DOWNLOADED, new_ep_quality)
 
-                cur_ep.saveToDB()
+            cur_ep.saveToDB()
 
         # find the destination folder
         try:
@@ -840,9 +850,8 @@ class PostProcessor(object):
 
         # put the new location in the database
         for cur_ep in [ep_obj] + ep_obj.relatedEps:
-            with cur_ep.lock:
-                cur_ep.location = ek.ek(os.path.join, dest_path, new_file_name)
-                cur_ep.saveToDB()
+            cur_ep.location = ek.ek(os.path.join, dest_path, new_file_name)
+            cur_ep.saveToDB()
 
         # log it to history
         history.logDownload(ep_obj, self.file_path, new_ep_quality, self.release_group)
@@ -854,11 +863,11 @@ class PostProcessor(object):
         ep_obj.createMetaFiles()
         ep_obj.saveToDB()
 
-        # do the library update for XBMC
-        notifiers.xbmc_notifier.update_library(ep_obj.show.name)
-
-        # do the library update for Plex
-        notifiers.plex_notifier.update_library()
+        # do the library updates for XBMC and Plex, once for the whole batch if we're part of one
+        if self.library_updates != None:
+            self.library_updates.add(ep_obj.show.name)
+        else:
+            notifiers.update_library(ep_obj.show.name)
 
         # do the library update for NMJ
         # nmj_notifier kicks off its library update when the notify_download is issued (inside notifiers)
@@ -866,11 +875,8 @@ class PostProcessor(object):
         # do the library update for Synology Indexer
         notifiers.synoindex_notifier.addFile(ep_obj.location)
 
-        # do the library update for pyTivo
-        notifiers.pytivo_notifier.update_library(ep_obj)
-
-        # do the library update for Trakt
-        notifiers.trakt_notifier.update_library(ep_obj)
+        # do the library update for pyTivo and Trakt
+        notifiers.update_episode(ep_obj)
 
         self._run_extra_scripts(ep_obj)
 
@@ -19,11 +19,14 @@
 from __future__ import with_statement
 
 import os
+import Queue
 import shutil
+import threading
+import traceback
 
 import sickbeard 
 from sickbeard import postProcessor
-from sickbeard import db, helpers, exceptions
+from sickbeard import db, helpers, exceptions, notifiers
 
 from sickbeard import encodingKludge as ek
 from sickbeard.exceptions import ex
@@ -34,13 +37,44 @@ def logHelper (logMessage, logLevel=logger.MESSAGE):
     logger.log(logMessage, logLevel)
     return logMessage + u"\n"
 
-def processDir (dirName, nzbName=None, recurse=False):
+class LibraryUpdates(object):
     """
-    Scans through the files in dirName and processes whatever media files it finds
-    
-    dirName: The folder name to look in
-    nzbName: The NZB name which resulted in this folder being downloaded
-    recurse: Boolean for whether we should descend into subfolders or not
+    Collects the shows whose XBMC and Plex libraries need updating while a batch of files is
+    post processed so each show's library is updated once instead of once per episode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._showNames = []
+
+    def add(self, showName):
+        with self._lock:
+            if showName not in self._showNames:
+                self._showNames.append(showName)
+
+    def run(self):
+        with self._lock:
+            showNames, self._showNames = self._showNames, []
+
+        # the notifiers only update Plex once for all of them
+        for curShowName in showNames:
+            notifiers.update_library(curShowName)
+
+
+class ProcessJob(object):
+
+    def __init__(self, filePath, nzbName):
+        self.filePath = filePath
+        self.nzbName = nzbName
+        self.result = False
+        self.failMessage = ""
+        self.log = ""
+
+
+def _findFolders (dirName, nzbName, folders):
+    """
+    Checks dirName and adds (dirName, nzbName, fileList, videoFiles) to folders for it and every
+    folder in it, subfolders before the folders they're in. Returns the log of what it found.
     """
 
     returnStr = ''
@@ -84,52 +118,112 @@ def processDir (dirName, nzbName=None, recurse=False):
     fileList = ek.ek(os.listdir, dirName)
 
     # split the list into video files and folders
-    folders = filter(lambda x: ek.ek(os.path.isdir, ek.ek(os.path.join, dirName, x)), fileList)
+    subFolders = filter(lambda x: ek.ek(os.path.isdir, ek.ek(os.path.join, dirName, x)), fileList)
     videoFiles = filter(helpers.isMediaFile, fileList)
 
-    # recursively process all the folders
-    for curFolder in folders:
+    # recursively look in all the folders
+    for curFolder in subFolders:
         returnStr += logHelper(u"Recursively processing a folder: "+curFolder, logger.DEBUG)
-        returnStr += processDir(ek.ek(os.path.join, dirName, curFolder), recurse=True)
-
-    remainingFolders = filter(lambda x: ek.ek(os.path.isdir, ek.ek(os.path.join, dirName, x)), fileList)
+        returnStr += _findFolders(ek.ek(os.path.join, dirName, curFolder), None, folders)
 
     # If nzbName is set and there's more than one videofile in the folder, files will be lost (overwritten).
     if nzbName != None and len(videoFiles) >= 2:
         nzbName = None
 
-    # process any files in the dir
-    for cur_video_file_path in videoFiles:
+    folders.append((dirName, nzbName, fileList, videoFiles))
+
+    return returnStr
+
+def _processWorker(jobQueue, libraryUpdates, threadName):
+
+    while True:
+        try:
+            job = jobQueue.get_nowait()
+        except Queue.Empty:
+            return
 
-        cur_video_file_path = ek.ek(os.path.join, dirName, cur_video_file_path)
+        threading.currentThread().setName(threadName)
 
+        processor = postProcessor.PostProcessor(job.filePath, job.nzbName, libraryUpdates)
         try:
-            processor = postProcessor.PostProcessor(cur_video_file_path, nzbName)
-            process_result = processor.process()
-            process_fail_message = ""
+            job.result = processor.process()
         except exceptions.PostProcessingFailed, e:
-            process_result = False
-            process_fail_message = ex(e)
+            job.result = False
+            job.failMessage = ex(e)
+        except Exception, e:
+            job.result = False
+            job.failMessage = ex(e)
+            logger.log(traceback.format_exc(), logger.DEBUG)
+
+        job.log = processor.log
+
+def processDir (dirName, nzbName=None, recurse=False):
+    """
+    Scans through the files in dirName and processes whatever media files it finds. The files
+    are post processed by up to POST_PROCESS_THREADS workers at once, episodes which are being
+    processed at the same time wait for each other (see PostProcessor.process).
+    
+    dirName: The folder name to look in
+    nzbName: The NZB name which resulted in this folder being downloaded
+    recurse: Boolean for whether we should descend into subfolders or not
+    """
+
+    folders = []
+    returnStr = _findFolders(dirName, nzbName, folders)
+
+    jobs = {}
+    jobQueue = Queue.Queue()
+    for curDir, curNzbName, fileList, videoFiles in folders:
+        for cur_video_file_path in videoFiles:
+            cur_video_file_path = ek.ek(os.path.join, curDir, cur_video_file_path)
+            jobs[cur_video_file_path] = ProcessJob(cur_video_file_path, curNzbName)
+            jobQueue.put(jobs[cur_video_file_path])
+
+    libraryUpdates = LibraryUpdates()
+
+    if jobs:
+        threadName = threading.currentThread().getName()
+        workers = []
+        for i in range(min(sickbeard.POST_PROCESS_THREADS, len(jobs))):
+            curThread = threading.Thread(target=_processWorker, args=(jobQueue, libraryUpdates, threadName + "-" + str(i + 1)))
+            curThread.setDaemon(True)
+            curThread.start()
+            workers.append(curThread)
+
+        for curThread in workers:
+            curThread.join()
+
+    # go through the results folder by folder so subfolders are deleted before the folders they're in
+    for curDir, curNzbName, fileList, videoFiles in folders:
+
+        remainingFolders = filter(lambda x: ek.ek(os.path.isdir, ek.ek(os.path.join, curDir, x)), fileList)
+
+        for cur_video_file_path in videoFiles:
+
+            job = jobs[ek.ek(os.path.join, curDir, cur_video_file_path)]
+
+            returnStr += job.log
+
+            # as long as the postprocessing was successful delete the old folder unless the config wants us not to
+            if job.result:
 
-        returnStr += processor.log 
+                if len(videoFiles) == 1 and not sickbeard.KEEP_PROCESSED_DIR and \
+                    ek.ek(os.path.normpath, curDir) != ek.ek(os.path.normpath, sickbeard.TV_DOWNLOAD_DIR) and \
+                    len(remainingFolders) == 0:
 
-        # as long as the postprocessing was successful delete the old folder unless the config wants us not to
-        if process_result:
+                    returnStr += logHelper(u"Deleting folder " + curDir, logger.DEBUG)
 
-            if len(videoFiles) == 1 and not sickbeard.KEEP_PROCESSED_DIR and \
-                ek.ek(os.path.normpath, dirName) != ek.ek(os.path.normpath, sickbeard.TV_DOWNLOAD_DIR) and \
-                len(remainingFolders) == 0:
+                    try:
+                        shutil.rmtree(curDir)
+                    except (OSError, IOError), e:
+                        returnStr += logHelper(u"Warning: unable to remove the folder " + curDir + ": " + ex(e), logger.WARNING)
 
-                returnStr += logHelper(u"Deleting folder " + dirName, logger.DEBUG)
+                returnStr += logHelper(u"Processing succeeded for "+job.filePath)
 
-                try:
-                    shutil.rmtree(dirName)
-                except (OSError, IOError), e:
-                    returnStr += logHelper(u"Warning: unable to remove the folder " + dirName + ": " + ex(e), logger.WARNING)
+            else:
+                returnStr += logHelper(u"Processing failed for "+job.filePath+": "+job.failMessage, logger.WARNING)
 
-            returnStr += logHelper(u"Processing succeeded for "+cur_video_file_path)
-            
-        else:
-            returnStr += logHelper(u"Processing failed for "+cur_video_file_path+": "+process_fail_message, logger.WARNING)
+    # one library update per show for everything that was processed
+    libraryUpdates.run()
 
     return returnStr
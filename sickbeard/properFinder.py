@@ -26,10 +26,11 @@ from sickbeard import helpers, logger, show_name_helpers
 from sickbeard import providers
 from sickbeard import search
 from sickbeard import history
+from sickbeard.airdate_index import airdate_index
 
 from sickbeard.common import DOWNLOADED, SNATCHED, SNATCHED_PROPER, Quality
 
-from lib.tvdb_api import tvdb_api, tvdb_exceptions
+from lib.tvdb_api import tvdb_exceptions
 
 from name_parser.parser import NameParser, InvalidNameException
 
@@ -87,6 +88,7 @@ class ProperFinder():
 
         # take the list of unique propers and get it sorted by
         sortedPropers = sorted(propers.values(), key=operator.attrgetter('date'), reverse=True)
+        matchedPropers = []
         finalPropers = []
 
         for curProper in sortedPropers:
@@ -154,28 +156,34 @@ class ProperFinder():
                     logger.log(u"This should never have happened, post a bug about this!", logger.ERROR)
                     raise Exception("BAD STUFF HAPPENED")
 
-                tvdb_lang = showObj.lang
-                # There's gotta be a better way of doing this but we don't wanna
-                # change the language value elsewhere
-                ltvdb_api_parms = sickbeard.TVDB_API_PARMS.copy()
-
-                if tvdb_lang and not tvdb_lang == 'en':
-                    ltvdb_api_parms['language'] = tvdb_lang
-
                 try:
-                    t = tvdb_api.Tvdb(**ltvdb_api_parms)
-                    epObj = t[curProper.tvdbid].airedOn(curProper.episode)[0]
-                    curProper.season = int(epObj["seasonnumber"])
-                    curProper.episodes = [int(epObj["episodenumber"])]
+                    curProper.season, episode = airdate_index.getEpisode(curProper.tvdbid, curProper.episode, showObj.lang)
+                    curProper.episodes = [episode]
                 except tvdb_exceptions.tvdb_episodenotfound:
                     logger.log(u"Unable to find episode with date "+str(curProper.episode)+" for show "+parse_result.series_name+", skipping", logger.WARNING)
                     continue
 
+            matchedPropers.append(curProper)
+
+        # get the current status of all the episodes with one query per show
+        showEpisodes = {}
+        for curProper in matchedPropers:
+            showEpisodes.setdefault(curProper.tvdbid, []).append((curProper.season, curProper.episode))
+
+        epStatuses = {}
+        for tvdbid, episodes in showEpisodes.items():
+            showObj = helpers.findCertainShow(sickbeard.showList, tvdbid)
+            if not showObj:
+                continue
+            for (season, episode), status in showObj.getEpisodeStatuses(episodes).items():
+                epStatuses[(tvdbid, season, episode)] = status
+
+        for curProper in matchedPropers:
+
             # check if we actually want this proper (if it's the right quality)
-            sqlResults = db.DBConnection().select("SELECT status FROM tv_episodes WHERE showid = ? AND season = ? AND episode = ?", [curProper.tvdbid, curProper.season, curProper.episode])
-            if not sqlResults:
+            if (curProper.tvdbid, curProper.season, curProper.episode) not in epStatuses:
                 continue
-            oldStatus, oldQuality = Quality.splitCompositeStatus(int(sqlResults[0]["status"]))
+            oldStatus, oldQuality = Quality.splitCompositeStatus(epStatuses[(curProper.tvdbid, curProper.season, curProper.episode)])
 
             # only keep the proper if we have already retrieved the same quality ep (don't get better/worse ones)
             if oldStatus not in (DOWNLOADED, SNATCHED) or oldQuality != curProper.quality:
@@ -17,17 +17,16 @@
 
 
 import os
-import xml.dom.minidom
 
 import sickbeard
 import generic
 
-from sickbeard import helpers
 from sickbeard import encodingKludge as ek
 
 from sickbeard import logger
 from sickbeard import tvcache
 from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
 
 CONFIG_SEP = '|||'
 
@@ -59,7 +58,7 @@ class AnyRssProvider(generic.TorrentProvider):
         return self.enabled
     
     def _get_title_and_url(self, item):
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
+        title = item.title
         
         # Finding the url for the torrent can be a bit tricky, as everyone seems to have their own
         # ideas as to where it should be.
@@ -69,29 +68,23 @@ class AnyRssProvider(generic.TorrentProvider):
         # If there's an 'enclosure' tag, then we can be reasonably confident that
         # its url attribute will be the torrent url.
         url = None
-        try:
-            url = item.getElementsByTagName('enclosure')[0].getAttribute('url').replace('&amp;','&')
-        except IndexError:
+        if 'url' in item.enclosure:
+            url = item.enclosure['url'].replace('&amp;','&')
+        else:
             # next port-of-call is the 'link' tag, we use this if it looks like
             # a torrent link
-            url = helpers.get_xml_text(item.getElementsByTagName('link')[0])
+            url = item.link or ''
             if url.startswith('magnet:') or url.endswith('.torrent'):
                 # found!
                 pass
-            else:
-                # link tag doesn't look like a torrent, look for a torrent tag
-                try:
-                    torrTag = item.getElementsByTagName('torrent')[0]
-                    try:
-                        url = helpers.get_xml_text(torrTag.getElementsByTagName('magnetURI')[0])
-                    except IndexError:
-                        # No magnetURI?  then use the infoHash
-                        infoHash = helpers.get_xml_text(torrTag.getElementsByTagName('infoHash')[0])
-                        url = 'magnet:?xt=urn:btih:' + infoHash
-                except IndexError:
-                    # no torrent tag?  They I guess we just have to use the link
-                    # tag, even if it doesn't look like a torrent
-                    url = helpers.get_xml_text(item.getElementsByTagName('link')[0])
+            elif item.get('magnetURI'):
+                # link tag doesn't look like a torrent, look in the torrent tag
+                url = item.get('magnetURI')
+            elif item.get('infoHash'):
+                # No magnetURI?  then use the infoHash
+                url = 'magnet:?xt=urn:btih:' + item.get('infoHash')
+            # no torrent tag?  They I guess we just have to use the link
+            # tag, even if it doesn't look like a torrent
              
         if title:
             # Badly formed rss sometimes will wrap the title in newlines, which 
@@ -115,17 +108,18 @@ class AnyRssProvider(generic.TorrentProvider):
             if not data:
                 return (False, 'No data returned from url: ' + self.url)
             
-            parsedXML = xml.dom.minidom.parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            parsedFeed = RSSFeed(data).readChannel()
                 
-            if parsedXML.documentElement.tagName != 'rss':
+            if parsedFeed.root != 'rss':
                 return (False, 'Data returned from url %s is not RSS.' % self.url)
                 
-            if items.length == 0:
+            checkItem = None
+            for checkItem in parsedFeed:
+                break
+            if not checkItem:
                 # Maybe this isn't really a failure?  Not sure what's best here
                 return (False, 'There were no items in the RSS feed from %s' % self.url)
         
-            checkItem = items[0]
             (title, url) = self._get_title_and_url(checkItem)
             if not title:
                 return (False, 'Failed to get title from first item in feed.')
@@ -286,8 +286,8 @@ class BTNCache(tvcache.TVCache):
         else:
             return []
         
-        logger.log(u"Clearing "+self.provider.name+" cache and updating with new information")
-        self._clearCache()
+        logger.log(u"Expiring old items from the "+self.provider.name+" cache and updating with new information")
+        self._expireCache()
 
         if not self._checkAuth(data):
             raise AuthException("Your authentication info for "+self.provider.name+" is incorrect, check your config")
@@ -17,7 +17,6 @@
 # Adapted from ezrss.py, original author of which is Nic Wolfe <nic@wolfeden.ca>
 #
 
-from xml.dom.minidom import parseString
 from pprint import pprint
 from httplib import BadStatusLine
 
@@ -40,6 +39,8 @@ from sickbeard import helpers
 from sickbeard import logger
 from sickbeard import tvcache
 from sickbeard.common import Quality, USER_AGENT
+from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
 from sickbeard.scene_exceptions import get_scene_exceptions
 from sickbeard.name_parser.parser import NameParser, InvalidNameException
 
@@ -184,26 +185,8 @@ class DailyTvTorrentsProvider(generic.TorrentProvider):
         try:
             paramsEnc = urllib.urlencode(params)
             
-            opener = urllib2.build_opener()
-            opener.addheaders = [('User-Agent', USER_AGENT), ('Accept-Encoding', 'gzip,deflate')]
-            
-            usock = opener.open('http://api.dailytvtorrents.org/%s?%s' % (fnName, paramsEnc))
-            url = usock.geturl()
-            encoding = usock.info().get("Content-Encoding")
-    
-            if encoding in ('gzip', 'x-gzip', 'deflate'):
-                content = usock.read()
-                if encoding == 'deflate':
-                    data = StringIO.StringIO(zlib.decompress(content))
-                else:
-                    data = gzip.GzipFile(fileobj=StringIO.StringIO(content))
-                result = data.read()
-    
-            else:
-                result = usock.read()
-    
-            usock.close()
-            
+            url, responseHeaders, result = helpers.httpGet('http://api.dailytvtorrents.org/%s?%s' % (fnName, paramsEnc))
+
             if result:
                 return json.loads(result)
             else:
@@ -300,40 +283,38 @@ class DailyTvTorrentsProvider(generic.TorrentProvider):
         if not data:
             return []
         
+        results = []
+
         try:
-            parsedXML = parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            for curItem in RSSFeed(data):
+
+                (title, url) = self._get_title_and_url(curItem)
+
+                if not title or not url:
+                    logger.log(u"The XML returned from the dtvt feed is incomplete, this result is unusable: "+data, logger.ERROR)
+                    continue
+
+                results.append(curItem)
+
         except Exception, e:
-            logger.log(u"Error trying to load dtvt RSS feed: " + e, logger.ERROR)
-            logger.log(u"RSS data: "+data, logger.DEBUG)
+            logger.log(u"Error trying to load dtvt RSS feed: " + ex(e), logger.ERROR)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
             return []
-        
-        results = []
-
-        for curItem in items:
-            
-            (title, url) = self._get_title_and_url(curItem)
-            
-            if not title or not url:
-                logger.log(u"The XML returned from the dtvt feed is incomplete, this result is unusable: "+data, logger.ERROR)
-                continue
-    
-            results.append(curItem)
 
         return results
     
     def _get_title_and_url(self, item):
         #(title, url) = generic.TorrentProvider._get_title_and_url(self, item)
 
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
-        url = item.getElementsByTagName('enclosure')[0].getAttribute('url').replace('&amp;','&')
+        title = item.title
+        url = item.enclosure['url'].replace('&amp;','&')
 
         return (title, url)
     
     def getQuality(self, item):
         """
         Figures out the quality of the given RSS item node
-        item: An xml.dom.minidom.Node representing the <item> tag of the RSS feed
+        item: An RSSItem representing the <item> tag of the RSS feed
         Returns a Quality value obtained from the node's data
         
         Overridden here because dtvt has its own quirky way of doing quality. 
@@ -18,7 +18,6 @@
 
 import urllib
 import re
-from xml.dom.minidom import parseString
 from datetime import datetime
 
 import sickbeard
@@ -27,8 +26,9 @@ import generic
 from sickbeard.common import Quality
 from sickbeard import logger
 from sickbeard import tvcache
-from sickbeard.helpers import sanitizeSceneName, get_xml_text
+from sickbeard.helpers import sanitizeSceneName
 from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
 
 class EZRSSProvider(generic.TorrentProvider):
 
@@ -56,9 +56,8 @@ class EZRSSProvider(generic.TorrentProvider):
       
     def getQuality(self, item):
         
-        torrent_node = item.getElementsByTagName('torrent')[0]
-        filename_node = torrent_node.getElementsByTagName('fileName')[0]
-        filename = get_xml_text(filename_node)
+        # plain RSS feeds don't have the torrent:fileName
+        filename = item.get('fileName') or item.title
 
         quality = Quality.nameQuality(filename)
         
@@ -122,25 +121,23 @@ class EZRSSProvider(generic.TorrentProvider):
         if not data:
             return []
         
+        results = []
+
         try:
-            parsedXML = parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            for curItem in RSSFeed(data):
+
+                (title, url) = self._get_title_and_url(curItem)
+
+                if not title or not url:
+                    logger.log(u"The XML returned from the EZRSS RSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
+                    continue
+
+                results.append(curItem)
+
         except Exception, e:
             logger.log(u"Error trying to load EZRSS RSS feed: "+ex(e), logger.ERROR)
-            logger.log(u"RSS data: "+data, logger.DEBUG)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
             return []
-        
-        results = []
-
-        for curItem in items:
-            
-            (title, url) = self._get_title_and_url(curItem)
-            
-            if not title or not url:
-                logger.log(u"The XML returned from the EZRSS RSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
-                continue
-    
-            results.append(curItem)
 
         return results
 
@@ -173,20 +170,16 @@ class EZRSSProvider(generic.TorrentProvider):
             logger.log(u"Extracted the title '%s' and url '%s' from the twitter link"%(title, url), logger.DEBUG)
         else:
             # this feed came from ezrss
-            try:
-                torrent_node = item.getElementsByTagName('torrent')[0]
-                filename_node = torrent_node.getElementsByTagName('fileName')[0]
-                filename = get_xml_text(filename_node)
-            
+            filename = item.get('fileName')
+            if filename is not None:
                 new_title = self._extract_name_from_filename(filename)
                 if new_title:
                     title = new_title
                     logger.log(u"Extracted the name "+title+" from the torrent link", logger.DEBUG)
-            except IndexError:
-                # we'll get an IndexError above when there's no 'torrent' node,
-                # which likely means that this isn't in the special ezrss format.
-                # So assume we're working with with a standard rss feed.
-                logger.log(u"IndexError while parsing the ezrss feed, maybe it's just standard RSS? Trying that ...", logger.DEBUG)
+            else:
+                # there's no torrent:fileName when this isn't in the special ezrss format,
+                # so assume we're working with a standard rss feed.
+                logger.log(u"No fileName in the ezrss feed item, maybe it's just standard RSS? Trying that ...", logger.DEBUG)
                 (title, url) = generic.GenericProvider._get_title_and_url(self, item)
                 
         # feedburner adds "[eztv] " to the start of all titles, so trim it off
@@ -229,17 +222,18 @@ class EZRSSCache(tvcache.TVCache):
                     logger.log(u"Feed result is empty!", logger.ERROR)
                     return False
                 
-                parsedXML = parseString(feed)
+                parsedFeed = RSSFeed(feed).readChannel()
                 
-                if parsedXML.documentElement.tagName != 'rss':
+                if parsedFeed.root != 'rss':
                     logger.log(u"Resulting XML isn't RSS, not parsing it", logger.ERROR)
                     return False
                 else: 
-                    items = parsedXML.getElementsByTagName('item')
+                    item = None
+                    for item in parsedFeed:
+                        break
                     
-                    if len(items) > 0:
-                        item = items[0]
-                        pubDate = get_xml_text(item.getElementsByTagName('pubDate')[0])
+                    if item:
+                        pubDate = item.pubDate
                         
                         # pubDate has a timezone, but it makes things much easier if
                         # we ignore it (and we don't need that level of accuracy anyway)
@@ -34,6 +34,7 @@ from sickbeard import helpers, classes, logger, db
 
 from sickbeard.common import Quality, MULTI_EP_RESULT, SEASON_RESULT
 from sickbeard import tvcache
+from sickbeard.airdate_index import airdate_index
 from sickbeard import encodingKludge as ek
 from sickbeard.exceptions import ex
 
@@ -202,7 +203,7 @@ class GenericProvider:
         """
         Figures out the quality of the given RSS item node
         
-        item: An xml.dom.minidom.Node representing the <item> tag of the RSS feed
+        item: An RSSItem representing the <item> tag of the RSS feed
         
         Returns a Quality value obtained from the node's data 
         """
@@ -221,17 +222,14 @@ class GenericProvider:
     
     def _get_title_and_url(self, item):
         """
-        Retrieves the title and URL data from the item XML node
-        item: An xml.dom.minidom.Node representing the <item> tag of the RSS feed
+        Retrieves the title and URL data from the item
+        item: An RSSItem representing the <item> tag of the RSS feed
         Returns: A tuple containing two strings representing title and URL respectively
         """
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
-        try:
-            url = helpers.get_xml_text(item.getElementsByTagName('link')[0])
-            if url:
-                url = url.replace('&amp;','&')
-        except IndexError:
-            url = None
+        title = item.title
+        url = item.link
+        if url:
+            url = url.replace('&amp;','&')
         
         return (title, url)
     
@@ -308,6 +306,8 @@ class GenericProvider:
         for curString in self._get_season_search_strings(show, season):
             itemList += self._doSearch(curString)
 
+        candidates = []
+
         for item in itemList:
 
             (title, url) = self._get_title_and_url(item)
@@ -337,20 +337,31 @@ class GenericProvider:
                     logger.log(u"This is supposed to be an air-by-date search but the result "+title+" didn't parse as one, skipping it", logger.DEBUG)
                     continue
                 
-                myDB = db.DBConnection()
-                sql_results = myDB.select("SELECT season, episode FROM tv_episodes WHERE showid = ? AND airdate = ?", [show.tvdbid, parse_result.air_date.toordinal()])
+                airdate_episodes = airdate_index.lookup(show.tvdbid, parse_result.air_date)
 
-                if len(sql_results) != 1:
+                if len(airdate_episodes) != 1:
                     logger.log(u"Tried to look up the date for the episode "+title+" but the database didn't give proper results, skipping it", logger.WARNING)
                     continue
                 
-                actual_season = int(sql_results[0]["season"])
-                actual_episodes = [int(sql_results[0]["episode"])]
+                actual_season, actual_episode = airdate_episodes[0]
+                actual_episodes = [actual_episode]
+
+            candidates.append((title, url, quality, parse_result, actual_season, actual_episodes))
+
+        # check all the episodes we found at once
+        wantedEps = {}
+        epCandidates = []
+        for (title, url, quality, parse_result, actual_season, actual_episodes) in candidates:
+            epCandidates += [(actual_season, epNo, quality) for epNo in actual_episodes]
+        for curCandidate, wantEp in zip(epCandidates, show.wantEpisodes(epCandidates)):
+            wantedEps[curCandidate] = wantEp
+
+        for (title, url, quality, parse_result, actual_season, actual_episodes) in candidates:
 
             # make sure we want the episode
             wantEp = True
             for epNo in actual_episodes:
-                if not show.wantEpisode(actual_season, epNo, quality):
+                if not wantedEps[(actual_season, epNo, quality)]:
                     wantEp = False
                     break
             
@@ -19,7 +19,6 @@
 import urllib, urllib2
 import StringIO, zlib, gzip
 import re, socket
-from xml.dom.minidom import parseString
 from httplib import BadStatusLine
 import traceback
 
@@ -32,6 +31,7 @@ from sickbeard import tvcache
 from sickbeard import helpers
 from sickbeard.exceptions import ex
 from sickbeard import scene_exceptions
+from sickbeard.rss_parser import RSSFeed
 
 class KATProvider(generic.TorrentProvider):
 
@@ -59,7 +59,7 @@ class KATProvider(generic.TorrentProvider):
         
         # I think the only place we can get anything resembing the filename is in 
         # the title
-        filename = helpers.get_xml_text(item.getElementsByTagName('title')[0])
+        filename = item.title
 
         quality = Quality.nameQuality(filename)
         
@@ -129,29 +129,8 @@ class KATProvider(generic.TorrentProvider):
         if not headers:
             headers = []
 
-        opener = urllib2.build_opener()
-        opener.addheaders = [('User-Agent', USER_AGENT), ('Accept-Encoding', 'gzip,deflate')]
-        for cur_header in headers:
-            opener.addheaders.append(cur_header)
-
         try:
-            usock = opener.open(url)
-            url = usock.geturl()
-            encoding = usock.info().get("Content-Encoding")
-    
-            if encoding in ('gzip', 'x-gzip', 'deflate'):
-                content = usock.read()
-                if encoding == 'deflate':
-                    data = StringIO.StringIO(zlib.decompress(content))
-                else:
-                    data = gzip.GzipFile(fileobj=StringIO.StringIO(content))
-                result = data.read()
-    
-            else:
-                result = usock.read()
-    
-            usock.close()
-            
+            url, responseHeaders, result = helpers.httpGet(url, headers)
             return result
     
         except urllib2.HTTPError, e:
@@ -244,42 +223,40 @@ class KATProvider(generic.TorrentProvider):
 
     def _parseKatRSS(self, data):
 
-        try:
-            parsedXML = parseString(data)
-            items = parsedXML.getElementsByTagName('item')
-        except Exception, e:
-            logger.log(u"Error trying to load KAT RSS feed: "+ex(e), logger.ERROR)
-            logger.log(u"RSS data: "+data, logger.DEBUG)
-            return []
-
         results = []
 
-        for curItem in items:
+        try:
+            for curItem in RSSFeed(data):
+
+                (title, url) = self._get_title_and_url(curItem)
 
-            (title, url) = self._get_title_and_url(curItem)
+                if not title or not url:
+                    logger.log(u"The XML returned from the KAT RSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
+                    continue
 
-            if not title or not url:
-                logger.log(u"The XML returned from the KAT RSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
-                continue
+                if self._get_seeders(curItem) <= 0:
+                    logger.log(u"Discarded result with no seeders: " + title, logger.DEBUG)
+                    continue
 
-            if self._get_seeders(curItem) <= 0:
-                logger.log(u"Discarded result with no seeders: " + title, logger.DEBUG)
-                continue
+                results.append(curItem)
 
-            results.append(curItem)
+        except Exception, e:
+            logger.log(u"Error trying to load KAT RSS feed: "+ex(e), logger.ERROR)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
+            return []
 
         return results
 
     def _get_title_and_url(self, item):
         #(title, url) = generic.TorrentProvider._get_title_and_url(self, item)
 
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
-        url = item.getElementsByTagName('enclosure')[0].getAttribute('url').replace('&amp;','&')
+        title = item.title
+        url = item.enclosure['url'].replace('&amp;','&')
 
         return (title, url)
 
     def _get_seeders(self, item):
-        return int(helpers.get_xml_text(item.getElementsByTagName('torrent:seeds')[0]))
+        return int(item.get('seeds'))
 
     def _extract_name_from_filename(self, filename):
         name_regex = '(.*?)\.?(\[.*]|\d+\.TPB)\.torrent$'
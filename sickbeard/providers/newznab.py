@@ -22,8 +22,6 @@ import datetime
 import re
 import os
 
-from xml.dom.minidom import parseString
-
 import sickbeard
 import generic
 
@@ -36,6 +34,7 @@ from sickbeard import exceptions
 from sickbeard import logger
 from sickbeard import tvcache
 from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
 
 
 class NewznabProvider(generic.NZBProvider):
@@ -153,12 +152,12 @@ class NewznabProvider(generic.NZBProvider):
     def _checkAuthFromData(self, data):
 
         try:
-            parsedXML = parseString(data)
+            parsedFeed = RSSFeed(data).readChannel()
         except Exception:
             return False
 
-        if parsedXML.documentElement.tagName == 'error':
-            code = parsedXML.documentElement.getAttribute('code')
+        if parsedFeed.root == 'error':
+            code = parsedFeed.rootAttrib.get('code')
             if code == '100':
                 raise exceptions.AuthException("Your API key for " + self.name + " is incorrect, check your config.")
             elif code == '101':
@@ -166,7 +165,7 @@ class NewznabProvider(generic.NZBProvider):
             elif code == '102':
                 raise exceptions.AuthException("Your account isn't allowed to use the API on " + self.name + ", contact the administrator")
             else:
-                logger.log(u"Unknown error given from " + self.name + ": "+parsedXML.documentElement.getAttribute('description'), logger.ERROR)
+                logger.log(u"Unknown error given from " + self.name + ": "+parsedFeed.rootAttrib.get('description', ''), logger.ERROR)
                 return False
 
         return True
@@ -205,31 +204,38 @@ class NewznabProvider(generic.NZBProvider):
         if not data.startswith('<?xml'):
             data = '<?xml version="1.0" encoding="ISO-8859-1" ?>' + data
 
+        parsedFeed = RSSFeed(data)
+
         try:
-            parsedXML = parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            parsedFeed.readChannel()
         except Exception, e:
             logger.log(u"Error trying to load " + self.name + " RSS feed: " + ex(e), logger.ERROR)
-            logger.log(u"RSS data: " + data, logger.DEBUG)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
             return []
 
         if not self._checkAuthFromData(data):
             return []
 
-        if parsedXML.documentElement.tagName != 'rss':
+        if parsedFeed.root != 'rss':
             logger.log(u"Resulting XML from " + self.name + " isn't RSS, not parsing it", logger.ERROR)
             return []
 
         results = []
 
-        for curItem in items:
-            (title, url) = self._get_title_and_url(curItem)
+        try:
+            for curItem in parsedFeed:
+                (title, url) = self._get_title_and_url(curItem)
 
-            if not title or not url:
-                logger.log(u"The XML returned from the " + self.name + " RSS feed is incomplete, this result is unusable: " + data, logger.ERROR)
-                continue
+                if not title or not url:
+                    logger.log(u"The XML returned from the " + self.name + " RSS feed is incomplete, this result is unusable: " + data, logger.ERROR)
+                    continue
 
-            results.append(curItem)
+                results.append(curItem)
+
+        except SyntaxError, e:
+            logger.log(u"Error trying to load " + self.name + " RSS feed: " + ex(e), logger.ERROR)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
+            return []
 
         return results
 
@@ -246,8 +252,7 @@ class NewznabProvider(generic.NZBProvider):
 
                 (title, url) = self._get_title_and_url(curResult)
 
-                description_node = curResult.getElementsByTagName('pubDate')[0]
-                descriptionStr = helpers.get_xml_text(description_node)
+                descriptionStr = curResult.pubDate or ''
 
                 try:
                     # we could probably do dateStr = descriptionStr but we want date in this format
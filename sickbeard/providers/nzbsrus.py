@@ -80,7 +80,7 @@ class NZBsRUSProvider(generic.NZBProvider):
         root = etree.fromstring(data)
         if root is None:
             logger.log(u"Error trying to parse NZBS'R'US XML data.", logger.ERROR)
-            logger.log(u"RSS data: " + data, logger.DEBUG)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
             return []
         return root.findall('./results/result')
 
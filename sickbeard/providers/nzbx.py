@@ -114,9 +114,9 @@ class NzbXCache(tvcache.TVCache):
             return
         self.setLastUpdate()
 
-        # now that we've got the latest releases lets delete the old cache
-        logger.log(u"Clearing nzbX cache and updating with new information")
-        self._clearCache()
+        # now that we've got the latest releases lets get rid of the old items, the rest are updated in place
+        logger.log(u"Expiring old items from the nzbX cache and updating with new information")
+        self._expireCache()
 
         for item in items:
             self._parseItem(item)
@@ -20,7 +20,7 @@ import sickbeard
 import generic
 import re
 
-from sickbeard import helpers, logger, exceptions, tvcache
+from sickbeard import logger, exceptions, tvcache
 
 
 class PublicHdProvider(generic.TorrentProvider):
@@ -39,8 +39,8 @@ class PublicHdProvider(generic.TorrentProvider):
         return 'publichd.png'
     
     def _get_title_and_url(self, item):
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
-        url = item.getElementsByTagName('enclosure')[0].getAttribute('url').replace('&amp;','&')
+        title = item.title
+        url = item.enclosure['url'].replace('&amp;','&')
         if title.startswith('[TORRENT] '):
             title = title[10:]    
             
@@ -57,11 +57,10 @@ class PublicHdProvider(generic.TorrentProvider):
         """
         Decides if the category of an item (from the rss feed) could be a valid
         tv show.
-        @param item: An xml.dom.minidom.Node representing the <item> tag of the RSS feed
+        @param item: An RSSItem representing the <item> tag of the RSS feed
         @return: boolean
         """
-        category = helpers.get_xml_text(item.getElementsByTagName('category')[0])
-        return category in ('BluRay 720p', 'BluRay 1080p', 'BluRay Remux',
+        return item.category in ('BluRay 720p', 'BluRay 1080p', 'BluRay Remux',
                             'BluRay', 'BluRay 3D', 'XviD', 'BRRip',
                             'HDTV', 'SDTV', 'TV WEB-DL', 'TV Packs')
     
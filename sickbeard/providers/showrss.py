@@ -16,7 +16,6 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
-from xml.dom.minidom import parseString
 from pprint import pprint
 
 import re
@@ -27,6 +26,8 @@ import generic
 from sickbeard import helpers
 from sickbeard import logger
 from sickbeard import tvcache
+from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
 from sickbeard.scene_exceptions import get_scene_exceptions
 
 # use the built-in if it's available (python 2.6), if not use the included library
@@ -117,25 +118,23 @@ class ShowRssProvider(generic.TorrentProvider):
         if not data:
             return []
         
+        results = []
+
         try:
-            parsedXML = parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            for curItem in RSSFeed(data):
+
+                (title, url) = self._get_title_and_url(curItem)
+
+                if not title or not url:
+                    logger.log(u"The XML returned from the ShowRSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
+                    continue
+
+                results.append(curItem)
+
         except Exception, e:
-            logger.log(u"Error trying to load ShowRSS RSS feed: " + e, logger.ERROR)
-            logger.log(u"RSS data: "+data, logger.DEBUG)
+            logger.log(u"Error trying to load ShowRSS RSS feed: " + ex(e), logger.ERROR)
+            logger.log(u"RSS data: %s", logger.DEBUG, data)
             return []
-        
-        results = []
-
-        for curItem in items:
-            
-            (title, url) = self._get_title_and_url(curItem)
-            
-            if not title or not url:
-                logger.log(u"The XML returned from the ShowRSS feed is incomplete, this result is unusable: "+data, logger.ERROR)
-                continue
-    
-            results.append(curItem)
 
         return results
     
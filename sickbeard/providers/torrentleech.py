@@ -21,7 +21,7 @@
 import sickbeard
 import generic
 
-from sickbeard import helpers, logger, exceptions, tvcache
+from sickbeard import logger, exceptions, tvcache
 
 
 class TorrentLeechProvider(generic.TorrentProvider):
@@ -61,9 +61,7 @@ class TorrentLeechCache(tvcache.TVCache):
         return data
 
     def _parseItem(self, item):
-        description = helpers.get_xml_text(item.getElementsByTagName('description')[0])
-
-        if "Your RSS key is invalid" in description:
+        if "Your RSS key is invalid" in (item.description or ''):
             raise exceptions.AuthException("TorrentLeech key invalid")
 
         (title, url) = self.provider._get_title_and_url(item)
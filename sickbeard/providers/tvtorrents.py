@@ -16,14 +16,12 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
-from xml.dom.minidom import parseString
-
 import sickbeard
 import generic
 
-from sickbeard import helpers
 from sickbeard import logger
 from sickbeard import tvcache
+from sickbeard.rss_parser import RSSFeed
 
 class TvTorrentsProvider(generic.TorrentProvider):
 
@@ -62,11 +60,7 @@ class TvTorrentsCache(tvcache.TVCache):
 
         data = self.provider.getURL(url)
         
-        parsedXML = parseString(data)
-        channel = parsedXML.getElementsByTagName('channel')[0]
-        description = channel.getElementsByTagName('description')[0]
-
-        description_text = helpers.get_xml_text(description)
+        description_text = RSSFeed(data).readChannel().channel['description']
 
         if "User can't be found" in description_text:
             logger.log(u"TvTorrents invalid digest, check your config", logger.ERROR)
@@ -0,0 +1,80 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import with_statement
+
+import threading
+import time
+
+# how fast the show updates may hit the TVDB and TVRage servers
+TVDB_REQUESTS_PER_SECOND = 2
+TVRAGE_REQUESTS_PER_SECOND = 1
+
+
+class RateLimiter(object):
+    """
+    Keeps the requests to a site to a steady rate, with some slack for short bursts.
+
+    wait() is called before every request and sleeps for as long as it takes. The time slots are
+    handed out under the lock but slept in outside of it, so every thread that's waiting gets its
+    own slot in turn.
+    """
+
+    def __init__(self, name, rate, burst=None):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = burst if burst != None else max(1, rate)
+
+        self._lock = threading.Lock()
+        self._allowance = self.burst
+        self._lastCheck = time.time()
+
+        self.requests = 0
+        self.delayed = 0
+        self.waited = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.time()
+            self._allowance = min(self.burst, self._allowance + (now - self._lastCheck) * self.rate)
+            self._lastCheck = now
+
+            # the allowance goes negative while there are threads waiting for their turn
+            self._allowance -= 1
+            delay = max(0, -self._allowance / self.rate)
+
+            self.requests += 1
+            if delay:
+                self.delayed += 1
+                self.waited += delay
+
+        if delay:
+            time.sleep(delay)
+
+    def getStats(self):
+        return {"requests": self.requests,
+                "delayed": self.delayed,
+                "waited": round(self.waited, 1)}
+
+
+tvdb_limiter = RateLimiter("TVDB", TVDB_REQUESTS_PER_SECOND)
+tvrage_limiter = RateLimiter("TVRage", TVRAGE_REQUESTS_PER_SECOND)
+
+
+def getStats():
+    return dict([(x.name, x.getStats()) for x in (tvdb_limiter, tvrage_limiter)])
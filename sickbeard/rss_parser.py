@@ -0,0 +1,164 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import StringIO
+
+try:
+    import xml.etree.cElementTree as etree
+except ImportError:
+    import xml.etree.ElementTree as etree
+
+
+def _localName(tag):
+    """
+    Strips the namespace from an element tag, "{http://xmlns.ezrss.it/0.1/}seeds" -> "seeds"
+    """
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element):
+    if element.text:
+        return unicode(element.text.strip())
+    return u''
+
+
+class RSSItem(object):
+    """
+    The parts of an RSS <item> the providers use.
+
+    fields holds the text of every element in the item by name without its namespace prefix (so
+    <torrent:seeds> is get('seeds')), the item's own children win over nested elements with the
+    same name. enclosure is a dict of the attributes of the <enclosure> tag and attrs the
+    name: value pairs of the newznab/torznab <attr> tags.
+    """
+
+    __slots__ = ('fields', 'enclosure', 'attrs')
+
+    def __init__(self, fields, enclosure=None, attrs=None):
+        self.fields = fields
+        self.enclosure = enclosure or {}
+        self.attrs = attrs or {}
+
+    def get(self, name, default=None):
+        return self.fields.get(name, default)
+
+    def _field(name):
+        return property(lambda self: self.fields.get(name))
+
+    title = _field('title')
+    link = _field('link')
+    guid = _field('guid')
+    description = _field('description')
+    pubDate = _field('pubDate')
+    category = _field('category')
+
+    del _field
+
+    def __repr__(self):
+        return '<RSSItem %r>' % self.title
+
+
+def _makeItem(element):
+    fields = {}
+    enclosure = None
+    attrs = {}
+
+    for child in element:
+        fields.setdefault(_localName(child.tag), _text(child))
+
+    # iter() needs python 2.7
+    for child in element.getiterator():
+        if child is element:
+            continue
+
+        name = _localName(child.tag)
+        if name == 'enclosure':
+            if enclosure is None:
+                enclosure = dict(child.attrib)
+        elif name == 'attr' and child.get('name'):
+            attrs.setdefault(child.get('name'), child.get('value'))
+        else:
+            fields.setdefault(name, _text(child))
+
+    return RSSItem(fields, enclosure, attrs)
+
+
+class RSSFeed(object):
+    """
+    Parses an RSS feed as it's iterated over, yielding an RSSItem for every <item>. Each item is
+    thrown away from the parsed tree as soon as it has been read so only the current one is ever
+    kept in memory.
+
+    root and rootAttrib are the name and attributes of the document element (so you can tell an
+    <rss> feed from a newznab <error>), channel holds the text of the elements directly inside
+    <channel> that were parsed so far. readChannel() parses just far enough to fill those in.
+
+    Malformed XML raises a SyntaxError (cElementTree's ParseError) from wherever the parsing
+    has got to.
+    """
+
+    def __init__(self, data):
+        self.root = None
+        self.rootAttrib = {}
+        self.channel = {}
+
+        self._pending = []
+        self._items = self._parse(data)
+
+    def _parse(self, data):
+        stack = []
+
+        for event, element in etree.iterparse(StringIO.StringIO(data), events=('start', 'end')):
+
+            if event == 'start':
+                if not stack:
+                    self.root = _localName(element.tag)
+                    self.rootAttrib = dict(element.attrib)
+                stack.append(element)
+                continue
+
+            stack.pop()
+            name = _localName(element.tag)
+
+            if name == 'item':
+                item = _makeItem(element)
+                element.clear()
+                if stack:
+                    stack[-1].remove(element)
+                yield item
+
+            elif stack and _localName(stack[-1].tag) == 'channel':
+                self.channel.setdefault(name, _text(element))
+
+    def readChannel(self):
+        """
+        Parses up to the end of the first item (or the whole feed if it has none) so that root,
+        rootAttrib and the channel elements before the items are filled in.
+        """
+        if not self._pending:
+            for item in self._items:
+                self._pending.append(item)
+                break
+
+        return self
+
+    def __iter__(self):
+        while self._pending:
+            yield self._pending.pop(0)
+
+        for item in self._items:
+            yield item
@@ -24,17 +24,33 @@ from sickbeard import logger
 from sickbeard import db
 from sickbeard.custom_exceptions import get_custom_exceptions, get_custom_exception_by_name 
 
+# tvdb_id -> list of scene exception names, filled as shows are looked up
+exception_cache = {}
+
+def clear_exception_cache():
+    """
+    Forgets the scene exceptions read from cache.db, they're read again on the next lookup.
+    """
+    exception_cache.clear()
+
+    # names parsed with scene numbering may map to a different show now
+    from sickbeard.name_parser.parser import name_parser_cache
+    name_parser_cache.clearSceneNumbering()
+
 def get_scene_exceptions(tvdb_id, ignoreCustom=False):
     """
     Given a tvdb_id, return a list of all the scene exceptions.
     """
 
-    myDB = db.DBConnection("cache.db")
-    exceptions = myDB.select(u"SELECT show_name FROM scene_exceptions WHERE tvdb_id = ?", [tvdb_id])
+    if tvdb_id not in exception_cache:
+        myDB = db.DBConnection("cache.db")
+        exceptions = myDB.select(u"SELECT show_name FROM scene_exceptions WHERE tvdb_id = ?", [tvdb_id])
+        exception_cache[tvdb_id] = [cur_exception["show_name"] for cur_exception in exceptions]
+
     if ignoreCustom:
-        return [cur_exception["show_name"] for cur_exception in exceptions]
+        return list(exception_cache[tvdb_id])
     else:
-        return list(set([cur_exception["show_name"] for cur_exception in exceptions] + get_custom_exceptions(tvdb_id)))
+        return list(set(exception_cache[tvdb_id] + get_custom_exceptions(tvdb_id)))
 
 
 def get_scene_exception_by_name(show_name):
@@ -121,5 +137,6 @@ def retrieve_exceptions():
         if changed_exceptions:
             logger.log(u"Updated scene exceptions")
             name_cache.clearCache()
+            clear_exception_cache()
         else:
             logger.log(u"No scene exceptions update needed")
@@ -82,4 +82,8 @@ def set_scene_numbering(tvdb_id, season, episode, sceneSeason=None, sceneEpisode
     # now, if the new numbering is not the default, we save a new record
     if season != sceneSeason or episode != sceneEpisode:
         myDB.action("INSERT INTO scene_numbering (tvdb_id, season, episode, scene_season, scene_episode) VALUES (?,?,?,?,?)", [tvdb_id, season, episode, sceneSeason, sceneEpisode])
+
+    # cached parse results with scene numbering applied are out of date now
+    from sickbeard.name_parser.parser import name_parser_cache
+    name_parser_cache.clearSceneNumbering()
             
\ No newline at end of file
@@ -16,37 +16,278 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import with_statement
+
 import datetime
-import time
+import heapq
+import itertools
+import os
+import select
 import threading
+import time
 import traceback
 
+from collections import deque
+
 from sickbeard import logger
 from sickbeard.exceptions import ex
 
-class Scheduler:
+# how long the scheduler sleeps at a time where it can't be woken up early (see Waker)
+NAP_TIME = 1
+
+
+def _seconds(delta):
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1000000.0
+
+
+class Waker(object):
+    """
+    Lets a thread sleep until a timeout or until another thread wakes it up.
+
+    Timed waits on a threading.Condition poll every few milliseconds in python 2, so on POSIX
+    systems this blocks in select() on a pipe instead. Elsewhere it falls back to sleeping
+    NAP_TIME seconds at a time.
+    """
+
+    def __init__(self):
+        self._flag = False
+        self._pipe = None
+
+        if os.name != 'nt':
+            import fcntl
+            self._pipe = os.pipe()
+            for fd in self._pipe:
+                fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    def wake(self):
+        self._flag = True
+        if self._pipe:
+            try:
+                os.write(self._pipe[1], 'x')
+            except OSError:
+                # the pipe is full, it'll wake up anyway
+                pass
+
+    def wait(self, timeout=None):
+        """
+        Sleeps for up to timeout seconds (forever if it's None) or until wake() is called.
+        """
+        if self._pipe:
+            try:
+                select.select([self._pipe[0]], [], [], timeout)
+            except select.error:
+                # interrupted by a signal
+                pass
+            try:
+                while os.read(self._pipe[0], 4096):
+                    pass
+            except OSError:
+                pass
+
+        else:
+            endTime = time.time() + timeout if timeout != None else None
+            while not self._flag and (endTime == None or time.time() < endTime):
+                time.sleep(NAP_TIME if endTime == None else max(0, min(NAP_TIME, endTime - time.time())))
+
+        self._flag = False
+
+    def close(self):
+        if self._pipe:
+            for fd in self._pipe:
+                os.close(fd)
+            self._pipe = None
+
+
+class Job(object):
+    """
+    A function waiting for or being run by a WorkerPool. isAlive() is True until it has finished,
+    like the threads the jobs replace.
+    """
+
+    def __init__(self, name, target, callback=None):
+        self.name = name
+        self.target = target
+        self.callback = callback
+        self.done = False
+
+    def isAlive(self):
+        return not self.done
+
+    def run(self):
+        try:
+            self.target()
+        except Exception, e:
+            logger.log(u"Exception generated in thread " + self.name + ": " + ex(e), logger.ERROR)
+            logger.log(repr(traceback.format_exc()), logger.DEBUG)
+
+        self.done = True
+
+        if self.callback:
+            try:
+                self.callback()
+            except Exception, e:
+                logger.log(u"Exception generated after thread " + self.name + ": " + ex(e), logger.ERROR)
+                logger.log(repr(traceback.format_exc()), logger.DEBUG)
+
+
+class WorkerPool(object):
+    """
+    Runs jobs on threads that are kept around for the next one. A thread is only started when
+    there's a job and every existing thread is busy, so there are never more than the most jobs
+    that have been running at once. Waiting threads block without a timeout so they don't wake up.
+
+    While it runs a job a thread is named after it so the log shows what it's doing.
+    """
+
+    def __init__(self, name="WORKER"):
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs = deque()
+        self._threads = []
+        self._idle = 0
+        self._stopping = False
+
+        self.started = 0
+        self.completed = 0
+
+    def submit(self, name, target, callback=None):
+        """
+        Runs target() on one of the pool's threads and then callback() if there is one. Returns
+        the Job.
+        """
+        job = Job(name, target, callback)
+
+        with self._lock:
+            self._jobs.append(job)
+            self.started += 1
+
+            if self._idle < len(self._jobs):
+                thread = threading.Thread(None, self._worker, self.name + '-' + str(len(self._threads) + 1))
+                thread.setDaemon(True)
+                self._threads.append(thread)
+                self._idle += 1
+                thread.start()
+
+            self._changed.notify()
+
+        return job
+
+    def _worker(self):
+        thread = threading.currentThread()
+        threadName = thread.getName()
+
+        while True:
+            with self._lock:
+                while not self._jobs and not self._stopping:
+                    self._changed.wait()
+
+                if not self._jobs:
+                    self._idle -= 1
+                    self._threads.remove(thread)
+                    self._changed.notifyAll()
+                    return
+
+                job = self._jobs.popleft()
+                self._idle -= 1
+
+            thread.setName(job.name)
+            try:
+                job.run()
+            finally:
+                thread.setName(threadName)
+
+            with self._lock:
+                self._idle += 1
+                self.completed += 1
+
+    def stop(self, timeout=10):
+        """
+        Lets the threads finish the jobs that were already submitted and waits up to timeout
+        seconds for them to exit.
+        """
+        endTime = time.time() + timeout
+        with self._lock:
+            self._stopping = True
+            self._changed.notifyAll()
+
+            while self._threads and time.time() < endTime:
+                self._changed.wait(endTime - time.time())
+
+            self._stopping = False
+            return not self._threads
+
+    def getStats(self):
+        with self._lock:
+            return {"threads": len(self._threads),
+                    "idle": self._idle,
+                    "queued": len(self._jobs),
+                    "started": self.started,
+                    "completed": self.completed}
+
+
+class Scheduler(object):
+    """
+    Runs action.run() every cycleTime. The SchedulerService it has been added to decides when,
+    changing lastRun or cycleTime reschedules it.
+
+    Setting abort stops it from being run again once the current run (if any) is over.
+    """
 
     def __init__(self, action, cycleTime=datetime.timedelta(minutes=10), runImmediately=True, threadName="ScheduledThread", silent=False):
 
+        self.service = None
+        self.running = False
+
+        # the heap entry which is current, older ones for this scheduler are skipped
+        self._entry = None
+        self._runAgain = False
+
         if runImmediately:
-            self.lastRun = datetime.datetime.fromordinal(1)
+            self._lastRun = datetime.datetime.fromordinal(1)
         else:
-            self.lastRun = datetime.datetime.now()
+            self._lastRun = datetime.datetime.now()
 
         self.action = action
-        self.cycleTime = cycleTime
+        self._cycleTime = cycleTime
 
-        self.thread = None
         self.threadName = threadName
         self.silent = silent
 
-        self.initThread()
+        self._abort = False
+
+    def _reschedule(self):
+        if self.service:
+            self.service.reschedule(self)
+
+    def _getLastRun(self):
+        return self._lastRun
+
+    def _setLastRun(self, lastRun):
+        self._lastRun = lastRun
+        self._reschedule()
+
+    lastRun = property(_getLastRun, _setLastRun)
 
-        self.abort = False
+    def _getCycleTime(self):
+        return self._cycleTime
 
-    def initThread(self):
-        if self.thread == None or not self.thread.isAlive():
-            self.thread = threading.Thread(None, self.runAction, self.threadName)
+    def _setCycleTime(self, cycleTime):
+        self._cycleTime = cycleTime
+        self._reschedule()
+
+    cycleTime = property(_getCycleTime, _setCycleTime)
+
+    def _getAbort(self):
+        return self._abort
+
+    def _setAbort(self, abort):
+        self._abort = abort
+        if abort:
+            self._reschedule()
+
+    abort = property(_getAbort, _setAbort)
 
     def timeLeft(self):
         return self.cycleTime - (datetime.datetime.now() - self.lastRun)
@@ -57,25 +298,158 @@ class Scheduler:
             return True
         return False
 
+    def wake(self):
+        """
+        Runs the action as soon as possible without changing lastRun, or again as soon as it has
+        finished if it's running now.
+        """
+        if self.service:
+            self.service.wake(self)
+
     def runAction(self):
+        if not self.silent:
+            logger.log(u"Starting new thread: " + self.threadName, logger.DEBUG)
+        self.action.run()
+
+
+class SchedulerService(object):
+    """
+    Runs every Scheduler from a single thread, which sleeps until the next one is due and then
+    hands it to a WorkerPool. The pool is shared with the queues so their items run on the same
+    threads.
+
+    The schedulers are kept in a heap by the time they're due, rescheduling one pushes a new
+    entry and leaves the old one to be skipped.
+    """
+
+    def __init__(self):
+        self.pool = WorkerPool()
+        self.schedulers = []
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._counter = itertools.count()
+        self._waker = Waker()
+        self._stopping = False
+
+        self.thread = None
+        self.wakeups = 0
+
+    def add(self, scheduler):
+        with self._lock:
+            scheduler.service = self
+            self.schedulers.append(scheduler)
+            self._push(scheduler)
+        self._waker.wake()
+
+    def _push(self, scheduler, due=None):
+        # callers hold the lock
+        if due == None:
+            due = scheduler._lastRun + scheduler._cycleTime
+        scheduler._entry = self._counter.next()
+        heapq.heappush(self._heap, (due, scheduler._entry, scheduler))
+
+    def _remove(self, scheduler):
+        # callers hold the lock
+        self.schedulers.remove(scheduler)
+        scheduler._entry = None
+        scheduler._abort = False
+        scheduler.service = None
+
+    def reschedule(self, scheduler):
+        with self._lock:
+            # running ones are pushed again when they've finished
+            if scheduler in self.schedulers and not scheduler.running:
+                self._push(scheduler)
+        self._waker.wake()
+
+    def wake(self, scheduler):
+        with self._lock:
+            if scheduler.running:
+                scheduler._runAgain = True
+            elif scheduler in self.schedulers:
+                self._push(scheduler, datetime.datetime.now())
+        self._waker.wake()
+
+    def start(self):
+        self.thread = threading.Thread(None, self._run, "SCHEDULER")
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def _run(self):
 
         while True:
+            with self._lock:
+                if self._stopping:
+                    return
+
+                for curScheduler in list(self.schedulers):
+                    if curScheduler.abort and not curScheduler.running:
+                        self._remove(curScheduler)
+
+                timeout = None
+                now = datetime.datetime.now()
+
+                while self._heap:
+                    due, entry, curScheduler = self._heap[0]
+
+                    if entry != curScheduler._entry:
+                        heapq.heappop(self._heap)
+                        continue
+
+                    if due > now:
+                        timeout = _seconds(due - now)
+                        break
+
+                    heapq.heappop(self._heap)
+                    curScheduler._entry = None
+                    curScheduler._lastRun = now
+                    curScheduler.running = True
+                    self.pool.submit(curScheduler.threadName, curScheduler.runAction, lambda s=curScheduler: self._finished(s))
+
+            self._waker.wait(timeout)
+            self.wakeups += 1
+
+    def _finished(self, scheduler):
+        with self._lock:
+            scheduler.running = False
+
+            if scheduler.abort:
+                self._remove(scheduler)
+
+            elif scheduler in self.schedulers:
+                if scheduler._runAgain:
+                    scheduler._runAgain = False
+                    self._push(scheduler, datetime.datetime.now())
+                else:
+                    self._push(scheduler)
+
+        self._waker.wake()
+
+    def stop(self, timeout=10):
+        """
+        Stops scheduling and waits up to timeout seconds for whatever is running to finish.
+        """
+        endTime = time.time() + timeout
+
+        with self._lock:
+            self._stopping = True
+        self._waker.wake()
+
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
 
-            currentTime = datetime.datetime.now()
+        result = self.pool.stop(max(0, endTime - time.time()))
 
-            if currentTime - self.lastRun > self.cycleTime:
-                self.lastRun = currentTime
-                try:
-                    if not self.silent:
-                        logger.log(u"Starting new thread: "+self.threadName, logger.DEBUG)
-                    self.action.run()
-                except Exception, e:
-                    logger.log(u"Exception generated in thread "+self.threadName+": " + ex(e), logger.ERROR)
-                    logger.log(repr(traceback.format_exc()), logger.DEBUG)
+        self._stopping = False
+        return result
 
-            if self.abort:
-                self.abort = False
-                self.thread = None
-                return
+    def getStats(self):
+        with self._lock:
+            schedulers = dict([(x.threadName, {"running": x.running,
+                                               "time_left": max(0, int(_seconds(x.timeLeft())))}) for x in self.schedulers])
 
-            time.sleep(1)
+        return {"wakeups": self.wakeups,
+                "pool": self.pool.getStats(),
+                "schedulers": schedulers}
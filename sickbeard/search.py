@@ -19,6 +19,9 @@
 from __future__ import with_statement
 
 import os
+import Queue
+import threading
+import time
 import traceback
 
 import sickbeard
@@ -142,31 +145,182 @@ def snatchEpisode(result, endStatus=SNATCHED):
 
     return True
 
-def searchForNeededEpisodes():
+providerStats = {}
+providerStatsLock = threading.Lock()
 
-    logger.log(u"Searching all providers for any needed episodes")
+# IDs of the providers a worker is searching right now, a hung one isn't searched again until it's done
+busyProviders = set()
 
-    foundResults = {}
+def _recordProviderSearch(provider, searchTime=None, error=False, timedOut=False):
+    with providerStatsLock:
+        stats = providerStats.setdefault(provider.getID(), {"searches": 0, "errors": 0, "timeouts": 0,
+                                                            "total_time": 0.0, "last_time": 0.0})
+        # the search itself is counted when it finally finishes
+        if timedOut:
+            stats["timeouts"] += 1
+            return
 
-    didSearch = False
+        stats["searches"] += 1
+        stats["total_time"] += searchTime
+        stats["last_time"] = searchTime
+        if error:
+            stats["errors"] += 1
 
-    # ask all providers for any episodes it finds
-    for curProvider in providers.sortedProviderList():
+def getProviderStats():
+    """
+    Returns a dict of provider ID: searches, errors, timeouts and search times (in seconds).
+    """
+    with providerStatsLock:
+        results = {}
+        for providerID, stats in providerStats.items():
+            results[providerID] = dict(stats)
+            if stats["searches"]:
+                results[providerID]["average_time"] = round(stats["total_time"] / stats["searches"], 3)
+            else:
+                results[providerID]["average_time"] = 0.0
+            results[providerID]["total_time"] = round(stats["total_time"], 3)
+            results[providerID]["last_time"] = round(stats["last_time"], 3)
+        return results
+
+
+class ProviderSearchJob(object):
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.startTime = None
+        self.cancelled = False
+        self.results = None
+        self.error = None
+        self.traceback = None
+        self.done = threading.Event()
 
-        if not curProvider.isActive():
-            continue
 
-        curFoundResults = {}
+def _providerSearchWorker(jobQueue, searchFunc, aborted, threadName):
 
+    while not aborted.isSet():
         try:
-            curFoundResults = curProvider.searchRSS()
-        except exceptions.AuthException, e:
-            logger.log(u"Authentication error: "+ex(e), logger.ERROR)
+            job = jobQueue.get_nowait()
+        except Queue.Empty:
+            return
+
+        # given up on before a worker got to it
+        if job.cancelled:
             continue
+
+        threading.currentThread().setName(threadName + "-" + job.provider.getID().upper())
+
+        with providerStatsLock:
+            busyProviders.add(job.provider.getID())
+
+        job.startTime = time.time()
+        try:
+            job.results = searchFunc(job.provider)
         except Exception, e:
-            logger.log(u"Error while searching "+curProvider.name+", skipping: "+ex(e), logger.ERROR)
-            logger.log(traceback.format_exc(), logger.DEBUG)
+            job.error = e
+            job.traceback = traceback.format_exc()
+        job.done.set()
+
+        with providerStatsLock:
+            busyProviders.discard(job.provider.getID())
+
+        if job.error:
+            _recordProviderSearch(job.provider, time.time() - job.startTime, error=True)
+        else:
+            _recordProviderSearch(job.provider, time.time() - job.startTime)
+
+def searchProviders(searchFunc):
+    """
+    Runs searchFunc(provider) for all the active providers, up to PROVIDER_THREADS of them at a
+    time, and yields (provider, results) in sortedProviderList order as each one is done.
+
+    Providers which raise an exception or take more than PROVIDER_TIMEOUT seconds are logged and
+    left out. Leaving the loop early means the providers that haven't started yet are skipped.
+
+    A provider that hangs keeps its worker busy, so the search as a whole is given as long as
+    it would take if every round of PROVIDER_THREADS providers took PROVIDER_TIMEOUT seconds.
+    Providers no worker got to by then are left out too. A thread can't be stopped, so a provider
+    still hanging from an earlier search is left out until that search returns.
+    """
+
+    jobs = []
+    for curProvider in providers.sortedProviderList():
+        if not curProvider.isActive():
             continue
+        with providerStatsLock:
+            busy = curProvider.getID() in busyProviders
+        if busy:
+            logger.log(u"The last search of "+curProvider.name+" still hasn't finished, skipping it", logger.WARNING)
+            continue
+        jobs.append(ProviderSearchJob(curProvider))
+
+    if not jobs:
+        return
+
+    jobQueue = Queue.Queue()
+    for curJob in jobs:
+        jobQueue.put(curJob)
+
+    aborted = threading.Event()
+    threadName = threading.currentThread().getName()
+
+    threadCount = max(1, min(sickbeard.PROVIDER_THREADS, len(jobs)))
+    deadline = time.time() + sickbeard.PROVIDER_TIMEOUT * ((len(jobs) + threadCount - 1) / threadCount)
+
+    for i in range(threadCount):
+        curThread = threading.Thread(target=_providerSearchWorker, args=(jobQueue, searchFunc, aborted, threadName))
+        curThread.setDaemon(True)
+        curThread.start()
+
+    try:
+        for curJob in jobs:
+
+            # the timeout starts once a worker picks the provider up, until then the deadline counts
+            timedOut = False
+            notStarted = False
+            while not curJob.done.isSet():
+                if curJob.startTime:
+                    if time.time() - curJob.startTime > sickbeard.PROVIDER_TIMEOUT:
+                        timedOut = True
+                        break
+                elif time.time() > deadline:
+                    curJob.cancelled = True
+                    notStarted = True
+                    break
+                curJob.done.wait(0.5)
+
+            if notStarted:
+                logger.log(u"No search thread was free to search "+curJob.provider.name+" in time, skipping it", logger.ERROR)
+                _recordProviderSearch(curJob.provider, timedOut=True)
+                continue
+
+            if timedOut:
+                logger.log(u"Timed out waiting for "+curJob.provider.name+" after "+str(sickbeard.PROVIDER_TIMEOUT)+" seconds, skipping it", logger.ERROR)
+                _recordProviderSearch(curJob.provider, timedOut=True)
+                continue
+
+            if isinstance(curJob.error, exceptions.AuthException):
+                logger.log(u"Authentication error: "+ex(curJob.error), logger.ERROR)
+                continue
+            elif curJob.error:
+                logger.log(u"Error while searching "+curJob.provider.name+", skipping: "+ex(curJob.error), logger.ERROR)
+                logger.log(curJob.traceback, logger.DEBUG)
+                continue
+
+            yield (curJob.provider, curJob.results)
+
+    finally:
+        aborted.set()
+
+def searchForNeededEpisodes():
+
+    logger.log(u"Searching all providers for any needed episodes")
+
+    foundResults = {}
+
+    didSearch = False
+
+    # ask all providers for any episodes it finds
+    for curProvider, curFoundResults in searchProviders(lambda x: x.searchRSS()):
 
         didSearch = True
 
@@ -271,20 +425,7 @@ def findEpisode(episode, manualSearch=False):
 
     didSearch = False
 
-    for curProvider in providers.sortedProviderList():
-
-        if not curProvider.isActive():
-            continue
-
-        try:
-            curFoundResults = curProvider.findEpisode(episode, manualSearch=manualSearch)
-        except exceptions.AuthException, e:
-            logger.log(u"Authentication error: "+ex(e), logger.ERROR)
-            continue
-        except Exception, e:
-            logger.log(u"Error while searching "+curProvider.name+", skipping: "+ex(e), logger.ERROR)
-            logger.log(traceback.format_exc(), logger.DEBUG)
-            continue
+    for curProvider, curFoundResults in searchProviders(lambda x: x.findEpisode(episode, manualSearch=manualSearch)):
 
         didSearch = True
 
@@ -320,32 +461,18 @@ def findSeason(show, season):
 
     didSearch = False
 
-    for curProvider in providers.sortedProviderList():
+    for curProvider, curResults in searchProviders(lambda x: x.findSeasonResults(show, season)):
 
-        if not curProvider.isActive():
-            continue
-
-        try:
-            curResults = curProvider.findSeasonResults(show, season)
+        # make a list of all the results for this provider
+        for curEp in curResults:
 
-            # make a list of all the results for this provider
-            for curEp in curResults:
+            # skip non-tv crap
+            curResults[curEp] = filter(lambda x:  show_name_helpers.filterBadReleases(x.name) and show_name_helpers.isGoodResult(x.name, show), curResults[curEp])
 
-                # skip non-tv crap
-                curResults[curEp] = filter(lambda x:  show_name_helpers.filterBadReleases(x.name) and show_name_helpers.isGoodResult(x.name, show), curResults[curEp])
-
-                if curEp in foundResults:
-                    foundResults[curEp] += curResults[curEp]
-                else:
-                    foundResults[curEp] = curResults[curEp]
-
-        except exceptions.AuthException, e:
-            logger.log(u"Authentication error: "+ex(e), logger.ERROR)
-            continue
-        except Exception, e:
-            logger.log(u"Error while searching "+curProvider.name+", skipping: "+ex(e), logger.ERROR)
-            logger.log(traceback.format_exc(), logger.DEBUG)
-            continue
+            if curEp in foundResults:
+                foundResults[curEp] += curResults[curEp]
+            else:
+                foundResults[curEp] = curResults[curEp]
 
         didSearch = True
 
@@ -380,13 +507,9 @@ def findSeason(show, season):
         allEps = [int(x["episode"]) for x in myDB.select("SELECT episode FROM tv_episodes WHERE showid = ? AND season = ?", [show.tvdbid, season])]
         logger.log(u"Episode list: "+str(allEps), logger.DEBUG)
 
-        allWanted = True
-        anyWanted = False
-        for curEpNum in allEps:
-            if not show.wantEpisode(season, curEpNum, seasonQual):
-                allWanted = False
-            else:
-                anyWanted = True
+        epsWanted = show.wantEpisodes([(season, curEpNum, seasonQual) for curEpNum in allEps])
+        allWanted = False not in epsWanted
+        anyWanted = True in epsWanted
 
         # if we need every ep in the season and there's nothing better then just download this and be done with it
         if allWanted and bestSeasonNZB.quality == highest_quality_overall:
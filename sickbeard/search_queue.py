@@ -38,43 +38,41 @@ class SearchQueue(generic_queue.GenericQueue):
         self.queue_name = "SEARCHQUEUE"
 
     def is_in_queue(self, show, segment):
-        for cur_item in self.queue:
-            if isinstance(cur_item, BacklogQueueItem) and cur_item.show == show and cur_item.segment == segment:
-                return True
-        return False
+        return self.is_key_queued((BACKLOG_SEARCH, show, segment))
 
     def is_ep_in_queue(self, ep_obj):
-        for cur_item in self.queue:
-            if isinstance(cur_item, ManualSearchQueueItem) and cur_item.ep_obj == ep_obj:
-                return True
-        return False
+        return self.is_key_queued((MANUAL_SEARCH, ep_obj))
 
     def pause_backlog(self):
         self.min_priority = generic_queue.QueuePriorities.HIGH
 
     def unpause_backlog(self):
         self.min_priority = 0
+        self._wake()
 
     def is_backlog_paused(self):
         # backlog priorities are NORMAL, this should be done properly somewhere
         return self.min_priority >= generic_queue.QueuePriorities.NORMAL
 
     def is_backlog_in_progress(self):
-        for cur_item in self.queue + [self.currentItem]:
+        if self.count_queued(BACKLOG_SEARCH):
+            return True
+        for cur_item in self.currentItems:
             if isinstance(cur_item, BacklogQueueItem):
                 return True
         return False
 
     def add_item(self, item):
-        if isinstance(item, RSSSearchQueueItem):
-            generic_queue.GenericQueue.add_item(self, item)
-        # don't do duplicates
-        elif isinstance(item, BacklogQueueItem) and not self.is_in_queue(item.show, item.segment):
-            generic_queue.GenericQueue.add_item(self, item)
-        elif isinstance(item, ManualSearchQueueItem) and not self.is_ep_in_queue(item.ep_obj):
-            generic_queue.GenericQueue.add_item(self, item)
-        else:
-            logger.log(u"Not adding item, it's already in the queue", logger.DEBUG)
+        with self.lock:
+            if isinstance(item, RSSSearchQueueItem):
+                generic_queue.GenericQueue.add_item(self, item)
+            # don't do duplicates
+            elif isinstance(item, BacklogQueueItem) and not self.is_in_queue(item.show, item.segment):
+                generic_queue.GenericQueue.add_item(self, item)
+            elif isinstance(item, ManualSearchQueueItem) and not self.is_ep_in_queue(item.ep_obj):
+                generic_queue.GenericQueue.add_item(self, item)
+            else:
+                logger.log(u"Not adding item, it's already in the queue", logger.DEBUG)
 
 class ManualSearchQueueItem(generic_queue.QueueItem):
     def __init__(self, ep_obj):
@@ -85,6 +83,9 @@ class ManualSearchQueueItem(generic_queue.QueueItem):
         
         self.success = None
 
+    def get_key(self):
+        return (MANUAL_SEARCH, self.ep_obj)
+
     def execute(self):
         generic_queue.QueueItem.execute(self)
 
@@ -199,6 +200,9 @@ class BacklogQueueItem(generic_queue.QueueItem):
         anyQualities, bestQualities = common.Quality.splitQuality(self.show.quality) #@UnusedVariable
         self.wantSeason = self._need_any_episodes(statusResults, bestQualities)
 
+    def get_key(self):
+        return (BACKLOG_SEARCH, self.show, self.segment)
+
     def execute(self):
         
         generic_queue.QueueItem.execute(self)
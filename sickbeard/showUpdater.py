@@ -23,6 +23,7 @@ import sickbeard
 from sickbeard import logger
 from sickbeard import exceptions
 from sickbeard import ui
+from sickbeard.generic_queue import QueuePriorities
 from sickbeard.exceptions import ex
 
 class ShowUpdater():
@@ -51,12 +52,13 @@ class ShowUpdater():
 
             try:
 
+                # low priority so that what the user asks for doesn't wait for all of these
                 if curShow.status != "Ended":
-                    curQueueItem = sickbeard.showQueueScheduler.action.updateShow(curShow, True) #@UndefinedVariable
+                    curQueueItem = sickbeard.showQueueScheduler.action.updateShow(curShow, True, QueuePriorities.LOW) #@UndefinedVariable
                 else:
                     #TODO: maybe I should still update specials?
                     logger.log(u"Not updating episodes for show "+curShow.name+" because it's marked as ended.", logger.DEBUG)
-                    curQueueItem = sickbeard.showQueueScheduler.action.refreshShow(curShow, True) #@UndefinedVariable
+                    curQueueItem = sickbeard.showQueueScheduler.action.refreshShow(curShow, True, QueuePriorities.LOW) #@UndefinedVariable
 
                 piList.append(curQueueItem)
 
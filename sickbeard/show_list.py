@@ -0,0 +1,193 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import threading
+
+from sickbeard.exceptions import MultipleShowObjectsException
+
+
+def normalizeName(name):
+    """
+    Returns the form of a show name used as a key in the name index, the same one name_cache uses.
+    """
+    from sickbeard.helpers import sanitizeSceneName
+    return sanitizeSceneName(name).lower()
+
+
+class ShowList(list):
+    """
+    The list of TVShow objects in sickbeard.showList. It's still a normal list, but it keeps
+    indexes of its shows by tvdbid, tvrid and normalized name so lookups don't have to walk it.
+
+    Every index maps a key to a list of shows so that two show objects with the same tvdbid
+    are still noticed (see getByTvdbid). TVShow tells the list when one of the indexed
+    attributes of a show changes with reindex().
+    """
+
+    def __init__(self, shows=()):
+        list.__init__(self, shows)
+
+        self._lock = threading.RLock()
+        self._rebuild()
+
+    def _keys(self, show):
+        names = set()
+        for curName in (show.name, show.tvrname):
+            if curName:
+                names.add(normalizeName(curName))
+
+        return (show.tvdbid, show.tvrid, names)
+
+    def _showsChanged(self):
+        # scene numbered parse results depend on which show a name belongs to
+        from sickbeard.name_parser.parser import name_parser_cache
+        name_parser_cache.clearSceneNumbering()
+
+    def _addKeys(self, show):
+        tvdbid, tvrid, names = self._keys(show)
+        self._showKeys[id(show)] = (tvdbid, tvrid, names)
+
+        self._byTvdbid.setdefault(tvdbid, []).append(show)
+        if tvrid:
+            self._byTvrid.setdefault(tvrid, []).append(show)
+        for curName in names:
+            self._byName.setdefault(curName, []).append(show)
+
+        self._showsChanged()
+
+    def _removeKeys(self, show):
+        tvdbid, tvrid, names = self._showKeys.pop(id(show))
+
+        for index, key in [(self._byTvdbid, tvdbid), (self._byTvrid, tvrid)] + [(self._byName, x) for x in names]:
+            if key not in index:
+                continue
+            index[key] = [x for x in index[key] if x is not show]
+            if not index[key]:
+                del index[key]
+
+        self._showsChanged()
+
+    def _rebuild(self):
+        with self._lock:
+            self._showKeys = {}
+            self._byTvdbid = {}
+            self._byTvrid = {}
+            self._byName = {}
+            for curShow in self:
+                if id(curShow) not in self._showKeys:
+                    self._addKeys(curShow)
+
+    def reindex(self, show):
+        """
+        Updates the indexes after the tvdbid, tvrid, name or tvrname of a show has changed.
+        Shows which aren't in the list are ignored.
+        """
+        with self._lock:
+            if id(show) not in self._showKeys:
+                return
+            self._removeKeys(show)
+            self._addKeys(show)
+
+    def _getOne(self, index, key):
+        results = index.get(key)
+        if not results:
+            return None
+        elif len(results) > 1:
+            raise MultipleShowObjectsException()
+        else:
+            return results[0]
+
+    def getByTvdbid(self, tvdbid):
+        """
+        Returns the show with the given tvdbid or None, raises MultipleShowObjectsException if
+        there's more than one.
+        """
+        return self._getOne(self._byTvdbid, tvdbid)
+
+    def getByTvrid(self, tvrid):
+        """
+        Returns the show with the given tvrid or None, raises MultipleShowObjectsException if
+        there's more than one.
+        """
+        if not tvrid:
+            return None
+        return self._getOne(self._byTvrid, tvrid)
+
+    def getByName(self, name):
+        """
+        Returns a list of the shows whose name or TVRage name matches the given one once both
+        are normalized.
+        """
+        if not name:
+            return []
+        return list(self._byName.get(normalizeName(name), []))
+
+    # keep the indexes up to date with every change to the list itself
+
+    def append(self, show):
+        with self._lock:
+            list.append(self, show)
+            if id(show) not in self._showKeys:
+                self._addKeys(show)
+
+    def remove(self, show):
+        with self._lock:
+            list.remove(self, show)
+            if show not in self:
+                self._removeKeys(show)
+
+    def extend(self, shows):
+        with self._lock:
+            list.extend(self, shows)
+            self._rebuild()
+
+    def insert(self, i, show):
+        with self._lock:
+            list.insert(self, i, show)
+            self._rebuild()
+
+    def pop(self, *args):
+        with self._lock:
+            show = list.pop(self, *args)
+            self._rebuild()
+            return show
+
+    def __iadd__(self, shows):
+        self.extend(shows)
+        return self
+
+    def __setitem__(self, i, show):
+        with self._lock:
+            list.__setitem__(self, i, show)
+            self._rebuild()
+
+    def __delitem__(self, i):
+        with self._lock:
+            list.__delitem__(self, i)
+            self._rebuild()
+
+    def __setslice__(self, i, j, shows):
+        with self._lock:
+            list.__setslice__(self, i, j, shows)
+            self._rebuild()
+
+    def __delslice__(self, i, j):
+        with self._lock:
+            list.__delslice__(self, i, j)
+            self._rebuild()
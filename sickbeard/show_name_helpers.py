@@ -199,32 +199,112 @@ def makeSceneSearchString (episode):
 
     return toReturn
 
-def isGoodResult(name, show, log=True):
+class ShowNameMatcher(object):
     """
-    Use an automatically-created regex to make sure the result actually is the show it claims to be
+    One compiled regex which checks a release name against every name of a show (see isGoodResult).
     """
 
-    all_show_names = allPossibleShowNames(show)
-    showNames = map(sanitizeSceneName, all_show_names) + all_show_names
+    def __init__(self, show):
+        all_show_names = allPossibleShowNames(show)
+        showNames = set(map(sanitizeSceneName, all_show_names) + all_show_names)
 
-    for curName in set(showNames):
-        escaped_name = re.sub('\\\\[\\s.-]', '\W+', re.escape(curName))
+        escaped_names = []
+        self.prefixes = set()
+
+        for curName in showNames:
+            escaped_names.append(re.sub('\\\\[\\s.-]', '\W+', re.escape(curName)))
+            self.prefixes.add(_namePrefix(curName))
+
+        year = ''
         if show.startyear:
-            escaped_name += "(?:\W+"+str(show.startyear)+")?"
-        curRegex = '^' + escaped_name + '\W+(?:(?:S\d[\dE._ -])|(?:\d\d?x)|(?:\d{4}\W\d\d\W\d\d)|(?:(?:part|pt)[\._ -]?(\d|[ivx]))|Season\W+\d+\W+|E\d+\W+)'
-        if log:
-            logger.log(u"Checking if show "+name+" matches " + curRegex, logger.DEBUG)
+            year = "(?:\W+"+str(show.startyear)+")?"
+
+        self.pattern = '^(?:' + '|'.join(escaped_names) + ')' + year + '\W+(?:(?:S\d[\dE._ -])|(?:\d\d?x)|(?:\d{4}\W\d\d\W\d\d)|(?:(?:part|pt)[\._ -]?(\d|[ivx]))|Season\W+\d+\W+|E\d+\W+)'
+        self.regex = re.compile(self.pattern, re.I)
+
+    def match(self, name):
+        return self.regex.search(name) != None
+
+
+def _namePrefix(name):
+    """
+    Returns the leading run of letters and numbers of a name, lowercased. A release name can only
+    match a show name which has the same prefix.
+    """
+    return re.match('[^\W_]*', name).group().lower()
+
+# tvdbid -> (the names the matcher was made from, ShowNameMatcher)
+show_matchers = {}
+
+# (the matchers it was made from, prefix -> list of (position, show, matcher)) for findShowForResult
+matcher_index = (None, {})
+
+def _getShowMatcher(show):
+    """
+    Returns the ShowNameMatcher for a show, only making a new one if something that goes into it
+    (the names, scene exceptions, start year or country list) has changed.
+    """
+
+    key = (show.name, show.tvrname, show.startyear, tuple(sorted(get_scene_exceptions(show.tvdbid))), tuple(sorted(countryList.items())))
+
+    cur_matcher = show_matchers.get(show.tvdbid)
+    if cur_matcher and cur_matcher[0] == key:
+        return cur_matcher[1]
 
-        match = re.search(curRegex, name, re.I)
+    matcher = ShowNameMatcher(show)
+    show_matchers[show.tvdbid] = (key, matcher)
 
-        if match:
-            logger.log(u"Matched "+curRegex+" to "+name, logger.DEBUG)
-            return True
+    return matcher
+
+def isGoodResult(name, show, log=True):
+    """
+    Use an automatically-created regex to make sure the result actually is the show it claims to be
+    """
+
+    matcher = _getShowMatcher(show)
+
+    if log:
+        logger.log(u"Checking if show "+name+" matches " + matcher.pattern, logger.DEBUG)
+
+    if matcher.match(name):
+        logger.log(u"Matched "+matcher.pattern+" to "+name, logger.DEBUG)
+        return True
 
     if log:
         logger.log(u"Provider gave result "+name+" but that doesn't seem like a valid result for "+show.name+" so I'm ignoring it")
     return False
 
+def findShowForResult(name, showList):
+    """
+    Returns the first show in showList that isGoodResult would accept the release name for, or None.
+
+    Instead of trying every show it only tries the ones with a name that starts like the release.
+    """
+
+    global matcher_index
+
+    matchers = [(curShow, _getShowMatcher(curShow)) for curShow in showList]
+
+    # rebuild the prefix index if any of the matchers changed
+    if matcher_index[0] != [x[1] for x in matchers]:
+        prefix_index = {}
+        for position, (curShow, curMatcher) in enumerate(matchers):
+            for curPrefix in curMatcher.prefixes:
+                prefix_index.setdefault(curPrefix, []).append((position, curShow, curMatcher))
+        matcher_index = ([x[1] for x in matchers], prefix_index)
+
+    prefix_index = matcher_index[1]
+
+    # shows with a name that doesn't start with a letter or number are always tried
+    candidates = prefix_index.get(_namePrefix(name), []) + prefix_index.get('', [])
+
+    for position, curShow, curMatcher in sorted(candidates):
+        if curMatcher.match(name):
+            logger.log(u"Matched "+curMatcher.pattern+" to "+name, logger.DEBUG)
+            return curShow
+
+    return None
+
 def allPossibleShowNames(show):
     """
     Figures out every possible variation of the name for a particular show. Includes TVDB name, TVRage name,
@@ -244,7 +324,8 @@ def allPossibleShowNames(show):
 
     newShowNames = []
 
-    country_list = countryList
+    # look countries up both ways without changing common.countryList
+    country_list = dict(countryList)
     country_list.update(dict(zip(countryList.values(), countryList.keys())))
 
     # if we have "Show Name Australia" or "Show Name (Australia)" this will add "Show Name (AU)" for
@@ -31,20 +31,43 @@ from sickbeard import exceptions, logger, ui, db
 from sickbeard import generic_queue
 from sickbeard import name_cache
 from sickbeard.exceptions import ex
+from sickbeard.show_stats import show_stats
 
 
 class ShowQueue(generic_queue.GenericQueue):
+    """
+    Runs up to SHOW_QUEUE_THREADS items at once, but never two for the same show. If there's more
+    than one thread the last one is kept for the items the user asked for, the nightly updates
+    are queued at LOW priority and can't use it.
+    """
 
     def __init__(self):
         generic_queue.GenericQueue.__init__(self)
         self.queue_name = "SHOWQUEUE"
+        self.setThreads(sickbeard.SHOW_QUEUE_THREADS)
+
+    def setThreads(self, threads):
+        with self.lock:
+            self.max_running = threads
+            self.reserved_slots = 1 if threads > 1 else 0
+            self.reserved_priority = generic_queue.QueuePriorities.NORMAL
+
+        self._wake()
+
+    def can_run(self, item):
+        return item.tvdbid not in [x.tvdbid for x in self.currentItems]
 
     def _isInQueue(self, show, actions):
-        return show in [x.show for x in self.queue if x.action_id in actions]
+        for curAction in actions:
+            if self.is_key_queued((show, curAction)):
+                return True
+        return False
 
     def _isBeingSomethinged(self, show, actions):
-        return self.currentItem != None and show == self.currentItem.show and \
-                self.currentItem.action_id in actions
+        for curItem in self.currentItems:
+            if show == curItem.show and curItem.action_id in actions:
+                return True
+        return False
 
     def isInUpdateQueue(self, show):
         return self._isInQueue(show, (ShowQueueActions.UPDATE, ShowQueueActions.FORCEUPDATE))
@@ -68,11 +91,15 @@ class ShowQueue(generic_queue.GenericQueue):
         return self._isBeingSomethinged(show, (ShowQueueActions.RENAME,))
 
     def _getLoadingShowList(self):
-        return [x for x in self.queue + [self.currentItem] if x != None and x.isLoading]
+        loading = [x for x in self.currentItems if x.isLoading]
+        # only shows being added are loading
+        if self.count_queued(ShowQueueActions.ADD):
+            loading += [x for x in self.queue if x.isLoading]
+        return loading
 
     loadingShowList = property(_getLoadingShowList)
 
-    def updateShow(self, show, force=False):
+    def updateShow(self, show, force=False, priority=None):
 
         if self.isBeingAdded(show):
             raise exceptions.CantUpdateException("Show is still being added, wait until it is finished before you update.")
@@ -81,6 +108,12 @@ class ShowQueue(generic_queue.GenericQueue):
             raise exceptions.CantUpdateException("This show is already being updated, can't update again until it's done.")
 
         if self.isInUpdateQueue(show):
+            # if it's waiting in the nightly batch move it to the front instead
+            if priority == None:
+                for curItem in self.find_queued((show, ShowQueueActions.UPDATE)) + self.find_queued((show, ShowQueueActions.FORCEUPDATE)):
+                    if curItem.priority < generic_queue.QueuePriorities.NORMAL and self.set_priority(curItem, generic_queue.QueuePriorities.NORMAL):
+                        return curItem
+
             raise exceptions.CantUpdateException("This show is already being updated, can't update again until it's done.")
 
         if not force:
@@ -88,11 +121,14 @@ class ShowQueue(generic_queue.GenericQueue):
         else:
             queueItemObj = QueueItemForceUpdate(show)
 
+        if priority != None:
+            queueItemObj.priority = priority
+
         self.add_item(queueItemObj)
 
         return queueItemObj
 
-    def refreshShow(self, show, force=False):
+    def refreshShow(self, show, force=False, priority=None):
 
         if self.isBeingRefreshed(show) and not force:
             raise exceptions.CantRefreshException("This show is already being refreshed, not refreshing again.")
@@ -103,6 +139,9 @@ class ShowQueue(generic_queue.GenericQueue):
 
         queueItemObj = QueueItemRefresh(show)
 
+        if priority != None:
+            queueItemObj.priority = priority
+
         self.add_item(queueItemObj)
 
         return queueItemObj
@@ -153,16 +192,27 @@ class ShowQueueItem(generic_queue.QueueItem):
         self.show = show
 
     def isInQueue(self):
-        return self in sickbeard.showQueueScheduler.action.queue + [sickbeard.showQueueScheduler.action.currentItem] #@UndefinedVariable
+        return sickbeard.showQueueScheduler.action.contains(self) #@UndefinedVariable
+
+    def get_key(self):
+        if self.show == None:
+            return None
+        return (self.show, self.action_id)
 
     def _getName(self):
         return str(self.show.tvdbid)
 
+    def _getTvdbid(self):
+        return str(self.show.tvdbid)
+
     def _isLoading(self):
         return False
 
     show_name = property(_getName)
 
+    # the show the item works on, as a string since adds might be given either
+    tvdbid = property(_getTvdbid)
+
     isLoading = property(_isLoading)
 
 
@@ -192,6 +242,11 @@ class QueueItemAdd(ShowQueueItem):
 
     show_name = property(_getName)
 
+    def _getTvdbid(self):
+        return str(self.tvdb_id)
+
+    tvdbid = property(_getTvdbid)
+
     def _isLoading(self):
         """
         Returns True if we've gotten far enough to have a show object, or False
@@ -309,6 +364,8 @@ class QueueItemAdd(ShowQueueItem):
             logger.log(u"Setting all episodes to the specified default status: " + str(self.default_status))
             myDB = db.DBConnection()
             myDB.action("UPDATE tv_episodes SET status = ? WHERE status = ? AND showid = ? AND season != 0", [self.default_status, SKIPPED, self.show.tvdbid])
+            self.show.clearEpisodeRows()
+            show_stats.clearShow(self.show.tvdbid)
 
         # if they started with WANTED eps then run the backlog
         if self.default_status == WANTED:
@@ -446,7 +503,11 @@ class QueueItemUpdate(ShowQueueItem):
             if self.show.tvrid == 0:
                 self.show.setTVRID()
 
-        sickbeard.showQueueScheduler.action.refreshShow(self.show, True) #@UndefinedVariable
+        # the refresh after a nightly update stays out of the way of the user's too
+        if self.priority < generic_queue.QueuePriorities.NORMAL:
+            sickbeard.showQueueScheduler.action.refreshShow(self.show, True, self.priority) #@UndefinedVariable
+        else:
+            sickbeard.showQueueScheduler.action.refreshShow(self.show, True) #@UndefinedVariable
 
 
 class QueueItemForceUpdate(QueueItemUpdate):
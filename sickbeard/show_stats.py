@@ -0,0 +1,235 @@
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import datetime
+import threading
+
+from sickbeard import db
+from sickbeard.common import Quality, ARCHIVED, IGNORED, UNAIRED, WANTED
+
+# an air date that went by before the episode was counted, they're all counted together
+AIRED = 0
+
+# an ordinal of 1 means the air date isn't known
+UNKNOWN_AIRDATE = 1
+
+SNATCHED_STATUSES = frozenset(Quality.SNATCHED + Quality.SNATCHED_PROPER)
+DOWNLOADED_STATUSES = frozenset(Quality.DOWNLOADED + [ARCHIVED])
+HAVE_STATUSES = SNATCHED_STATUSES | DOWNLOADED_STATUSES
+
+# the most shows to ask about in one query, sqlite won't take a lot more parameters than this
+MAX_SHOWS_PER_QUERY = 500
+
+
+def _countKey(season, episode, status, location, airdate, today):
+    """
+    What the episode counts towards: whether it's a special, its status, whether it has a file
+    and its air date, which is only kept for the ones that haven't aired yet.
+    """
+    if airdate != UNKNOWN_AIRDATE and airdate < today:
+        airdate = AIRED
+
+    return (season == 0 or episode == 0, status, bool(location), airdate)
+
+
+class ShowStats(object):
+    """
+    Counts of the episodes of every show by status, so the home page, displayShow and the API
+    don't have to go through tv_episodes to show how far along a show is or when it airs next.
+
+    The episodes of a show are counted the first time its stats are needed (the shows not
+    counted yet are read in one query), after that TVEpisode.saveToDB and deleteEpisode keep
+    the counts current with update() and remove(). Anything else changing tv_episodes has to
+    clearShow() the show so it's counted again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        # tvdbid: {count key: number of episodes}
+        self._counts = {}
+        # tvdbid: {(season, episode): count key}
+        self._byEpisode = {}
+
+        self.hits = 0
+        self.loads = 0
+        self.updates = 0
+
+    def _loadShows(self, tvdbids):
+        # callers hold the lock
+        toLoad = [x for x in tvdbids if x not in self._counts]
+        if not toLoad:
+            return
+
+        for curTvdbid in toLoad:
+            self._counts[curTvdbid] = {}
+            self._byEpisode[curTvdbid] = {}
+        self.loads += len(toLoad)
+
+        query = "SELECT showid, season, episode, status, location, airdate FROM tv_episodes"
+
+        myDB = db.DBConnection()
+        if len(self._counts) == len(toLoad):
+            # nothing was counted yet, all of them are read in one go
+            sqlResults = myDB.select(query)
+        else:
+            sqlResults = []
+            for i in range(0, len(toLoad), MAX_SHOWS_PER_QUERY):
+                chunk = toLoad[i:i + MAX_SHOWS_PER_QUERY]
+                sqlResults += myDB.select(query + " WHERE showid IN (" + ",".join(["?"] * len(chunk)) + ")", chunk)
+
+        today = datetime.date.today().toordinal()
+        for curResult in sqlResults:
+            curTvdbid = int(curResult["showid"])
+            if curTvdbid not in self._counts:
+                self._counts[curTvdbid] = {}
+                self._byEpisode[curTvdbid] = {}
+
+            self._add(curTvdbid, int(curResult["season"]), int(curResult["episode"]),
+                      _countKey(int(curResult["season"]), int(curResult["episode"]), int(curResult["status"]),
+                                curResult["location"], int(curResult["airdate"]), today))
+
+    def _add(self, tvdbid, season, episode, key):
+        self._discard(tvdbid, season, episode)
+
+        self._byEpisode[tvdbid][(season, episode)] = key
+        counts = self._counts[tvdbid]
+        counts[key] = counts.get(key, 0) + 1
+
+    def _discard(self, tvdbid, season, episode):
+        oldKey = self._byEpisode[tvdbid].pop((season, episode), None)
+        if oldKey is None:
+            return
+
+        counts = self._counts[tvdbid]
+        counts[oldKey] -= 1
+        if not counts[oldKey]:
+            del counts[oldKey]
+
+    def update(self, tvdbid, season, episode, status, location, airdate):
+        """
+        Counts an episode (airdate is a datetime.date) again after it was saved. Shows which
+        haven't been counted yet are left alone, they'll be read from the database.
+        """
+        key = _countKey(season, episode, status, location, airdate.toordinal(), datetime.date.today().toordinal())
+
+        with self._lock:
+            if tvdbid in self._counts:
+                self._add(tvdbid, season, episode, key)
+                self.updates += 1
+
+    def remove(self, tvdbid, season, episode):
+        """
+        Stops counting a deleted episode.
+        """
+        with self._lock:
+            if tvdbid in self._byEpisode:
+                self._discard(tvdbid, season, episode)
+
+    def clearShow(self, tvdbid):
+        """
+        Forgets the counts of a show, it's counted again the next time they're needed.
+        """
+        with self._lock:
+            self._counts.pop(tvdbid, None)
+            self._byEpisode.pop(tvdbid, None)
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+            self._byEpisode = {}
+            self.hits = self.loads = self.updates = 0
+
+    def _summarize(self, counts, today):
+        """
+        Works out the stats of a show as of today from its counts:
+
+        downloaded: aired episodes (not specials) which are downloaded or archived, or snatched with a file
+        total: aired episodes (not specials) which aren't ignored, not counting ones without an air
+               date unless they're snatched, downloaded or archived
+        snatched: episodes which are snatched
+        wanted: episodes which are wanted
+        next_airdate: the date (a datetime.date) of the next episode that's still to air, None if there isn't one
+        statuses: {status: number of episodes} for all the episodes
+        """
+        stats = {"downloaded": 0,
+                 "total": 0,
+                 "snatched": 0,
+                 "wanted": 0,
+                 "next_airdate": None,
+                 "statuses": {}}
+
+        nextAirdate = None
+
+        for (special, status, hasFile, airdate), count in counts.iteritems():
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + count
+
+            if status in SNATCHED_STATUSES:
+                stats["snatched"] += count
+            elif status == WANTED:
+                stats["wanted"] += count
+            elif status == UNAIRED and airdate >= today and (nextAirdate == None or airdate < nextAirdate):
+                nextAirdate = airdate
+
+            if special or airdate > today:
+                continue
+
+            if status in DOWNLOADED_STATUSES or (hasFile and status in SNATCHED_STATUSES):
+                stats["downloaded"] += count
+
+            if status != IGNORED and (airdate != UNKNOWN_AIRDATE or status in HAVE_STATUSES):
+                stats["total"] += count
+
+        if nextAirdate != None:
+            stats["next_airdate"] = datetime.date.fromordinal(nextAirdate)
+
+        return stats
+
+    def getShows(self, tvdbids):
+        """
+        Returns {tvdbid: stats} for the given shows, see _summarize for what's in the stats.
+        """
+        today = datetime.date.today().toordinal()
+
+        with self._lock:
+            self._loadShows(tvdbids)
+            self.hits += len(tvdbids)
+            allCounts = [(x, self._counts[x].copy()) for x in tvdbids]
+
+        return dict([(curTvdbid, self._summarize(curCounts, today)) for curTvdbid, curCounts in allCounts])
+
+    def getShow(self, tvdbid):
+        """
+        Returns the stats of a show, see _summarize for what's in them.
+        """
+        return self.getShows([tvdbid])[tvdbid]
+
+    def getStats(self):
+        with self._lock:
+            shows = len(self._counts)
+            episodes = sum([len(x) for x in self._byEpisode.values()])
+
+        return {"shows": shows,
+                "episodes": episodes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "updates": self.updates}
+
+
+show_stats = ShowStats()
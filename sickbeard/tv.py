@@ -23,6 +23,8 @@ import datetime
 import threading
 import re
 import glob
+import time
+import weakref
 
 import sickbeard
 
@@ -39,6 +41,10 @@ from sickbeard import tvrage
 from sickbeard import image_cache
 from sickbeard import postProcessor
 from sickbeard.scene_exceptions import get_scene_exceptions
+from sickbeard.show_list import ShowList
+from sickbeard.airdate_index import airdate_index
+from sickbeard.episode_cache import episode_cache
+from sickbeard.show_stats import show_stats
 
 from sickbeard import encodingKludge as ek
 
@@ -46,9 +52,29 @@ from common import Quality, Overview
 from common import DOWNLOADED, SNATCHED, SNATCHED_PROPER, ARCHIVED, IGNORED, UNAIRED, WANTED, SKIPPED, UNKNOWN
 from common import NAMING_DUPLICATE, NAMING_EXTEND, NAMING_LIMITED_EXTEND, NAMING_SEPARATED_REPEAT, NAMING_LIMITED_EXTEND_E_PREFIXED
 
+# how long the tv_episodes rows read for TVShow.getEpisode are used before they're read again
+EPISODE_ROWS_TTL = 60
+
+# how many locks the episodes of a show share between them
+EPISODE_LOCK_STRIPES = 16
+
+def indexed_setter(attr_name):
+    """
+    Setter for the TVShow attributes that sickbeard.showList keeps an index of.
+    """
+    def wrapper(self, val):
+        if not hasattr(self, attr_name) or getattr(self, attr_name) != val:
+            setattr(self, attr_name, val)
+            if isinstance(sickbeard.showList, ShowList):
+                sickbeard.showList.reindex(self)
+    return wrapper
+
 class TVShow(object):
 
-    def __init__ (self, tvdbid, lang=""):
+    def __init__ (self, tvdbid, lang="", sqlShow=None):
+        """
+        sqlShow: the show's tv_shows row if the caller has already read it (optional)
+        """
 
         self.tvdbid = tvdbid
 
@@ -72,15 +98,24 @@ class TVShow(object):
         self.lock = threading.Lock()
         self._isDirGood = False
 
-        self.episodes = {}
+        # (season, episode): TVEpisode, episode_cache is what keeps them alive
+        self.episodes = weakref.WeakValueDictionary()
+        # held while an episode is looked up and made, so two threads can't make one each. Nothing
+        # holding it waits for an episode lock (getEpisode is called with those held)
+        self._episodesLock = threading.RLock()
+        self._episodeLocks = [threading.RLock() for x in range(EPISODE_LOCK_STRIPES)]
+
+        # (season, episode): tv_episodes row, for the episodes getEpisode hasn't made objects for yet
+        self._episodeRows = None
+        self._episodeRowsTime = 0
         
         otherShow = helpers.findCertainShow(sickbeard.showList, self.tvdbid)
         if otherShow != None:
             raise exceptions.MultipleShowObjectsException("Can't create a show if it already exists")
 
-        self.loadFromDB()
-
-        self.saveToDB()
+        # a show that came from the database doesn't need saving again
+        if not self.loadFromDB(sqlShow=sqlShow):
+            self.saveToDB()
 
     def _getLocation(self):
         # no dir check needed if missing show dirs are created during post-processing
@@ -108,14 +143,18 @@ class TVShow(object):
 
     location = property(_getLocation, _setLocation)
 
+    tvdbid = property(lambda self: self._tvdbid, indexed_setter("_tvdbid"))
+    tvrid = property(lambda self: self._tvrid, indexed_setter("_tvrid"))
+    name = property(lambda self: self._name, indexed_setter("_name"))
+    tvrname = property(lambda self: self._tvrname, indexed_setter("_tvrname"))
+
     # delete references to anything that's not in the internal lists
     def flushEpisodes(self):
 
-        for curSeason in self.episodes:
-            for curEp in self.episodes[curSeason]:
-                myEp = self.episodes[curSeason][curEp]
-                self.episodes[curSeason][curEp] = None
-                del myEp
+        with self._episodesLock:
+            for curEp in self.episodes.values():
+                episode_cache.discard(curEp)
+            self.episodes.clear()
 
     def getAllEpisodes(self, season=None, has_location=False):
 
@@ -159,26 +198,76 @@ class TVShow(object):
 
         #return TVEpisode(self, season, episode)
 
-        if not season in self.episodes:
-            self.episodes[season] = {}
+        with self._episodesLock:
+            ep = self.episodes.get((season, episode))
 
-        ep = None
+            if ep != None:
+                episode_cache.touch(ep)
 
-        if not episode in self.episodes[season] or self.episodes[season][episode] == None:
-            if noCreate:
-                return None
+            else:
+                if noCreate:
+                    return None
 
-            logger.log(str(self.tvdbid) + ": An object for episode " + str(season) + "x" + str(episode) + " didn't exist in the cache, trying to create it", logger.DEBUG)
+                logger.log(str(self.tvdbid) + ": An object for episode " + str(season) + "x" + str(episode) + " didn't exist in the cache, trying to create it", logger.DEBUG)
 
-            if file != None:
-                ep = TVEpisode(self, season, episode, file)
-            else:
-                ep = TVEpisode(self, season, episode)
+                sqlResult = self._getEpisodeRow(season, episode)
 
-            if ep != None:
-                self.episodes[season][episode] = ep
+                if file != None:
+                    ep = TVEpisode(self, season, episode, file, sqlResult=sqlResult)
+                else:
+                    ep = TVEpisode(self, season, episode, sqlResult=sqlResult)
+
+                self.episodes[(season, episode)] = ep
+                episode_cache.add(ep)
+
+        return ep
+
+    def getEpisodeLock(self, season, episode):
+        return self._episodeLocks[hash((int(season), int(episode))) % EPISODE_LOCK_STRIPES]
+
+    def getEpisodeLocks(self, episodes):
+        """
+        Returns the locks of the given episodes of this show without duplicates, in the order
+        they have to be acquired in so that two threads locking several episodes can't deadlock.
+        """
+        lockIndexes = set([hash((int(x.season), int(x.episode))) % EPISODE_LOCK_STRIPES for x in episodes])
+        return [self._episodeLocks[x] for x in sorted(lockIndexes)]
+
+    def _loadEpisodeRows(self):
+        myDB = db.DBConnection()
+        sqlResults = myDB.select("SELECT * FROM tv_episodes WHERE showid = ?", [self.tvdbid])
+        return dict([((int(x["season"]), int(x["episode"])), x) for x in sqlResults])
+
+    def _getEpisodeRow(self, season, episode):
+        """
+        Returns the tv_episodes row of an episode getEpisode is making an object for, or None if
+        the episode has to look itself up.
+
+        The rows of all the show's episodes are read with one query the first time, after that each
+        one is handed out once at most so an episode that's made again (after flushEpisodes) reads
+        its own row. They're read again after EPISODE_ROWS_TTL seconds, and clearEpisodeRows()
+        throws them away when the table has been changed behind the episodes' backs.
+
+        The rows of episodes which have an object when they're read aren't kept, the object may
+        have changes the row doesn't, and saving or deleting an episode drops its row
+        (dropEpisodeRow) for the same reason.
+        """
+        if self._episodeRows == None or time.time() - self._episodeRowsTime > EPISODE_ROWS_TTL:
+            episodeRows = self._loadEpisodeRows()
+            for curKey in self.episodes.keys():
+                episodeRows.pop(curKey, None)
+            self._episodeRows = episodeRows
+            self._episodeRowsTime = time.time()
 
-        return self.episodes[season][episode]
+        return self._episodeRows.pop((int(season), int(episode)), None)
+
+    def dropEpisodeRow(self, season, episode):
+        episodeRows = self._episodeRows
+        if episodeRows != None:
+            episodeRows.pop((int(season), int(episode)), None)
+
+    def clearEpisodeRows(self):
+        self._episodeRows = None
 
     def writeShowNFO(self):
 
@@ -235,41 +324,44 @@ class TVShow(object):
         # get file list
         mediaFiles = helpers.listMediaFiles(self._location)
 
-        # create TVEpisodes from each media file (if possible)
-        for mediaFile in mediaFiles:
+        # write all the episodes to the DB in one transaction once we're done
+        with db.DBConnection().batch():
 
-            curEpisode = None
+            # create TVEpisodes from each media file (if possible)
+            for mediaFile in mediaFiles:
 
-            logger.log(str(self.tvdbid) + ": Creating episode from " + mediaFile, logger.DEBUG)
-            try:
-                curEpisode = self.makeEpFromFile(ek.ek(os.path.join, self._location, mediaFile))
-            except (exceptions.ShowNotFoundException, exceptions.EpisodeNotFoundException), e:
-                logger.log(u"Episode "+mediaFile+" returned an exception: "+ex(e), logger.ERROR)
-                continue
-            except exceptions.EpisodeDeletedException:
-                logger.log(u"The episode deleted itself when I tried making an object for it", logger.DEBUG)
+                curEpisode = None
 
-            if curEpisode is None:
-                continue
+                logger.log(str(self.tvdbid) + ": Creating episode from " + mediaFile, logger.DEBUG)
+                try:
+                    curEpisode = self.makeEpFromFile(ek.ek(os.path.join, self._location, mediaFile))
+                except (exceptions.ShowNotFoundException, exceptions.EpisodeNotFoundException), e:
+                    logger.log(u"Episode "+mediaFile+" returned an exception: "+ex(e), logger.ERROR)
+                    continue
+                except exceptions.EpisodeDeletedException:
+                    logger.log(u"The episode deleted itself when I tried making an object for it", logger.DEBUG)
+
+                if curEpisode is None:
+                    continue
 
-            # see if we should save the release name in the db
-            ep_file_name = ek.ek(os.path.basename, curEpisode.location)
-            ep_file_name = ek.ek(os.path.splitext, ep_file_name)[0]
+                # see if we should save the release name in the db
+                ep_file_name = ek.ek(os.path.basename, curEpisode.location)
+                ep_file_name = ek.ek(os.path.splitext, ep_file_name)[0]
             
-            parse_result = None
-            try:
-                np = NameParser(False)
-                parse_result = np.parse(ep_file_name, False) # we assume that these have tvdb numbering
-            except InvalidNameException:
-                pass
+                parse_result = None
+                try:
+                    np = NameParser(False)
+                    parse_result = np.parse(ep_file_name, False) # we assume that these have tvdb numbering
+                except InvalidNameException:
+                    pass
         
-            if not ' ' in ep_file_name and parse_result and parse_result.release_group:
-                logger.log(u"Name " + ep_file_name + " gave release group of " + parse_result.release_group + ", seems valid", logger.DEBUG)
-                curEpisode.release_name = ep_file_name
+                if not ' ' in ep_file_name and parse_result and parse_result.release_group:
+                    logger.log(u"Name " + ep_file_name + " gave release group of " + parse_result.release_group + ", seems valid", logger.DEBUG)
+                    curEpisode.release_name = ep_file_name
 
-            # store the reference in the show
-            if curEpisode != None:
-                curEpisode.saveToDB()
+                # store the reference in the show
+                if curEpisode != None:
+                    curEpisode.saveToDB()
 
 
     def loadEpisodesFromDB(self):
@@ -292,37 +384,38 @@ class TVShow(object):
         cachedShow = t[self.tvdbid]
         cachedSeasons = {}
 
-        for curResult in sqlResults:
+        with myDB.batch():
+            for curResult in sqlResults:
 
-            deleteEp = False
+                deleteEp = False
                     
-            curSeason = int(curResult["season"])
-            curEpisode = int(curResult["episode"])
-            if curSeason not in cachedSeasons:
-                try:
-                    cachedSeasons[curSeason] = cachedShow[curSeason]
-                except tvdb_exceptions.tvdb_seasonnotfound, e:
-                    logger.log(u"Error when trying to load the episode from TVDB: "+e.message, logger.WARNING)
-                    deleteEp = True
+                curSeason = int(curResult["season"])
+                curEpisode = int(curResult["episode"])
+                if curSeason not in cachedSeasons:
+                    try:
+                        cachedSeasons[curSeason] = cachedShow[curSeason]
+                    except tvdb_exceptions.tvdb_seasonnotfound, e:
+                        logger.log(u"Error when trying to load the episode from TVDB: "+e.message, logger.WARNING)
+                        deleteEp = True
 
-            if not curSeason in scannedEps:
-                scannedEps[curSeason] = {}
+                if not curSeason in scannedEps:
+                    scannedEps[curSeason] = {}
 
-            logger.log(u"Loading episode "+str(curSeason)+"x"+str(curEpisode)+" from the DB", logger.DEBUG)
+                logger.log(u"Loading episode "+str(curSeason)+"x"+str(curEpisode)+" from the DB", logger.DEBUG)
 
-            try:
-                curEp = self.getEpisode(curSeason, curEpisode)
+                try:
+                    curEp = self.getEpisode(curSeason, curEpisode)
                 
-                # if we found out that the ep is no longer on TVDB then delete it from our database too
-                if deleteEp:
-                    curEp.deleteEpisode()
+                    # if we found out that the ep is no longer on TVDB then delete it from our database too
+                    if deleteEp:
+                        curEp.deleteEpisode()
                 
-                curEp.loadFromDB(curSeason, curEpisode)
-                curEp.loadFromTVDB(tvapi=t, cachedSeason=cachedSeasons[curSeason])
-                scannedEps[curSeason][curEpisode] = True
-            except exceptions.EpisodeDeletedException:
-                logger.log(u"Tried loading an episode from the DB that should have been deleted, skipping it", logger.DEBUG)
-                continue
+                    curEp.loadFromDB(curSeason, curEpisode, curResult)
+                    curEp.loadFromTVDB(tvapi=t, cachedSeason=cachedSeasons[curSeason])
+                    scannedEps[curSeason][curEpisode] = True
+                except exceptions.EpisodeDeletedException:
+                    logger.log(u"Tried loading an episode from the DB that should have been deleted, skipping it", logger.DEBUG)
+                    continue
 
         return scannedEps
 
@@ -350,32 +443,33 @@ class TVShow(object):
 
         scannedEps = {}
 
-        for season in showObj:
-            scannedEps[season] = {}
-            for episode in showObj[season]:
-                # need some examples of wtf episode 0 means to decide if we want it or not
-                if episode == 0:
-                    continue
-                try:
-                    #ep = TVEpisode(self, season, episode)
-                    ep = self.getEpisode(season, episode)
-                except exceptions.EpisodeNotFoundException:
-                    logger.log(str(self.tvdbid) + ": TVDB object for " + str(season) + "x" + str(episode) + " is incomplete, skipping this episode")
-                    continue
-                else:
+        with db.DBConnection().batch():
+            for season in showObj:
+                scannedEps[season] = {}
+                for episode in showObj[season]:
+                    # need some examples of wtf episode 0 means to decide if we want it or not
+                    if episode == 0:
+                        continue
                     try:
-                        ep.loadFromTVDB(tvapi=t)
-                    except exceptions.EpisodeDeletedException:
-                        logger.log(u"The episode was deleted, skipping the rest of the load")
+                        #ep = TVEpisode(self, season, episode)
+                        ep = self.getEpisode(season, episode)
+                    except exceptions.EpisodeNotFoundException:
+                        logger.log(str(self.tvdbid) + ": TVDB object for " + str(season) + "x" + str(episode) + " is incomplete, skipping this episode")
                         continue
+                    else:
+                        try:
+                            ep.loadFromTVDB(tvapi=t)
+                        except exceptions.EpisodeDeletedException:
+                            logger.log(u"The episode was deleted, skipping the rest of the load")
+                            continue
 
-                with ep.lock:
-                    logger.log(str(self.tvdbid) + ": Loading info from theTVDB for episode " + str(season) + "x" + str(episode), logger.DEBUG)
-                    ep.loadFromTVDB(season, episode, tvapi=t)
-                    if ep.dirty:
-                        ep.saveToDB()
+                    with ep.lock:
+                        logger.log(str(self.tvdbid) + ": Loading info from theTVDB for episode " + str(season) + "x" + str(episode), logger.DEBUG)
+                        ep.loadFromTVDB(season, episode, tvapi=t)
+                        if ep.dirty:
+                            ep.saveToDB()
 
-                scannedEps[season][episode] = True
+                    scannedEps[season][episode] = True
 
         return scannedEps
 
@@ -454,18 +548,8 @@ class TVShow(object):
         # if we have an air-by-date show then get the real season/episode numbers
         if parse_result.air_by_date:
             try:
-                # There's gotta be a better way of doing this but we don't wanna
-                # change the cache value elsewhere
-                ltvdb_api_parms = sickbeard.TVDB_API_PARMS.copy()
-
-                if self.lang:
-                    ltvdb_api_parms['language'] = self.lang
-
-                t = tvdb_api.Tvdb(**ltvdb_api_parms)
-
-                epObj = t[self.tvdbid].airedOn(parse_result.air_date)[0]
-                season = int(epObj["seasonnumber"])
-                episodes = [int(epObj["episodenumber"])]
+                season, episode = airdate_index.getEpisode(self.tvdbid, parse_result.air_date, self.lang)
+                episodes = [episode]
             except tvdb_exceptions.tvdb_episodenotfound:
                 logger.log(u"Unable to find episode with date " + str(parse_result.air_date) + " for show " + self.name + ", skipping", logger.WARNING)
                 return None
@@ -565,19 +649,25 @@ class TVShow(object):
         return rootEp
 
 
-    def loadFromDB(self, skipNFO=False):
+    def loadFromDB(self, skipNFO=False, sqlShow=None):
+        """
+        Loads the show's info from the given tv_shows row or from the database, returns False if
+        the show isn't in the database.
+        """
 
         logger.log(str(self.tvdbid) + ": Loading show info from database")
 
-        myDB = db.DBConnection()
-
-        sqlResults = myDB.select("SELECT * FROM tv_shows WHERE tvdb_id = ?", [self.tvdbid])
+        if sqlShow != None:
+            sqlResults = [sqlShow]
+        else:
+            myDB = db.DBConnection()
+            sqlResults = myDB.select("SELECT * FROM tv_shows WHERE tvdb_id = ?", [self.tvdbid])
 
         if len(sqlResults) > 1:
             raise exceptions.MultipleDBShowsException()
         elif len(sqlResults) == 0:
             logger.log(str(self.tvdbid) + ": Unable to find the show in the database")
-            return
+            return False
         else:
             if self.name == "":
                 self.name = sqlResults[0]["show_name"]
@@ -615,6 +705,8 @@ class TVShow(object):
             if self.lang == "":
                 self.lang = sqlResults[0]["lang"]
 
+            return True
+
 
     def loadFromTVDB(self, cache=True, tvapi=None, cachedSeason=None):
 
@@ -749,8 +841,14 @@ class TVShow(object):
         myDB.action("DELETE FROM tv_episodes WHERE showid = ?", [self.tvdbid])
         myDB.action("DELETE FROM tv_shows WHERE tvdb_id = ?", [self.tvdbid])
 
+        airdate_index.clearShow(self.tvdbid)
+        show_stats.clearShow(self.tvdbid)
+        self.clearEpisodeRows()
+        self.flushEpisodes()
+
         # remove self from show list
-        sickbeard.showList = [x for x in sickbeard.showList if x.tvdbid != self.tvdbid]
+        for curShow in [x for x in sickbeard.showList if x.tvdbid == self.tvdbid]:
+            sickbeard.showList.remove(curShow)
         
         # clear the cache
         image_cache_dir = ek.ek(os.path.join, sickbeard.CACHE_DIR, 'images')
@@ -779,30 +877,31 @@ class TVShow(object):
         myDB = db.DBConnection()
         sqlResults = myDB.select("SELECT * FROM tv_episodes WHERE showid = ? AND location != ''", [self.tvdbid])
 
-        for ep in sqlResults:
-            curLoc = os.path.normpath(ep["location"])
-            season = int(ep["season"])
-            episode = int(ep["episode"])
+        with myDB.batch():
+            for ep in sqlResults:
+                curLoc = os.path.normpath(ep["location"])
+                season = int(ep["season"])
+                episode = int(ep["episode"])
 
-            try:
-                curEp = self.getEpisode(season, episode)
-            except exceptions.EpisodeDeletedException:
-                logger.log(u"The episode was deleted while we were refreshing it, moving on to the next one", logger.DEBUG)
-                continue
+                try:
+                    curEp = self.getEpisode(season, episode)
+                except exceptions.EpisodeDeletedException:
+                    logger.log(u"The episode was deleted while we were refreshing it, moving on to the next one", logger.DEBUG)
+                    continue
 
-            # if the path doesn't exist or if it's not in our show dir
-            if not ek.ek(os.path.isfile, curLoc) or not os.path.normpath(curLoc).startswith(os.path.normpath(self.location)):
+                # if the path doesn't exist or if it's not in our show dir
+                if not ek.ek(os.path.isfile, curLoc) or not os.path.normpath(curLoc).startswith(os.path.normpath(self.location)):
 
-                with curEp.lock:
-                    # if it used to have a file associated with it and it doesn't anymore then set it to IGNORED
-                    if curEp.location and curEp.status in Quality.DOWNLOADED:
-                        logger.log(str(self.tvdbid) + ": Location for " + str(season) + "x" + str(episode) + " doesn't exist, removing it and changing our status to IGNORED", logger.DEBUG)
-                        curEp.status = IGNORED
-                    curEp.location = ''
-                    curEp.hasnfo = False
-                    curEp.hastbn = False
-                    curEp.release_name = ''
-                    curEp.saveToDB()
+                    with curEp.lock:
+                        # if it used to have a file associated with it and it doesn't anymore then set it to IGNORED
+                        if curEp.location and curEp.status in Quality.DOWNLOADED:
+                            logger.log(str(self.tvdbid) + ": Location for " + str(season) + "x" + str(episode) + " doesn't exist, removing it and changing our status to IGNORED", logger.DEBUG)
+                            curEp.status = IGNORED
+                        curEp.location = ''
+                        curEp.hasnfo = False
+                        curEp.hastbn = False
+                        curEp.release_name = ''
+                        curEp.saveToDB()
 
     def saveToDB(self):
 
@@ -849,15 +948,41 @@ class TVShow(object):
         return toReturn
 
 
-    def wantEpisode(self, season, episode, quality, manualSearch=False):
+    def getEpisodeStatuses(self, episodes):
+        """
+        Returns a dict of (season, episode): status for the given (season, episode) pairs,
+        all looked up with a single query. Episodes which aren't in the DB are left out.
+        """
+        wanted = set(episodes)
+        if not wanted:
+            return {}
 
-        logger.log(u"Checking if we want episode "+str(season)+"x"+str(episode)+" at quality "+Quality.qualityStrings[quality], logger.DEBUG)
+        seasons = list(set([season for (season, episode) in wanted]))
 
-        # if the quality isn't one we want under any circumstances then just say no
+        myDB = db.DBConnection()
+        sqlResults = myDB.select("SELECT season, episode, status FROM tv_episodes WHERE showid = ? AND season IN (" + ",".join(["?"] * len(seasons)) + ")",
+                                 [self.tvdbid] + seasons)
+
+        statuses = {}
+        for curResult in sqlResults:
+            curKey = (int(curResult["season"]), int(curResult["episode"]))
+            if curKey in wanted:
+                statuses[curKey] = int(curResult["status"])
+
+        return statuses
+
+    def _isAllowedQuality(self, quality):
         anyQualities, bestQualities = Quality.splitQuality(self.quality)
         logger.log(u"any,best = "+str(anyQualities)+" "+str(bestQualities)+" and we are "+str(quality), logger.DEBUG)
 
-        if quality not in anyQualities + bestQualities:
+        return quality in anyQualities + bestQualities
+
+    def wantEpisode(self, season, episode, quality, manualSearch=False):
+
+        logger.log(u"Checking if we want episode "+str(season)+"x"+str(episode)+" at quality "+Quality.qualityStrings[quality], logger.DEBUG)
+
+        # if the quality isn't one we want under any circumstances then just say no
+        if not self._isAllowedQuality(quality):
             logger.log(u"I know for sure I don't want this episode, saying no", logger.DEBUG)
             return False
 
@@ -868,7 +993,43 @@ class TVShow(object):
             logger.log(u"Unable to find the episode", logger.DEBUG)
             return False
 
-        epStatus = int(sqlResults[0]["status"])
+        return self._wantEpisodeStatus(quality, int(sqlResults[0]["status"]), manualSearch)
+
+    def wantEpisodes(self, candidates, manualSearch=False):
+        """
+        Batch version of wantEpisode. Takes a list of (season, episode, quality) tuples and
+        returns a list of True/False in the same order, the episode statuses are fetched with
+        one query for the lot.
+        """
+        candidates = [(int(season), int(episode), quality) for (season, episode, quality) in candidates]
+
+        allowed = {}
+        for (season, episode, quality) in candidates:
+            if quality not in allowed:
+                allowed[quality] = self._isAllowedQuality(quality)
+
+        statuses = self.getEpisodeStatuses([(season, episode) for (season, episode, quality) in candidates if allowed[quality]])
+
+        results = []
+        for (season, episode, quality) in candidates:
+            logger.log(u"Checking if we want episode "+str(season)+"x"+str(episode)+" at quality "+Quality.qualityStrings[quality], logger.DEBUG)
+
+            if not allowed[quality]:
+                logger.log(u"I know for sure I don't want this episode, saying no", logger.DEBUG)
+                results.append(False)
+            elif (season, episode) not in statuses:
+                logger.log(u"Unable to find the episode", logger.DEBUG)
+                results.append(False)
+            else:
+                results.append(self._wantEpisodeStatus(quality, statuses[(season, episode)], manualSearch))
+
+        return results
+
+    def _wantEpisodeStatus(self, quality, epStatus, manualSearch=False):
+        """
+        Decides whether we want an episode with the given status at the given quality.
+        """
+        anyQualities, bestQualities = Quality.splitQuality(self.quality)
 
         logger.log(u"current episode status: "+str(epStatus), logger.DEBUG)
 
@@ -949,7 +1110,16 @@ def dirty_setter(attr_name):
 
 class TVEpisode(object):
 
-    def __init__(self, show, season, episode, file=""):
+    # there can be tens of thousands of these, so they don't get a __dict__ (or a lock, see
+    # TVShow.getEpisodeLock)
+    __slots__ = ('_name', '_season', '_episode', '_description', '_airdate', '_hasnfo', '_hastbn',
+                 '_status', '_tvdbid', '_file_size', '_release_name', '_location', '_relatedEps',
+                 'dirty', 'show', '__weakref__')
+
+    def __init__(self, show, season, episode, file="", sqlResult=None):
+        """
+        sqlResult: the episode's tv_episodes row if the caller has already read it (optional)
+        """
 
         self._name = ""
         self._season = season
@@ -968,19 +1138,20 @@ class TVEpisode(object):
 
         self.show = show
         self._location = file
+        self._relatedEps = None
 
-        self.lock = threading.Lock()
-
-        self.specifyEpisode(self.season, self.episode)
+        self.specifyEpisode(self.season, self.episode, sqlResult)
 
-        self.relatedEps = []
-
-        self.checkForMetaFiles()
+        # the row knows which metadata files there were, a new file has to be looked at
+        if sqlResult != None and not file:
+            self._hasnfo = bool(sqlResult["hasnfo"])
+            self._hastbn = bool(sqlResult["hastbn"])
+        else:
+            self.checkForMetaFiles()
 
     name = property(lambda self: self._name, dirty_setter("_name"))
     season = property(lambda self: self._season, dirty_setter("_season"))
     episode = property(lambda self: self._episode, dirty_setter("_episode"))
-    description = property(lambda self: self._description, dirty_setter("_description"))
     airdate = property(lambda self: self._airdate, dirty_setter("_airdate"))
     hasnfo = property(lambda self: self._hasnfo, dirty_setter("_hasnfo"))
     hastbn = property(lambda self: self._hastbn, dirty_setter("_hastbn"))
@@ -1003,6 +1174,39 @@ class TVEpisode(object):
 
     location = property(lambda self: self._location, _set_location)
 
+    def _get_description(self):
+        # episodes loaded from the database only read their description when it's asked for
+        if self._description == None:
+            myDB = db.DBConnection()
+            sqlResults = myDB.select("SELECT description FROM tv_episodes WHERE showid = ? AND season = ? AND episode = ?", [self.show.tvdbid, self.season, self.episode])
+            if sqlResults and sqlResults[0]["description"] != None:
+                self._description = sqlResults[0]["description"]
+            else:
+                self._description = ""
+        return self._description
+
+    def _set_description(self, new_description):
+        # don't read the old one just to compare, an episode whose description wasn't loaded is
+        # saved with the new one
+        if self._description == None or self._description != new_description:
+            self._description = new_description
+            self.dirty = True
+
+    description = property(_get_description, _set_description)
+
+    def _get_relatedEps(self):
+        # most episodes never have any
+        if self._relatedEps == None:
+            self._relatedEps = []
+        return self._relatedEps
+
+    def _set_relatedEps(self, relatedEps):
+        self._relatedEps = relatedEps
+
+    relatedEps = property(_get_relatedEps, _set_relatedEps)
+
+    lock = property(lambda self: self.show.getEpisodeLock(self.season, self.episode))
+
     def checkForMetaFiles(self):
 
         oldhasnfo = self.hasnfo
@@ -1032,9 +1236,9 @@ class TVEpisode(object):
         # if either setting has changed return true, if not return false
         return oldhasnfo != self.hasnfo or oldhastbn != self.hastbn
 
-    def specifyEpisode(self, season, episode):
+    def specifyEpisode(self, season, episode, sqlResult=None):
 
-        sqlResult = self.loadFromDB(season, episode)
+        sqlResult = self.loadFromDB(season, episode, sqlResult)
 
         if not sqlResult:
             # only load from NFO if we didn't load from DB
@@ -1060,12 +1264,15 @@ class TVEpisode(object):
         if self.dirty:
             self.saveToDB()
 
-    def loadFromDB(self, season, episode):
+    def loadFromDB(self, season, episode, sqlResult=None):
 
         logger.log(str(self.show.tvdbid) + ": Loading episode details from DB for episode " + str(season) + "x" + str(episode), logger.DEBUG)
 
-        myDB = db.DBConnection()
-        sqlResults = myDB.select("SELECT * FROM tv_episodes WHERE showid = ? AND season = ? AND episode = ?", [self.show.tvdbid, season, episode])
+        if sqlResult != None:
+            sqlResults = [sqlResult]
+        else:
+            myDB = db.DBConnection()
+            sqlResults = myDB.select("SELECT * FROM tv_episodes WHERE showid = ? AND season = ? AND episode = ?", [self.show.tvdbid, season, episode])
 
         if len(sqlResults) > 1:
             raise exceptions.MultipleDBEpisodesException("Your DB has two records for the same show somehow.")
@@ -1078,16 +1285,15 @@ class TVEpisode(object):
                 self.name = sqlResults[0]["name"]
             self.season = season
             self.episode = episode
-            self.description = sqlResults[0]["description"]
-            if self.description == None:
-                self.description = ""
+            # read when it's needed
+            self._description = None
             self.airdate = datetime.date.fromordinal(int(sqlResults[0]["airdate"]))
             #logger.log(u"1 Status changes from " + str(self.status) + " to " + str(sqlResults[0]["status"]), logger.DEBUG)
             self.status = int(sqlResults[0]["status"])
 
-            # don't overwrite my location
+            # don't overwrite my location (without the setter, the size comes from the row)
             if sqlResults[0]["location"] != "" and sqlResults[0]["location"] != None:
-                self.location = os.path.normpath(sqlResults[0]["location"])
+                self._location = os.path.normpath(sqlResults[0]["location"])
             if sqlResults[0]["file_size"]:
                 self.file_size = int(sqlResults[0]["file_size"])
             else:
@@ -1342,7 +1548,8 @@ class TVEpisode(object):
         # remove myself from the show dictionary
         if self.show.getEpisode(self.season, self.episode, noCreate=True) == self:
             logger.log(u"Removing myself from my show's list", logger.DEBUG)
-            del self.show.episodes[self.season][self.episode]
+            del self.show.episodes[(self.season, self.episode)]
+            episode_cache.discard(self)
 
         # delete myself from the DB
         logger.log(u"Deleting myself from the database", logger.DEBUG)
@@ -1350,6 +1557,10 @@ class TVEpisode(object):
         sql = "DELETE FROM tv_episodes WHERE showid="+str(self.show.tvdbid)+" AND season="+str(self.season)+" AND episode="+str(self.episode)
         myDB.action(sql)
 
+        airdate_index.remove(self.show.tvdbid, self.season, self.episode)
+        self.show.dropEpisodeRow(self.season, self.episode)
+        show_stats.remove(self.show.tvdbid, self.season, self.episode)
+
         raise exceptions.EpisodeDeletedException()
 
     def saveToDB(self, forceSave=False):
@@ -1371,7 +1582,6 @@ class TVEpisode(object):
         myDB = db.DBConnection()
         newValueDict = {"tvdbid": self.tvdbid,
                         "name": self.name,
-                        "description": self.description,
                         "airdate": self.airdate.toordinal(),
                         "hasnfo": self.hasnfo,
                         "hastbn": self.hastbn,
@@ -1383,9 +1593,19 @@ class TVEpisode(object):
                             "season": self.season,
                             "episode": self.episode}
 
+        # a description that was never read can't have changed
+        if self._description != None:
+            newValueDict["description"] = self._description
+
         # use a custom update/insert method to get the data into the DB
         myDB.upsert("tv_episodes", newValueDict, controlValueDict)
 
+        airdate_index.update(self.show.tvdbid, self.season, self.episode, self.airdate)
+        self.show.dropEpisodeRow(self.season, self.episode)
+        show_stats.update(self.show.tvdbid, self.season, self.episode, self.status, self.location, self.airdate)
+
+        self.dirty = False
+
     def fullPath (self):
         if self.location == None or self.location == "":
             return None
@@ -16,9 +16,10 @@
 # You should have received a copy of the GNU General Public License
 # along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
 
+from __future__ import with_statement
+
 import time
 import datetime
-import sqlite3
 
 import sickbeard
 
@@ -29,38 +30,20 @@ from sickbeard.common import Quality
 from sickbeard import helpers, exceptions, show_name_helpers
 from sickbeard import name_cache
 from sickbeard.exceptions import ex
+from sickbeard.rss_parser import RSSFeed
+from sickbeard.airdate_index import airdate_index
 
-#import xml.etree.cElementTree as etree
-import xml.dom.minidom
-
-from lib.tvdb_api import tvdb_api, tvdb_exceptions
+from lib.tvdb_api import tvdb_exceptions
 
 from name_parser.parser import NameParser, InvalidNameException
 
 
 class CacheDBConnection(db.DBConnection):
 
-    def __init__(self, providerName):
+    def __init__(self, providerName=None):
+        # the provider_cache table is shared by all providers and created by cache_db
         db.DBConnection.__init__(self, "cache.db")
 
-        # Create the table if it's not already there
-        try:
-            sql = "CREATE TABLE "+providerName+" (name TEXT, season NUMERIC, episodes TEXT, tvrid NUMERIC, tvdbid NUMERIC, url TEXT, time NUMERIC, quality TEXT);"
-            self.connection.execute(sql)
-            self.connection.commit()
-        except sqlite3.OperationalError, e:
-            if str(e) != "table "+providerName+" already exists":
-                raise
-
-        # Create the table if it's not already there
-        try:
-            sql = "CREATE TABLE lastUpdate (provider TEXT, time NUMERIC);"
-            self.connection.execute(sql)
-            self.connection.commit()
-        except sqlite3.OperationalError, e:
-            if str(e) != "table lastUpdate already exists":
-                raise
-
 class TVCache():
 
     def __init__(self, provider):
@@ -77,7 +60,40 @@ class TVCache():
 
         myDB = self._getDB()
 
-        myDB.action("DELETE FROM "+self.providerID+" WHERE 1")
+        myDB.mass_action([["DELETE FROM provider_cache_episodes WHERE cache_id IN (SELECT cache_id FROM provider_cache WHERE provider = ?)", [self.providerID]],
+                          ["DELETE FROM provider_cache WHERE provider = ?", [self.providerID]],
+                          ["DELETE FROM provider_cache_seen WHERE provider = ?", [self.providerID]]])
+
+    def _expireCache(self):
+        """
+        Drops the items which were first seen more than CACHE_RETENTION days ago, once they're
+        forgotten they will be parsed again if the feed still has them.
+        """
+
+        myDB = self._getDB()
+
+        expireTime = int(time.mktime((datetime.datetime.today() - datetime.timedelta(days=sickbeard.CACHE_RETENTION)).timetuple()))
+
+        myDB.mass_action([["DELETE FROM provider_cache_episodes WHERE cache_id IN (SELECT cache_id FROM provider_cache WHERE provider = ? AND time < ?)", [self.providerID, expireTime]],
+                          ["DELETE FROM provider_cache WHERE provider = ? AND time < ?", [self.providerID, expireTime]],
+                          ["DELETE FROM provider_cache_seen WHERE provider = ? AND time < ?", [self.providerID, expireTime]]])
+
+    def _isSeen(self, itemID):
+        """
+        Returns True if the item with the given GUID or URL was already handled by _addCacheEntry.
+        """
+
+        myDB = self._getDB()
+
+        return len(myDB.select("SELECT 1 FROM provider_cache_seen WHERE provider = ? AND item_id = ?", [self.providerID, itemID])) > 0
+
+    def _markSeenQuery(self, itemID, tvdb_id=0):
+        """
+        Returns the query remembering that the item was handled. Items which didn't match a show
+        (tvdb_id 0) are forgotten by name_cache.clearCache() when a show or the exceptions change.
+        """
+        curTimestamp = int(time.mktime(datetime.datetime.today().timetuple()))
+        return ["INSERT OR IGNORE INTO provider_cache_seen (provider, item_id, time, tvdbid) VALUES (?,?,?,?)", [self.providerID, itemID, curTimestamp, tvdb_id]]
 
     def _getRSSData(self):
 
@@ -96,7 +112,8 @@ class TVCache():
         if not self.shouldUpdate():
             return
 
-        data = self._getRSSData()
+        with helpers.ConditionalRequests() as requests:
+            data = self._getRSSData()
 
         # as long as the http request worked we count this as an update
         if data:
@@ -104,36 +121,47 @@ class TVCache():
         else:
             return []
 
-        # now that we've loaded the current RSS feed lets delete the old cache
-        logger.log(u"Clearing "+self.provider.name+" cache and updating with new information")
-        self._clearCache()
+        # the server told us the feed hasn't changed since last time so there's nothing new in it
+        if requests.unchanged():
+            logger.log(u"The "+self.provider.name+" feed hasn't changed since the last update, skipping it", logger.DEBUG)
+            return []
+
+        # now that we've loaded the current RSS feed lets get rid of the old items, anything we already have is skipped
+        logger.log(u"Expiring old items from the "+self.provider.name+" cache and updating with new information")
+        self._expireCache()
 
         if not self._checkAuth(data):
             raise exceptions.AuthException("Your authentication info for "+self.provider.name+" is incorrect, check your config")
 
+        feed = RSSFeed(data)
+
         try:
-            parsedXML = xml.dom.minidom.parseString(data)
-            items = parsedXML.getElementsByTagName('item')
+            feed.readChannel()
         except Exception, e:
             logger.log(u"Error trying to load "+self.provider.name+" RSS feed: "+ex(e), logger.ERROR)
-            logger.log(u"Feed contents: "+repr(data), logger.DEBUG)
+            logger.log(u"Feed contents: %r", logger.DEBUG, data)
             return []
 
-        if parsedXML.documentElement.tagName != 'rss':
+        if feed.root != 'rss':
             logger.log(u"Resulting XML from "+self.provider.name+" isn't RSS, not parsing it", logger.ERROR)
             return []
 
-        for item in items:
-
-            self._parseItem(item)
+        # the items are parsed one at a time as they're added, a broken feed still gives us the ones before the error
+        try:
+            for item in feed:
+                self._parseItem(item)
+        except SyntaxError, e:
+            logger.log(u"Error trying to load "+self.provider.name+" RSS feed: "+ex(e), logger.ERROR)
+            logger.log(u"Feed contents: %r", logger.DEBUG, data)
 
     def _translateLinkURL(self, url):
         return url.replace('&amp;','&')
 
     def _parseItem(self, item):
 
-        title = helpers.get_xml_text(item.getElementsByTagName('title')[0])
-        url = helpers.get_xml_text(item.getElementsByTagName('link')[0])
+        title = item.title
+        url = item.link
+        guid = item.guid or None
 
         self._checkItemAuth(title, url)
 
@@ -145,7 +173,7 @@ class TVCache():
 
         logger.log(u"Adding item from RSS to cache: "+title, logger.DEBUG)
 
-        self._addCacheEntry(title, url)
+        self._addCacheEntry(title, url, guid=guid)
 
     def _getLastUpdate(self):
         myDB = self._getDB()
@@ -178,10 +206,18 @@ class TVCache():
 
         return True
 
-    def _addCacheEntry(self, name, url, season=None, episodes=None, tvdb_id=0, tvrage_id=0, quality=None, extraNames=[]):
+    def _addCacheEntry(self, name, url, season=None, episodes=None, tvdb_id=0, tvrage_id=0, quality=None, extraNames=[], guid=None):
 
         myDB = self._getDB()
 
+        # items are remembered by their GUID if the feed has one, otherwise by their URL
+        itemID = guid or url
+
+        # don't parse and look up the same item again every time the feed is refreshed
+        if self._isSeen(itemID):
+            logger.log(u"Already have "+name+" in the cache, skipping it", logger.DEBUG)
+            return False
+
         parse_result = None
 
         # if we don't have complete info then parse the filename to get it
@@ -195,10 +231,12 @@ class TVCache():
 
         if not parse_result:
             logger.log(u"Giving up because I'm unable to parse this name: "+name, logger.DEBUG)
+            myDB.action(*self._markSeenQuery(itemID))
             return False
 
         if not parse_result.series_name:
             logger.log(u"No series name retrieved from "+name+", unable to cache it", logger.DEBUG)
+            myDB.action(*self._markSeenQuery(itemID))
             return False
 
         tvdb_lang = None
@@ -252,12 +290,11 @@ class TVCache():
                 # if the DB lookup fails then do a comprehensive regex search
                 if tvdb_id == None:
                     logger.log(u"Couldn't figure out a show name straight from the DB, trying a regex search instead", logger.DEBUG)
-                    for curShow in sickbeard.showList:
-                        if show_name_helpers.isGoodResult(name, curShow, False):
-                            logger.log(u"Successfully matched "+name+" to "+curShow.name+" with regex", logger.DEBUG)
-                            tvdb_id = curShow.tvdbid
-                            tvdb_lang = curShow.lang
-                            break
+                    curShow = show_name_helpers.findShowForResult(name, sickbeard.showList)
+                    if curShow:
+                        logger.log(u"Successfully matched "+name+" to "+curShow.name+" with regex", logger.DEBUG)
+                        tvdb_id = curShow.tvdbid
+                        tvdb_lang = curShow.lang
 
                 # if tvdb_id was anything but None (0 or a number) then 
                 if not from_cache:
@@ -283,17 +320,8 @@ class TVCache():
         # if we have an air-by-date show then get the real season/episode numbers
         if parse_result.air_by_date and tvdb_id:
             try:
-                # There's gotta be a better way of doing this but we don't wanna
-                # change the language value elsewhere
-                ltvdb_api_parms = sickbeard.TVDB_API_PARMS.copy()
-
-                if not (tvdb_lang == "" or tvdb_lang == "en" or tvdb_lang == None):
-                    ltvdb_api_parms['language'] = tvdb_lang
-
-                t = tvdb_api.Tvdb(**ltvdb_api_parms)
-                epObj = t[tvdb_id].airedOn(parse_result.air_date)[0]
-                season = int(epObj["seasonnumber"])
-                episodes = [int(epObj["episodenumber"])]
+                season, episode = airdate_index.getEpisode(tvdb_id, parse_result.air_date, tvdb_lang)
+                episodes = [episode]
             except tvdb_exceptions.tvdb_episodenotfound:
                 logger.log(u"Unable to find episode with date "+str(parse_result.air_date)+" for show "+parse_result.series_name+", skipping", logger.WARNING)
                 return False
@@ -301,16 +329,33 @@ class TVCache():
                 logger.log(u"Unable to contact TVDB: "+ex(e), logger.WARNING)
                 return False
 
-        episodeText = "|"+"|".join(map(str, episodes))+"|"
-
         # get the current timestamp
         curTimestamp = int(time.mktime(datetime.datetime.today().timetuple()))
 
+        # if we've already got this item keep the time we first saw it, listPropers goes by that
+        sqlResults = myDB.select("SELECT time FROM provider_cache WHERE provider = ? AND url = ?", [self.providerID, url])
+        if sqlResults:
+            curTimestamp = int(sqlResults[0]["time"])
+
         if not quality:
             quality = Quality.nameQuality(name)
 
-        myDB.action("INSERT INTO "+self.providerID+" (name, season, episodes, tvrid, tvdbid, url, time, quality) VALUES (?,?,?,?,?,?,?,?)",
-                    [name, season, episodeText, tvrage_id, tvdb_id, url, curTimestamp, quality])
+        firstEpisode = episodes[0] if episodes else None
+
+        queries = [["DELETE FROM provider_cache_episodes WHERE cache_id IN (SELECT cache_id FROM provider_cache WHERE provider = ? AND url = ?)", [self.providerID, url]],
+                   ["DELETE FROM provider_cache WHERE provider = ? AND url = ?", [self.providerID, url]],
+                   ["INSERT INTO provider_cache (provider, name, season, episode, tvrid, tvdbid, url, time, quality) VALUES (?,?,?,?,?,?,?,?,?)",
+                    [self.providerID, name, season, firstEpisode, tvrage_id, tvdb_id, url, curTimestamp, quality]]]
+
+        # multi-episode releases list every episode they contain so they can be found by any of them
+        if len(episodes) > 1:
+            for curEpisode in episodes:
+                queries.append(["INSERT INTO provider_cache_episodes (cache_id, episode) SELECT cache_id, ? FROM provider_cache WHERE provider = ? AND url = ?",
+                                [curEpisode, self.providerID, url]])
+
+        queries.append(self._markSeenQuery(itemID, tvdb_id))
+
+        myDB.mass_action(queries)
 
 
     def searchCache(self, episode, manualSearch=False):
@@ -321,13 +366,15 @@ class TVCache():
 
         myDB = self._getDB()
 
-        sql = "SELECT * FROM "+self.providerID+" WHERE name LIKE '%.PROPER.%' OR name LIKE '%.REPACK.%'"
+        sql = "SELECT * FROM provider_cache WHERE provider = ? AND (name LIKE '%.PROPER.%' OR name LIKE '%.REPACK.%')"
+        args = [self.providerID]
 
         if date != None:
-            sql += " AND time >= "+str(int(time.mktime(date.timetuple())))
+            sql += " AND time >= ?"
+            args.append(int(time.mktime(date.timetuple())))
 
         #return filter(lambda x: x['tvdbid'] != 0, myDB.select(sql))
-        return myDB.select(sql)
+        return myDB.select(sql, args)
 
     def findNeededEpisodes(self, episode = None, manualSearch=False):
         neededEps = {}
@@ -338,11 +385,17 @@ class TVCache():
         myDB = self._getDB()
 
         if not episode:
-            sqlResults = myDB.select("SELECT * FROM "+self.providerID)
+            sqlResults = myDB.select("SELECT * FROM provider_cache WHERE provider = ?", [self.providerID])
         else:
-            sqlResults = myDB.select("SELECT * FROM "+self.providerID+" WHERE tvdbid = ? AND season = ? AND episodes LIKE ?", [episode.show.tvdbid, episode.season, "%|"+str(episode.episode)+"|%"])
-
-        # for each cache entry
+            sqlResults = myDB.select("SELECT * FROM provider_cache WHERE provider = ? AND tvdbid = ? AND season = ? AND episode = ?"
+                                     " UNION SELECT provider_cache.* FROM provider_cache_episodes, provider_cache WHERE provider_cache_episodes.episode = ?"
+                                     " AND provider_cache.cache_id = provider_cache_episodes.cache_id AND provider = ? AND tvdbid = ? AND season = ?",
+                                     [self.providerID, episode.show.tvdbid, episode.season, episode.episode,
+                                      episode.episode, self.providerID, episode.show.tvdbid, episode.season])
+
+        # work out which show and episode each cache entry is for
+        candidates = []
+        showCandidates = {}
         for curResult in sqlResults:
 
             # skip non-tv crap (but allow them for Newzbin cause we assume it's filtered well)
@@ -358,14 +411,24 @@ class TVCache():
             curSeason = int(curResult["season"])
             if curSeason == -1:
                 continue
-            curEp = curResult["episodes"].split("|")[1]
-            if not curEp:
+            if curResult["episode"] == None:
                 continue
-            curEp = int(curEp)
+            curEp = int(curResult["episode"])
             curQuality = int(curResult["quality"])
 
+            candidates.append((curResult, showObj, curSeason, curEp, curQuality))
+            showCandidates.setdefault(showObj, []).append((curSeason, curEp, curQuality))
+
+        # ask each show about all its episodes at once
+        wantedEps = {}
+        for showObj, curCandidates in showCandidates.items():
+            for curCandidate, wantEp in zip(curCandidates, showObj.wantEpisodes(curCandidates, manualSearch)):
+                wantedEps[(showObj.tvdbid,) + curCandidate] = wantEp
+
+        for (curResult, showObj, curSeason, curEp, curQuality) in candidates:
+
             # if the show says we want that episode then add it to the list
-            if not showObj.wantEpisode(curSeason, curEp, curQuality, manualSearch):
+            if not wantedEps[(showObj.tvdbid, curSeason, curEp, curQuality)]:
                 logger.log(u"Skipping "+curResult["name"]+" because we don't want an episode that's "+Quality.qualityStrings[curQuality], logger.DEBUG)
 
             else:
@@ -28,8 +28,10 @@ from sickbeard import logger
 from sickbeard.common import UNAIRED
 
 from sickbeard import db
-from sickbeard import exceptions, helpers
+from sickbeard import exceptions, helpers, rate_limiter
 from sickbeard.exceptions import ex
+from sickbeard.airdate_index import airdate_index
+from sickbeard.show_stats import show_stats
 
 from lib.tvdb_api import tvdb_api, tvdb_exceptions
 
@@ -247,6 +249,7 @@ class TVRage:
         url += urllib.urlencode(urlData)
 
         logger.log(u"Loading TVRage info from URL: " + url, logger.DEBUG)
+        rate_limiter.tvrage_limiter.wait()
         result = helpers.getURL(url)
 
         if result is None:
@@ -329,6 +332,9 @@ class TVRage:
         # insert it
         myDB.action("INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location) VALUES (?,?,?,?,?,?,?,?,?,?,?)", \
                     [self.show.tvdbid, -1, self.nextEpInfo['name'], self.nextEpInfo['season'], self.nextEpInfo['episode'], '', self.nextEpInfo['airdate'].toordinal(), 0, 0, UNAIRED, ''])
+        self.show.clearEpisodeRows()
+        show_stats.clearShow(self.show.tvdbid)
+        airdate_index.update(self.show.tvdbid, self.nextEpInfo['season'], int(self.nextEpInfo['episode']), self.nextEpInfo['airdate'])
 
         # once it's in the DB make an object and return it
         ep = None
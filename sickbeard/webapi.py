@@ -24,20 +24,25 @@ import time
 import urllib
 import datetime
 import threading
-import re
 import traceback
 
 import cherrypy
 import sickbeard
 import webserve
 from sickbeard import db, logger, exceptions, history, ui, helpers
+from sickbeard import log_reader
 from sickbeard.exceptions import ex
 from sickbeard import encodingKludge as ek
-from sickbeard import search_queue
+from sickbeard import search, search_queue, rate_limiter
+from sickbeard.name_parser.parser import name_parser_cache
+from sickbeard.episode_cache import episode_cache
+from sickbeard.airdate_index import airdate_index
+from sickbeard.show_stats import show_stats
+from sickbeard import notifiers
 from sickbeard.common import SNATCHED, SNATCHED_PROPER, DOWNLOADED, SKIPPED, UNAIRED, IGNORED, ARCHIVED, WANTED, UNKNOWN
 from common import Quality, qualityPresetStrings, statusStrings
 from sickbeard import image_cache
-from lib.tvdb_api import tvdb_api, tvdb_exceptions
+from lib.tvdb_api import tvdb_api, tvdb_cache, tvdb_exceptions
 try:
     import json
 except ImportError:
@@ -149,7 +154,6 @@ class Api:
         t.seasonSQLResults = seasonSQLResults
         t.episodeSQLResults = episodeSQLResults
 
-        myDB.connection.close()
         if len(sickbeard.API_KEY) == 32:
             t.apikey = sickbeard.API_KEY
         else:
@@ -777,7 +781,6 @@ class CMD_ComingEpisodes(ApiCall):
                 finalEpResults[status] = []
 
             finalEpResults[status].append(ep)
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, finalEpResults)
 
 
@@ -835,7 +838,6 @@ class CMD_Episode(ApiCall):
         episode["quality"] = _get_quality_string(quality)
         episode["file_size_human"] = _sizeof_fmt(episode["file_size"])
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, episode)
 
 
@@ -1016,7 +1018,6 @@ class CMD_Exceptions(ApiCall):
             for row in sqlResults:
                 scene_exceptions.append(row["show_name"])
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, scene_exceptions)
 
 
@@ -1071,7 +1072,6 @@ class CMD_History(ApiCall):
             row["resource"] = os.path.basename(row["resource"])
             results.append(row)
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, results)
 
 
@@ -1090,7 +1090,6 @@ class CMD_HistoryClear(ApiCall):
         myDB = db.DBConnection()
         myDB.action("DELETE FROM history WHERE 1=1")
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, msg="History cleared")
 
 
@@ -1109,19 +1108,23 @@ class CMD_HistoryTrim(ApiCall):
         myDB = db.DBConnection()
         myDB.action("DELETE FROM history WHERE date < " + str((datetime.datetime.today() - datetime.timedelta(days=30)).strftime(history.dateFormat)))
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, msg="Removed history entries greater than 30 days old")
 
 
 class CMD_Logs(ApiCall):
     _help = {"desc": "view sickbeard's log",
-             "optionalParameters": {"min_level ": {"desc": "the minimum level classification of log entries to show, with each level inherting its above level"} }
+             "optionalParameters": {"min_level ": {"desc": "the minimum level classification of log entries to show, with each level inherting its above level"},
+                                    "thread": {"desc": "only show log entries from the thread with this name"},
+                                    "page": {"desc": "the page of 50 log entries to show, 0 is the newest"}
+                                   }
              }
 
     def __init__(self, args, kwargs):
         # required
         # optional
         self.min_level, args = self.check_params(args, kwargs, "min_level", "error", False, "string", ["error", "warning", "info", "debug"])
+        self.thread, args = self.check_params(args, kwargs, "thread", None, False, "string", [])
+        self.page, args = self.check_params(args, kwargs, "page", 0, False, "int", [])
         # super, missing, help
         ApiCall.__init__(self, args, kwargs)
 
@@ -1130,47 +1133,9 @@ class CMD_Logs(ApiCall):
         # 10 = Debug / 20 = Info / 30 = Warning / 40 = Error
         minLevel = logger.reverseNames[str(self.min_level).upper()]
 
-        data = []
-        if os.path.isfile(logger.sb_log_instance.log_file):
-            f = ek.ek(open, logger.sb_log_instance.log_file)
-            data = f.readlines()
-            f.close()
-
-        regex = "^(\w{3})\-(\d\d)\s*(\d\d)\:(\d\d):(\d\d)\s*([A-Z]+)\s*(.+?)\s*\:\:\s*(.*)$"
-
-        finalData = []
-
-        numLines = 0
-        lastLine = False
-        numToShow = min(50, len(data))
-
-        for x in reversed(data):
+        entries = log_reader.readLog(logger.sb_log_instance.log_file, minLevel, 50, self.thread, max(0, self.page))
 
-            x = x.decode('utf-8')
-            match = re.match(regex, x)
-
-            if match:
-                level = match.group(6)
-                if level not in logger.reverseNames:
-                    lastLine = False
-                    continue
-
-                if logger.reverseNames[level] >= minLevel:
-                    lastLine = True
-                    finalData.append(x.rstrip("\n"))
-                else:
-                    lastLine = False
-                    continue
-
-            elif lastLine:
-                finalData.append("AA" + x)
-
-            numLines += 1
-
-            if numLines >= numToShow:
-                break
-
-        return _responds(RESULT_SUCCESS, finalData)
+        return _responds(RESULT_SUCCESS, [x.text.rstrip("\n") for x in entries])
 
 
 class CMD_SickBeard(ApiCall):
@@ -1266,7 +1231,6 @@ class CMD_SickBeardCheckScheduler(ApiCall):
         nextSearch = str(sickbeard.currentSearchScheduler.timeLeft()).split('.')[0]
         nextBacklog = sickbeard.backlogSearchScheduler.nextRun().strftime(dateFormat).decode(sickbeard.SYS_ENCODING)
 
-        myDB.connection.close()
         data = {"backlog_is_paused": int(backlogPaused), "backlog_is_running": int(backlogRunning), "last_backlog": _ordinal_to_dateForm(sqlResults[0]["last_backlog"]), "search_is_running": int(searchStatus), "next_search": nextSearch, "next_backlog": nextBacklog}
         return _responds(RESULT_SUCCESS, data)
 
@@ -1373,6 +1337,32 @@ class CMD_SickBeardGetMessages(ApiCall):
         return _responds(RESULT_SUCCESS, messages)
 
 
+class CMD_SickBeardGetStats(ApiCall):
+    _help = {"desc": "get internal performance counters"}
+
+    def __init__(self, args, kwargs):
+        # required
+        # optional
+        # super, missing, help
+        ApiCall.__init__(self, args, kwargs)
+
+    def run(self):
+        """ get the internal performance counters of sickbeard """
+        data = {"airdate_index": airdate_index.getStats(),
+                "db": db.getPoolStats(),
+                "episode_cache": episode_cache.getStats(),
+                "http": helpers.getHTTPStats(),
+                "name_parser": name_parser_cache.getStats(),
+                "notifiers": notifiers.dispatcher.getStats(),
+                "providers": search.getProviderStats(),
+                "rate_limits": rate_limiter.getStats(),
+                "scheduler": sickbeard.schedulerService.getStats(),
+                "show_stats": show_stats.getStats(),
+                "tvdb": tvdb_api.show_data_cache.getStats(),
+                "tvdb_cache": tvdb_cache.get_stats()}
+        return _responds(RESULT_SUCCESS, data)
+
+
 class CMD_SickBeardGetRootDirs(ApiCall):
     _help = {"desc": "get sickbeard user parent directories"}
 
@@ -1663,9 +1653,9 @@ class CMD_Show(ApiCall):
         showDict["status"] = showObj.status
 
         nextAirdate = ''
-        nextEps = showObj.nextEpisode()
-        if (len(nextEps) != 0):
-            nextAirdate = _ordinal_to_dateForm(nextEps[0].airdate.toordinal())
+        showStats = show_stats.getShow(showObj.tvdbid)
+        if showStats["next_airdate"] != None:
+            nextAirdate = _ordinal_to_dateForm(showStats["next_airdate"].toordinal())
         showDict["next_ep_airdate"] = nextAirdate
 
         return _responds(RESULT_SUCCESS, showDict)
@@ -2077,7 +2067,6 @@ class CMD_ShowSeasonList(ApiCall):
         for row in sqlResults:
             seasonList.append(int(row["season"]))
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, seasonList)
 
 
@@ -2137,7 +2126,6 @@ class CMD_ShowSeasons(ApiCall):
                     seasons[curEpisode] = {}
                 seasons[curEpisode] = row
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, seasons)
 
 
@@ -2244,24 +2232,22 @@ class CMD_ShowStats(ApiCall):
                 continue
             episode_qualities_counts_snatch[statusCode] = 0
 
-        myDB = db.DBConnection(row_type="dict")
-        sqlResults = myDB.select("SELECT status, season FROM tv_episodes WHERE showid = ?", [self.tvdbid])
-        # the main loop that goes through all episodes
-        for row in sqlResults:
-            status, quality = Quality.splitCompositeStatus(int(row["status"]))
+        # the main loop that goes through the episode counts of each status
+        for statusCode, count in show_stats.getShow(showObj.tvdbid)["statuses"].iteritems():
+            status, quality = Quality.splitCompositeStatus(statusCode)
 
-            episode_status_counts_total["total"] += 1
+            episode_status_counts_total["total"] += count
 
             if status in Quality.DOWNLOADED:
-                episode_qualities_counts_download["total"] += 1
-                episode_qualities_counts_download[int(row["status"])] += 1
+                episode_qualities_counts_download["total"] += count
+                episode_qualities_counts_download[statusCode] += count
             elif status in Quality.SNATCHED + Quality.SNATCHED_PROPER:
-                episode_qualities_counts_snatch["total"] += 1
-                episode_qualities_counts_snatch[int(row["status"])] += 1
+                episode_qualities_counts_snatch["total"] += count
+                episode_qualities_counts_snatch[statusCode] += count
             elif status == 0: # we dont count NONE = 0 = N/A
                 pass
             else:
-                episode_status_counts_total[status] += 1
+                episode_status_counts_total[status] += count
 
         # the outgoing container
         episodes_stats = {}
@@ -2298,7 +2284,6 @@ class CMD_ShowStats(ApiCall):
             statusString = statusStrings.statusStrings[statusCode].lower().replace(" ", "_").replace("(", "").replace(")", "")
             episodes_stats[statusString] = episode_status_counts_total[statusCode]
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, episodes_stats)
 
 
@@ -2347,15 +2332,15 @@ class CMD_Shows(ApiCall):
     def run(self):
         """ display_is_int_multi( self.tvdbid )shows in sickbeard """
         shows = {}
+        allStats = show_stats.getShows([x.tvdbid for x in sickbeard.showList])
         for curShow in sickbeard.showList:
-            nextAirdate = ''
-            nextEps = curShow.nextEpisode()
-            if (len(nextEps) != 0):
-                nextAirdate = _ordinal_to_dateForm(nextEps[0].airdate.toordinal())
-
             if self.paused != None and bool(self.paused) != bool(curShow.paused):
                 continue
 
+            nextAirdate = ''
+            if allStats[curShow.tvdbid]["next_airdate"] != None:
+                nextAirdate = _ordinal_to_dateForm(allStats[curShow.tvdbid]["next_airdate"].toordinal())
+
             showDict = {"paused": curShow.paused,
                         "quality": _get_quality_string(curShow.quality),
                         "language": curShow.lang,
@@ -2391,14 +2376,12 @@ class CMD_ShowsStats(ApiCall):
         """ display the global shows and episode stats """
         stats = {}
 
-        myDB = db.DBConnection()
-        today = str(datetime.date.today().toordinal())
+        allStats = show_stats.getShows([x.tvdbid for x in sickbeard.showList]).values()
         stats["shows_total"] = len(sickbeard.showList)
         stats["shows_active"] = len([show for show in sickbeard.showList if show.paused == 0 and show.status != "Ended"])
-        stats["ep_downloaded"] = myDB.select("SELECT COUNT(*) FROM tv_episodes WHERE status IN (" + ",".join([str(show) for show in Quality.DOWNLOADED + [ARCHIVED]]) + ") AND season != 0 and episode != 0 AND airdate <= " + today + "")[0][0]
-        stats["ep_total"] = myDB.select("SELECT COUNT(*) FROM tv_episodes WHERE season != 0 and episode != 0 AND (airdate != 1 OR status IN (" + ",".join([str(show) for show in (Quality.DOWNLOADED + Quality.SNATCHED + Quality.SNATCHED_PROPER) + [ARCHIVED]]) + ")) AND airdate <= " + today + " AND status != " + str(IGNORED) + "")[0][0]
+        stats["ep_downloaded"] = sum([x["downloaded"] for x in allStats])
+        stats["ep_total"] = sum([x["total"] for x in allStats])
 
-        myDB.connection.close()
         return _responds(RESULT_SUCCESS, stats)
 
 # WARNING: never define a cmd call string that contains a "_" (underscore)
@@ -2423,6 +2406,7 @@ _functionMaper = {"help": CMD_Help,
                   "sb.forcesearch": CMD_SickBeardForceSearch,
                   "sb.getdefaults": CMD_SickBeardGetDefaults,
                   "sb.getmessages": CMD_SickBeardGetMessages,
+                  "sb.getstats": CMD_SickBeardGetStats,
                   "sb.getrootdirs": CMD_SickBeardGetRootDirs,
                   "sb.pausebacklog": CMD_SickBeardPauseBacklog,
                   "sb.ping": CMD_SickBeardPing,
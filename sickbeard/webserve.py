@@ -37,6 +37,7 @@ from sickbeard import config, sab
 from sickbeard import history, notifiers, processTV
 from sickbeard import ui
 from sickbeard import logger, helpers, exceptions, classes, db
+from sickbeard import log_reader
 from sickbeard import encodingKludge as ek
 from sickbeard import search_queue
 from sickbeard import image_cache
@@ -50,6 +51,7 @@ from sickbeard.webapi import Api
 from sickbeard.scene_exceptions import get_scene_exceptions
 from sickbeard.custom_exceptions import get_custom_exceptions, set_custom_exceptions
 from sickbeard.scene_numbering import get_scene_numbering, set_scene_numbering, get_scene_numbering_for_show
+from sickbeard.show_stats import show_stats
 
 from lib.tvdb_api import tvdb_api
 
@@ -165,6 +167,7 @@ class ManageSearches:
         t.backlogPaused = sickbeard.searchQueueScheduler.action.is_backlog_paused() #@UndefinedVariable
         t.backlogRunning = sickbeard.searchQueueScheduler.action.is_backlog_in_progress() #@UndefinedVariable
         t.searchStatus = sickbeard.currentSearchScheduler.action.amActive #@UndefinedVariable
+        t.notifierStats = notifiers.dispatcher.getStats()
         t.submenu = ManageMenu
 
         return _munge(t)
@@ -689,7 +692,8 @@ class ConfigGeneral:
     @cherrypy.expose
     def saveGeneral(self, log_dir=None, web_port=None, web_log=None, web_ipv6=None,
                     launch_browser=None, web_username=None, use_api=None, api_key=None,
-                    web_password=None, version_notify=None, enable_https=None, https_cert=None, https_key=None):
+                    web_password=None, version_notify=None, enable_https=None, https_cert=None, https_key=None,
+                    show_queue_threads=None, log_debug=None, log_background=None):
 
         results = []
 
@@ -716,6 +720,19 @@ class ConfigGeneral:
         if not config.change_LOG_DIR(log_dir):
             results += ["Unable to create directory " + os.path.normpath(log_dir) + ", log dir not changed."]
 
+        if log_debug == "on":
+            log_debug = 1
+        else:
+            log_debug = 0
+
+        if log_background == "on":
+            log_background = 1
+        else:
+            log_background = 0
+
+        config.change_LOG_DEBUG(log_debug)
+        config.change_LOG_BACKGROUND(log_background)
+
         sickbeard.LAUNCH_BROWSER = launch_browser
 
         sickbeard.WEB_PORT = int(web_port)
@@ -747,6 +764,12 @@ class ConfigGeneral:
 
         config.change_VERSION_NOTIFY(version_notify)
 
+        if not show_queue_threads:
+            show_queue_threads = 3
+
+        sickbeard.SHOW_QUEUE_THREADS = max(1, int(show_queue_threads))
+        sickbeard.showQueueScheduler.action.setThreads(sickbeard.SHOW_QUEUE_THREADS) #@UndefinedVariable
+
         sickbeard.save_config()
 
         if len(results) > 0:
@@ -772,7 +795,8 @@ class ConfigSearch:
     @cherrypy.expose
     def saveSearch(self, use_nzbs=None, use_torrents=None, use_vods=None, nzb_dir=None, sab_username=None, sab_password=None,
                        sab_apikey=None, sab_category=None, sab_host=None, nzbget_password=None, nzbget_category=None, nzbget_host=None,
-                       torrent_dir=None, nzb_method=None, usenet_retention=None, search_frequency=None, download_propers=None):
+                       torrent_dir=None, nzb_method=None, usenet_retention=None, cache_retention=None, search_frequency=None, download_propers=None,
+                       provider_threads=None, provider_timeout=None):
 
         results = []
 
@@ -807,12 +831,24 @@ class ConfigSearch:
         if usenet_retention == None:
             usenet_retention = 200
 
+        if not cache_retention:
+            cache_retention = 7
+
+        if not provider_threads:
+            provider_threads = 4
+
+        if not provider_timeout:
+            provider_timeout = 120
+
         sickbeard.USE_NZBS = use_nzbs
         sickbeard.USE_TORRENTS = use_torrents
         sickbeard.USE_VODS = use_vods
 
         sickbeard.NZB_METHOD = nzb_method
         sickbeard.USENET_RETENTION = int(usenet_retention)
+        sickbeard.CACHE_RETENTION = max(1, int(cache_retention))
+        sickbeard.PROVIDER_THREADS = max(1, int(provider_threads))
+        sickbeard.PROVIDER_TIMEOUT = max(10, int(provider_timeout))
 
         sickbeard.DOWNLOAD_PROPERS = download_propers
 
@@ -859,7 +895,8 @@ class ConfigPostProcessing:
     def savePostProcessing(self, naming_pattern=None, naming_multi_ep=None,
                     xbmc_data=None, mediabrowser_data=None, synology_data=None, sony_ps3_data=None, wdtv_data=None, tivo_data=None,
                     use_banner=None, keep_processed_dir=None, process_automatically=None, rename_episodes=None,
-                    move_associated_files=None, tv_download_dir=None, naming_custom_abd=None, naming_abd_pattern=None):
+                    move_associated_files=None, tv_download_dir=None, naming_custom_abd=None, naming_abd_pattern=None,
+                    post_process_threads=None):
 
         results = []
 
@@ -896,10 +933,14 @@ class ConfigPostProcessing:
         else:
             naming_custom_abd = 0
 
+        if not post_process_threads:
+            post_process_threads = 2
+
         sickbeard.PROCESS_AUTOMATICALLY = process_automatically
         sickbeard.KEEP_PROCESSED_DIR = keep_processed_dir
         sickbeard.RENAME_EPISODES = rename_episodes
         sickbeard.MOVE_ASSOCIATED_FILES = move_associated_files
+        sickbeard.POST_PROCESS_THREADS = max(1, int(post_process_threads))
         sickbeard.NAMING_CUSTOM_ABD = naming_custom_abd
 
         sickbeard.metadata_provider_dict['XBMC'].set_config(xbmc_data)
@@ -2012,57 +2053,22 @@ class ErrorLogs:
         redirect("/errorlogs")
 
     @cherrypy.expose
-    def viewlog(self, minLevel=logger.MESSAGE, maxLines=500):
+    def viewlog(self, minLevel=logger.MESSAGE, maxLines=500, thread=None, page=0):
 
         t = PageTemplate(file="viewlogs.tmpl")
         t.submenu = ErrorLogsMenu
 
         minLevel = int(minLevel)
+        maxLines = int(maxLines)
+        page = max(0, int(page))
 
-        data = []
-        if os.path.isfile(logger.sb_log_instance.log_file):
-            f = ek.ek(open, logger.sb_log_instance.log_file)
-            data = f.readlines()
-            f.close()
-
-        regex =  "^(\w{3})\-(\d\d)\s*(\d\d)\:(\d\d):(\d\d)\s*([A-Z]+)\s*(.+?)\s*\:\:\s*(.*)$"
-
-        finalData = []
+        entries = log_reader.readLog(logger.sb_log_instance.log_file, minLevel, maxLines, thread, page)
 
-        numLines = 0
-        lastLine = False
-        numToShow = min(maxLines, len(data))
-
-        for x in reversed(data):
-
-            x = x.decode('utf-8')
-            match = re.match(regex, x)
-
-            if match:
-                level = match.group(6)
-                if level not in logger.reverseNames:
-                    lastLine = False
-                    continue
-
-                if logger.reverseNames[level] >= minLevel:
-                    lastLine = True
-                    finalData.append(x)
-                else:
-                    lastLine = False
-                    continue
-
-            elif lastLine:
-                finalData.append("AA"+x)
-
-            numLines += 1
-
-            if numLines >= numToShow:
-                break
-
-        result = "".join(finalData)
-
-        t.logLines = result
+        t.logLines = "".join([x.text for x in entries])
         t.minLevel = minLevel
+        t.thread = thread or ""
+        t.page = page
+        t.morePages = len(entries) == maxLines
 
         return _munge(t)
 
@@ -2346,16 +2352,17 @@ class Home:
 
         myDB = db.DBConnection()
 
-        seasonResults = myDB.select(
-            "SELECT DISTINCT season FROM tv_episodes WHERE showid = ? ORDER BY season desc",
-            [showObj.tvdbid]
-        )
-
         sqlResults = myDB.select(
             "SELECT * FROM tv_episodes WHERE showid = ? ORDER BY season DESC, episode DESC",
             [showObj.tvdbid]
         )
 
+        # the rows are in season order already
+        seasonResults = []
+        for curResult in sqlResults:
+            if not seasonResults or seasonResults[-1]["season"] != curResult["season"]:
+                seasonResults.append({"season": curResult["season"]})
+
         t = PageTemplate(file="displayShow.tmpl")
         t.submenu = [ { 'title': 'Edit', 'path': 'home/editShow?show=%d'%showObj.tvdbid } ]
 
@@ -2403,11 +2410,17 @@ class Home:
         epCounts[Overview.UNAIRED] = 0
         epCounts[Overview.SNATCHED] = 0
 
-        for curResult in sqlResults:
+        # there are a lot more episodes than statuses
+        statusCats = {}
+        for curStatus, curCount in show_stats.getShow(showObj.tvdbid)["statuses"].iteritems():
+            statusCats[curStatus] = showObj.getOverview(curStatus)
+            epCounts[statusCats[curStatus]] += curCount
 
-            curEpCat = showObj.getOverview(int(curResult["status"]))
-            epCats[str(curResult["season"])+"x"+str(curResult["episode"])] = curEpCat
-            epCounts[curEpCat] += 1
+        for curResult in sqlResults:
+            curStatus = int(curResult["status"])
+            if curStatus not in statusCats:
+                statusCats[curStatus] = showObj.getOverview(curStatus)
+            epCats[str(curResult["season"])+"x"+str(curResult["episode"])] = statusCats[curStatus]
 
         def titler(x):
             if not x:
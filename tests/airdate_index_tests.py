@@ -0,0 +1,150 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import unittest
+
+import test_lib as test
+
+import sickbeard
+from sickbeard import airdate_index as airdate_index_module
+from sickbeard.airdate_index import airdate_index
+from sickbeard.providers.generic import NZBProvider
+from sickbeard.tv import TVEpisode, TVShow
+
+from lib.tvdb_api import tvdb_exceptions
+
+AIRDATE = datetime.date(2012, 3, 14)
+
+
+class FakeTvdb(object):
+    """
+    Answers airedOn() for a single episode, counting how often it's asked
+    """
+
+    calls = 0
+
+    def __init__(self, **kwargs):
+        pass
+
+    def __getitem__(self, tvdbid):
+        return self
+
+    def airedOn(self, airdate):
+        FakeTvdb.calls += 1
+        if airdate != AIRDATE:
+            raise tvdb_exceptions.tvdb_episodenotfound()
+        return [{"seasonnumber": "2012", "episodenumber": "7"}]
+
+
+class AirDateIndexTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        super(AirDateIndexTests, self).setUp()
+
+        self.show = TVShow(0001, "en")
+        self.show.name = test.SHOWNAME
+        self.show.air_by_date = 1
+        self.show.saveToDB()
+        sickbeard.showList.append(self.show)
+
+        FakeTvdb.calls = 0
+        self.old_tvdb = airdate_index_module.tvdb_api.Tvdb
+        airdate_index_module.tvdb_api.Tvdb = FakeTvdb
+
+    def tearDown(self):
+        airdate_index_module.tvdb_api.Tvdb = self.old_tvdb
+        super(AirDateIndexTests, self).tearDown()
+
+    def _saveEpisode(self, season, episode, airdate):
+        ep = TVEpisode(self.show, season, episode)
+        ep.airdate = airdate
+        ep.saveToDB()
+        return ep
+
+    def test_loaded_from_db(self):
+        myDB = test.db.DBConnection()
+        myDB.action("INSERT INTO tv_episodes (showid, season, episode, airdate) VALUES (?,?,?,?)", [self.show.tvdbid, 2012, 5, AIRDATE.toordinal()])
+        myDB.action("INSERT INTO tv_episodes (showid, season, episode, airdate) VALUES (?,?,?,?)", [self.show.tvdbid, 0, 1, AIRDATE.toordinal()])
+        myDB.action("INSERT INTO tv_episodes (showid, season, episode, airdate) VALUES (?,?,?,?)", [self.show.tvdbid, 2012, 6, 1])
+
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, AIRDATE), [(2012, 5)])
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, datetime.date.fromordinal(1)), [])
+        self.assertEqual(airdate_index.lookup(2, AIRDATE), [])
+
+        stats = airdate_index.getStats()
+        self.assertEqual((stats["shows"], stats["episodes"], stats["hits"], stats["misses"]), (2, 2, 1, 2))
+
+    def test_kept_current(self):
+        airdate_index.lookup(self.show.tvdbid, AIRDATE)
+
+        ep = self._saveEpisode(2012, 5, AIRDATE)
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, AIRDATE), [(2012, 5)])
+
+        # the air date moved
+        self._saveEpisode(2012, 5, AIRDATE + datetime.timedelta(days=1))
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, AIRDATE), [])
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, AIRDATE + datetime.timedelta(days=1)), [(2012, 5)])
+
+        self.assertRaises(sickbeard.exceptions.EpisodeDeletedException, ep.deleteEpisode)
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, AIRDATE + datetime.timedelta(days=1)), [])
+
+    def test_specials_last(self):
+        self._saveEpisode(0, 1, AIRDATE)
+        self._saveEpisode(2012, 5, AIRDATE)
+        self.assertEqual(airdate_index.getEpisode(self.show.tvdbid, AIRDATE), (2012, 5))
+
+        # unless nothing else aired that day
+        other_date = AIRDATE + datetime.timedelta(days=1)
+        self._saveEpisode(0, 2, other_date)
+        self.assertEqual(airdate_index.lookup(self.show.tvdbid, other_date), [(0, 2)])
+        self.assertEqual(airdate_index.getEpisode(self.show.tvdbid, other_date), (0, 2))
+        self.assertEqual(FakeTvdb.calls, 0)
+
+    def test_tvdb_only_on_miss(self):
+        self._saveEpisode(2012, 5, AIRDATE)
+        self.assertEqual(airdate_index.getEpisode(self.show.tvdbid, AIRDATE), (2012, 5))
+        self.assertEqual(FakeTvdb.calls, 0)
+
+        other_date = AIRDATE - datetime.timedelta(days=1)
+        self.assertRaises(tvdb_exceptions.tvdb_episodenotfound, airdate_index.getEpisode, self.show.tvdbid, other_date)
+        self.assertEqual(FakeTvdb.calls, 1)
+
+    def test_tvdb_answer_kept(self):
+        self.assertEqual(airdate_index.getEpisode(self.show.tvdbid, AIRDATE), (2012, 7))
+        self.assertEqual(airdate_index.getEpisode(self.show.tvdbid, AIRDATE), (2012, 7))
+        self.assertEqual(FakeTvdb.calls, 1)
+
+    def test_cache_entry(self):
+        self._saveEpisode(2012, 5, AIRDATE)
+        cache = NZBProvider("Air Date Test").cache
+
+        cache._addCacheEntry("Show.Name.2012.03.14.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+
+        sqlResults = cache._getDB().select("SELECT season, episode FROM provider_cache")
+        self.assertEqual([(x["season"], x["episode"]) for x in sqlResults], [(2012, 5)])
+        self.assertEqual(FakeTvdb.calls, 0)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - AIR DATE INDEX TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(AirDateIndexTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,5 +1,6 @@
 import unittest
 
+import re
 import sys
 import os.path
 sys.path.append(os.path.abspath('..'))
@@ -82,6 +83,66 @@ class QualityTests(unittest.TestCase):
         self.assertEqual(common.Quality.FULLHDBLURAY, common.Quality.nameQuality("Test Show - S01E02 - 1080p BluRay - GROUP"))
         self.assertEqual(common.Quality.UNKNOWN, common.Quality.nameQuality("Test Show - S01E02 - Unknown - SiCKBEARD"))
 
+    def test_reference_implementation(self):
+        # the single pass nameQuality has to agree with the original one on real release names
+        for name in release_names():
+            self.assertEqual(name_quality_reference(name), common.Quality.nameQuality(name), name)
+
+    def test_overlapping_tokens(self):
+        self.assertEqual(common.Quality.SDTV, common.Quality.nameQuality("Test.Show.S01E02.HDTVRip.XViD-GROUP"))
+        self.assertEqual(common.Quality.SDDVD, common.Quality.nameQuality("Test.Show.S01E02.HDDVDRip.x264-GROUP"))
+
+
+def name_quality_reference(name):
+    """
+    The original implementation of Quality.nameQuality which runs a regex at a time, kept to
+    check nameQuality against.
+    """
+    Quality = common.Quality
+
+    name = os.path.basename(name)
+
+    # if we have our exact text then assume we put it there
+    for x in sorted(Quality.qualityStrings, reverse=True):
+        if x == Quality.UNKNOWN:
+            continue
+
+        regex = '\W' + Quality.qualityStrings[x].replace(' ', '\W') + '\W'
+        regex_match = re.search(regex, name, re.I)
+        if regex_match:
+            return x
+
+    checkName = lambda list, func: func([re.search(x, name, re.I) for x in list])
+
+    if checkName(["(pdtv|hdtv|dsr|tvrip|webrip).(xvid|x264)"], all) and not checkName(["(720|1080)[pi]"], all):
+        return Quality.SDTV
+    elif checkName(["(dvdrip|bdrip)(.ws)?.(xvid|divx|x264)"], any) and not checkName(["(720|1080)[pi]"], all):
+        return Quality.SDDVD
+    elif checkName(["720p", "hdtv", "x264"], all) or checkName(["hr.ws.pdtv.x264"], any) and not checkName(["(1080)[pi]"], all):
+        return Quality.HDTV
+    elif checkName(["720p|1080i", "hdtv", "mpeg2"], all):
+        return Quality.RAWHDTV
+    elif checkName(["1080p", "hdtv", "x264"], all):
+        return Quality.FULLHDTV
+    elif checkName(["720p", "web.dl|webrip"], all) or checkName(["720p", "itunes", "h.?264"], all):
+        return Quality.HDWEBDL
+    elif checkName(["1080p", "web.dl|webrip"], all) or checkName(["1080p", "itunes", "h.?264"], all):
+        return Quality.FULLHDWEBDL
+    elif checkName(["720p", "bluray|hddvd", "x264"], all):
+        return Quality.HDBLURAY
+    elif checkName(["1080p", "bluray|hddvd", "x264"], all):
+        return Quality.FULLHDBLURAY
+    else:
+        return Quality.UNKNOWN
+
+
+def release_names():
+    release_file = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'release_names.txt'))
+    try:
+        return [x.strip() for x in release_file if x.strip()]
+    finally:
+        release_file.close()
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(QualityTests)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -30,6 +30,62 @@ class DBBasicTests(test.SickbeardTestDBCase):
     def test_select(self):
         self.db.select("SELECT * FROM tv_episodes WHERE showid = ? AND location != ''", [0000])
 
+    def test_pooled_connection(self):
+        hits_before = test.db.getPoolStats()['hits']
+        other_db = test.db.DBConnection()
+        self.assertTrue(self.db.connection is other_db.connection)
+        self.assertTrue(test.db.getPoolStats()['hits'] > hits_before)
+
+    def test_wal_mode(self):
+        self.assertEqual(self.db.select("PRAGMA journal_mode")[0][0], "wal")
+
+    def test_batch_upsert(self):
+        with self.db.batch():
+            self.db.upsert("tv_episodes", {"name": "first"}, {"showid": 1, "season": 1, "episode": 1})
+            self.db.upsert("tv_episodes", {"name": "second"}, {"showid": 1, "season": 1, "episode": 1})
+            self.db.upsert("tv_episodes", {"name": "other"}, {"showid": 1, "season": 1, "episode": 2})
+            # nothing is written until the batch is done
+            self.assertEqual(len(self.db.select("SELECT * FROM tv_episodes WHERE showid = 1")), 0)
+
+        sqlResults = self.db.select("SELECT name FROM tv_episodes WHERE showid = 1 ORDER BY episode")
+        self.assertEqual([x["name"] for x in sqlResults], ["second", "other"])
+
+        # existing rows are updated, not inserted again
+        with self.db.batch():
+            self.db.upsert("tv_episodes", {"name": "third"}, {"showid": 1, "season": 1, "episode": 1})
+        sqlResults = self.db.select("SELECT name FROM tv_episodes WHERE showid = 1 ORDER BY episode")
+        self.assertEqual([x["name"] for x in sqlResults], ["third", "other"])
+
+    def test_batch_keeps_write_order(self):
+        with self.db.batch():
+            self.db.upsert("tv_episodes", {"name": "ep"}, {"showid": 1, "season": 1, "episode": 1})
+            self.db.action("DELETE FROM tv_episodes WHERE showid = 1")
+        self.assertEqual(len(self.db.select("SELECT * FROM tv_episodes WHERE showid = 1")), 0)
+
+    def test_batch_error_kept(self):
+        def failInBatch():
+            with self.db.batch():
+                self.db.upsert("no_such_table", {"name": "ep"}, {"showid": 1})
+                raise ValueError("original error")
+
+        # the flush failing too doesn't replace the error
+        self.assertRaises(ValueError, failInBatch)
+        self.assertFalse(self.db.isBatched("no_such_table", {"showid": 1}))
+
+        # rows saved before an error are still written
+        try:
+            with self.db.batch():
+                self.db.upsert("tv_episodes", {"name": "ep"}, {"showid": 1, "season": 1, "episode": 1})
+                raise ValueError("original error")
+        except ValueError:
+            pass
+        self.assertEqual(len(self.db.select("SELECT * FROM tv_episodes WHERE showid = 1")), 1)
+
+    def test_dict_rows(self):
+        dict_db = test.db.DBConnection(row_type="dict")
+        self.assertEqual(dict_db.select("SELECT 1 AS one"), [{"one": 1}])
+        self.assertEqual(self.db.select("SELECT 1 AS one")[0]["one"], 1)
+
 
 if __name__ == '__main__':
     print "=================="
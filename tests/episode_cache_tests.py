@@ -0,0 +1,231 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import gc
+import threading
+import time
+import unittest
+
+import test_lib as test
+
+import sickbeard
+from sickbeard.common import SKIPPED
+from sickbeard.episode_cache import episode_cache
+from sickbeard.show_list import ShowList
+from sickbeard.tv import TVShow
+
+
+class EpisodeCacheTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        super(EpisodeCacheTests, self).setUp()
+
+        self.oldSize = episode_cache.maxSize
+        episode_cache.clear()
+        episode_cache.setSize(10)
+
+        self.show = TVShow(0001, "en")
+        self.show.name = test.SHOWNAME
+        self.show.saveToDB()
+        sickbeard.showList = ShowList([self.show])
+
+        myDB = test.db.DBConnection()
+        for episode in range(1, 31):
+            myDB.action("INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                        [self.show.tvdbid, episode, "episode " + str(episode), 1, episode, "plot " + str(episode), 1, 0, 0, SKIPPED, ""])
+
+        sickbeard.tv.TVEpisode.specifyEpisode = test.real_specifyEpisode
+
+    def tearDown(self):
+        sickbeard.tv.TVEpisode.specifyEpisode = test._fake_specifyEP
+        episode_cache.clear()
+        episode_cache.setSize(self.oldSize)
+        super(EpisodeCacheTests, self).tearDown()
+
+    def test_lru_bound(self):
+        for episode in range(1, 31):
+            self.show.getEpisode(1, episode)
+        gc.collect()
+
+        self.assertTrue(len(episode_cache) <= 10)
+        self.assertTrue(len(self.show.episodes) <= 10)
+        self.assertTrue(episode_cache.getStats()["evictions"] >= 20)
+
+        # the most recently used ones are still there
+        self.assertTrue(self.show.getEpisode(1, 30, noCreate=True) != None)
+        self.assertEqual(self.show.getEpisode(1, 1, noCreate=True), None)
+
+    def test_same_object(self):
+        ep = self.show.getEpisode(1, 1)
+        for episode in range(2, 31):
+            self.show.getEpisode(1, episode)
+        gc.collect()
+
+        # it was evicted but it's still in use, so it's the one that's found
+        self.assertTrue(self.show.getEpisode(1, 1) is ep)
+
+    def test_dirty_kept(self):
+        ep = self.show.getEpisode(1, 1)
+        ep.name = "changed"
+        epId = id(ep)
+        del ep
+
+        for episode in range(2, 31):
+            self.show.getEpisode(1, episode)
+        gc.collect()
+
+        ep = self.show.getEpisode(1, 1, noCreate=True)
+        self.assertTrue(ep != None)
+        self.assertEqual(id(ep), epId)
+        self.assertEqual(ep.name, "changed")
+
+    def test_dirty_moved_back(self):
+        oldMaxChecked = episode_cache.maxChecked
+        episode_cache.maxChecked = 3
+        try:
+            dirtyEps = [self.show.getEpisode(1, x) for x in range(1, 11)]
+            for curEp in dirtyEps:
+                curEp.name = "changed"
+
+            # only a few are looked at each time, the dirty ones don't keep the clean ones behind
+            # them from being let go of
+            for episode in range(11, 31):
+                self.show.getEpisode(1, episode)
+
+            self.assertTrue(episode_cache.getStats()["evictions"] > 0)
+            for curEp in dirtyEps:
+                self.assertTrue(self.show.getEpisode(1, curEp.episode, noCreate=True) is curEp)
+        finally:
+            episode_cache.maxChecked = oldMaxChecked
+
+    def test_batched_kept(self):
+        episodes = [self.show.getEpisode(1, 1)]
+        epId = id(episodes[0])
+
+        saved = threading.Event()
+        release = threading.Event()
+
+        def save():
+            myDB = test.db.DBConnection()
+            with myDB.batch():
+                curEp = episodes.pop()
+                curEp.name = "changed"
+                curEp.saveToDB()
+                del curEp
+                saved.set()
+                release.wait(5)
+
+        saveThread = threading.Thread(target=save)
+        saveThread.start()
+        saved.wait(5)
+
+        try:
+            # the row isn't in the database yet, the object is the only place the change is
+            self.assertTrue(test.db.DBConnection().isBatched("tv_episodes", {"showid": self.show.tvdbid, "season": 1, "episode": 1}))
+            for episode in range(2, 31):
+                self.show.getEpisode(1, episode)
+            gc.collect()
+
+            ep = self.show.getEpisode(1, 1, noCreate=True)
+            self.assertTrue(ep != None)
+            self.assertEqual(id(ep), epId)
+        finally:
+            release.set()
+            saveThread.join()
+
+        self.assertFalse(test.db.DBConnection().isBatched("tv_episodes", {"showid": self.show.tvdbid, "season": 1, "episode": 1}))
+        self.assertEqual(test.db.DBConnection().select("SELECT name FROM tv_episodes WHERE showid = ? AND season = 1 AND episode = 1", [self.show.tvdbid])[0]["name"], "changed")
+
+    def test_lazy_description(self):
+        ep = self.show.getEpisode(1, 5)
+        self.assertEqual(ep._description, None)
+        self.assertEqual(ep.description, "plot 5")
+
+        ep.status = SKIPPED + 1
+        ep.saveToDB()
+        self.assertFalse(ep.dirty)
+
+        ep.description = "plot 5"
+        self.assertFalse(ep.dirty)
+        ep.description = "new plot"
+        self.assertTrue(ep.dirty)
+        ep.saveToDB()
+
+        self.show.flushEpisodes()
+        self.assertEqual(self.show.getEpisode(1, 5).description, "new plot")
+
+    def test_set_description_without_loading(self):
+        ep = self.show.getEpisode(1, 6)
+        ep.dirty = False
+
+        # setting it doesn't read the old one first
+        test.db.DBConnection().action("UPDATE tv_episodes SET description = ? WHERE showid = ? AND season = 1 AND episode = 6", ["changed elsewhere", self.show.tvdbid])
+        ep.description = "new plot"
+        self.assertTrue(ep.dirty)
+        self.assertEqual(ep.description, "new plot")
+
+    def test_episode_locks(self):
+        episodes = [self.show.getEpisode(1, x) for x in range(1, 31)]
+
+        locks = self.show.getEpisodeLocks(episodes)
+        self.assertEqual(len(locks), len(set(locks)))
+        for curEp in episodes:
+            self.assertTrue(curEp.lock in locks)
+
+        # the order doesn't depend on the order of the episodes
+        self.assertEqual(locks, self.show.getEpisodeLocks(reversed(episodes)))
+
+        # they're taken more than once for episodes sharing a lock
+        with episodes[0].lock:
+            with episodes[0].lock:
+                pass
+
+    def test_one_object_per_episode(self):
+        self.show.flushEpisodes()
+
+        # make the threads overlap while the episode is being made
+        getEpisodeRow = self.show._getEpisodeRow
+        def slowGetEpisodeRow(season, episode):
+            time.sleep(0.05)
+            return getEpisodeRow(season, episode)
+        self.show._getEpisodeRow = slowGetEpisodeRow
+
+        found = []
+        threads = [threading.Thread(target=lambda: found.append(self.show.getEpisode(1, 7))) for x in range(4)]
+        for curThread in threads:
+            curThread.start()
+        for curThread in threads:
+            curThread.join()
+
+        self.assertEqual(len(found), 4)
+        self.assertEqual(len(set([id(x) for x in found])), 1)
+
+    def test_no_dict(self):
+        ep = self.show.getEpisode(1, 1)
+        self.assertFalse(hasattr(ep, '__dict__'))
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - EPISODE CACHE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(EpisodeCacheTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,174 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measures the memory used per episode object for a synthetic 10,000 episode show, with the
+layout episodes used to have (a __dict__, a lock and a related episode list each and the
+description always loaded) and with the slotted one, and how many of them the episode cache
+keeps alive after every episode has been looked at.
+
+This isn't part of all_tests.py, run it by hand:
+
+    python episode_memory_benchmark.py
+"""
+
+import gc
+import os.path
+import sys
+import threading
+
+import test_lib as test
+
+import sickbeard
+from sickbeard import tv
+from sickbeard.common import SKIPPED
+from sickbeard.episode_cache import episode_cache
+from sickbeard.show_list import ShowList
+
+SEASONS = 100
+EPISODES = 100
+
+DESCRIPTION = "Something happens to somebody, and then something else happens to somebody else. " * 4
+
+
+class OldLayoutEpisode(tv.TVEpisode):
+    """
+    Has everything an episode used to carry around: no __slots__ means a __dict__, and every
+    one has its own lock and relatedEps list and its description loaded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        tv.TVEpisode.__init__(self, *args, **kwargs)
+        self.ownLock = threading.Lock()
+        self.ownRelatedEps = []
+        self.description
+
+
+def footprint(ep):
+    """
+    The bytes used by an episode object and the objects only it refers to
+    """
+    size = sys.getsizeof(ep)
+
+    owned = [ep._name, ep._description, ep._airdate, ep._location, ep._release_name, ep._relatedEps]
+    if hasattr(ep, '__dict__'):
+        size += sys.getsizeof(ep.__dict__)
+        owned += ep.__dict__.values()
+
+    for curObj in owned:
+        if curObj != None:
+            size += sys.getsizeof(curObj)
+
+    return size
+
+
+def rss():
+    """
+    The resident size of the process in bytes, None where /proc isn't there to tell
+    """
+    if not os.path.isfile('/proc/self/statm'):
+        return None
+    return int(open('/proc/self/statm').read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def make_show():
+    sickbeard.showList = ShowList()
+    test.setUp_test_db()
+
+    show = tv.TVShow(0001, "en")
+    show.name = test.SHOWNAME
+    show.saveToDB()
+    sickbeard.showList.append(show)
+
+    episodeRows = []
+    for season in range(1, SEASONS + 1):
+        for episode in range(1, EPISODES + 1):
+            episodeRows.append(["INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location, file_size, release_name) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                                [show.tvdbid, season * 1000 + episode, "Episode %d" % episode, season, episode, DESCRIPTION, 730000 + season * 100 + episode, 0, 0, SKIPPED, "", 0, ""]])
+    test.db.DBConnection().mass_action(episodeRows)
+
+    return show
+
+
+def measure(episodeClass):
+    show = make_show()
+
+    # read every row up front so only the episodes are counted
+    rows = dict([((int(x["season"]), int(x["episode"])), x) for x in test.db.DBConnection().select("SELECT * FROM tv_episodes")])
+
+    gc.collect()
+    rssBefore = rss()
+
+    episodes = [episodeClass(show, season, episode, sqlResult=rows[(season, episode)])
+                for season in range(1, SEASONS + 1) for episode in range(1, EPISODES + 1)]
+
+    gc.collect()
+    rssAfter = rss()
+
+    perEpisode = sum([footprint(x) for x in episodes]) / len(episodes)
+    if rssBefore != None:
+        perEpisodeRSS = (rssAfter - rssBefore) / len(episodes)
+    else:
+        perEpisodeRSS = None
+
+    del episodes
+    sickbeard.showList = ShowList()
+    test.tearDown_test_db()
+
+    return perEpisode, perEpisodeRSS
+
+
+def measure_cache():
+    show = make_show()
+
+    for season in range(1, SEASONS + 1):
+        for episode in range(1, EPISODES + 1):
+            show.getEpisode(season, episode)
+
+    gc.collect()
+    alive = len(show.episodes)
+
+    episode_cache.clear()
+    sickbeard.showList = ShowList()
+    test.tearDown_test_db()
+
+    return alive
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - EPISODE MEMORY BENCHMARK"
+    print "=================="
+
+    # keep the log quiet, we're measuring the episodes here
+    sickbeard.logger.sb_log_instance.initLogging(False)
+    sickbeard.logger.log = lambda *args, **kwargs: None
+
+    # load the episodes for real
+    tv.TVEpisode.specifyEpisode = test.real_specifyEpisode
+
+    oldSize, oldRSS = measure(OldLayoutEpisode)
+    newSize, newRSS = measure(tv.TVEpisode)
+
+    print "old layout: %d bytes per episode" % oldSize
+    print "slotted:    %d bytes per episode" % newSize
+    if oldRSS != None:
+        print "resident size grew by %d bytes per episode with the old layout, %d with the slotted one" % (oldRSS, newRSS)
+
+    alive = measure_cache()
+    print "%d of %d episodes still alive after looking at all of them (episode cache size %d)" % (alive, SEASONS * EPISODES, episode_cache.maxSize)
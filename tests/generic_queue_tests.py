@@ -0,0 +1,133 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import unittest
+import test_lib as test
+
+from sickbeard import generic_queue
+from sickbeard.generic_queue import QueuePriorities
+
+
+class FakeItem(generic_queue.QueueItem):
+
+    def __init__(self, name, priority=QueuePriorities.NORMAL, key=None, action_id=0):
+        generic_queue.QueueItem.__init__(self, name, action_id)
+        self.priority = priority
+        self.key = key
+        self.release = threading.Event()
+        self.finished = False
+
+    def get_key(self):
+        return self.key
+
+    def execute(self):
+        generic_queue.QueueItem.execute(self)
+        self.release.wait(5)
+
+    def finish(self):
+        self.finished = True
+        generic_queue.QueueItem.finish(self)
+
+
+class GenericQueueTests(test.SickbeardTestDBCase):
+
+    def _finishAll(self, queue):
+        for curItem in queue.currentItems:
+            curItem.release.set()
+        for curItem in queue.queue:
+            curItem.release.set()
+
+    def test_order(self):
+        queue = generic_queue.GenericQueue()
+        low = queue.add_item(FakeItem("low", QueuePriorities.LOW))
+        first = queue.add_item(FakeItem("first"))
+        high = queue.add_item(FakeItem("high", QueuePriorities.HIGH))
+        second = queue.add_item(FakeItem("second"))
+
+        self.assertEqual(queue.queue, [high, first, second, low])
+        self.assertEqual(len(queue), 4)
+
+    def test_run_one_at_a_time(self):
+        queue = generic_queue.GenericQueue()
+        first = queue.add_item(FakeItem("first"))
+        second = queue.add_item(FakeItem("second"))
+
+        try:
+            queue.run()
+            self.assertTrue(queue.currentItem is first)
+            self.assertEqual(queue.queue, [second])
+
+            # still running, nothing else starts
+            queue.run()
+            self.assertEqual(queue.currentItems, [first])
+
+            first.release.set()
+            queue._running[0][0].join(5)
+            queue.run()
+            self.assertTrue(first.finished)
+            self.assertTrue(queue.currentItem is second)
+            self.assertFalse(queue.contains(first))
+            self.assertTrue(queue.contains(second))
+        finally:
+            self._finishAll(queue)
+
+    def test_max_running(self):
+        queue = generic_queue.GenericQueue(max_running=2)
+        items = [queue.add_item(FakeItem("item " + str(x))) for x in range(3)]
+
+        try:
+            queue.run()
+            self.assertEqual(queue.currentItems, items[:2])
+            self.assertEqual(queue.queue, items[2:])
+        finally:
+            self._finishAll(queue)
+
+    def test_min_priority(self):
+        queue = generic_queue.GenericQueue()
+        queue.add_item(FakeItem("low", QueuePriorities.LOW))
+        queue.min_priority = QueuePriorities.HIGH
+
+        queue.run()
+        self.assertEqual(queue.currentItems, [])
+        self.assertEqual(len(queue), 1)
+
+    def test_index(self):
+        queue = generic_queue.GenericQueue()
+        first = queue.add_item(FakeItem("first", key=("show", 1), action_id=5))
+        queue.add_item(FakeItem("other", action_id=5))
+
+        self.assertTrue(queue.is_key_queued(("show", 1)))
+        self.assertEqual(queue.find_queued(("show", 1)), [first])
+        self.assertEqual(queue.count_queued(5), 2)
+
+        try:
+            queue.run()
+            self.assertFalse(queue.is_key_queued(("show", 1)))
+            self.assertEqual(queue.count_queued(5), 1)
+        finally:
+            self._finishAll(queue)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - GENERIC QUEUE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(GenericQueueTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,146 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import BaseHTTPServer
+import gzip
+import StringIO
+import threading
+import unittest
+import urllib2
+
+import test_lib as test
+
+from sickbeard import helpers
+
+FEED = '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel></channel></rss>'
+
+
+class FeedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, code, body='', headers={}):
+        self.send_response(code)
+        for name in headers:
+            self.send_header(name, headers[name])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        self.server.connections.add(self.client_address)
+
+        if self.path == "/feed":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"'})
+            else:
+                self._send(200, FEED, {"ETag": '"v1"'})
+
+        elif self.path == "/gzip":
+            data = StringIO.StringIO()
+            gzip_file = gzip.GzipFile(fileobj=data, mode="wb")
+            gzip_file.write(FEED)
+            gzip_file.close()
+            self._send(200, data.getvalue(), {"Content-Encoding": "gzip"})
+
+        elif self.path == "/redirect":
+            self._send(302, headers={"Location": "/feed"})
+
+        else:
+            self._send(404, "not found")
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPTests(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), FeedHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.url = "http://127.0.0.1:%d" % self.server.server_port
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+        self.old_proxies = helpers.http_proxies
+        helpers.http_proxies = {}
+        helpers.http_validators.clear()
+        helpers.http_validator_order.clear()
+
+    def tearDown(self):
+        helpers.http_proxies = self.old_proxies
+        with helpers.http_pools_lock:
+            for pool in helpers.http_pools.values():
+                for conn in pool._idle:
+                    conn.close()
+            helpers.http_pools.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_gzip(self):
+        self.assertEqual(helpers.getURL(self.url + "/gzip"), FEED)
+
+    def test_keep_alive(self):
+        for i in range(3):
+            self.assertEqual(helpers.getURL(self.url + "/feed"), FEED)
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.server.connections), 1)
+
+        stats = helpers.getHTTPStats()["127.0.0.1:%d" % self.server.server_port]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["reused"], 2)
+
+    def test_redirect(self):
+        url, headers, body = helpers.httpGet(self.url + "/redirect")
+        self.assertEqual(url, self.url + "/feed")
+        self.assertEqual(body, FEED)
+
+    def test_errors(self):
+        self.assertRaises(urllib2.HTTPError, helpers.httpGet, self.url + "/missing")
+        self.assertEqual(helpers.getURL(self.url + "/missing"), None)
+
+    def test_conditional_requests(self):
+        with helpers.ConditionalRequests() as requests:
+            self.assertEqual(helpers.getURL(self.url + "/feed"), FEED)
+        self.assertFalse(requests.unchanged())
+
+        with helpers.ConditionalRequests() as requests:
+            self.assertEqual(helpers.getURL(self.url + "/feed"), FEED)
+        self.assertTrue(requests.unchanged())
+
+        stats = helpers.getHTTPStats()["127.0.0.1:%d" % self.server.server_port]
+        self.assertEqual(stats["not_modified"], 1)
+
+        # outside of the block the request isn't conditional
+        self.assertEqual(helpers.getURL(self.url + "/feed"), FEED)
+        self.assertEqual(helpers.getHTTPStats()["127.0.0.1:%d" % self.server.server_port]["not_modified"], 1)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - HTTP TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(HTTPTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,169 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import os.path
+import unittest
+
+import test_lib as test
+
+from sickbeard import logger
+from sickbeard import log_reader
+
+LOG_FILE = os.path.join(test.TESTDIR, 'log_reader_test.log')
+
+LEVEL_NAMES = {logger.DEBUG: 'DEBUG', logger.MESSAGE: 'INFO', logger.WARNING: 'WARNING', logger.ERROR: 'ERROR'}
+
+
+def log_line(logLevel, thread, message):
+    return 'Oct-18 12:00:00 %-8s %s :: %s\n' % (LEVEL_NAMES[logLevel], thread, message)
+
+
+class LogReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.removeFiles()
+
+    def tearDown(self):
+        self.removeFiles()
+
+    def removeFiles(self):
+        for curFile in (LOG_FILE, LOG_FILE + logger.INDEX_SUFFIX):
+            if os.path.isfile(curFile):
+                os.remove(curFile)
+
+    def writeLog(self, messages, indexFrom=0):
+        """
+        Writes (level, thread, text) messages to the log and indexes the ones from indexFrom on,
+        an index level can be given as a fourth item to tell them apart from the real one.
+        """
+        logFile = open(LOG_FILE, 'wb')
+        indexFile = None
+        if indexFrom != None:
+            indexFile = open(LOG_FILE + logger.INDEX_SUFFIX, 'wb')
+
+        for i, curMessage in enumerate(messages):
+            if indexFile and i >= indexFrom:
+                indexFile.write(logger.INDEX_ENTRY.pack(logFile.tell(), curMessage[len(curMessage) > 3 and 3 or 0]))
+            logFile.write(log_line(*curMessage[:3]))
+
+        logFile.close()
+        if indexFile:
+            indexFile.close()
+
+    def texts(self, entries):
+        return [x.text.split(' :: ', 1)[1].rstrip('\n') for x in entries]
+
+    def test_newest_first(self):
+        self.writeLog([(logger.MESSAGE, 'MAIN', 'message %d' % i) for i in range(10)], indexFrom=None)
+
+        self.assertEqual(self.texts(log_reader.readLog(LOG_FILE, maxLines=3)), ['message 9', 'message 8', 'message 7'])
+
+    def test_paging(self):
+        self.writeLog([(logger.MESSAGE, 'MAIN', 'message %d' % i) for i in range(10)])
+
+        self.assertEqual(self.texts(log_reader.readLog(LOG_FILE, maxLines=4, page=1)), ['message 5', 'message 4', 'message 3', 'message 2'])
+        self.assertEqual(self.texts(log_reader.readLog(LOG_FILE, maxLines=4, page=2)), ['message 1', 'message 0'])
+        self.assertEqual(log_reader.readLog(LOG_FILE, maxLines=4, page=3), [])
+
+    def test_level_and_thread(self):
+        messages = []
+        for i in range(10):
+            messages.append((logger.DEBUG, 'SEARCHQUEUE', 'debug %d' % i))
+            messages.append((logger.WARNING, 'POSTPROCESSER', 'warning %d' % i))
+            messages.append((logger.ERROR, 'SEARCHQUEUE', 'error %d' % i))
+
+        for indexFrom in (None, 0, 15):
+            self.removeFiles()
+            self.writeLog(messages, indexFrom)
+
+            entries = log_reader.readLog(LOG_FILE, minLevel=logger.WARNING, maxLines=100)
+            self.assertEqual(len(entries), 20)
+            self.assertTrue(logger.DEBUG not in [x.level for x in entries])
+
+            entries = log_reader.readLog(LOG_FILE, minLevel=logger.DEBUG, maxLines=100, thread='SEARCHQUEUE')
+            self.assertEqual(len(entries), 20)
+            self.assertEqual(self.texts(entries[:2]), ['error 9', 'debug 9'])
+
+    def test_index_skips_levels(self):
+        # the index says these are debug messages, so they aren't read at all
+        self.writeLog([(logger.ERROR, 'MAIN', 'message %d' % i, logger.DEBUG if i % 2 else logger.ERROR) for i in range(10)])
+
+        self.assertEqual(self.texts(log_reader.readLog(LOG_FILE, minLevel=logger.ERROR)), ['message 8', 'message 6', 'message 4', 'message 2', 'message 0'])
+
+        # without the index they are
+        os.remove(LOG_FILE + logger.INDEX_SUFFIX)
+        self.assertEqual(len(log_reader.readLog(LOG_FILE, minLevel=logger.ERROR)), 10)
+
+    def test_bad_index(self):
+        self.writeLog([(logger.MESSAGE, 'MAIN', 'message %d' % i, logger.DEBUG) for i in range(5)])
+
+        # offsets out of order don't go with this log
+        indexFile = open(LOG_FILE + logger.INDEX_SUFFIX, 'ab')
+        indexFile.write(logger.INDEX_ENTRY.pack(0, logger.DEBUG))
+        indexFile.close()
+
+        self.assertEqual(len(log_reader.readLog(LOG_FILE)), 5)
+
+    def test_traceback(self):
+        logFile = open(LOG_FILE, 'wb')
+        logFile.write(log_line(logger.MESSAGE, 'MAIN', 'before'))
+        logFile.write(log_line(logger.ERROR, 'MAIN', 'it broke'))
+        logFile.write('Traceback (most recent call last):\n  File "x.py", line 1\nValueError: oops\n')
+        logFile.write(log_line(logger.MESSAGE, 'MAIN', 'after'))
+        logFile.close()
+
+        entries = log_reader.readLog(LOG_FILE)
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[1].level, logger.ERROR)
+        self.assertTrue(entries[1].text.endswith('ValueError: oops\n'))
+        self.assertEqual(self.texts([entries[0], entries[2]]), ['after', 'before'])
+
+    def test_across_blocks(self):
+        oldBlockSize = log_reader.BLOCK_SIZE
+        log_reader.BLOCK_SIZE = 7
+        try:
+            self.writeLog([(logger.MESSAGE, 'MAIN', 'message %d' % i) for i in range(10)], indexFrom=None)
+            self.assertEqual(self.texts(log_reader.readLog(LOG_FILE)), ['message %d' % i for i in range(9, -1, -1)])
+        finally:
+            log_reader.BLOCK_SIZE = oldBlockSize
+
+    def test_handler_index(self):
+        handler = logger.SBRotatingLogHandler(LOG_FILE, 1, logger.LOG_SIZE)
+        handler.cur_handler = handler._config_handler()
+        logger.logging.getLogger('sickbeard').addHandler(handler.cur_handler)
+        try:
+            handler.setLevel(logger.DEBUG)
+            for i in range(6):
+                handler.log(u"message %d", logger.DEBUG if i % 2 else logger.WARNING, i)
+        finally:
+            logger.logging.getLogger('sickbeard').removeHandler(handler.cur_handler)
+            handler.cur_handler.close()
+            handler._close_index()
+
+        index = log_reader._readIndex(LOG_FILE + logger.INDEX_SUFFIX, os.path.getsize(LOG_FILE))
+        self.assertEqual([x[1] for x in index], [logger.WARNING, logger.DEBUG] * 3)
+        self.assertEqual(self.texts(log_reader.readLog(LOG_FILE, minLevel=logger.WARNING)), ['message 4', 'message 2', 'message 0'])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - LOG READER TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(LogReaderTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,124 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import unittest
+
+import test_lib as test
+
+from sickbeard import logger
+
+
+class ListHandler(logging.Handler):
+    """
+    Keeps the messages written to the log
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage().decode('utf-8'))
+
+
+class LoggerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ListHandler()
+        logging.getLogger('sickbeard').addHandler(self.handler)
+        self.oldLevel = logger.sb_log_instance.level
+
+    def tearDown(self):
+        logger.sb_log_instance.stopWriter()
+        logger.sb_log_instance.setLevel(self.oldLevel)
+        logging.getLogger('sickbeard').removeHandler(self.handler)
+
+    def test_level(self):
+        logger.sb_log_instance.setLevel(logger.MESSAGE)
+        self.assertFalse(logger.isEnabledFor(logger.DEBUG))
+        self.assertTrue(logger.isEnabledFor(logger.WARNING))
+
+        calls = []
+        def message():
+            calls.append(True)
+            return u"expensive"
+
+        logger.log(message, logger.DEBUG)
+        logger.log(u"%s", logger.DEBUG, u"formatted")
+        self.assertEqual(calls, [])
+        self.assertEqual(self.handler.messages, [])
+
+        logger.log(message, logger.MESSAGE)
+        self.assertEqual(calls, [True])
+        self.assertTrue(self.handler.messages[0].endswith(u" :: expensive"))
+
+    def test_formatting(self):
+        logger.sb_log_instance.setLevel(logger.DEBUG)
+
+        logger.log(u"%s rows in %d queries", logger.DEBUG, u"12", 3)
+        logger.log(lambda x: u"called with " + x, logger.DEBUG, u"arg")
+        # a message without args is left alone
+        logger.log(u"100%", logger.DEBUG)
+
+        self.assertTrue(self.handler.messages[0].endswith(u" :: 12 rows in 3 queries"))
+        self.assertTrue(self.handler.messages[1].endswith(u" :: called with arg"))
+        self.assertTrue(self.handler.messages[2].endswith(u" :: 100%"))
+
+    def test_background_writer(self):
+        logger.sb_log_instance.setLevel(logger.DEBUG)
+        logger.sb_log_instance.startWriter()
+
+        threadName = threading.currentThread().getName()
+        for i in range(100):
+            logger.log(u"message %d", logger.DEBUG, i)
+
+        logger.sb_log_instance.stopWriter()
+
+        self.assertEqual(len(self.handler.messages), 100)
+        # the thread named is the one that logged it, not the writer
+        self.assertEqual(self.handler.messages[0], threadName + u" :: message 0")
+        self.assertTrue(self.handler.messages[99].endswith(u" :: message 99"))
+
+    def test_background_writer_full(self):
+        logger.sb_log_instance.setLevel(logger.DEBUG)
+
+        logger.sb_log_instance.startWriter(maxQueued=5)
+
+        # hold the writer up until the queue has overflowed
+        logger.sb_log_instance.log_lock.acquire()
+        try:
+            for i in range(20):
+                logger.log(u"message %d", logger.DEBUG, i)
+        finally:
+            logger.sb_log_instance.log_lock.release()
+
+        logger.sb_log_instance.stopWriter()
+
+        self.assertTrue(len([x for x in self.handler.messages if u" :: message " in x]) < 20)
+        self.assertTrue([x for x in self.handler.messages if u"dropped" in x])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - LOGGER TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(LoggerTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,83 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import test_lib as test
+
+from sickbeard.lru import LRUDict
+
+
+class LRUDictTests(unittest.TestCase):
+
+    def test_order(self):
+        d = LRUDict()
+        for key in ('a', 'b', 'c'):
+            d[key] = key.upper()
+
+        d.touch('a')
+        d['b'] = 'B2'
+        self.assertEqual(d.keys(), ['c', 'a', 'b'])
+        self.assertEqual(len(d), 3)
+        self.assertEqual(d['b'], 'B2')
+        self.assertEqual(d.get('x'), None)
+
+        self.assertEqual(d.popOldest(), ('c', 'C'))
+        self.assertEqual(d.pop('a'), 'A')
+        self.assertEqual(d.pop('a'), None)
+        self.assertEqual(d.popOldest(), ('b', 'B2'))
+        self.assertRaises(KeyError, d.popOldest)
+
+    def test_oldest_keys(self):
+        d = LRUDict()
+        for key in ('a', 'b', 'c', 'd'):
+            d[key] = key.upper()
+        d.touch('a')
+
+        self.assertEqual(d.oldestKeys(2), ['b', 'c'])
+        self.assertEqual(d.oldestKeys(10), ['b', 'c', 'd', 'a'])
+
+    def test_compacted(self):
+        d = LRUDict()
+        d['a'] = 1
+        d['b'] = 2
+        for i in range(1000):
+            d.touch('a')
+
+        self.assertTrue(len(d._order) < 30)
+        self.assertEqual(d.keys(), ['b', 'a'])
+
+    def test_deleted_key_set_again(self):
+        d = LRUDict()
+        d['a'] = 1
+        d['b'] = 2
+        del d['a']
+        d['a'] = 3
+
+        self.assertEqual(d.popOldest(), ('b', 2))
+        self.assertEqual(d.popOldest(), ('a', 3))
+        self.assertEqual(len(d), 0)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - LRU TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(LRUDictTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
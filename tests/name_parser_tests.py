@@ -334,6 +334,56 @@ class BasicTests(unittest.TestCase):
     def test_combination_names(self):
         pass
 
+class CacheTests(unittest.TestCase):
+
+    def setUp(self):
+        parser.name_parser_cache = parser.NameParserCache()
+
+    def test_cache_hits(self):
+        np = parser.NameParser()
+        first = np.parse('Show.Name.S01E02.Source.Quality.Etc-Group')
+        second = np.parse('Show.Name.S01E02.Source.Quality.Etc-Group')
+
+        self.assertTrue(first is second)
+        self.assertEqual(parser.name_parser_cache.hits, 1)
+        self.assertEqual(parser.name_parser_cache.misses, 1)
+
+    def test_cache_keyed_on_file_name(self):
+        file_result = parser.NameParser().parse('Show.Name.S01E02.avi')
+        name_result = parser.NameParser(False).parse('Show.Name.S01E02.avi')
+
+        self.assertEqual(file_result.extra_info, None)
+        self.assertEqual(name_result.extra_info, 'avi')
+
+    def test_results_immutable(self):
+        result = parser.NameParser().parse('Show.Name.S01E02.Source.Quality.Etc-Group')
+        self.assertRaises(AttributeError, setattr, result, 'season_number', 5)
+
+        changed = result.copy(season_number=5)
+        self.assertEqual(changed.season_number, 5)
+        self.assertEqual(result.season_number, 1)
+        self.assertEqual(changed.which_regex, result.which_regex)
+
+    def test_lru_eviction(self):
+        cache = parser.NameParserCache(2)
+        cache.add(('a', True), 'a')
+        cache.add(('b', True), 'b')
+        cache.get(('a', True))
+        cache.add(('c', True), 'c')
+
+        self.assertEqual(cache.get(('b', True)), None)
+        self.assertEqual(cache.get(('a', True)), 'a')
+        self.assertEqual(cache.get(('c', True)), 'c')
+
+    def test_clear_scene_numbering(self):
+        cache = parser.NameParserCache()
+        cache.add(('a', True), 'plain')
+        cache.add(('a', True), 'scene', scene_numbered=True)
+        cache.clearSceneNumbering()
+
+        self.assertEqual(cache.get(('a', True), scene_numbered=True), None)
+        self.assertEqual(cache.get(('a', True)), 'plain')
+
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         suite = unittest.TestLoader().loadTestsFromName('name_parser_tests.BasicTests.test_'+sys.argv[1])
@@ -349,3 +399,6 @@ if __name__ == '__main__':
 
     suite = unittest.TestLoader().loadTestsFromTestCase(FailureCaseTests)
     unittest.TextTestRunner(verbosity=2).run(suite)
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(CacheTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,134 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+
+import test_lib as test
+
+from sickbeard.notifiers.dispatcher import NotificationDispatcher
+
+
+class FakeNotifier(object):
+
+    def __init__(self, failures=0, result=None, delay=0):
+        self.failures = failures
+        self.result = result
+        self.delay = delay
+        self.calls = []
+        self.threads = set()
+
+    def notify_download(self, ep_name):
+        self.threads.add(threading.currentThread())
+        time.sleep(self.delay)
+        self.calls.append(ep_name)
+        if len(self.calls) <= self.failures:
+            raise IOError("host is down")
+        return self.result
+
+    def update_library(self, show_name=None):
+        self.calls.append(show_name)
+        return self.result
+
+
+class NotificationDispatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dispatcher = NotificationDispatcher(maxQueued=5, retryDelay=0.05, coalesceWindow=0.2)
+
+    def tearDown(self):
+        self.dispatcher.stop(5)
+
+    def test_background(self):
+        slow = FakeNotifier(delay=0.3)
+        fast = FakeNotifier()
+
+        start = time.time()
+        self.dispatcher.submit(slow, 'notify_download', ("Show - 1x01",))
+        self.dispatcher.submit(fast, 'notify_download', ("Show - 1x01",))
+        self.assertTrue(time.time() - start < 0.1)
+
+        # a slow notifier doesn't hold up the others
+        time.sleep(0.1)
+        self.assertEqual(fast.calls, ["Show - 1x01"])
+        self.assertEqual(slow.calls, [])
+
+        self.assertTrue(self.dispatcher.waitUntilEmpty(5))
+        self.assertEqual(slow.calls, ["Show - 1x01"])
+        self.assertEqual(len(slow.threads | fast.threads), 2)
+
+    def test_retry(self):
+        notifier = FakeNotifier(failures=2)
+        self.dispatcher.submit(notifier, 'notify_download', ("Show - 1x01",))
+
+        self.assertTrue(self.dispatcher.waitUntilEmpty(5))
+        self.assertEqual(len(notifier.calls), 3)
+
+        stats = self.dispatcher.getStats().values()[0]
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 2, 0))
+        self.assertEqual(stats["last_error"], "notify_download: host is down")
+
+    def test_give_up(self):
+        notifier = FakeNotifier(result=False)
+        self.dispatcher.submit(notifier, 'update_library', ("Show",), failOnFalse=True)
+        # a False result only counts when it's asked for
+        self.dispatcher.submit(notifier, 'notify_download', ("Show - 1x01",))
+
+        self.assertTrue(self.dispatcher.waitUntilEmpty(5))
+        self.assertEqual(len(notifier.calls), 4)
+
+        stats = self.dispatcher.getStats().values()[0]
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 2, 1))
+
+    def test_coalesced(self):
+        notifier = FakeNotifier()
+        for i in range(20):
+            self.dispatcher.submit(notifier, 'update_library', ("Show",), key="Show")
+        self.dispatcher.submit(notifier, 'update_library', ("Other Show",), key="Other Show")
+
+        self.assertTrue(self.dispatcher.waitUntilEmpty(5))
+        self.assertEqual(notifier.calls, ["Show", "Other Show"])
+        self.assertEqual(self.dispatcher.getStats().values()[0]["coalesced"], 19)
+
+    def test_bounded(self):
+        notifier = FakeNotifier(delay=0.05)
+        for i in range(10):
+            self.dispatcher.submit(notifier, 'notify_download', (str(i),))
+
+        self.assertTrue(self.dispatcher.waitUntilEmpty(5))
+        stats = self.dispatcher.getStats().values()[0]
+        self.assertEqual(stats["sent"] + stats["dropped"], 10)
+        self.assertTrue(stats["dropped"] >= 4)
+
+    def test_stop_sends_waiting(self):
+        notifier = FakeNotifier()
+        self.dispatcher.coalesceWindow = 60
+        self.dispatcher.submit(notifier, 'update_library', ("Show",), key="Show")
+
+        self.dispatcher.stop(5)
+        self.assertEqual(notifier.calls, ["Show"])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - NOTIFIER DISPATCH TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(NotificationDispatcherTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,159 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import with_statement
+
+import os.path
+import shutil
+import threading
+import time
+import unittest
+
+import test_lib as test
+
+import sickbeard
+from sickbeard import processTV
+
+DOWNLOADDIR = os.path.join(test.TESTDIR, "process_tv_downloads")
+
+
+class FakePostProcessor(object):
+    """
+    Pretends to post process a file, "Fail" in the name makes it fail and every file of the same
+    show goes in the same library update
+    """
+
+    lock = threading.Lock()
+    processed = []
+    running = 0
+    maxRunning = 0
+
+    def __init__(self, file_path, nzb_name=None, library_updates=None):
+        self.file_path = file_path
+        self.nzb_name = nzb_name
+        self.library_updates = library_updates
+        self.log = u"Processing " + file_path + "\n"
+
+    def process(self):
+        with FakePostProcessor.lock:
+            FakePostProcessor.running += 1
+            FakePostProcessor.maxRunning = max(FakePostProcessor.running, FakePostProcessor.maxRunning)
+
+        time.sleep(0.05)
+
+        with FakePostProcessor.lock:
+            FakePostProcessor.running -= 1
+            FakePostProcessor.processed.append((os.path.basename(self.file_path), self.nzb_name))
+
+        if "Fail" in self.file_path:
+            raise processTV.exceptions.PostProcessingFailed("bad file")
+
+        self.library_updates.add(os.path.basename(self.file_path).split(".")[0])
+        return True
+
+
+class FakeLibraryUpdates(object):
+
+    def __init__(self):
+        self.updates = []
+
+    def __call__(self, showName):
+        self.updates.append(showName)
+
+
+class ProcessDirTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        super(ProcessDirTests, self).setUp()
+
+        FakePostProcessor.processed = []
+        FakePostProcessor.running = 0
+        FakePostProcessor.maxRunning = 0
+
+        self.old = (processTV.postProcessor.PostProcessor, processTV.notifiers.update_library,
+                    sickbeard.TV_DOWNLOAD_DIR, sickbeard.KEEP_PROCESSED_DIR, sickbeard.POST_PROCESS_THREADS)
+        processTV.postProcessor.PostProcessor = FakePostProcessor
+        processTV.notifiers.update_library = FakeLibraryUpdates()
+        sickbeard.TV_DOWNLOAD_DIR = test.TESTDIR
+        sickbeard.KEEP_PROCESSED_DIR = False
+        sickbeard.POST_PROCESS_THREADS = 4
+
+        os.makedirs(DOWNLOADDIR)
+
+    def tearDown(self):
+        (processTV.postProcessor.PostProcessor, processTV.notifiers.update_library,
+         sickbeard.TV_DOWNLOAD_DIR, sickbeard.KEEP_PROCESSED_DIR, sickbeard.POST_PROCESS_THREADS) = self.old
+        shutil.rmtree(DOWNLOADDIR)
+        super(ProcessDirTests, self).tearDown()
+
+    def _makeFile(self, *path):
+        dirName = os.path.join(DOWNLOADDIR, *path[:-1])
+        if not os.path.isdir(dirName):
+            os.makedirs(dirName)
+        open(os.path.join(dirName, path[-1]), "w").close()
+
+    def test_season_pack(self):
+        for episode in range(1, 9):
+            self._makeFile("Show.S01.720p", "Show.S01E%02d.720p.mkv" % episode)
+
+        result = processTV.processDir(os.path.join(DOWNLOADDIR, "Show.S01.720p"), "Show.S01.720p")
+
+        self.assertEqual(len(FakePostProcessor.processed), 8)
+        self.assertEqual(FakePostProcessor.maxRunning, 4)
+        # the nzb name can't be used for more than one file
+        self.assertEqual(set([x[1] for x in FakePostProcessor.processed]), set([None]))
+        self.assertEqual(result.count("Processing succeeded"), 8)
+
+        # one library update for the whole season
+        self.assertEqual(processTV.notifiers.update_library.updates, ["Show"])
+
+        # there was more than one file so the folder stays
+        self.assertTrue(os.path.isdir(os.path.join(DOWNLOADDIR, "Show.S01.720p")))
+
+    def test_folders_deleted(self):
+        self._makeFile("Show.S01E01", "Show.S01E01.mkv")
+        self._makeFile("Show.S01E01", "Sub", "Other.S01E01.mkv")
+        self._makeFile("Show.S01E02", "Show.S01E02.Fail.mkv")
+
+        sickbeard.POST_PROCESS_THREADS = 1
+        result = processTV.processDir(DOWNLOADDIR)
+
+        self.assertEqual(FakePostProcessor.maxRunning, 1)
+        self.assertEqual(sorted([x[0] for x in FakePostProcessor.processed]), ["Other.S01E01.mkv", "Show.S01E01.mkv", "Show.S01E02.Fail.mkv"])
+
+        # the subfolder is deleted first so the folder it was in can go too, the failed one stays
+        self.assertEqual(os.listdir(DOWNLOADDIR), ["Show.S01E02"])
+        self.assertTrue("Processing failed for " + os.path.join(DOWNLOADDIR, "Show.S01E02", "Show.S01E02.Fail.mkv") + ": bad file" in result)
+
+        self.assertEqual(sorted(processTV.notifiers.update_library.updates), ["Other", "Show"])
+
+    def test_single_file_nzb_name(self):
+        self._makeFile("Show.S01E01", "Show.S01E01.mkv")
+
+        processTV.processDir(os.path.join(DOWNLOADDIR, "Show.S01E01"), "Show.S01E01.nzb")
+
+        self.assertEqual(FakePostProcessor.processed, [("Show.S01E01.mkv", "Show.S01E01.nzb")])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - PROCESS TV TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ProcessDirTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
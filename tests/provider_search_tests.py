@@ -0,0 +1,132 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+
+import test_lib as test
+
+import sickbeard
+from sickbeard import exceptions, providers, search
+
+
+class FakeProvider(object):
+
+    def __init__(self, name, delay=0, error=None, active=True):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.active = active
+        self.searched = threading.Event()
+
+    def getID(self):
+        return self.name.lower()
+
+    def isActive(self):
+        return self.active
+
+    def search(self):
+        self.searched.set()
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.name
+
+
+class ProviderSearchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.old_sortedProviderList = providers.sortedProviderList
+        self.old_threads = sickbeard.PROVIDER_THREADS
+        self.old_timeout = sickbeard.PROVIDER_TIMEOUT
+        search.providerStats.clear()
+
+    def tearDown(self):
+        providers.sortedProviderList = self.old_sortedProviderList
+        sickbeard.PROVIDER_THREADS = self.old_threads
+        sickbeard.PROVIDER_TIMEOUT = self.old_timeout
+
+    def _search(self, providerList):
+        providers.sortedProviderList = lambda: providerList
+        return [x[1] for x in search.searchProviders(lambda x: x.search())]
+
+    def test_priority_order(self):
+        sickbeard.PROVIDER_THREADS = 3
+        # the first provider is the slowest but its results still come first
+        results = self._search([FakeProvider("First", 0.3), FakeProvider("Second", 0.1), FakeProvider("Third"),
+                                FakeProvider("Inactive", active=False)])
+        self.assertEqual(results, ["First", "Second", "Third"])
+
+    def test_errors_skipped(self):
+        sickbeard.PROVIDER_THREADS = 2
+        results = self._search([FakeProvider("Broken", error=Exception("broken")), FakeProvider("Auth", error=exceptions.AuthException("bad key")),
+                                FakeProvider("Working")])
+        self.assertEqual(results, ["Working"])
+
+        stats = search.getProviderStats()
+        self.assertEqual(stats["broken"]["errors"], 1)
+        self.assertEqual(stats["auth"]["errors"], 1)
+        self.assertEqual(stats["working"]["errors"], 0)
+        self.assertEqual(stats["working"]["searches"], 1)
+
+    def test_timeout(self):
+        sickbeard.PROVIDER_THREADS = 2
+        sickbeard.PROVIDER_TIMEOUT = 0.2
+        results = self._search([FakeProvider("Slow", 2), FakeProvider("Fast")])
+        self.assertEqual(results, ["Fast"])
+        self.assertEqual(search.getProviderStats()["slow"]["timeouts"], 1)
+
+    def test_hung_workers(self):
+        sickbeard.PROVIDER_THREADS = 1
+        sickbeard.PROVIDER_TIMEOUT = 0.2
+        hung = FakeProvider("Hung", 2)
+
+        # the only worker is stuck on the first provider, the search still ends
+        startTime = time.time()
+        results = self._search([hung, FakeProvider("Waiting")])
+        self.assertEqual(results, [])
+        self.assertTrue(time.time() - startTime < 1.5)
+        self.assertEqual(search.getProviderStats()["waiting"]["timeouts"], 1)
+
+        # and the hung provider isn't searched again while it's still going
+        hung.searched.clear()
+        results = self._search([hung, FakeProvider("Fast")])
+        self.assertEqual(results, ["Fast"])
+        self.assertFalse(hung.searched.isSet())
+
+    def test_early_exit(self):
+        sickbeard.PROVIDER_THREADS = 1
+        providerList = [FakeProvider("First"), FakeProvider("Second", 0.2), FakeProvider("Third")]
+        providers.sortedProviderList = lambda: providerList
+
+        for curProvider, curResults in search.searchProviders(lambda x: x.search()):
+            break
+
+        # the one worker was busy with the second provider so the third one never starts
+        time.sleep(0.4)
+        self.assertFalse(providerList[2].searched.isSet())
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - PROVIDER SEARCH TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ProviderSearchTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,57 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Times Quality.nameQuality against the original regex at a time implementation
+(name_quality_reference in common_tests.py) over the release names in release_names.txt.
+
+This isn't part of all_tests.py, run it by hand:
+
+    python quality_benchmark.py
+"""
+
+import timeit
+
+from common_tests import name_quality_reference, release_names
+
+from sickbeard import common
+
+ROUNDS = 200
+
+
+def time_quality(func, names):
+    def run():
+        for name in names:
+            func(name)
+    return min(timeit.repeat(run, number=ROUNDS, repeat=3))
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - QUALITY BENCHMARK"
+    print "=================="
+
+    names = release_names()
+
+    reference_time = time_quality(name_quality_reference, names)
+    single_pass_time = time_quality(common.Quality.nameQuality, names)
+
+    total = len(names) * ROUNDS
+    print "regex at a time: %d names in %.2fs (%.1fus per name)" % (total, reference_time, reference_time * 1000000 / total)
+    print "single pass:     %d names in %.2fs (%.1fus per name)" % (total, single_pass_time, single_pass_time * 1000000 / total)
+    print "speedup: %.1fx" % (reference_time / single_pass_time)
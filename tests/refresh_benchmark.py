@@ -0,0 +1,106 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Times a refresh of a synthetic 5,000 episode show with every episode saved in its own
+transaction (the old behaviour) and with the write-behind batch of db.DBConnection.
+
+This isn't part of all_tests.py, run it by hand:
+
+    python refresh_benchmark.py
+"""
+
+import os.path
+import time
+
+import test_lib as test
+
+import sickbeard
+from sickbeard.tv import TVShow
+
+SEASONS = 100
+EPISODES = 50
+
+
+class NoBatch(object):
+    """
+    Stand-in for DBBatch which writes every row straight away.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def make_show_files():
+    for season in range(1, SEASONS + 1):
+        for episode in range(1, EPISODES + 1):
+            file_name = "Show.Name.S%02dE%02d.HDTV.x264-GROUP.mkv" % (season, episode)
+            open(os.path.join(test.SHOWDIR, file_name), "w").close()
+
+
+def time_refresh():
+    sickbeard.showList = []
+    test.setUp_test_db()
+
+    show = TVShow(0001, "en")
+    show.name = test.SHOWNAME
+    show.location = test.SHOWDIR
+    show.saveToDB()
+
+    start_time = time.time()
+    # the first pass creates all the episodes, the second one finds them all again
+    show.refreshDir()
+    show.refreshDir()
+    total_time = time.time() - start_time
+
+    episodes = test.db.DBConnection().select("SELECT COUNT(*) FROM tv_episodes WHERE showid = ?", [show.tvdbid])[0][0]
+
+    test.tearDown_test_db()
+
+    return total_time, episodes
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - REFRESH BENCHMARK"
+    print "=================="
+
+    # keep the log quiet, we're timing the database here
+    sickbeard.logger.sb_log_instance.initLogging(False)
+    sickbeard.logger.log = lambda *args, **kwargs: None
+
+    test.setUp_test_show_dir()
+    make_show_files()
+
+    try:
+        real_batch = test.db.DBConnection.batch
+
+        test.db.DBConnection.batch = lambda self: NoBatch()
+        unbatched_time, unbatched_eps = time_refresh()
+
+        test.db.DBConnection.batch = real_batch
+        batched_time, batched_eps = time_refresh()
+    finally:
+        test.tearDown_test_show_dir()
+
+    print "one transaction per episode: %d episodes in %.2fs" % (unbatched_eps, unbatched_time)
+    print "write-behind batch:          %d episodes in %.2fs" % (batched_eps, batched_time)
+    print "speedup: %.1fx" % (unbatched_time / batched_time)
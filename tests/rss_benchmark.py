@@ -0,0 +1,89 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Times reading the title and link of every item in the recorded feeds in feeds/ with
+xml.dom.minidom (the old way) and with the streaming rss_parser.RSSFeed. It also makes a
+100 item newznab feed with big descriptions like a full search result.
+
+This isn't part of all_tests.py, run it by hand:
+
+    python rss_benchmark.py
+"""
+
+import time
+import xml.dom.minidom
+
+import test_lib as test
+
+from sickbeard import helpers
+from sickbeard.rss_parser import RSSFeed
+
+from rss_parser_tests import load_feed
+
+RUNS = 200
+
+
+def minidom_items(data):
+    parsedXML = xml.dom.minidom.parseString(data)
+    results = []
+    for item in parsedXML.getElementsByTagName('item'):
+        results.append((helpers.get_xml_text(item.getElementsByTagName('title')[0]),
+                        helpers.get_xml_text(item.getElementsByTagName('link')[0])))
+    return results
+
+
+def rss_feed_items(data):
+    return [(x.title, x.link) for x in RSSFeed(data)]
+
+
+def big_newznab_feed():
+    data = load_feed('newznab.xml')
+    head = data[:data.index('<item>')]
+    item = data[data.index('<item>'):data.index('</item>') + len('</item>')]
+    description = '<li>Group: alt.binaries.teevee</li>' * 500
+
+    items = [item.replace('S01E02', 'S01E%02d' % (x % 100)).replace('<ul>', '<ul>' + description) for x in range(100)]
+    return head + '\n'.join(items) + '\n</channel>\n</rss>\n'
+
+
+def time_parser(parser, data):
+    start_time = time.time()
+    for i in range(RUNS):
+        parser(data)
+    return (time.time() - start_time) / RUNS
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - RSS BENCHMARK"
+    print "=================="
+
+    feeds = [(x, load_feed(x)) for x in ('newznab.xml', 'kat.xml', 'ezrss.xml')]
+    feeds.append(('newznab, 100 items', big_newznab_feed()))
+
+    for name, data in feeds:
+        if minidom_items(data) != rss_feed_items(data):
+            print "%s: the parsers don't agree!" % name
+            continue
+
+        minidom_time = time_parser(minidom_items, data)
+        rss_feed_time = time_parser(rss_feed_items, data)
+
+        print "%-20s %7d bytes  minidom: %7.2fms  RSSFeed: %6.2fms  speedup: %.1fx" % (name, len(data), minidom_time * 1000,
+                                                                                       rss_feed_time * 1000, minidom_time / rss_feed_time)
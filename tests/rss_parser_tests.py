@@ -0,0 +1,168 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import os.path
+import unittest
+
+import test_lib as test
+
+from sickbeard import exceptions, tvcache
+from sickbeard.providers import ezrss, kat
+from sickbeard.providers.generic import NZBProvider
+from sickbeard.providers.newznab import NewznabProvider
+from sickbeard.rss_parser import RSSFeed
+
+
+def load_feed(name):
+    feed_file = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feeds', name))
+    try:
+        return feed_file.read()
+    finally:
+        feed_file.close()
+
+
+class RSSFeedTests(unittest.TestCase):
+
+    def test_newznab_items(self):
+        feed = RSSFeed(load_feed('newznab.xml'))
+        items = list(feed)
+
+        self.assertEqual(feed.root, 'rss')
+        self.assertEqual(feed.channel['title'], u'nzb.example.com')
+        self.assertEqual([x.title for x in items], [u'Show.Name.S01E02.720p.HDTV.x264-GROUP',
+                                                    u'Show.Name.S01E03.HDTV.XviD-GROUP',
+                                                    u'Show.Name.S01E04.PROPER.HDTV.XviD-OTHER'])
+
+        item = items[0]
+        self.assertEqual(item.link, u'https://nzb.example.com/getnzb/0a1b2c3d4e5f60718293a4b5c6d7e8f9.nzb&i=1234&r=0123456789abcdef')
+        self.assertEqual(item.guid, u'https://nzb.example.com/details/0a1b2c3d4e5f60718293a4b5c6d7e8f9')
+        self.assertEqual(item.pubDate, u'Sat, 18 May 2013 03:04:05 +0100')
+        self.assertEqual(item.category, u'TV > HD')
+        self.assertTrue(item.description.startswith(u'<div><img class="shadow"'))
+        self.assertEqual(item.enclosure['length'], '1234567890')
+        self.assertEqual(item.attrs['category'], '5000')
+        self.assertEqual(item.attrs['tvrageid'], '12345')
+        self.assertEqual(item.get('comments'), u'https://nzb.example.com/details/0a1b2c3d4e5f60718293a4b5c6d7e8f9#comments')
+        self.assertEqual(item.get('missing', 'default'), 'default')
+
+    def test_read_channel(self):
+        feed = RSSFeed(load_feed('ezrss.xml')).readChannel()
+
+        # the title of the <image> isn't the channel's
+        self.assertEqual(feed.channel['title'], u'ezRSS - Latest torrent releases')
+        self.assertEqual(feed.channel['description'], u'Latest torrent releases.')
+
+        # reading the channel doesn't lose the first item
+        self.assertEqual(len(list(feed)), 2)
+
+    def test_nested_elements(self):
+        item = list(RSSFeed(load_feed('ezrss.xml')))[0]
+
+        self.assertEqual(item.title, u'Show Name 1x02 [HDTV - LOL]')
+        self.assertEqual(item.get('fileName'), u'Show.Name.S01E02.HDTV.x264-LOL.[eztv].torrent')
+        self.assertEqual(item.get('infoHash'), u'0A1B2C3D4E5F60718293A4B5C6D7E8F901234567')
+
+    def test_error_document(self):
+        feed = RSSFeed('<?xml version="1.0" encoding="UTF-8"?><error code="100" description="Incorrect user credentials"/>')
+
+        self.assertEqual(list(feed), [])
+        self.assertEqual(feed.root, 'error')
+        self.assertEqual(feed.rootAttrib['code'], '100')
+
+    def test_broken_feed(self):
+        data = load_feed('kat.xml')
+        data = data[:data.index('<title>Show Name S01E03')]
+
+        items = []
+        try:
+            for item in RSSFeed(data):
+                items.append(item)
+        except SyntaxError:
+            pass
+        else:
+            self.fail("The truncated feed didn't raise an error")
+
+        self.assertEqual([x.title for x in items], [u'Show Name S01E02 HDTV x264-GROUP'])
+
+
+class ProviderFeedTests(unittest.TestCase):
+
+    def test_kat(self):
+        provider = kat.KATProvider()
+        items = provider._parseKatRSS(load_feed('kat.xml'))
+
+        # the second item has no seeders
+        self.assertEqual(len(items), 1)
+        self.assertEqual(provider._get_title_and_url(items[0]),
+                         (u'Show Name S01E02 HDTV x264-GROUP', u'http://torcache.net/torrent/0A1B2C3D4E5F60718293A4B5C6D7E8F901234567.torrent?title=[kat.ph]show.name.s01e02.hdtv.x264.group'))
+
+    def test_ezrss(self):
+        provider = ezrss.EZRSSProvider()
+        items = list(RSSFeed(load_feed('ezrss.xml')))
+
+        self.assertEqual(provider._get_title_and_url(items[1]),
+                         (u'Show.Name.S01E03.720p.HDTV.x264-IMMERSE', u'http://torrent.zoink.it/Show.Name.S01E03.720p.HDTV.x264-IMMERSE.[eztv].torrent'))
+
+    def test_newznab_auth(self):
+        provider = NewznabProvider("Test", "https://nzb.example.com/")
+
+        self.assertTrue(provider._checkAuthFromData(load_feed('newznab.xml')))
+        self.assertRaises(exceptions.AuthException, provider._checkAuthFromData,
+                          '<?xml version="1.0" encoding="UTF-8"?><error code="100" description="Incorrect user credentials"/>')
+        self.assertFalse(provider._checkAuthFromData('not xml'))
+
+
+class FeedCache(tvcache.TVCache):
+
+    def __init__(self, provider, data):
+        tvcache.TVCache.__init__(self, provider)
+        self.data = data
+        self.items = []
+
+    def _getRSSData(self):
+        return self.data
+
+    def _parseItem(self, item):
+        self.items.append(item)
+
+
+class TVCacheFeedTests(test.SickbeardTestDBCase):
+
+    def test_update_cache(self):
+        cache = FeedCache(NZBProvider("Feed Test"), load_feed('newznab.xml'))
+        cache.updateCache()
+
+        self.assertEqual([x.title for x in cache.items], [u'Show.Name.S01E02.720p.HDTV.x264-GROUP',
+                                                          u'Show.Name.S01E03.HDTV.XviD-GROUP',
+                                                          u'Show.Name.S01E04.PROPER.HDTV.XviD-OTHER'])
+
+    def test_not_rss(self):
+        cache = FeedCache(NZBProvider("Feed Test"), '<html><body><item>Not a feed</item></body></html>')
+        cache.updateCache()
+
+        self.assertEqual(cache.items, [])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - RSS PARSER TESTS"
+    print "=================="
+    print "######################################################################"
+    for test_class in (RSSFeedTests, ProviderFeedTests, TVCacheFeedTests):
+        suite = unittest.TestLoader().loadTestsFromTestCase(test_class)
+        unittest.TextTestRunner(verbosity=2).run(suite)
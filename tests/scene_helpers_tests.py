@@ -53,6 +53,31 @@ class SceneTests(test.SickbeardTestDBCase):
             s.name = show_name
             self._test_isGoodName(scene_name, s)
 
+    def test_isGoodName_changed_show(self):
+        s = Show(0)
+        s.name = 'Show Name'
+        self.assertTrue(show_name_helpers.isGoodResult('Show.Name.S01E02.Test-Test', s))
+
+        # the cached matcher has to notice the new names
+        s.name = 'Other Name'
+        self.assertFalse(show_name_helpers.isGoodResult('Show.Name.S01E02.Test-Test', s))
+        s.tvrname = 'Show Name'
+        self.assertTrue(show_name_helpers.isGoodResult('Show.Name.S01E02.Test-Test', s))
+
+    def test_findShowForResult(self):
+        first = Show(1)
+        first.name = 'Show Name'
+        second = Show(2)
+        second.name = 'Show Name Two'
+        third = Show(3)
+        third.name = '$#*! Name'
+        showList = [first, second, third]
+
+        self.assertTrue(show_name_helpers.findShowForResult('Show.Name.S01E02.Test-Test', showList) is first)
+        self.assertTrue(show_name_helpers.findShowForResult('Show.Name.Two.S01E02.Test-Test', showList) is second)
+        self.assertTrue(show_name_helpers.findShowForResult('$#*!.Name.S01E02.Test-Test', showList) is third)
+        self.assertEqual(show_name_helpers.findShowForResult('Other.Show.S01E02.Test-Test', showList), None)
+
     def test_sceneToNormalShowNames(self):
         self._test_sceneToNormalShowNames('Show Name 2010', ['Show Name 2010', 'Show Name (2010)'])
         self._test_sceneToNormalShowNames('Show Name US', ['Show Name US', 'Show Name (US)'])
@@ -82,6 +107,9 @@ class SceneTests(test.SickbeardTestDBCase):
         self._test_allPossibleShowNames('Show Name (Full Country Name)', expected=['Show Name (Full Country Name)', 'Show Name (FCN)'])
         self._test_allPossibleShowNames('Show Name (FCN)', -1, 'TVRage Name', expected=['Show Name (FCN)', 'Show Name (Full Country Name)', 'Exception Test', 'TVRage Name'])
 
+        # the reverse lookups stay out of the real list
+        self.assertFalse('FCN' in common.countryList)
+
     def test_filterBadReleases(self):
         self._test_filterBadReleases('Show.S02.German.Stuff-Grp', False)
         self._test_filterBadReleases('Show.S02.Some.Stuff-Core2HD', False)
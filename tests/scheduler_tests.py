@@ -0,0 +1,127 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import threading
+import time
+import unittest
+import test_lib as test
+
+from sickbeard import generic_queue, scheduler
+
+
+class FakeAction:
+
+    def __init__(self):
+        self.amActive = False
+        self.runs = 0
+        self.threadNames = []
+        self.ran = threading.Event()
+
+    def run(self):
+        self.runs += 1
+        self.threadNames.append(threading.currentThread().getName())
+        self.ran.set()
+
+
+class FakeItem(generic_queue.QueueItem):
+
+    def __init__(self, name):
+        generic_queue.QueueItem.__init__(self, name)
+        self.ran = threading.Event()
+
+    def execute(self):
+        generic_queue.QueueItem.execute(self)
+        self.ran.set()
+
+
+class SchedulerTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        test.SickbeardTestDBCase.setUp(self)
+        self.service = scheduler.SchedulerService()
+
+    def tearDown(self):
+        self.service.stop(5)
+        test.SickbeardTestDBCase.tearDown(self)
+
+    def _add(self, cycleTime, runImmediately=True, threadName="TEST"):
+        action = FakeAction()
+        self.service.add(scheduler.Scheduler(action, cycleTime=cycleTime, runImmediately=runImmediately, threadName=threadName, silent=True))
+        return action
+
+    def test_run_when_due(self):
+        soon = self._add(datetime.timedelta(hours=1), threadName="SOON")
+        later = self._add(datetime.timedelta(hours=1), runImmediately=False, threadName="LATER")
+        self.service.start()
+
+        soon.ran.wait(5)
+        self.assertEqual(soon.runs, 1)
+        self.assertEqual(soon.threadNames, ["SOON"])
+        self.assertEqual(later.runs, 0)
+
+        # nothing else is due for an hour so the scheduler goes to sleep
+        time.sleep(0.2)
+        wakeups = self.service.wakeups
+        time.sleep(0.5)
+        self.assertEqual(self.service.wakeups, wakeups)
+
+    def test_force_run(self):
+        action = self._add(datetime.timedelta(hours=1), runImmediately=False)
+        self.service.start()
+
+        cur_scheduler = self.service.schedulers[0]
+        self.assertTrue(cur_scheduler.timeLeft() > datetime.timedelta(minutes=59))
+        self.assertTrue(cur_scheduler.forceRun())
+
+        action.ran.wait(5)
+        self.assertEqual(action.runs, 1)
+
+    def test_abort(self):
+        action = self._add(datetime.timedelta(hours=1))
+        cur_scheduler = self.service.schedulers[0]
+        cur_scheduler.abort = True
+        self.service.start()
+
+        time.sleep(0.5)
+        self.assertEqual(action.runs, 0)
+        self.assertEqual(self.service.schedulers, [])
+        self.assertFalse(cur_scheduler.abort)
+
+    def test_queue_wakes_scheduler(self):
+        queue = generic_queue.GenericQueue()
+        queue_scheduler = scheduler.Scheduler(queue, cycleTime=datetime.timedelta(hours=1), runImmediately=False, threadName="QUEUE", silent=True)
+        self.service.add(queue_scheduler)
+        queue.set_scheduler(queue_scheduler)
+        self.service.start()
+
+        items = [queue.add_item(FakeItem("item " + str(x))) for x in range(3)]
+        for curItem in items:
+            curItem.ran.wait(5)
+            self.assertTrue(curItem.ran.isSet())
+
+        self.assertEqual(len(queue), 0)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - SCHEDULER TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(SchedulerTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
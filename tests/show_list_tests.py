@@ -0,0 +1,88 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import test_lib as test
+
+import sickbeard
+from sickbeard import helpers
+from sickbeard.exceptions import MultipleShowObjectsException
+from sickbeard.show_list import ShowList
+from sickbeard.tv import TVShow
+
+
+class ShowListTests(test.SickbeardTestDBCase):
+
+    def _makeShow(self, tvdbid, name, tvrid=0):
+        show = TVShow(tvdbid, "en")
+        show.name = name
+        show.tvrid = tvrid
+        return show
+
+    def test_lookups(self):
+        show = self._makeShow(1, "Show Name", 10)
+        sickbeard.showList.append(show)
+
+        self.assertTrue(helpers.findCertainShow(sickbeard.showList, 1) is show)
+        self.assertTrue(helpers.findCertainTVRageShow(sickbeard.showList, 10) is show)
+        self.assertEqual(sickbeard.showList.getByName("show.name"), [show])
+        self.assertEqual(helpers.findCertainShow(sickbeard.showList, 2), None)
+        self.assertEqual(helpers.findCertainTVRageShow(sickbeard.showList, 0), None)
+
+    def test_changed_show(self):
+        show = self._makeShow(1, "Show Name")
+        sickbeard.showList.append(show)
+
+        show.name = "New Name"
+        show.tvdbid = 2
+
+        self.assertEqual(sickbeard.showList.getByName("Show Name"), [])
+        self.assertEqual(sickbeard.showList.getByName("New Name"), [show])
+        self.assertEqual(helpers.findCertainShow(sickbeard.showList, 1), None)
+        self.assertTrue(helpers.findCertainShow(sickbeard.showList, 2) is show)
+
+    def test_duplicate_shows(self):
+        # TVShow refuses to make a second copy of a show that's in the list so make both first
+        showList = ShowList([self._makeShow(1, "Show Name"), self._makeShow(1, "Show Name")])
+
+        self.assertRaises(MultipleShowObjectsException, helpers.findCertainShow, showList, 1)
+
+    def test_delete_show(self):
+        show = self._makeShow(1, "Show Name")
+        sickbeard.showList.append(show)
+        sickbeard.showList.append(self._makeShow(2, "Other Show"))
+
+        # deleteShow cleans up the image cache too
+        old_cache_dir = sickbeard.CACHE_DIR
+        sickbeard.CACHE_DIR = test.TESTDIR
+        try:
+            show.deleteShow()
+        finally:
+            sickbeard.CACHE_DIR = old_cache_dir
+
+        self.assertEqual(helpers.findCertainShow(sickbeard.showList, 1), None)
+        self.assertEqual([x.tvdbid for x in sickbeard.showList], [2])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - SHOW LIST TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ShowListTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
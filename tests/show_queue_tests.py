@@ -0,0 +1,114 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+import test_lib as test
+
+from sickbeard import show_queue
+from sickbeard.generic_queue import QueuePriorities
+from sickbeard.rate_limiter import RateLimiter
+
+
+class FakeShow:
+
+    def __init__(self, tvdbid):
+        self.tvdbid = tvdbid
+        self.name = "Show " + str(tvdbid)
+
+
+class FakeItem(show_queue.ShowQueueItem):
+
+    def __init__(self, show, action_id=show_queue.ShowQueueActions.REFRESH, priority=QueuePriorities.NORMAL):
+        show_queue.ShowQueueItem.__init__(self, action_id, show)
+        self.priority = priority
+        self.release = threading.Event()
+
+    def execute(self):
+        show_queue.ShowQueueItem.execute(self)
+        self.release.wait(5)
+
+
+class ShowQueueTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        test.SickbeardTestDBCase.setUp(self)
+        self.queue = show_queue.ShowQueue()
+        self.queue.setThreads(3)
+
+    def tearDown(self):
+        for curItem in self.queue.currentItems:
+            curItem.release.set()
+        test.SickbeardTestDBCase.tearDown(self)
+
+    def test_one_item_per_show(self):
+        show1 = FakeShow(1)
+        first = self.queue.add_item(FakeItem(show1))
+        second = self.queue.add_item(FakeItem(show1, show_queue.ShowQueueActions.RENAME))
+        other = self.queue.add_item(FakeItem(FakeShow(2)))
+
+        self.queue.run()
+        self.assertEqual(self.queue.currentItems, [first, other])
+        self.assertEqual(self.queue.queue, [second])
+
+    def test_reserved_for_user(self):
+        nightly = [self.queue.add_item(FakeItem(FakeShow(x), priority=QueuePriorities.LOW)) for x in range(1, 5)]
+
+        self.queue.run()
+        self.assertEqual(self.queue.currentItems, nightly[:2])
+
+        user = self.queue.add_item(FakeItem(FakeShow(10)))
+        self.queue.run()
+        self.assertEqual(self.queue.currentItems, nightly[:2] + [user])
+
+    def test_update_moves_nightly_update_up(self):
+        show = FakeShow(1)
+        nightly = self.queue.updateShow(show, True, QueuePriorities.LOW)
+        self.assertEqual(nightly.priority, QueuePriorities.LOW)
+
+        self.assertTrue(self.queue.updateShow(show, True) is nightly)
+        self.assertEqual(nightly.priority, QueuePriorities.NORMAL)
+        self.assertEqual(self.queue.queue, [nightly])
+
+
+class RateLimiterTests(unittest.TestCase):
+
+    def test_rate(self):
+        limiter = RateLimiter("test", 20, burst=2)
+
+        startTime = time.time()
+        for i in range(6):
+            limiter.wait()
+        elapsed = time.time() - startTime
+
+        # two go straight away, the other four are 1/20th of a second apart
+        self.assertTrue(0.18 < elapsed < 0.5, elapsed)
+        self.assertEqual(limiter.getStats()["requests"], 6)
+        self.assertEqual(limiter.getStats()["delayed"], 4)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - SHOW QUEUE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ShowQueueTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
+    suite = unittest.TestLoader().loadTestsFromTestCase(RateLimiterTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,143 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import unittest
+
+import test_lib as test
+
+import sickbeard
+from sickbeard.common import Quality, SNATCHED, DOWNLOADED, SKIPPED, IGNORED, UNAIRED, WANTED
+from sickbeard.show_stats import show_stats
+from sickbeard.tv import TVEpisode, TVShow
+
+TODAY = datetime.date.today()
+PAST = TODAY - datetime.timedelta(days=30)
+FUTURE = TODAY + datetime.timedelta(days=7)
+UNKNOWN_AIRDATE = datetime.date.fromordinal(1)
+
+
+class ShowStatsTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        super(ShowStatsTests, self).setUp()
+
+        self.show = TVShow(0001, "en")
+        self.show.name = test.SHOWNAME
+        self.show.saveToDB()
+        sickbeard.showList.append(self.show)
+
+    def _saveEpisode(self, season, episode, status, airdate, location=""):
+        ep = TVEpisode(self.show, season, episode)
+        ep.status = status
+        ep.airdate = airdate
+        ep._location = location
+        ep.saveToDB()
+        return ep
+
+    def _insertEpisode(self, season, episode, status, airdate, location=""):
+        test.db.DBConnection().action("INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                                      [self.show.tvdbid, season * 100 + episode, "", season, episode, "", airdate.toordinal(), 0, 0, status, location])
+
+    def _library(self, addEpisode):
+        addEpisode(1, 1, Quality.compositeStatus(DOWNLOADED, Quality.SDTV), PAST, "/tv/1x01.avi")
+        addEpisode(1, 2, Quality.compositeStatus(SNATCHED, Quality.SDTV), PAST, "/tv/1x02.avi")
+        addEpisode(1, 3, Quality.compositeStatus(SNATCHED, Quality.SDTV), PAST)
+        addEpisode(1, 4, WANTED, PAST)
+        addEpisode(1, 5, IGNORED, PAST)
+        addEpisode(1, 6, SKIPPED, UNKNOWN_AIRDATE)
+        addEpisode(1, 7, UNAIRED, FUTURE)
+        addEpisode(1, 8, UNAIRED, FUTURE + datetime.timedelta(days=7))
+        addEpisode(0, 1, Quality.compositeStatus(DOWNLOADED, Quality.SDTV), PAST, "/tv/0x01.avi")
+
+    def _checkLibrary(self, stats):
+        self.assertEqual(stats["downloaded"], 2)
+        self.assertEqual(stats["total"], 4)
+        self.assertEqual(stats["snatched"], 2)
+        self.assertEqual(stats["wanted"], 1)
+        self.assertEqual(stats["next_airdate"], FUTURE)
+        self.assertEqual(stats["statuses"][Quality.compositeStatus(DOWNLOADED, Quality.SDTV)], 2)
+        self.assertEqual(sum(stats["statuses"].values()), 9)
+
+    def test_loaded_from_db(self):
+        self._library(self._insertEpisode)
+        self._checkLibrary(show_stats.getShow(self.show.tvdbid))
+        self.assertEqual(show_stats.getStats()["loads"], 1)
+
+    def test_kept_current(self):
+        # counted before any of the episodes are there, they're all counted as they're saved
+        self.assertEqual(show_stats.getShow(self.show.tvdbid)["total"], 0)
+
+        self._library(self._saveEpisode)
+        self._checkLibrary(show_stats.getShow(self.show.tvdbid))
+
+        # the same as counting them all again
+        show_stats.clearShow(self.show.tvdbid)
+        self._checkLibrary(show_stats.getShow(self.show.tvdbid))
+
+    def test_status_change(self):
+        self._library(self._insertEpisode)
+        show_stats.getShow(self.show.tvdbid)
+
+        ep = self.show.getEpisode(1, 4)
+        ep.status = Quality.compositeStatus(DOWNLOADED, Quality.SDTV)
+        ep.saveToDB()
+
+        ep = self.show.getEpisode(1, 7)
+        ep.status = WANTED
+        ep.saveToDB()
+
+        stats = show_stats.getShow(self.show.tvdbid)
+        self.assertEqual(stats["downloaded"], 3)
+        self.assertEqual(stats["wanted"], 1)
+        self.assertEqual(stats["next_airdate"], FUTURE + datetime.timedelta(days=7))
+
+    def test_deleted_episode(self):
+        self._library(self._insertEpisode)
+        show_stats.getShow(self.show.tvdbid)
+
+        try:
+            self.show.getEpisode(1, 1).deleteEpisode()
+        except sickbeard.exceptions.EpisodeDeletedException:
+            pass
+
+        stats = show_stats.getShow(self.show.tvdbid)
+        self.assertEqual(stats["downloaded"], 1)
+        self.assertEqual(sum(stats["statuses"].values()), 8)
+
+    def test_several_shows(self):
+        otherShow = TVShow(0002, "en")
+        otherShow.name = "other show"
+        otherShow.saveToDB()
+        sickbeard.showList.append(otherShow)
+
+        self._library(self._insertEpisode)
+        allStats = show_stats.getShows([self.show.tvdbid, otherShow.tvdbid])
+
+        self._checkLibrary(allStats[self.show.tvdbid])
+        self.assertEqual(allStats[otherShow.tvdbid]["total"], 0)
+        self.assertEqual(allStats[otherShow.tvdbid]["next_airdate"], None)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - SHOW STATS TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ShowStatsTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,128 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Times loading a synthetic library of 500 shows and 50,000 episodes from the database with a
+query (and a save) per show and a query per episode (the old behaviour) and with the rows read
+in bulk.
+
+This isn't part of all_tests.py, run it by hand:
+
+    python startup_benchmark.py
+"""
+
+import time
+
+import test_lib as test
+
+import sickbeard
+from sickbeard import tv
+from sickbeard.episode_cache import episode_cache
+from sickbeard.show_list import ShowList
+
+SHOWS = 500
+SEASONS = 10
+EPISODES = 10
+
+
+def make_library():
+    myDB = test.db.DBConnection()
+
+    showRows = []
+    episodeRows = []
+    for tvdbid in range(1, SHOWS + 1):
+        showRows.append(["INSERT INTO tv_shows (tvdb_id, show_name, location, network, genre, runtime, quality, airs, status, flatten_folders, paused, startyear, tvr_id, tvr_name, air_by_date, lang) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                         [tvdbid, "Show %d" % tvdbid, "/tv/Show %d" % tvdbid, "Network", "|Drama|", 60, 3, "Monday 9:00 PM", "Continuing", 0, 0, 2000, 0, "", 0, "en"]])
+        for season in range(1, SEASONS + 1):
+            for episode in range(1, EPISODES + 1):
+                episodeRows.append(["INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location, file_size, release_name) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                                    [tvdbid, tvdbid * 1000 + season * 100 + episode, "Episode %d" % episode, season, episode, "Something happens.", 730000 + season * 100 + episode, 0, 0, 5, "", 0, ""]])
+
+    myDB.mass_action(showRows)
+    myDB.mass_action(episodeRows)
+
+
+def load_library_old():
+    """
+    Every show reads its own row and saves it straight back, every episode reads its own row
+    and looks for its metadata files.
+    """
+    sickbeard.showList = ShowList()
+
+    for sqlShow in test.db.DBConnection().select("SELECT * FROM tv_shows"):
+        curShow = tv.TVShow(int(sqlShow["tvdb_id"]))
+        curShow.saveToDB()
+        sickbeard.showList.append(curShow)
+
+    for curShow in sickbeard.showList:
+        curShow._getEpisodeRow = lambda season, episode: None
+        for season in range(1, SEASONS + 1):
+            for episode in range(1, EPISODES + 1):
+                curShow.getEpisode(season, episode)
+
+
+def load_library_new():
+    sickbeard.showList = ShowList()
+
+    for sqlShow in test.db.DBConnection().select("SELECT * FROM tv_shows"):
+        sickbeard.showList.append(tv.TVShow(int(sqlShow["tvdb_id"]), sqlShow=sqlShow))
+
+    for curShow in sickbeard.showList:
+        for season in range(1, SEASONS + 1):
+            for episode in range(1, EPISODES + 1):
+                curShow.getEpisode(season, episode)
+
+
+def time_load(load_library):
+    test.setUp_test_db()
+    make_library()
+
+    start_time = time.time()
+    load_library()
+    total_time = time.time() - start_time
+
+    episodes = sum([len(curShow.episodes) for curShow in sickbeard.showList])
+
+    sickbeard.showList = ShowList()
+    episode_cache.clear()
+    test.tearDown_test_db()
+
+    return total_time, episodes
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - STARTUP BENCHMARK"
+    print "=================="
+
+    # keep the log quiet, we're timing the database here
+    sickbeard.logger.sb_log_instance.initLogging(False)
+    sickbeard.logger.log = lambda *args, **kwargs: None
+
+    # keep every episode
+    episode_cache.setSize(SHOWS * SEASONS * EPISODES)
+
+    # load the episodes for real
+    tv.TVEpisode.specifyEpisode = test.real_specifyEpisode
+
+    old_time, old_eps = time_load(load_library_old)
+    new_time, new_eps = time_load(load_library_new)
+
+    print "a query per show and episode: %d shows, %d episodes in %.2fs" % (SHOWS, old_eps, old_time)
+    print "rows read in bulk:            %d shows, %d episodes in %.2fs" % (SHOWS, new_eps, new_time)
+    print "speedup: %.1fx" % (old_time / new_time)
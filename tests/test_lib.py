@@ -19,7 +19,6 @@
 
 import unittest
 
-import sqlite3
 
 import sys, os.path
 sys.path.append(os.path.abspath('..'))
@@ -28,9 +27,12 @@ sys.path.append(os.path.abspath('../lib'))
 import sickbeard
 import shutil, time
 from sickbeard import encodingKludge as ek, providers, tvcache
-from sickbeard import db
+from sickbeard import db, scene_exceptions, custom_exceptions, scene_numbering
 from sickbeard.databases import mainDB
 from sickbeard.databases import cache_db
+from sickbeard.show_list import ShowList
+from sickbeard.airdate_index import airdate_index
+from sickbeard.show_stats import show_stats
 
 #=================
 # test globals
@@ -65,7 +67,7 @@ def createTestLogFolder():
 # sickbeard globals
 #=================
 sickbeard.SYS_ENCODING = 'UTF-8'
-sickbeard.showList = []
+sickbeard.showList = ShowList()
 sickbeard.QUALITY_DEFAULT = 4 #hdtv
 sickbeard.FLATTEN_FOLDERS_DEFAULT = 0
 
@@ -94,9 +96,10 @@ def _dummy_saveConfig():
 mainDB.sickbeard.save_config = _dummy_saveConfig
 
 # the real one tries to contact tvdb just stop it from getting more info on the ep
-def _fake_specifyEP(self, season, episode):
+def _fake_specifyEP(self, season, episode, sqlResult=None):
     pass
 
+real_specifyEpisode = sickbeard.tv.TVEpisode.specifyEpisode
 sickbeard.tv.TVEpisode.specifyEpisode = _fake_specifyEP
 
 
@@ -105,13 +108,13 @@ sickbeard.tv.TVEpisode.specifyEpisode = _fake_specifyEP
 #=================
 class SickbeardTestDBCase(unittest.TestCase):
     def setUp(self):
-        sickbeard.showList = []
+        sickbeard.showList = ShowList()
         setUp_test_db()
         setUp_test_episode_file()
         setUp_test_show_dir()
 
     def tearDown(self):
-        sickbeard.showList = []
+        sickbeard.showList = ShowList()
         tearDown_test_db()
         tearDown_test_episode_file()
         tearDown_test_show_dir()
@@ -119,33 +122,15 @@ class SickbeardTestDBCase(unittest.TestCase):
 
 class TestDBConnection(db.DBConnection, object):
 
-    def __init__(self, dbFileName=TESTDBNAME):
+    def __init__(self, dbFileName=TESTDBNAME, row_type=None):
         dbFileName = os.path.join(TESTDIR, dbFileName)
-        super(TestDBConnection, self).__init__(dbFileName)
+        super(TestDBConnection, self).__init__(dbFileName, row_type=row_type)
 
 
 class TestCacheDBConnection(TestDBConnection, object):
 
-    def __init__(self, providerName):
-        db.DBConnection.__init__(self, os.path.join(TESTDIR, TESTCACHEDBNAME))
-
-        # Create the table if it's not already there
-        try:
-            sql = "CREATE TABLE " + providerName + " (name TEXT, season NUMERIC, episodes TEXT, tvrid NUMERIC, tvdbid NUMERIC, url TEXT, time NUMERIC, quality TEXT);"
-            self.connection.execute(sql)
-            self.connection.commit()
-        except sqlite3.OperationalError, e:
-            if str(e) != "table " + providerName + " already exists":
-                raise
-
-        # Create the table if it's not already there
-        try:
-            sql = "CREATE TABLE lastUpdate (provider TEXT, time NUMERIC);"
-            self.connection.execute(sql)
-            self.connection.commit()
-        except sqlite3.OperationalError, e:
-            if str(e) != "table lastUpdate already exists":
-                raise
+    def __init__(self, providerName=None):
+        super(TestCacheDBConnection, self).__init__(TESTCACHEDBNAME)
 
 # this will override the normal db connection
 sickbeard.db.DBConnection = TestDBConnection
@@ -173,10 +158,19 @@ def tearDown_test_db():
     """
     # uncomment next line so leave the db intact beween test and at the end
     #return False
-    if os.path.exists(os.path.join(TESTDIR, TESTDBNAME)):
-        os.remove(os.path.join(TESTDIR, TESTDBNAME))
-    if os.path.exists(os.path.join(TESTDIR, TESTCACHEDBNAME)):
-        os.remove(os.path.join(TESTDIR, TESTCACHEDBNAME))
+    # the pooled connections would otherwise keep using the deleted files
+    db.closeAll()
+    # forget what was read from the deleted files too
+    scene_exceptions.clear_exception_cache()
+    custom_exceptions.clear_custom_exception_cache()
+    custom_exceptions.schema_created = False
+    scene_numbering._schema_created = False
+    airdate_index.clear()
+    show_stats.clear()
+    for db_file in (TESTDBNAME, TESTCACHEDBNAME):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(os.path.join(TESTDIR, db_file + suffix)):
+                os.remove(os.path.join(TESTDIR, db_file + suffix))
 
 
 def setUp_test_episode_file():
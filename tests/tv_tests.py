@@ -21,6 +21,7 @@ import unittest
 import test_lib as test
 
 import sickbeard
+from sickbeard.common import Quality, WANTED, SKIPPED, DOWNLOADED, SNATCHED
 from sickbeard.tv import TVEpisode, TVShow
 
 
@@ -61,6 +62,22 @@ class TVShowTests(test.SickbeardTestDBCase):
         show.loadFromDB(skipNFO=True)
         self.assertEqual(show.name, "newName")
 
+    def test_wantEpisodes(self):
+        show = TVShow(0001, "en")
+        show.quality = Quality.combineQualities([Quality.SDTV], [Quality.HDTV])
+        show.saveToDB()
+
+        myDB = test.db.DBConnection()
+        for (season, episode, status) in [(1, 1, WANTED), (1, 2, SKIPPED), (2, 1, Quality.compositeStatus(DOWNLOADED, Quality.SDTV))]:
+            myDB.action("INSERT INTO tv_episodes (showid, season, episode, status) VALUES (?,?,?,?)", [show.tvdbid, season, episode, status])
+
+        candidates = [(1, 1, Quality.SDTV), (1, 1, Quality.FULLHDTV), (1, 2, Quality.SDTV),
+                      (2, 1, Quality.SDTV), (2, 1, Quality.HDTV), (3, 1, Quality.SDTV)]
+
+        self.assertEqual(show.wantEpisodes(candidates), [show.wantEpisode(*x) for x in candidates])
+        self.assertEqual(show.wantEpisodes(candidates, True), [show.wantEpisode(*x, manualSearch=True) for x in candidates])
+        self.assertEqual(show.getEpisodeStatuses([(1, 2), (3, 1)]), {(1, 2): SKIPPED})
+
 
 class TVEpisodeTests(test.SickbeardTestDBCase):
 
@@ -76,6 +93,18 @@ class TVEpisodeTests(test.SickbeardTestDBCase):
         ep.loadFromDB(1, 1)
         self.assertEqual(ep.name, "asdasdasdajkaj")
 
+    def test_load_from_row(self):
+        show = TVShow(0001, "en")
+        ep = TVEpisode(show, 1, 1)
+        ep.name = "asdasdasdajkaj"
+        ep.saveToDB()
+
+        sqlResult = test.db.DBConnection().select("SELECT * FROM tv_episodes WHERE showid = ?", [show.tvdbid])[0]
+        otherEp = TVEpisode(show, 1, 2)
+        otherEp.loadFromDB(1, 1, sqlResult)
+        self.assertEqual(otherEp.name, "asdasdasdajkaj")
+        self.assertEqual(otherEp.episode, 1)
+
 
 class TVTests(test.SickbeardTestDBCase):
 
@@ -97,6 +126,78 @@ class TVTests(test.SickbeardTestDBCase):
         sickbeard.showList = [show]
         #TODO: implement
 
+    def test_load_show_from_row(self):
+        show = TVShow(0001, "en")
+        show.name = "show name"
+        show.saveToDB()
+
+        sqlShow = test.db.DBConnection().select("SELECT * FROM tv_shows WHERE tvdb_id = ?", [show.tvdbid])[0]
+        sickbeard.showList = []
+        loadedShow = TVShow(0001, sqlShow=sqlShow)
+        self.assertEqual(loadedShow.name, "show name")
+        self.assertEqual(loadedShow.lang, "en")
+
+    def test_getEpisode_rows(self):
+        show = TVShow(0001, "en")
+        myDB = test.db.DBConnection()
+        for episode in (1, 2):
+            myDB.action("INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                        [show.tvdbid, episode, "episode " + str(episode), 1, episode, "", 1, 1, 0, SKIPPED, ""])
+
+        self.assertEqual(show._getEpisodeRow(1, 1)["name"], "episode 1")
+        # every row is handed out once
+        self.assertEqual(show._getEpisodeRow(1, 1), None)
+        self.assertEqual(show._getEpisodeRow(1, 3), None)
+
+        sickbeard.tv.TVEpisode.specifyEpisode = test.real_specifyEpisode
+        try:
+            ep = show.getEpisode(1, 2)
+        finally:
+            sickbeard.tv.TVEpisode.specifyEpisode = test._fake_specifyEP
+        self.assertEqual(ep.name, "episode 2")
+        self.assertTrue(ep.hasnfo)
+        self.assertFalse(ep.hastbn)
+
+        show.clearEpisodeRows()
+        self.assertEqual(show._getEpisodeRow(1, 1)["name"], "episode 1")
+
+    def test_getEpisode_stale_row(self):
+        show = TVShow(0001, "en")
+        sickbeard.showList = [show]
+        myDB = test.db.DBConnection()
+        for episode in (1, 2):
+            myDB.action("INSERT INTO tv_episodes (showid, tvdbid, name, season, episode, description, airdate, hasnfo, hastbn, status, location) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                        [show.tvdbid, episode, "episode " + str(episode), 1, episode, "", 1, 0, 0, WANTED, ""])
+
+        sickbeard.tv.TVEpisode.specifyEpisode = test.real_specifyEpisode
+        try:
+            ep = show.getEpisode(1, 1)
+
+            # the rows are read again while the episode is alive
+            show._episodeRowsTime = 0
+            show.getEpisode(1, 2)
+
+            ep.status = SNATCHED
+            ep.saveToDB()
+            show.flushEpisodes()
+            del ep
+
+            self.assertEqual(show.getEpisode(1, 1).status, SNATCHED)
+
+            # an episode saved by an object that didn't come from getEpisode
+            show.flushEpisodes()
+            show.clearEpisodeRows()
+            self.assertEqual(show._getEpisodeRow(1, 3), None)
+            ep = TVEpisode(show, 1, 2)
+            ep.status = SNATCHED
+            ep.saveToDB()
+            show.flushEpisodes()
+            del ep
+
+            self.assertEqual(show.getEpisode(1, 2).status, SNATCHED)
+        finally:
+            sickbeard.tv.TVEpisode.specifyEpisode = test._fake_specifyEP
+
 
 if __name__ == '__main__':
     print "=================="
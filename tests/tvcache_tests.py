@@ -0,0 +1,145 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import test_lib as test
+
+import sickbeard
+from sickbeard import name_cache
+from sickbeard.common import Quality, WANTED
+from sickbeard.providers.generic import NZBProvider
+from sickbeard.tv import TVShow
+
+
+class FakeEpisode(object):
+
+    def __init__(self, show, season, episode):
+        self.show = show
+        self.season = season
+        self.episode = episode
+
+
+class TVCacheTests(test.SickbeardTestDBCase):
+
+    def setUp(self):
+        super(TVCacheTests, self).setUp()
+
+        self.show = TVShow(0001, "en")
+        self.show.name = test.SHOWNAME
+        self.show.quality = Quality.combineQualities([Quality.SDTV], [])
+        self.show.saveToDB()
+        sickbeard.showList = [self.show]
+
+        myDB = test.db.DBConnection()
+        for episode in range(1, 5):
+            myDB.action("INSERT INTO tv_episodes (showid, season, episode, status) VALUES (?,?,?,?)", [self.show.tvdbid, 1, episode, WANTED])
+
+        self.provider = NZBProvider("Cache Test")
+        self.cache = self.provider.cache
+
+    def _cacheRows(self):
+        return self.cache._getDB().select("SELECT * FROM provider_cache WHERE provider = ?", [self.cache.providerID])
+
+    def test_multi_episode_search(self):
+        self.cache._addCacheEntry("Show.Name.S01E02E03.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/2", tvdb_id=self.show.tvdbid)
+
+        for episode in (2, 3):
+            results = self.cache.searchCache(FakeEpisode(self.show, 1, episode))
+            self.assertEqual([x.url for x in results], ["http://test/1"])
+
+        results = self.cache.searchCache(FakeEpisode(self.show, 1, 4))
+        self.assertEqual([x.url for x in results], ["http://test/2"])
+
+        self.assertEqual(self.cache.searchCache(FakeEpisode(self.show, 1, 1)), [])
+
+    def test_update_existing_item(self):
+        self.cache._addCacheEntry("Show.Name.S01E02E03.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+        self.cache._getDB().action("UPDATE provider_cache SET time = 1")
+        self.cache._getDB().action("DELETE FROM provider_cache_seen")
+
+        self.cache._addCacheEntry("Show.Name.S01E02E03.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+
+        sqlResults = self._cacheRows()
+        self.assertEqual(len(sqlResults), 1)
+        self.assertEqual(sqlResults[0]["time"], 1)
+        self.assertEqual(len(self.cache._getDB().select("SELECT * FROM provider_cache_episodes")), 2)
+
+    def test_seen_items_skipped(self):
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid, guid="guid-1")
+        self.assertEqual(self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid, guid="guid-1"), False)
+
+        self.assertTrue(self.cache._isSeen("guid-1"))
+        self.assertFalse(self.cache._isSeen("http://test/1"))
+
+        self.assertEqual(len(self._cacheRows()), 1)
+
+    def test_unmatched_items_seen(self):
+        # unparsable items and ones for shows we don't have aren't looked at again either
+        self.assertEqual(self.cache._addCacheEntry("Not a tv show", "http://test/1"), False)
+        self.assertTrue(self.cache._isSeen("http://test/1"))
+
+        sickbeard.showList = []
+        test.db.DBConnection().action("DELETE FROM tv_shows")
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/2", guid="guid-2")
+        self.assertTrue(self.cache._isSeen("guid-2"))
+        self.assertEqual(self._cacheRows()[0]["tvdbid"], 0)
+
+        # until a show is added, then they're matched again
+        self.show.saveToDB()
+        sickbeard.showList = [self.show]
+        name_cache.clearCache()
+        self.assertFalse(self.cache._isSeen("http://test/1"))
+        self.assertFalse(self.cache._isSeen("guid-2"))
+
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/2", guid="guid-2")
+        self.assertTrue(self.cache._isSeen("guid-2"))
+        self.assertEqual(self._cacheRows()[0]["tvdbid"], self.show.tvdbid)
+
+        # items which matched a show are kept
+        name_cache.clearCache()
+        self.assertTrue(self.cache._isSeen("guid-2"))
+
+    def test_expire_cache(self):
+        self.cache._addCacheEntry("Show.Name.S01E02E03.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/2", tvdb_id=self.show.tvdbid)
+        self.cache._getDB().action("UPDATE provider_cache SET time = 1 WHERE url = ?", ["http://test/1"])
+        self.cache._getDB().action("UPDATE provider_cache_seen SET time = 1 WHERE item_id = ?", ["http://test/1"])
+
+        self.cache._expireCache()
+
+        self.assertEqual([x["url"] for x in self._cacheRows()], ["http://test/2"])
+        self.assertEqual(len(self.cache._getDB().select("SELECT * FROM provider_cache_episodes")), 0)
+        self.assertFalse(self.cache._isSeen("http://test/1"))
+        self.assertTrue(self.cache._isSeen("http://test/2"))
+
+    def test_list_propers(self):
+        self.cache._addCacheEntry("Show.Name.S01E04.PROPER.HDTV.XviD-GROUP", "http://test/1", tvdb_id=self.show.tvdbid)
+        self.cache._addCacheEntry("Show.Name.S01E04.HDTV.XviD-GROUP", "http://test/2", tvdb_id=self.show.tvdbid)
+        NZBProvider("Other Provider").cache._addCacheEntry("Show.Name.S01E03.REPACK.HDTV.XviD-GROUP", "http://test/3", tvdb_id=self.show.tvdbid)
+
+        self.assertEqual([x["url"] for x in self.cache.listPropers()], ["http://test/1"])
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - TVCACHE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(TVCacheTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,236 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import test_lib as test
+
+from lib.tvdb_api import tvdb_api, tvdb_exceptions
+
+SERIES_XML = """<?xml version="1.0" encoding="UTF-8" ?>
+<Data>
+<Series>
+<id>%(sid)d</id>
+<SeriesName>Show %(sid)d</SeriesName>
+<Language>en</Language>
+<Status>Continuing</Status>
+<banner>graphical/%(sid)d-g.jpg</banner>
+</Series>
+</Data>
+"""
+
+EPISODES_XML = """<?xml version="1.0" encoding="UTF-8" ?>
+<Data>
+<Series>
+<id>%(sid)d</id>
+<SeriesName>Show %(sid)d</SeriesName>
+</Series>
+<Episode>
+<id>1</id>
+<SeasonNumber>1</SeasonNumber>
+<EpisodeNumber>1</EpisodeNumber>
+<EpisodeName>Pilot &amp; More</EpisodeName>
+<FirstAired>2010-01-01</FirstAired>
+<Overview>The first one.</Overview>
+<filename>episodes/%(sid)d/1.jpg</filename>
+</Episode>
+<Episode>
+<id>2</id>
+<SeasonNumber>1</SeasonNumber>
+<EpisodeNumber>2</EpisodeNumber>
+<EpisodeName>Second</EpisodeName>
+<FirstAired></FirstAired>
+</Episode>
+<Episode>
+<id>3</id>
+<SeasonNumber>2</SeasonNumber>
+<EpisodeNumber>1</EpisodeNumber>
+<EpisodeName>%(name)s</EpisodeName>
+<FirstAired>2011-01-01</FirstAired>
+<Overview>A new season.</Overview>
+</Episode>
+</Data>
+"""
+
+
+class FakeTvdb(tvdb_api.Tvdb):
+    """
+    Serves made up XML instead of going to thetvdb.com
+    """
+
+    loads = []
+    updates = []
+    changed = set()
+    episode_name = "Season Two"
+
+    def _loadUrl(self, url, recache=False, language=None):
+        FakeTvdb.loads.append((url, recache))
+        sid = int(url.split('/series/')[1].split('/')[0])
+        if '/all/' in url:
+            return EPISODES_XML % {'sid': sid, 'name': FakeTvdb.episode_name}
+        return SERIES_XML % {'sid': sid}
+
+    def _getUpdates(self, since):
+        FakeTvdb.updates.append(since)
+        return FakeTvdb.changed
+
+
+class ShowDataCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        tvdb_api.show_data_cache.clear()
+        self.old_limits = (tvdb_api.show_data_cache.max_size, tvdb_api.show_data_cache.ttl)
+        FakeTvdb.loads = []
+        FakeTvdb.updates = []
+        FakeTvdb.changed = set()
+        FakeTvdb.episode_name = "Season Two"
+
+    def tearDown(self):
+        tvdb_api.show_data_cache.max_size, tvdb_api.show_data_cache.ttl = self.old_limits
+        tvdb_api.show_data_cache.clear()
+
+    def _expire(self):
+        for cached in tvdb_api.show_data_cache._shows.values():
+            cached.checked -= tvdb_api.show_data_cache.ttl + 1
+
+    def test_show_data(self):
+        show = FakeTvdb(cache=False)[10]
+
+        self.assertEqual(show['seriesname'], u'Show 10')
+        self.assertEqual(show['banner'], u'http://thetvdb.com/banners/graphical/10-g.jpg')
+        self.assertEqual(sorted(show.keys()), [1, 2])
+        self.assertEqual(show[1][1]['episodename'], u'Pilot & More')
+        self.assertEqual(show[1][1]['filename'], u'http://thetvdb.com/banners/episodes/10/1.jpg')
+        self.assertEqual(show[1][2]['firstaired'], None)
+        self.assertRaises(tvdb_exceptions.tvdb_attributenotfound, show[1][2].__getitem__, 'overview')
+        self.assertEqual(show[2][1]['episodename'], u'Season Two')
+        self.assertTrue(show[1][1].season is show[1])
+
+    def test_shared_between_instances(self):
+        first = FakeTvdb()[10]
+        second = FakeTvdb()[10]
+
+        self.assertEqual(len(FakeTvdb.loads), 2)
+        self.assertFalse(first is second)
+        self.assertEqual(second[2][1]['episodename'], u'Season Two')
+        self.assertEqual(second[1][2]['firstaired'], None)
+
+        # each instance gets its own objects
+        second[1][1]['episodename'] = u'Changed'
+        self.assertEqual(FakeTvdb()[10][1][1]['episodename'], u'Pilot & More')
+
+        # a different language is a different show
+        FakeTvdb(language='de')[10]
+        self.assertEqual(len(FakeTvdb.loads), 4)
+
+        stats = tvdb_api.show_data_cache.getStats()
+        self.assertEqual((stats['shows'], stats['episodes'], stats['hits'], stats['misses']), (2, 6, 2, 2))
+
+    def test_no_cache_reloads(self):
+        FakeTvdb()[10]
+        FakeTvdb.episode_name = "New Name"
+
+        # refreshing without the cache stores the new data for everyone else
+        self.assertEqual(FakeTvdb(cache=False)[10][2][1]['episodename'], u'New Name')
+        self.assertEqual(FakeTvdb()[10][2][1]['episodename'], u'New Name')
+        self.assertEqual(len(FakeTvdb.loads), 4)
+
+    def test_unchanged_updates(self):
+        FakeTvdb()[10]
+        FakeTvdb()[11]
+        self._expire()
+
+        FakeTvdb()[10]
+        FakeTvdb()[11]
+
+        # one check of the updates covers both shows and nothing is reloaded
+        self.assertEqual(len(FakeTvdb.updates), 1)
+        self.assertEqual(len(FakeTvdb.loads), 4)
+
+    def test_changed_updates(self):
+        FakeTvdb()[10]
+        FakeTvdb()[11]
+        self._expire()
+
+        FakeTvdb.changed = set([11])
+        FakeTvdb.episode_name = "New Name"
+
+        self.assertEqual(FakeTvdb()[10][2][1]['episodename'], u'Season Two')
+        self.assertEqual(FakeTvdb()[11][2][1]['episodename'], u'New Name')
+
+        # the changed show is loaded again past the disk cache
+        self.assertEqual(FakeTvdb.loads[4:], [(u'http://thetvdb.com/api/0629B785CE550C8D/series/11/en.xml', True),
+                                              (u'http://thetvdb.com/api/0629B785CE550C8D/series/11/all/en.xml', True)])
+        self.assertFalse(tvdb_api.show_data_cache.isChanged(11))
+
+    def test_failed_updates(self):
+        FakeTvdb()[10]
+        self._expire()
+
+        FakeTvdb.changed = None
+        FakeTvdb()[10]
+
+        self.assertEqual(len(FakeTvdb.loads), 4)
+
+    def test_size_limit(self):
+        FakeTvdb()[10]
+        tvdb_api.show_data_cache.max_size = tvdb_api.show_data_cache.getStats()['size'] * 2 + 1
+
+        FakeTvdb()[11]
+        FakeTvdb()[10]
+        FakeTvdb()[12]
+
+        # 11 was the least recently used
+        self.assertEqual(sorted(tvdb_api.show_data_cache._shows.keys()), [(10, 'en'), (12, 'en')])
+
+
+    def test_add_data(self):
+        FakeTvdb()[10]
+        key = (10, 'en')
+        cached = tvdb_api.show_data_cache._shows[key]
+        oldData = cached.data
+        oldSize = tvdb_api.show_data_cache.getStats()['size']
+
+        banners = {'poster': {'680x1000': {1: {'bannerpath': u'posters/10-1.jpg'}}}}
+        tvdb_api.show_data_cache.addData(key, cached, '_banners', banners)
+
+        # readers of the old data aren't disturbed, and the size counts the new data
+        self.assertFalse('_banners' in oldData)
+        self.assertEqual(cached.data['_banners'], banners)
+        self.assertTrue(tvdb_api.show_data_cache.getStats()['size'] > oldSize)
+        self.assertEqual(tvdb_api.show_data_cache.getStats()['size'], cached.size)
+
+        # data for a show that's been dropped since is ignored
+        tvdb_api.show_data_cache.clear()
+        tvdb_api.show_data_cache.addData(key, cached, '_actors', [])
+        self.assertFalse('_actors' in cached.data)
+        self.assertEqual(tvdb_api.show_data_cache.getStats()['size'], 0)
+
+        # an instance wanting the banners adds them to the shared show
+        FakeTvdb()[10]
+        FakeTvdb(banners=True)[10]
+        self.assertTrue('_banners' in tvdb_api.show_data_cache._shows[key].data)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - TVDB CACHE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(ShowDataCacheTests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
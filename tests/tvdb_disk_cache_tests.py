@@ -0,0 +1,180 @@
+# coding=UTF-8
+# URL: http://code.google.com/p/sickbeard/
+#
+# This file is part of Sick Beard.
+#
+# Sick Beard is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Sick Beard is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Sick Beard.  If not, see <http://www.gnu.org/licenses/>.
+
+import httplib
+import os.path
+import shutil
+import StringIO
+import tempfile
+import unittest
+import urllib2
+
+import test_lib as test
+
+from lib.tvdb_api import tvdb_api, tvdb_cache
+
+HEADERS = "Content-Type: text/xml\r\n"
+BODY = "<Data>%s</Data>" % ("<Episode><id>1</id></Episode>" * 100)
+
+
+class CacheStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.store = tvdb_cache.CacheStore(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_store_and_lookup(self):
+        self.assertEqual(self.store.lookup("http://test/1", 60), None)
+
+        self.store.store("http://test/1", HEADERS, BODY)
+        self.assertEqual(self.store.lookup("http://test/1", 60), (HEADERS, BODY))
+
+        stats = self.store.get_stats()
+        self.assertEqual((stats["entries"], stats["raw_size"], stats["hits"], stats["misses"], stats["hit_rate"]),
+                         (1, len(BODY), 1, 1, 0.5))
+        # the body is stored compressed
+        self.assertTrue(stats["size"] < len(BODY) / 10)
+
+        # everything goes in the one database (and its write-ahead log)
+        for name in os.listdir(self.cache_dir):
+            self.assertTrue(name.startswith(tvdb_cache.CACHE_FILENAME))
+
+    def test_expired(self):
+        self.store.store("http://test/1", HEADERS, BODY)
+        self.store._connection().execute("UPDATE responses SET stored = stored - 120")
+
+        self.assertEqual(self.store.lookup("http://test/1", 60), None)
+        self.assertEqual(self.store.lookup("http://test/1", 600), (HEADERS, BODY))
+
+        self.assertEqual(self.store.prune(60), 1)
+        self.assertEqual(self.store.lookup("http://test/1", 600), None)
+
+    def test_lru_eviction(self):
+        self.store.store("http://test/1", HEADERS, BODY)
+        self.store.max_size = self.store.get_stats()["size"] * 5 / 2
+
+        self.store.store("http://test/2", HEADERS, BODY + " ")
+        self.store._connection().execute("UPDATE responses SET accessed = accessed - 10")
+        # reading 1 makes 2 the least recently used one
+        self.store.lookup("http://test/1", 60)
+        self.store.store("http://test/3", HEADERS, BODY + "  ")
+
+        self.assertEqual(self.store.lookup("http://test/2", 60), None)
+        self.assertEqual(self.store.lookup("http://test/1", 60), (HEADERS, BODY))
+        self.assertEqual(self.store.get_stats()["evictions"], 1)
+
+    def test_persisted_stats(self):
+        self.store.store("http://test/1", HEADERS, BODY)
+        self.store.lookup("http://test/1", 60)
+        self.store.lookup("http://test/2", 60)
+        self.store.store("http://test/2", HEADERS, BODY)
+
+        # a new process (like the maintenance command) sees the same hit rate
+        stats = tvdb_cache.CacheStore(self.cache_dir).get_stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"]), (2, 1, 1))
+
+        self.store.clear()
+        stats = self.store.get_stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]), (0, 0, 0, None))
+
+    def test_legacy_files_removed(self):
+        legacy_dir = tempfile.mkdtemp()
+        try:
+            for name in ("abc.headers", "abc.body", "other.txt"):
+                open(os.path.join(legacy_dir, name), "w").close()
+
+            tvdb_cache.CacheStore(legacy_dir)
+
+            self.assertEqual(sorted(x for x in os.listdir(legacy_dir) if not x.startswith(tvdb_cache.CACHE_FILENAME)), ["other.txt"])
+        finally:
+            shutil.rmtree(legacy_dir)
+
+
+
+class FakeServer(urllib2.BaseHandler):
+    """Answers every request in place of thetvdb.com, after the rate limiter and before the
+    real HTTP handler
+    """
+    handler_order = 450
+
+    def __init__(self, body):
+        self.body = body
+        self.requests = 0
+
+    def http_open(self, request):
+        self.requests += 1
+        response = urllib2.addinfourl(StringIO.StringIO(self.body), httplib.HTTPMessage(StringIO.StringIO(HEADERS)), request.get_full_url())
+        response.code = 200
+        response.msg = "OK"
+        return response
+
+
+class FakeLimiter(object):
+
+    def __init__(self):
+        self.waits = 0
+
+    def wait(self):
+        self.waits += 1
+
+
+class UncachedRequestTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.limiter = FakeLimiter()
+        self.tvdb = tvdb_api.Tvdb(cache=self.cache_dir, rate_limiter=self.limiter)
+        self.server = FakeServer(BODY)
+        self.tvdb.urlopener.add_handler(self.server)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_recache(self):
+        self.assertEqual(self.tvdb._loadUrl("http://test/1"), BODY)
+        self.assertEqual(self.tvdb._loadUrl("http://test/1"), BODY)
+        self.assertEqual((self.server.requests, self.limiter.waits), (1, 1))
+
+        # going back to the server is rate limited too, and the new response is cached
+        self.server.body = BODY + " "
+        self.assertEqual(self.tvdb._loadUrl("http://test/1", recache=True), BODY + " ")
+        self.assertEqual((self.server.requests, self.limiter.waits), (2, 2))
+        self.assertEqual(self.tvdb._loadUrl("http://test/1"), BODY + " ")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_updates(self):
+        self.server.body = "<Items><Series>1</Series><Series>2</Series></Items>"
+        self.assertEqual(self.tvdb._getUpdates(10), set([1, 2]))
+        self.assertEqual(self.tvdb._getUpdates(10), set([1, 2]))
+
+        # never cached, but rate limited
+        self.assertEqual((self.server.requests, self.limiter.waits), (2, 2))
+        self.assertEqual(tvdb_cache.get_store(self.cache_dir).get_stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    print "=================="
+    print "STARTING - TVDB DISK CACHE TESTS"
+    print "=================="
+    print "######################################################################"
+    suite = unittest.TestLoader().loadTestsFromTestCase(CacheStoreTests)
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(UncachedRequestTests))
+    unittest.TextTestRunner(verbosity=2).run(suite)